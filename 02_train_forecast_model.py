@@ -8,8 +8,11 @@ from azure_config import get_ml_client
 from azure.ai.ml import automl, Input
 from azure.ai.ml.constants import AssetTypes
 from azure.ai.ml.automl import ForecastingJob
-import pandas as pd
 import os
+import shutil
+
+from data_loader import FORECAST_DIR, FORECAST_CSV
+from data_quality import validate_sidecar
 
 def verify_clean_data():
     """정제된 데이터 확인"""
@@ -25,25 +28,16 @@ def verify_clean_data():
             "먼저 clean_data.py를 실행하여 중복 없는 데이터를 생성하세요."
         )
 
-    # 데이터 로드 및 검증
-    df = pd.read_csv('./cont_forecast_clean/data.csv')
-    df['colDate'] = pd.to_datetime(df['colDate'])
-
-    print(f"✅ 데이터 로드: {len(df):,} 행")
-    print(f"   컬럼: {list(df.columns)}")
-
-    # 중복 확인
-    dup_check = df.groupby(['contID', 'colDate']).size()
-    dup_count = (dup_check > 1).sum()
-
-    if dup_count > 0:
-        raise ValueError(f"⚠️ 여전히 {dup_count}개의 중복이 있습니다. clean_data.py를 다시 실행하세요.")
+    # 품질 리포트(_quality.json) + data.csv 지문으로 검증 (데이터를 다시 읽지 않음)
+    report = validate_sidecar(FORECAST_DIR)
 
+    print(f"✅ 데이터: {report['rows']:,} 행 (품질 리포트 기준, 리포트 이후 변경 없음)")
+    print(f"   컬럼: {list(report['nan_counts'])}")
     print("✅ 중복 검사 통과: 0개")
-    print(f"   존 개수: {df['contID'].nunique()}개")
-    print(f"   시간 범위: {df['colDate'].min()} ~ {df['colDate'].max()}")
+    print(f"   존 개수: {report['series']}개")
+    print(f"   시간 범위: {report['time_min']} ~ {report['time_max']}")
 
-    return df
+    return report
 
 def create_automl_forecast_job():
     """AutoML Forecasting Job 생성"""
@@ -105,11 +99,11 @@ def main():
     """메인 실행 함수"""
 
     # 1. 정제된 데이터 확인
-    df = verify_clean_data()
+    verify_clean_data()
 
-    # 2. cont_forecast_data.csv 파일로 저장
+    # 2. cont_forecast_data.csv 파일로 저장 (검증된 data.csv 그대로)
     output_path = "cont_forecast_data.csv"
-    df.to_csv(output_path, index=False)
+    shutil.copyfile(FORECAST_CSV, output_path)
     print(f"✅ 예측용 데이터 저장 완료: {output_path}")
 
     # AutoML Job 생성 및 제출 부분은 주석 처리하거나 필요에 따라 활성화
@@ -2,14 +2,25 @@
 Step 3: 이상 탐지 모델 학습 (Isolation Forest)
 목표: 비정상 온습도 패턴 감지
 """
-import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
 
+from data_loader import read_table, rack_clean_path
+from schema import compact, memory_mb, check_output_tolerance
+from forest_compiler import compile_forest
+from anomaly_pipeline import save_pipeline
+from plot_utils import decimate_indices, grid_shape, new_figure, render_figures
+
+CONT_PATH = './data/cont_processed.csv'
+RACK_PATH = './data/rack_processed.csv'
+
+# float32 스키마 검증: 샘플 행 수, 이상 점수 허용 오차
+SCHEMA_CHECK_ROWS = 20_000
+SCHEMA_SCORE_ATOL = 1e-2
+
 def train_anomaly_detector():
     """Isolation Forest로 이상 탐지 모델 학습"""
     
@@ -18,12 +29,15 @@ def train_anomaly_detector():
     print("="*60)
     
     # 1. 데이터 로드
-    cont_df = pd.read_csv('./data/cont_processed.csv')
-    rack_df = pd.read_csv('./data/rack_processed.csv')
+    # float32 센서 / category contID / 작은 정수형 (schema.py)
+    # 랙은 clean_rack_data.py 결과(중복 제거 + 10분 격자)가 있으면 그것을 사용
+    rack_path = rack_clean_path() or RACK_PATH
+    cont_df = read_table(CONT_PATH, compact=True)
+    rack_df = read_table(rack_path, compact=True)
     
-    print(f"\n데이터 로드:")
-    print(f"  컨테인먼트: {len(cont_df):,} 행")
-    print(f"  랙: {len(rack_df):,} 행")
+    print(f"\n데이터 로드 (랙: {rack_path}):")
+    print(f"  컨테인먼트: {len(cont_df):,} 행 ({memory_mb(cont_df):,.1f} MB)")
+    print(f"  랙: {len(rack_df):,} 행 ({memory_mb(rack_df):,.1f} MB)")
     
     # 2. Feature 선택 (온도/습도 + 차이값)
     feature_cols = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
@@ -44,10 +58,10 @@ def train_anomaly_detector():
     )
     iso_forest_cont.fit(X_cont_scaled)
     
-    # 예측
-    cont_df['anomaly_score'] = iso_forest_cont.score_samples(X_cont_scaled)
-    cont_df['is_anomaly'] = iso_forest_cont.predict(X_cont_scaled)
-    cont_df['is_anomaly'] = (cont_df['is_anomaly'] == -1).astype(int)
+    # 예측 (점수와 라벨을 숲 한 번 탐색으로: score < offset_ == predict -1)
+    scores, labels = compile_forest(iso_forest_cont).score_and_label(X_cont_scaled)
+    cont_df['anomaly_score'] = scores
+    cont_df['is_anomaly'] = labels.astype(int)
     
     anomaly_count_cont = cont_df['is_anomaly'].sum()
     print(f"✅ 컨테인먼트 이상 탐지 완료")
@@ -69,14 +83,24 @@ def train_anomaly_detector():
     )
     iso_forest_rack.fit(X_rack_scaled)
     
-    # 예측
-    rack_df['anomaly_score'] = iso_forest_rack.score_samples(X_rack_scaled)
-    rack_df['is_anomaly'] = iso_forest_rack.predict(X_rack_scaled)
-    rack_df['is_anomaly'] = (rack_df['is_anomaly'] == -1).astype(int)
+    # 예측 (점수와 라벨을 숲 한 번 탐색으로: score < offset_ == predict -1)
+    scores, labels = compile_forest(iso_forest_rack).score_and_label(X_rack_scaled)
+    rack_df['anomaly_score'] = scores
+    rack_df['is_anomaly'] = labels.astype(int)
     
     anomaly_count_rack = rack_df['is_anomaly'].sum()
     print(f"✅ 랙 이상 탐지 완료")
     print(f"   이상치 개수: {anomaly_count_rack:,} ({anomaly_count_rack/len(rack_df)*100:.2f}%)")
+
+    # 2-3. float32 입력이 이상 점수를 바꾸지 않는지 확인 (원본 정밀도 샘플과 비교)
+    print("\n[검증] float32 스키마 허용 오차 확인...")
+    for name, path, scaler, model in [('컨테인먼트', CONT_PATH, scaler_cont, iso_forest_cont),
+                                      ('랙', rack_path, scaler_rack, iso_forest_rack)]:
+        reference = read_table(path, columns=feature_cols, nrows=SCHEMA_CHECK_ROWS)
+        check_output_tolerance(
+            lambda df, scaler=scaler, model=model: model.score_samples(scaler.transform(df[feature_cols].values)),
+            reference, compact(reference.copy()), atol=SCHEMA_SCORE_ATOL, name=name
+        )
     
     # 3. 모델 저장
     print("\n[3] 모델 저장 중...")
@@ -85,6 +109,10 @@ def train_anomaly_detector():
     joblib.dump(iso_forest_rack, './models/anomaly_detector_rack.pkl')
     joblib.dump(scaler_rack, './models/scaler_rack.pkl')
     print("✅ 모델 저장 완료: ./models/")
+    # 레벨별 단일 아티팩트 (스케일러 + 모델 + 특성 컬럼, 메모리 매핑 로드용)
+    for level, model, scaler in [('cont', iso_forest_cont, scaler_cont), ('rack', iso_forest_rack, scaler_rack)]:
+        path = save_pipeline(level, model, scaler, feature_cols, metadata={'source': '03_train_anomaly_detector.py'})
+        print(f"✅ 파이프라인 저장: {path}")
     
     # 4. 이상치 분석
     print("\n" + "="*60)
@@ -116,62 +144,75 @@ def train_anomaly_detector():
     
     return iso_forest_cont, iso_forest_rack
 
-def create_anomaly_visualizations(cont_df, rack_df):
-    """이상치 시각화"""
+def zone_points(df, x_col, y_col):
+    """존별 (contID, x, y, 이상치 여부) - x 순 정렬 후 점 줄이기 (이상치는 모두 남김)"""
+    zones = []
+    for cont_id, zone_data in df.sort_values(x_col, kind='stable').groupby('contID', sort=True, observed=True):
+        x = zone_data[x_col].to_numpy()
+        y = zone_data[y_col].to_numpy()
+        anomaly = zone_data['is_anomaly'].to_numpy() == 1
+        idx = decimate_indices(x, y, keep=anomaly)
+        zones.append((cont_id, x[idx], y[idx], anomaly[idx]))
+    return zones
+
+
+def draw_zone_timeseries(zones, path):
+    """존별 tempHot 시계열 + 이상치 (존 수에 맞춘 격자)"""
+    rows, cols = grid_shape(len(zones))
+    fig = new_figure((4 * cols, 6 * rows))
+    for i, (cont_id, x, y, anomaly) in enumerate(zones):
+        ax = fig.add_subplot(rows, cols, i + 1)
+        ax.scatter(x, y, c='blue', alpha=0.3, s=1, label='Normal', rasterized=True)
+        ax.scatter(x[anomaly], y[anomaly], c='red', alpha=0.8, s=10, label='Anomaly', rasterized=True)
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Hot Aisle Temp (°C)')
+        ax.set_title(f'Zone {cont_id}')
+        ax.tick_params(axis='x', labelrotation=45)
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    return path
+
+
+def draw_score_analysis(panels, path):
+    """온도 차이 vs 이상치 스코어 (패널: 컨테인먼트, 랙)"""
+    fig = new_figure((12, 5))
+    for i, (title, zones) in enumerate(panels):
+        ax = fig.add_subplot(1, len(panels), i + 1)
+        for cont_id, x, y, _ in zones:
+            ax.scatter(x, y, alpha=0.3, s=5, label=f'Zone {cont_id}', rasterized=True)
+        ax.set_xlabel('Temperature Difference (Hot - Cold)')
+        ax.set_ylabel('Anomaly Score')
+        ax.set_title(f'{title}: Temp Diff vs Anomaly Score')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    return path
+
+
+def create_anomaly_visualizations(cont_df, rack_df, workers=None):
+    """이상치 시각화 (점 줄이기 + 그림별 워커 프로세스 렌더링, plot_utils.py)"""
     
     import os
     os.makedirs('./visualizations', exist_ok=True)
     
-    # 1. 컨테인먼트 이상치 시계열
-    plt.figure(figsize=(16, 6))
-    for cont_id in sorted(cont_df['contID'].unique()):
-        zone_data = cont_df[cont_df['contID'] == cont_id]
-        anomalies = zone_data[zone_data['is_anomaly'] == 1]
-        
-        plt.subplot(1, 4, cont_id)
-        plt.scatter(zone_data['colDate'], zone_data['tempHot'], 
-                   c='blue', alpha=0.3, s=1, label='Normal')
-        plt.scatter(anomalies['colDate'], anomalies['tempHot'], 
-                   c='red', alpha=0.8, s=10, label='Anomaly')
-        plt.xlabel('Date')
-        plt.ylabel('Hot Aisle Temp (°C)')
-        plt.title(f'Zone {cont_id}')
-        plt.xticks(rotation=45)
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig('./visualizations/containment_anomalies_timeseries.png', dpi=150, bbox_inches='tight')
-    print("✅ 저장: containment_anomalies_timeseries.png")
-    
-    # 2. 온도 차이 vs 이상치 스코어
-    plt.figure(figsize=(12, 5))
-    
-    plt.subplot(1, 2, 1)
-    for cont_id in sorted(cont_df['contID'].unique()):
-        zone_data = cont_df[cont_df['contID'] == cont_id]
-        plt.scatter(zone_data['temp_diff'], zone_data['anomaly_score'], 
-                   alpha=0.3, s=5, label=f'Zone {cont_id}')
-    plt.xlabel('Temperature Difference (Hot - Cold)')
-    plt.ylabel('Anomaly Score')
-    plt.title('Containment: Temp Diff vs Anomaly Score')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    
-    plt.subplot(1, 2, 2)
-    for cont_id in sorted(rack_df['contID'].unique()):
-        zone_data = rack_df[rack_df['contID'] == cont_id]
-        plt.scatter(zone_data['temp_diff'], zone_data['anomaly_score'], 
-                   alpha=0.3, s=5, label=f'Zone {cont_id}')
-    plt.xlabel('Temperature Difference (Hot - Cold)')
-    plt.ylabel('Anomaly Score')
-    plt.title('Rack: Temp Diff vs Anomaly Score')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig('./visualizations/anomaly_score_analysis.png', dpi=150, bbox_inches='tight')
-    print("✅ 저장: anomaly_score_analysis.png")
+    jobs = [
+        # 1. 컨테인먼트 이상치 시계열
+        (draw_zone_timeseries, {
+            'zones': zone_points(cont_df, 'colDate', 'tempHot'),
+            'path': './visualizations/containment_anomalies_timeseries.png',
+        }),
+        # 2. 온도 차이 vs 이상치 스코어
+        (draw_score_analysis, {
+            'panels': [('Containment', zone_points(cont_df, 'temp_diff', 'anomaly_score')),
+                       ('Rack', zone_points(rack_df, 'temp_diff', 'anomaly_score'))],
+            'path': './visualizations/anomaly_score_analysis.png',
+        }),
+    ]
+    for path in render_figures(jobs, workers):
+        print(f"✅ 저장: {os.path.basename(path)}")
 
 if __name__ == "__main__":
     import os
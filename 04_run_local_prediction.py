@@ -1,17 +1,25 @@
 
 
-import pandas as pd
-import joblib
 import os
 
+from data_loader import read_table
+from schema import to_model_frame
+from forecast_server import ForecastClient, LocalForecaster
+from forecast_context import trim_context, verified_path, verified_spec
+
 # --- 설정 ---
 # Azure ML Studio에서 다운로드하여 models/ 폴더에 저장한 모델 파일의 경로
 MODEL_PATH = "models/automl_forecast_model.pkl"
 
 def load_model(path):
     """
-    지정된 경로에서 pkl 모델 파일을 로드합니다.
+    예측 서버(forecast_server.py)가 떠 있으면 서버 클라이언트를, 없으면 pkl 모델 파일을 로드합니다.
     """
+    client = ForecastClient()
+    if client.available():
+        print(f"✅ 예측 서버 사용: {client.url} (모델 로드 생략)")
+        return client
+
     print(f"모델 로딩 중: {path}")
     if not os.path.exists(path):
         print("="*60)
@@ -24,8 +32,8 @@ def load_model(path):
         return None
     
     try:
-        model = joblib.load(path)
-        print("✅ 모델 로딩 성공")
+        model = LocalForecaster(path)
+        print(f"✅ 모델 로딩 성공 ({model.load_sec:.2f}초)")
         return model
     except Exception as e:
         print(f"❌ 모델 로딩 중 오류 발생: {e}")
@@ -43,7 +51,7 @@ def prepare_input_data(zone_id='zone_1'):
     """
     print(f"\n'{zone_id}'의 예측용 입력 데이터 준비 중...")
     try:
-        df = pd.read_csv('cont_forecast_data.csv', parse_dates=['colDate'])
+        df = read_table('cont_forecast_data.csv', compact=True)
     except FileNotFoundError:
         print("오류: 'cont_forecast_data.csv' 파일을 찾을 수 없습니다.")
         return None
@@ -58,7 +66,7 @@ def prepare_input_data(zone_id='zone_1'):
     # AutoML 시계열 모델은 예측을 위해 학습에 사용된 전체 데이터를 입력으로 받습니다.
     # 모델이 내부적으로 최신 데이터를 기반으로 미래를 예측합니다.
     # 예측 대상(y)인 'target_tempHot_30min' 컬럼은 입력에서 제외합니다.
-    X_test = zone_df.drop(columns=['target_tempHot_30min'])
+    X_test = to_model_frame(zone_df.drop(columns=['target_tempHot_30min']))
     
     print(f"✅ 입력 데이터 준비 완료: {len(X_test)}개 행")
     return X_test
@@ -83,19 +91,21 @@ def main():
         return
 
     # 3. 예측 실행
-    # AutoML 시계열 모델은 .forecast() 메소드를 사용합니다.
+    # AutoML 시계열 모델의 .forecast() (서버 또는 로컬 모델, 결과 형식 같음)
     # 이 메소드는 X_test 데이터의 마지막 시점 이후를 예측합니다.
     print("\n예측 실행 중...")
     try:
-        # forecast()는 예측 결과와 함께 예측 시점의 데이터프레임을 반환합니다.
-        y_predictions, X_trans = model.forecast(X_test)
-        
-        # 예측 결과에서 시간과 예측값만 추출
-        # X_trans 에는 'time_index'라는 예측 시점 컬럼이 포함됩니다.
-        forecast_df = X_trans[['time_index']].copy()
-        forecast_df['prediction'] = y_predictions
+        # 전체 이력 대신 모델이 보는 과거(lag + rolling window)만 전달
+        # 자른 길이는 모델 지문마다 한 번 전체 이력으로 예측을 비교해 확인 (forecast_context.verified_spec)
+        info = model.info()
+        spec = verified_spec(model, X_test, info['lookback'], info['fingerprint'], verified_path(info['model_path']))
+        X_test = trim_context(X_test, spec)
+        print(f"컨텍스트: {len(X_test)}개 행 (lookback {spec['periods']} × {spec['freq']})")
+
+        # 행별 예측 (contID, colDate, target_tempHot_30min) + 요청 시간
+        forecast_df, timing = model.forecast(X_test)
         
-        print("✅ 예측 성공!")
+        print(f"✅ 예측 성공! ({timing['total_ms']:.0f} ms)")
         print("\n" + "-"*60)
         print("30분 후 온도 예측 결과 (15분 간격 2개 스텝):")
         print(forecast_df)
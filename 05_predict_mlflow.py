@@ -5,6 +5,9 @@ MLflow를 사용한 Azure AutoML 모델 예측
 import pandas as pd
 import mlflow
 
+from data_loader import load_forecast_clean
+from schema import to_model_frame
+
 # 설정
 MODEL_DIR = "models"  # MLflow 모델 디렉토리
 DATA_PATH = "cont_forecast_clean/data.csv"
@@ -26,11 +29,8 @@ def prepare_data(zone_id=1):
     """예측용 데이터 준비"""
     print(f"\n'contID={zone_id}' 데이터 준비 중...")
 
-    # 전체 데이터 로드
-    df = pd.read_csv(DATA_PATH, parse_dates=['colDate'])
-
-    # 특정 zone만 필터링
-    zone_df = df[df['contID'] == zone_id].copy()
+    # 특정 zone만 로드
+    zone_df = load_forecast_clean(cont_ids=[zone_id], compact=True)
 
     # target 컬럼 제거 (예측에는 불필요)
     if 'target_tempHot_30min' in zone_df.columns:
@@ -41,7 +41,7 @@ def prepare_data(zone_id=1):
     print(f"   종료: {zone_df['colDate'].max()}")
     print(f"   컬럼: {list(zone_df.columns)}")
 
-    return zone_df
+    return to_model_frame(zone_df)
 
 def predict(model, data):
     """예측 실행"""
@@ -1,9 +1,10 @@
 """
 Joblib로 직접 모델을 로드하여 예측
-(Azure ML 패키지 없이 시도)
+(Azure ML 패키지 없이 시도, 예측 서버가 떠 있으면 서버의 모델 정보 사용)
 """
-import pandas as pd
-import joblib
+
+from data_loader import load_forecast_clean
+from forecast_server import get_forecaster
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -12,13 +13,13 @@ MODEL_PATH = "models/model.pkl"
 DATA_PATH = "cont_forecast_clean/data.csv"
 
 def load_model():
-    """Joblib로 모델 직접 로드"""
-    print(f"모델 로딩 중: {MODEL_PATH}")
+    """예측 서버 클라이언트 또는 Joblib 직접 로드 (forecast_server.get_forecaster)"""
     try:
-        model = joblib.load(MODEL_PATH)
+        model = get_forecaster(model_path=MODEL_PATH)
+        info = model.info()
         print("✅ 모델 로딩 성공")
-        print(f"   모델 타입: {type(model)}")
-        print(f"   모델 속성: {dir(model)[:10]}...")
+        print(f"   모델 타입: {info['model_type']}")
+        print(f"   모델 속성: {info['methods'][:10]}...")
         return model
     except Exception as e:
         print(f"❌ 모델 로딩 실패: {e}")
@@ -31,7 +32,7 @@ def prepare_data(zone_id='zone_1', last_n_rows=100):
     print(f"\n'{zone_id}' 데이터 준비 중 (마지막 {last_n_rows}개 행)...")
 
     # 전체 데이터 로드
-    df = pd.read_csv(DATA_PATH, parse_dates=['colDate'])
+    df = load_forecast_clean(compact=True)
 
     # 특정 zone만 필터링
     zone_df = df[df['contID'] == zone_id].copy()
@@ -72,7 +73,7 @@ def main():
     print("="*60)
 
     # 사용 가능한 메서드 확인
-    methods = [m for m in dir(model) if not m.startswith('_') and callable(getattr(model, m))]
+    methods = model.info()['methods']
     print(f"사용 가능한 메서드 ({len(methods)}개):")
     for i, method in enumerate(methods[:20]):  # 처음 20개만
         print(f"  {i+1}. {method}")
@@ -1,75 +1,179 @@
 # -*- coding: utf-8 -*-
 """
 cont_processed.csv를 cont_forecast_clean 형식으로 변환
+
+증분 모드 (--incremental): data/_validation_watermark.json 이후의 새 행만 변환해서
+cont_validation.csv에 추가한다. 타겟(30분 후)이 아직 없는 존별 마지막 2행은
+워터마크에 보관했다가 다음 실행에서 확정한다.
+워터마크가 있으면 --input은 새 배치 CSV 또는 원본 Parquet 데이터셋 (워터마크 이후만 pushdown)이어야 한다.
 """
+import argparse
+import json
+import os
+
 import pandas as pd
 
-print("="*60)
-print("검증 데이터 준비")
-print("="*60)
-
-# 1. cont_processed.csv 로드
-print("\n[1] cont_processed.csv 로드")
-df = pd.read_csv('./data/cont_processed.csv', parse_dates=['colDate'])
-print(f"  Shape: {df.shape}")
-print(f"  Date range: {df['colDate'].min()} ~ {df['colDate'].max()}")
-print(f"  Columns: {list(df.columns)}")
-
-# 2. cont_forecast_clean 형식 확인
-print("\n[2] cont_forecast_clean 형식 확인")
-df_clean = pd.read_csv('./cont_forecast_clean/data.csv', parse_dates=['colDate'])
-print(f"  Shape: {df_clean.shape}")
-print(f"  Columns: {list(df_clean.columns)}")
-
-# 3. 변환 작업
-print("\n[3] 데이터 변환")
-
-# 3-1. month, day 컬럼 제거
-if 'month' in df.columns:
-    df = df.drop(columns=['month'])
-    print("  - month 컬럼 제거")
-if 'day' in df.columns:
-    df = df.drop(columns=['day'])
-    print("  - day 컬럼 제거")
-
-# 3-2. target_tempHot_30min 생성
-# 30분 후 = 15분 x 2 step
-df = df.sort_values(['contID', 'colDate']).reset_index(drop=True)
-df['target_tempHot_30min'] = df.groupby('contID')['tempHot'].shift(-2)
-print("  - target_tempHot_30min 생성 (30분 후 온도)")
-
-# 3-3. NaN 제거 (마지막 2개 행)
-df_before = len(df)
-df = df.dropna(subset=['target_tempHot_30min'])
-print(f"  - NaN 제거: {df_before} -> {len(df)} 행")
-
-# 3-4. 컬럼 순서 맞추기
-column_order = list(df_clean.columns)
-df = df[column_order]
-print(f"  - 컬럼 순서 정렬: {list(df.columns)}")
-
-# 4. 결과 저장
-output_path = './data/cont_validation.csv'
-df.to_csv(output_path, index=False, encoding='utf-8-sig')
-print(f"\n[4] 저장 완료: {output_path}")
-print(f"  Shape: {df.shape}")
-print(f"  Date range: {df['colDate'].min()} ~ {df['colDate'].max()}")
-
-# 5. 비교
-print("\n[5] cont_forecast_clean vs cont_validation 비교")
-print(f"  cont_forecast_clean: {len(df_clean):,} 행")
-print(f"  cont_validation:     {len(df):,} 행")
-print(f"  차이:                {len(df) - len(df_clean):,} 행")
-
-if len(df) > len(df_clean):
-    print(f"\n  [OK] cont_validation에 {len(df) - len(df_clean)}행의 추가 데이터가 있습니다!")
-    print(f"       이 데이터는 모델이 학습하지 않은 새로운 데이터입니다.")
-elif len(df) == len(df_clean):
-    print(f"\n  [주의] 두 데이터셋의 행 수가 동일합니다.")
-    print(f"        날짜 범위를 확인하여 차이가 있는지 검토하세요.")
-else:
-    print(f"\n  [주의] cont_validation이 더 적습니다. 데이터를 확인하세요.")
-
-print("\n" + "="*60)
-print("완료!")
-print("="*60)
+from data_loader import read_table, iter_new_rows, load_forecast_clean
+from forecast_frame import (FINAL_COLS, TARGET_COL, TARGET_STEPS, DATE_FORMAT,
+                            frame_to_records, frame_from_records)
+
+SOURCE_PATH = './data/cont_processed.csv'
+OUTPUT_PATH = './data/cont_validation.csv'
+WATERMARK_PATH = './data/_validation_watermark.json'
+
+
+def add_validation_target(df):
+    """(contID, colDate) 정렬 후 2 step 뒤 tempHot을 타겟으로 (존별 마지막 2행은 NaN)"""
+    df = df.sort_values(['contID', 'colDate']).reset_index(drop=True)
+    df[TARGET_COL] = df.groupby('contID')['tempHot'].shift(-TARGET_STEPS)
+    return df
+
+
+def run_full():
+    print("="*60)
+    print("검증 데이터 준비")
+    print("="*60)
+
+    # 1. cont_processed.csv 로드
+    print("\n[1] cont_processed.csv 로드")
+    df = read_table(SOURCE_PATH)
+    print(f"  Shape: {df.shape}")
+    print(f"  Date range: {df['colDate'].min()} ~ {df['colDate'].max()}")
+    print(f"  Columns: {list(df.columns)}")
+
+    # 2. cont_forecast_clean 형식 확인
+    print("\n[2] cont_forecast_clean 형식 확인")
+    df_clean = load_forecast_clean()
+    print(f"  Shape: {df_clean.shape}")
+    print(f"  Columns: {list(df_clean.columns)}")
+
+    # 3. 변환 작업
+    print("\n[3] 데이터 변환")
+
+    # 3-1. month, day 컬럼 제거
+    if 'month' in df.columns:
+        df = df.drop(columns=['month'])
+        print("  - month 컬럼 제거")
+    if 'day' in df.columns:
+        df = df.drop(columns=['day'])
+        print("  - day 컬럼 제거")
+
+    # 3-2. target_tempHot_30min 생성
+    # 30분 후 = 15분 x 2 step
+    df = add_validation_target(df)
+    print("  - target_tempHot_30min 생성 (30분 후 온도)")
+
+    # 3-3. NaN 제거 (마지막 2개 행)
+    df_before = len(df)
+    df = df.dropna(subset=[TARGET_COL])
+    print(f"  - NaN 제거: {df_before} -> {len(df)} 행")
+
+    # 3-4. 컬럼 순서 맞추기
+    column_order = list(df_clean.columns)
+    df = df[column_order]
+    print(f"  - 컬럼 순서 정렬: {list(df.columns)}")
+
+    # 4. 결과 저장
+    df.to_csv(OUTPUT_PATH, index=False, encoding='utf-8-sig')
+    if os.path.exists(WATERMARK_PATH):
+        os.remove(WATERMARK_PATH)
+    print(f"\n[4] 저장 완료: {OUTPUT_PATH}")
+    print(f"  Shape: {df.shape}")
+    print(f"  Date range: {df['colDate'].min()} ~ {df['colDate'].max()}")
+
+    # 5. 비교
+    print("\n[5] cont_forecast_clean vs cont_validation 비교")
+    print(f"  cont_forecast_clean: {len(df_clean):,} 행")
+    print(f"  cont_validation:     {len(df):,} 행")
+    print(f"  차이:                {len(df) - len(df_clean):,} 행")
+
+    if len(df) > len(df_clean):
+        print(f"\n  [OK] cont_validation에 {len(df) - len(df_clean)}행의 추가 데이터가 있습니다!")
+        print(f"       이 데이터는 모델이 학습하지 않은 새로운 데이터입니다.")
+    elif len(df) == len(df_clean):
+        print(f"\n  [주의] 두 데이터셋의 행 수가 동일합니다.")
+        print(f"        날짜 범위를 확인하여 차이가 있는지 검토하세요.")
+    else:
+        print(f"\n  [주의] cont_validation이 더 적습니다. 데이터를 확인하세요.")
+
+
+def run_incremental(source_path):
+    """워터마크 이후 행만 변환해서 cont_validation.csv에 추가"""
+    print("="*60)
+    print("검증 데이터 증분 추가")
+    print("="*60)
+
+    since = None
+    pending = None
+    if os.path.exists(WATERMARK_PATH) and os.path.exists(OUTPUT_PATH):
+        with open(WATERMARK_PATH) as f:
+            state = json.load(f)
+        since = pd.Timestamp(state['last_raw_time'])
+        pending = frame_from_records(state['pending'])
+        print(f"\n워터마크: {since}")
+    else:
+        print("\n워터마크 없음 → 처음부터 생성")
+
+    if source_path is None:
+        if since is not None:
+            print("[ERROR] 워터마크가 있으면 --input에 새 배치 CSV(또는 원본 Parquet 데이터셋)를 지정하세요.")
+            print(f"        전체 이력({SOURCE_PATH})을 다시 읽으면 갱신 비용이 이력 길이에 비례합니다.")
+            raise SystemExit(1)
+        source_path = SOURCE_PATH
+
+    # 1. 워터마크 이후 새 행만 (Parquet은 pushdown, CSV는 새 배치 파일 전체)
+    chunks = list(iter_new_rows(source_path, since))
+    df = pd.concat(chunks, ignore_index=True) if chunks else read_table(source_path, nrows=0)
+    df = df.drop(columns=[c for c in ('month', 'day') if c in df.columns])
+    print(f"  새 행: {len(df):,} (입력: {source_path})")
+    if len(df) == 0:
+        print("  추가할 데이터가 없습니다.")
+        return
+    last_raw_time = df['colDate'].max()
+
+    # 2. 지난 실행에서 타겟이 없던 행 + 새 행으로 타겟 계산
+    if pending is not None:
+        df = pd.concat([pending, df], ignore_index=True)
+    df = add_validation_target(df)
+
+    is_tail = df.groupby('contID').cumcount(ascending=False) < TARGET_STEPS
+    done = df[~is_tail & df[TARGET_COL].notna()][FINAL_COLS]
+    pending = df.loc[is_tail, [c for c in df.columns if c != TARGET_COL]]
+
+    # 3. 추가 저장 (처음이면 헤더 포함 새 파일)
+    if since is None:
+        done.to_csv(OUTPUT_PATH, index=False, encoding='utf-8-sig', date_format=DATE_FORMAT)
+    else:
+        done.to_csv(OUTPUT_PATH, index=False, header=False, mode='a', encoding='utf-8',
+                    date_format=DATE_FORMAT)
+
+    state = {'last_raw_time': str(last_raw_time), 'pending': frame_to_records(pending)}
+    with open(WATERMARK_PATH + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(WATERMARK_PATH + '.tmp', WATERMARK_PATH)
+
+    print(f"\n[OK] {len(done):,}행 추가: {OUTPUT_PATH}")
+    print(f"  새 워터마크: {last_raw_time} (타겟 대기 {len(pending)}행)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cont_processed.csv → data/cont_validation.csv")
+    parser.add_argument('--incremental', action='store_true',
+                        help="워터마크 이후 새 행만 변환해서 추가")
+    parser.add_argument('--input', default=None,
+                        help="증분 모드 입력: 새 배치 CSV 또는 원본 Parquet 데이터셋 "
+                             "(워터마크가 있으면 필수, 첫 실행 기본: ./data/cont_processed.csv)")
+    args = parser.parse_args()
+
+    if args.incremental:
+        run_incremental(args.input)
+    else:
+        run_full()
+
+    print("\n" + "="*60)
+    print("완료!")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,14 @@
 Azure AutoML 모델 간단한 예측 테스트
 04_run_local_prediction.py 방식 참고
 """
-import pandas as pd
-import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+from data_loader import load_forecast_clean
+from schema import to_model_frame, check_output_tolerance
+from forecast_server import get_forecaster, TARGET_COL
+from forecast_context import trim_context, verified_path, verified_spec
+
 MODEL_PATH = "models/model.pkl"
 DATA_PATH = "./cont_forecast_clean/data.csv"  # 모델이 학습한 원본 데이터로 테스트
 
@@ -15,43 +18,51 @@ print("="*60)
 print("간단한 예측 테스트")
 print("="*60)
 
-# 1. 모델 로드
+# 1. 모델 로드 (예측 서버가 떠 있으면 로드 없이 서버 사용)
 print("\n[1] 모델 로드")
-model = joblib.load(MODEL_PATH)
-print(f"  [OK] {type(model)}")
-
-# 2. 데이터 로드
-print("\n[2] 데이터 로드")
-df = pd.read_csv(DATA_PATH, parse_dates=['colDate'])
-print(f"  전체: {len(df)} 행")
-print(f"  날짜: {df['colDate'].min()} ~ {df['colDate'].max()}")
+model = get_forecaster(model_path=MODEL_PATH)
+info = model.info()
+print(f"  [OK] {info['model_type']}")
+print(f"  lookback: {info['lookback']}")
 
-# 3. 단일 contID만 필터링 (04_run_local_prediction.py 방식)
+# 2~3. 단일 contID만 로드 (04_run_local_prediction.py 방식)
 zone_id = 1
-print(f"\n[3] contID={zone_id} 필터링")
-zone_df = df[df['contID'] == zone_id].copy()
+print(f"\n[2] contID={zone_id} 데이터 로드")
+zone_df = load_forecast_clean(cont_ids=[zone_id], compact=True)
 print(f"  {len(zone_df)} 행")
+print(f"  날짜: {zone_df['colDate'].min()} ~ {zone_df['colDate'].max()}")
 
 # 4. target 컬럼 제거
 print("\n[4] 예측용 데이터 준비")
-X_test = zone_df.drop(columns=['target_tempHot_30min'])
-print(f"  Shape: {X_test.shape}")
-print(f"  Columns: {list(X_test.columns)}")
+X_full = to_model_frame(zone_df.drop(columns=['target_tempHot_30min']))
 
 # 5. 예측 실행 (04_run_local_prediction.py 방식)
 print("\n[5] 예측 실행 (forecast 메서드)")
 try:
+    # 마지막 horizon 행 예측 + 모델이 보는 과거만. 자른 길이는 모델 지문마다 한 번 전체 이력으로 예측을 비교해 확인
+    spec = verified_spec(model, X_full, info['lookback'], info['fingerprint'], verified_path(info['model_path']))
+    X_test = trim_context(X_full, spec)
+    print(f"  Shape: {X_test.shape} (전체 {len(zone_df)}행 중 컨텍스트)")
+    print(f"  Columns: {list(X_test.columns)}")
+
     # y_pred 없이 X_test만 전달
-    y_predictions, X_trans = model.forecast(X_test)
+    predictions, timing = model.forecast(X_test)
 
-    print(f"  [OK] 예측 성공!")
-    print(f"  y_predictions shape: {y_predictions.shape if hasattr(y_predictions, 'shape') else len(y_predictions)}")
-    print(f"  X_trans shape: {X_trans.shape}")
-    print(f"  X_trans columns: {list(X_trans.columns)}")
+    print(f"  [OK] 예측 성공! ({timing['total_ms']:.0f} ms)")
+    print(f"  predictions shape: {predictions.shape}")
+    print(f"  predictions columns: {list(predictions.columns)}")
 
     # 결과 확인
     print("\n[6] 예측 결과 (처음 10개)")
-    print(y_predictions[:10])
+    print(predictions[TARGET_COL].values[:10])
+
+    # float32 스키마로 읽은 입력이 예측을 바꾸지 않는지 확인 (원본 정밀도와 비교)
+    print("\n[7] float32 스키마 허용 오차 확인")
+    reference = load_forecast_clean(cont_ids=[zone_id]).drop(columns=['target_tempHot_30min'])
+    check_output_tolerance(lambda X: model.forecast(X)[0][TARGET_COL].to_numpy(),
+                           trim_context(reference, spec),
+                           trim_context(zone_df.drop(columns=['target_tempHot_30min']), spec),
+                           atol=1e-3, name='forecast')
 
 except Exception as e:
     print(f"  [ERROR] {e}")
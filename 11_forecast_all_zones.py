@@ -3,11 +3,15 @@
 전체 contID로 예측 후 특정 zone 추출
 """
 import pandas as pd
-import joblib
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+from data_loader import load_forecast_clean
+from schema import to_model_frame
+from forecast_server import get_forecaster, TARGET_COL
+from forecast_cache import ForecastCache, format_stats
+
 MODEL_PATH = "models/model.pkl"
 DATA_PATH = "./cont_forecast_clean/data.csv"
 
@@ -15,14 +19,14 @@ print("="*60)
 print("전체 contID 예측 테스트")
 print("="*60)
 
-# 1. 모델 로드
+# 1. 모델 로드 (예측 서버가 떠 있으면 로드 없이 서버 사용)
 print("\n[1] 모델 로드")
-model = joblib.load(MODEL_PATH)
-print(f"  [OK] {type(model)}")
+model = get_forecaster(model_path=MODEL_PATH)
+print(f"  [OK] {model.info()['model_type']}")
 
 # 2. 전체 데이터 로드 (모든 contID 포함)
 print("\n[2] 전체 데이터 로드")
-df = pd.read_csv(DATA_PATH, parse_dates=['colDate'])
+df = load_forecast_clean(compact=True)
 print(f"  전체: {len(df)} 행")
 print(f"  날짜: {df['colDate'].min()} ~ {df['colDate'].max()}")
 print(f"  contID: {df['contID'].unique()}")
@@ -36,29 +40,28 @@ test_df = df[df['colDate'] >= train_end].head(400).copy()  # 8월 초 일부만
 print(f"  Train: {len(train_df)} 행 ({train_df['colDate'].min()} ~ {train_df['colDate'].max()})")
 print(f"  Test:  {len(test_df)} 행 ({test_df['colDate'].min()} ~ {test_df['colDate'].max()})")
 
-# 4. target 제거 및 예측
+# 4. target 제거 및 예측 (다시 실행하면 캐시에서 읽음, forecast_cache.py)
 print("\n[4] 예측 실행 (전체 contID)")
-X_test = test_df.drop(columns=['target_tempHot_30min'])
+history = to_model_frame(df.drop(columns=['target_tempHot_30min']))
 
 try:
-    # 전체 contID로 예측
-    y_predictions, X_trans = model.forecast(X_test)
+    # 전체 contID로 예측 (행별 contID, colDate, target_tempHot_30min)
+    cache = ForecastCache(model)
+    predictions = cache.get_or_compute(history, targets=test_df)
 
-    print(f"  [OK] 예측 성공!")
-    print(f"  예측 결과 수: {len(y_predictions)}")
-    print(f"  X_trans shape: {X_trans.shape}")
+    print(f"  [OK] 예측 성공! ({format_stats(cache.stats())})")
+    print(f"  예측 결과 수: {len(predictions)}")
 
     # 5. 결과 확인
     print("\n[5] 예측 결과 샘플")
-    if 'contID' in X_trans.columns:
+    if 'contID' in predictions.columns:
         print("  contID별 예측 수:")
-        print(X_trans.groupby('contID').size())
+        print(predictions.groupby('contID').size())
 
     # 6. contID=1만 추출
     print("\n[6] contID=1 결과 추출")
-    if 'contID' in X_trans.columns:
-        zone1_results = X_trans[X_trans['contID'] == 1].copy()
-        zone1_predictions = y_predictions[X_trans['contID'] == 1]
+    if 'contID' in predictions.columns:
+        zone1_predictions = predictions.loc[predictions['contID'] == 1, TARGET_COL].values
 
         print(f"  contID=1 예측 수: {len(zone1_predictions)}")
         print(f"  실제값과 비교:")
@@ -3,11 +3,13 @@
 forecast_destination을 사용하여 학습 데이터 끝 이후 예측
 """
 import pandas as pd
-import joblib
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+from data_loader import load_forecast_clean
+from forecast_server import get_forecaster
+
 MODEL_PATH = "models/model.pkl"
 DATA_PATH = "./cont_forecast_clean/data.csv"
 
@@ -15,15 +17,16 @@ print("="*60)
 print("forecast_destination 사용 테스트")
 print("="*60)
 
-# 1. 모델 로드
+# 1. 모델 로드 (예측 서버가 떠 있으면 로드 없이 서버 사용)
 print("\n[1] 모델 로드")
-model = joblib.load(MODEL_PATH)
-print(f"  [OK] {type(model)}")
-print(f"  forecast_horizon: {model.max_horizon if hasattr(model, 'max_horizon') else 'N/A'}")
+model = get_forecaster(model_path=MODEL_PATH)
+info = model.info()
+print(f"  [OK] {info['model_type']}")
+print(f"  forecast_horizon: {info['max_horizon'] if info['max_horizon'] is not None else 'N/A'}")
 
 # 2. 데이터 로드
 print("\n[2] 데이터 로드")
-df = pd.read_csv(DATA_PATH, parse_dates=['colDate'])
+df = load_forecast_clean(columns=['colDate', 'contID', 'tempHot'], compact=True)
 print(f"  전체: {len(df)} 행")
 print(f"  날짜: {df['colDate'].min()} ~ {df['colDate'].max()}")
 
@@ -42,22 +45,15 @@ print(f"\n[5] 예측 실행 (forecast_destination만 사용)")
 
 try:
     # forecast_destination만 사용 (X_pred 없이)
-    y_predictions, X_trans = model.forecast(
-        X_pred=None,
-        y_pred=None,
-        forecast_destination=forecast_dest
-    )
+    predictions, timing = model.forecast(forecast_destination=forecast_dest)
 
-    print(f"  [OK] 예측 성공!")
-    print(f"  예측 결과 수: {len(y_predictions)}")
-    print(f"  X_trans shape: {X_trans.shape}")
-    print(f"  X_trans columns: {list(X_trans.columns)}")
+    print(f"  [OK] 예측 성공! ({timing['total_ms']:.0f} ms)")
+    print(f"  예측 결과 수: {len(predictions)}")
+    print(f"  columns: {list(predictions.columns)}")
 
     # 6. 결과 확인
     print("\n[6] 예측 결과")
-    print(X_trans.head(10))
-    print(f"\n예측값 샘플:")
-    print(y_predictions[:10])
+    print(predictions.head(10))
 
     # 7. 실제 8월 1일 00:00:00 ~ 00:30:00 데이터와 비교
     print("\n[7] 실제값과 비교")
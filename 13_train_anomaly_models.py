@@ -0,0 +1,213 @@
+"""
+Step 13: 이상 탐지 모델 병렬 학습 (컨테인먼트 + 랙, 선택적으로 존별 모델)
+
+03_train_anomaly_detector.py는 레벨별 전체 모델 2개를 차례로 학습한다.
+여기서는 (레벨, contID) 단위 학습 작업을 프로세스 풀로 동시에 돌리고, 각 학습 안에서는
+IsolationForest n_jobs로 트리 단위 병렬 처리를 한다. 결과는 버전 관리되는 번들 하나로 저장한다.
+
+존별 모델: contID 4의 공사 기간(불완전 데이터, TRAINING_PLAN.md 참고) 패턴이 전체 모델을 오염시키므로
+--per-zone이면 레벨 전체 모델과 함께 존마다 따로 학습한다.
+
+--rolling-features: 순간값 6개에 시리즈별 1시간 기울기/z-score, 같은 시각 동료 대비 편차를 더해 학습한다
+(anomaly_features.py). 번들은 anomaly_service.py --bundle이 읽어서 측정값 contID마다 존 모델로 점수를 매기고
+(롤링 특성이면 같은 특성을 증분으로 계산), --save-pipeline을 주면 레벨 전체 모델을 파이프라인 아티팩트의
+새 최신 버전으로도 저장한다 (anomaly_service.py --pipeline이 읽는 특성 구성이 바뀌므로 명시할 때만).
+
+사용 방법:
+    python 13_train_anomaly_models.py                  # 레벨 전체 모델 2개
+    python 13_train_anomaly_models.py --per-zone       # + 존별 모델
+    python 13_train_anomaly_models.py --per-zone --workers 4 --n-jobs 2
+    python 13_train_anomaly_models.py --rolling-features
+    python 13_train_anomaly_models.py --rolling-features --save-pipeline   # + 파이프라인 최신 버전으로
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+import fingerprint
+from anomaly_bundle import save_bundle, model_key, BUNDLE_DIR
+from anomaly_features import add_features, fill_features, model_features
+from anomaly_pipeline import save_pipeline, FEATURE_COLS, FOREST_PARAMS
+from data_loader import read_table, rack_clean_path
+from forest_compiler import compile_forest
+
+CONT_PATH = './data/cont_processed.csv'
+RACK_PATH = './data/rack_processed.csv'
+MIN_ZONE_ROWS = 1000  # 이보다 적은 존은 존별 모델을 만들지 않음 (레벨 전체 모델 사용)
+
+
+def load_level(path, level=None, feature_cols=FEATURE_COLS):
+    """
+    특성 행렬(float32, 원래 행 순서) + contID 순 행 번호 + 존별 구간 {contID: (start, end)}
+
+    레벨 전체 모델은 원래 순서 그대로 학습해서 03과 같은 모델이 되고,
+    존 모델은 행 번호 구간으로 자기 존 행만 꺼낸다.
+    feature_cols에 롤링 특성이 있으면 level 단위 시리즈로 계산해서 붙인다.
+    """
+    # 03과 같은 행 순서가 되도록 전체 컬럼으로 읽음 (Parquet은 contID, rackID, colDate 순 정렬)
+    df = read_table(path, compact=True)
+    if feature_cols != FEATURE_COLS:
+        df = fill_features(add_features(df, level), feature_cols)
+    cont_ids = df['contID'].astype(np.int64).to_numpy()
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32))
+    order = np.argsort(cont_ids, kind='stable')
+    zones, starts = np.unique(cont_ids[order], return_index=True)
+    ends = np.append(starts[1:], len(cont_ids))
+    return X, order, {int(z): (int(s), int(e)) for z, s, e in zip(zones, starts, ends)}
+
+
+def _fit_worker(task):
+    """공유 메모리의 행(전체 또는 존 구간)으로 스케일러 + IsolationForest 학습"""
+    key, (x_name, order_name), shape, bounds, params, n_jobs = task
+    x_shm = shared_memory.SharedMemory(name=x_name)
+    order_shm = shared_memory.SharedMemory(name=order_name)
+    try:
+        shared = np.ndarray(shape, dtype=np.float32, buffer=x_shm.buf)
+        if bounds is None:
+            X = shared.copy()
+        else:
+            order = np.ndarray((shape[0],), dtype=np.int64, buffer=order_shm.buf)
+            X = shared[order[bounds[0]:bounds[1]]]
+            del order
+        del shared  # 공유 메모리를 닫기 전에 뷰를 놓음
+    finally:
+        x_shm.close()
+        order_shm.close()
+
+    t0 = time.perf_counter()
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = IsolationForest(n_jobs=n_jobs, **params)
+    model.fit(X_scaled)
+    fit_sec = time.perf_counter() - t0
+
+    _, labels = compile_forest(model).score_and_label(X_scaled)
+    model.n_jobs = None  # 점수 계산 쪽에서는 기본값으로
+    return key, {
+        'model': model,
+        'scaler': scaler,
+        'rows': len(X),
+        'anomaly_rate': float(labels.mean()),
+        'fit_sec': fit_sec,
+    }
+
+
+def plan_tasks(levels, per_zone, min_zone_rows):
+    """(model_key, level, 행 수, 존 구간 또는 None) 목록. 큰 작업부터 (풀이 끝까지 고르게 바쁘도록)"""
+    tasks = []
+    for level, (X, _, zones) in levels.items():
+        tasks.append((model_key(level), level, len(X), None))
+        if per_zone:
+            for cont_id, (start, end) in zones.items():
+                if end - start >= min_zone_rows:
+                    tasks.append((model_key(level, cont_id), level, end - start, (start, end)))
+    return sorted(tasks, key=lambda t: t[2], reverse=True)
+
+
+def train_models(levels, per_zone=False, workers=None, n_jobs=None, params=FOREST_PARAMS,
+                 min_zone_rows=MIN_ZONE_ROWS):
+    """
+    모든 학습 작업을 프로세스 풀에서 실행
+
+    workers: 동시에 학습하는 모델 수 (기본: CPU 수와 작업 수 중 작은 값)
+    n_jobs: 모델 하나의 트리 병렬 수 (기본: CPU 수 / workers)
+    """
+    tasks = plan_tasks(levels, per_zone, min_zone_rows)
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, min(cpus, len(tasks)))
+    n_jobs = n_jobs or max(1, cpus // workers)
+    print(f"학습 작업 {len(tasks)}개: 프로세스 {workers}개 × 트리 병렬 {n_jobs}")
+
+    shms = {}
+    try:
+        for level, (X, order, _) in levels.items():
+            x_shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+            order_shm = shared_memory.SharedMemory(create=True, size=max(order.nbytes, 1))
+            shms[level] = (x_shm, order_shm)
+            np.ndarray(X.shape, dtype=np.float32, buffer=x_shm.buf)[:] = X
+            np.ndarray(order.shape, dtype=np.int64, buffer=order_shm.buf)[:] = order
+
+        models = {}
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fit_worker, (key, tuple(shm.name for shm in shms[level]),
+                                                 levels[level][0].shape, bounds, params, n_jobs))
+                       for key, level, _, bounds in tasks]
+            for future in as_completed(futures):
+                key, entry = future.result()
+                models[key] = entry
+                print(f"  ✅ {key:>8}: {entry['rows']:>10,} 행, {entry['fit_sec']:6.1f}초, "
+                      f"이상치 {entry['anomaly_rate'] * 100:.2f}%")
+        wall = time.perf_counter() - start
+    finally:
+        for pair in shms.values():
+            for shm in pair:
+                shm.close()
+                shm.unlink()
+
+    total_fit = sum(entry['fit_sec'] for entry in models.values())
+    print(f"\n전체 {wall:.1f}초 (모델별 학습 시간 합 {total_fit:.1f}초, {total_fit / max(wall, 1e-9):.1f}배)")
+    return dict(sorted(models.items())), {'workers': workers, 'n_jobs': n_jobs, 'wall_sec': wall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 모델 병렬 학습 (버전 번들)")
+    parser.add_argument('--per-zone', action='store_true',
+                        help="레벨 전체 모델과 함께 contID별 모델도 학습")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="동시에 학습하는 모델 수 (기본: CPU 수)")
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help="모델 하나의 트리 병렬 수 (기본: CPU 수 / workers)")
+    parser.add_argument('--min-zone-rows', type=int, default=MIN_ZONE_ROWS)
+    parser.add_argument('--rolling-features', action='store_true',
+                        help="기울기/z-score/동료 편차 특성 추가 (anomaly_features.py)")
+    parser.add_argument('--save-pipeline', action='store_true',
+                        help="레벨 전체 모델을 models/anomaly_pipeline/ 최신 버전으로도 저장 "
+                             "(anomaly_service --pipeline이 이 특성 구성으로 바뀜)")
+    args = parser.parse_args()
+    feature_cols = FEATURE_COLS + model_features() if args.rolling_features else FEATURE_COLS
+
+    print("\n" + "="*60)
+    print("이상 탐지 모델 병렬 학습")
+    print("="*60)
+
+    # 랙은 clean_rack_data.py 결과(중복 제거 + 10분 격자)가 있으면 그것을 사용 (03과 같음)
+    paths = {'cont': CONT_PATH, 'rack': rack_clean_path() or RACK_PATH}
+    levels = {}
+    for level, path in paths.items():
+        X, order, zones = load_level(path, level, feature_cols)
+        levels[level] = (X, order, zones)
+        print(f"  {level}: {len(X):,} 행, 존 {len(zones)}개 ({path})")
+
+    models, run_info = train_models(levels, per_zone=args.per_zone, workers=args.workers,
+                                    n_jobs=args.n_jobs, min_zone_rows=args.min_zone_rows)
+
+    metadata = {
+        'feature_cols': feature_cols,
+        'params': FOREST_PARAMS,
+        'per_zone': args.per_zone,
+        'inputs': {level: {'path': path, 'digest': fingerprint.tree_digest(path)} for level, path in paths.items()},
+        'training': run_info,
+    }
+    version = save_bundle(models, metadata)
+    if args.save_pipeline:
+        # 명시했을 때만: 파이프라인 최신 버전이 되면 anomaly_service --pipeline이 읽는 특성 구성이 바뀐다
+        for level in paths:
+            entry = models[model_key(level)]
+            path = save_pipeline(level, entry['model'], entry['scaler'], feature_cols,
+                                 metadata={'source': '13_train_anomaly_models.py', 'bundle_version': version})
+            print(f"✅ 파이프라인 저장: {path}")
+
+    print("\n" + "="*60)
+    print(f"✅ 번들 저장 완료: {BUNDLE_DIR}/anomaly_v{version:04d}.joblib (모델 {len(models)}개)")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
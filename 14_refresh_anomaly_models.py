@@ -0,0 +1,283 @@
+"""
+Step 14: 이상 탐지 모델 증분 갱신 (일 단위 슬라이딩 윈도우)
+
+매일 전체 데이터로 처음부터 다시 학습하는 대신, 하루치 새 데이터로만 트리를 키워서
+가장 오래된 날의 트리와 교체한다. 갱신 시간은 새 데이터 양에 비례한다.
+
+- 트리 묶음(cohort): 날짜마다 trees_per_day개 (IsolationForest warm_start로 새 날짜 데이터에만 학습)
+  새 트리 시드는 기본 random_state와 날짜에서 만든다 (윈도우가 차면 트리 수가 같아 고정 시드면 매일 같은 시드)
+- window_days보다 오래된 날짜의 트리는 제거 → 항상 window_days × trees_per_day개
+- 스케일러: 날짜별 (행 수, 평균, 제곱편차 합)을 저장해 두고 윈도우 안 날짜만 합쳐 평균/분산 계산
+  스케일러가 바뀌면 기존 트리의 threshold를 새 스케일 공간으로 옮김 (단조 선형 변환이라 분할이 그대로)
+- offset_(이상치 기준): 날짜별로 남겨 둔 샘플 행으로 윈도우 전체 점수의 contamination 분위수
+
+산출물은 03과 같은 models/anomaly_detector_{cont,rack}.pkl, scaler_{cont,rack}.pkl, models/anomaly_pipeline/ 이고
+갱신 상태는 models/anomaly_refresh/{level}.joblib 에 보관한다.
+
+사용 방법:
+    python 14_refresh_anomaly_models.py --init             # 최근 window_days일로 처음 구성
+    python 14_refresh_anomaly_models.py                    # 새 날짜만 반영 (매일 실행)
+    python 14_refresh_anomaly_models.py --compare          # + 전체 재학습 대비 점수 분포 변화 보고
+    python 14_refresh_anomaly_models.py --until 2025-08-01 # 그 날짜까지만 (지난 날짜 재현용)
+    python 14_refresh_anomaly_models.py --cont-input ./data/cont_2025-08-02.csv   # 날짜 단위 CSV만 읽기
+
+증분 실행은 새 날짜만 읽는다: Parquet 데이터셋(rack_clean/parquet)은 날짜 조건을 pushdown하고,
+CSV 원본(cont_processed.csv)은 전체를 파싱해야 하므로 --cont-input/--rack-input에 날짜 단위 CSV
+(그 날짜들의 전체 행, 이미 반영한 날짜가 있으면 그 날짜를 교체)를 지정해야 한다.
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from data_loader import read_table, rack_clean_path
+from forest_compiler import compile_forest
+from anomaly_pipeline import save_pipeline, FEATURE_COLS, FOREST_PARAMS
+
+CONT_PATH = './data/cont_processed.csv'
+RACK_PATH = './data/rack_processed.csv'
+STATE_DIR = './models/anomaly_refresh'
+
+WINDOW_DAYS = 20      # 학습 윈도우 (일)
+TREES_PER_DAY = 5     # 날짜마다 새로 키우는 트리 수 (20일 × 5 = 100, 03과 같은 트리 수)
+SAMPLE_ROWS = 2000    # offset_ 계산용으로 날짜마다 남겨 두는 행 수
+
+
+def level_paths():
+    # 랙은 clean_rack_data.py 결과가 있으면 그것을 사용 (03과 같음)
+    return {'cont': CONT_PATH, 'rack': rack_clean_path() or RACK_PATH}
+
+
+def day_stats(X):
+    """날짜 하나의 (행 수, 평균, 제곱편차 합) (float64)"""
+    X = X.astype(np.float64)
+    mean = X.mean(axis=0)
+    return {'n': len(X), 'mean': mean, 'm2': ((X - mean) ** 2).sum(axis=0)}
+
+
+def window_scaler(cohorts):
+    """윈도우 안 날짜 통계를 합친 StandardScaler (Chan 병렬 분산 공식)"""
+    n, mean, m2 = 0, 0.0, 0.0
+    for c in cohorts.values():
+        total = n + c['n']
+        delta = c['mean'] - mean
+        mean = mean + delta * c['n'] / total
+        m2 = m2 + c['m2'] + delta ** 2 * n * c['n'] / total
+        n = total
+    var = m2 / n
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    scaler.scale_ = np.where(var > np.finfo(np.float64).eps, np.sqrt(var), 1.0)
+    scaler.n_samples_seen_ = n
+    scaler.n_features_in_ = len(mean)
+    return scaler
+
+
+def rescale_trees(model, old_scaler, new_scaler):
+    """기존 트리 threshold를 old 스케일 공간 → new 스케일 공간으로 (x_raw = x * scale + mean)"""
+    ratio = old_scaler.scale_ / new_scaler.scale_
+    shift = (old_scaler.mean_ - new_scaler.mean_) / new_scaler.scale_
+    for est, features in zip(model.estimators_, model.estimators_features_):
+        tree = est.tree_
+        inner = tree.children_left != -1
+        feature = np.asarray(features)[tree.feature[inner]]
+        threshold = tree.threshold  # 트리 노드 배열의 뷰 (쓰면 트리가 바뀜)
+        threshold[inner] = threshold[inner] * ratio[feature] + shift[feature]
+
+
+def day_seed(day, base=FOREST_PARAMS['random_state']):
+    """날짜(YYYY-MM-DD) + 기본 시드 → 그 날짜 새 트리의 random_state (실행마다 같고 날짜마다 다름)"""
+    return int(np.random.SeedSequence([base, int(day.replace('-', ''))]).generate_state(1)[0])
+
+
+def new_state(level, window_days, trees_per_day):
+    return {'level': level, 'window_days': window_days, 'trees_per_day': trees_per_day,
+            'model': None, 'scaler': None, 'tree_days': [], 'cohorts': {}}
+
+
+def refresh_day(state, day, X_day, rng):
+    """
+    날짜 하나 반영: 스케일러 갱신 → 기존 트리 옮김 → 만료 트리 제거 → 새 트리 학습 → offset_
+
+    Returns: 이번 갱신에서 제거한 트리 수
+    """
+    cohorts = state['cohorts']
+    sample = X_day[rng.choice(len(X_day), min(SAMPLE_ROWS, len(X_day)), replace=False)]
+    cohorts[day] = dict(day_stats(X_day), sample=sample)
+
+    # 윈도우 밖 날짜 제거
+    days = sorted(cohorts)
+    expired = set(days[:-state['window_days']])
+    for old in expired:
+        del cohorts[old]
+
+    scaler = window_scaler(cohorts)
+    model = state['model']
+    retired = 0
+    if model is None:
+        model = IsolationForest(**{**FOREST_PARAMS, 'n_estimators': state['trees_per_day']}, warm_start=True)
+    else:
+        rescale_trees(model, state['scaler'], scaler)
+        keep = [i for i, d in enumerate(state['tree_days']) if d not in expired]
+        retired = len(state['tree_days']) - len(keep)
+        model.estimators_ = [model.estimators_[i] for i in keep]
+        model.estimators_features_ = [model.estimators_features_[i] for i in keep]
+        state['tree_days'] = [state['tree_days'][i] for i in keep]
+        model.set_params(n_estimators=len(keep) + state['trees_per_day'])
+
+    # warm_start: 늘어난 n_estimators만큼 새 트리를 이 날짜 데이터로만 학습 (시드는 날짜별)
+    model.set_params(random_state=day_seed(day))
+    model.fit(scaler.transform(X_day))
+    state['tree_days'] += [day] * state['trees_per_day']
+
+    # offset_: fit이 새 날짜 데이터만으로 정한 값을 윈도우 전체 샘플 기준으로 다시
+    window_sample = scaler.transform(np.concatenate([c['sample'] for c in cohorts.values()]))
+    scores = compile_forest(model).score_samples(window_sample)
+    model.offset_ = np.percentile(scores, 100.0 * FOREST_PARAMS['contamination'])
+
+    state['model'], state['scaler'] = model, scaler
+    return retired
+
+
+def read_days(path, start=None, end=None):
+    """{날짜(YYYY-MM-DD): 특성 행렬 float32}"""
+    df = read_table(path, columns=['colDate'] + FEATURE_COLS, start=start, end=end, compact=True)
+    day = df['colDate'].dt.normalize()
+    X = df[FEATURE_COLS].to_numpy(dtype=np.float32)
+    return {d.strftime('%Y-%m-%d'): X[(day == d).to_numpy()] for d in sorted(day.unique())}
+
+
+def full_retrain(state, days_data):
+    """비교용: 윈도우 전체 데이터로 처음부터 학습 (같은 트리 수, 같은 윈도우 스케일러)"""
+    X = np.concatenate([days_data[d] for d in sorted(state['cohorts']) if d in days_data])
+    scaler = window_scaler(state['cohorts'])
+    model = IsolationForest(**{**FOREST_PARAMS, 'n_estimators': len(state['tree_days'])})
+    model.fit(scaler.transform(X))
+    return model, scaler, X
+
+
+def report_shift(state, days_data):
+    """증분 모델 vs 전체 재학습 점수 분포 변화 (윈도우 데이터 기준)"""
+    t0 = time.perf_counter()
+    full_model, full_scaler, X = full_retrain(state, days_data)
+    full_sec = time.perf_counter() - t0
+
+    inc_scores, inc_labels = compile_forest(state['model']).score_and_label(state['scaler'].transform(X))
+    full_scores, full_labels = compile_forest(full_model).score_and_label(full_scaler.transform(X))
+
+    # 두 점수 분포의 KS 통계량 (최대 누적분포 차이)
+    grid = np.sort(np.concatenate([inc_scores, full_scores]))
+    cdf_inc = np.searchsorted(np.sort(inc_scores), grid, side='right') / len(inc_scores)
+    cdf_full = np.searchsorted(np.sort(full_scores), grid, side='right') / len(full_scores)
+    ks = float(np.max(np.abs(cdf_inc - cdf_full)))
+
+    print(f"\n  [{state['level']}] 전체 재학습 대비 점수 분포 ({len(X):,} 행, 전체 재학습 {full_sec:.1f}초)")
+    quantiles = [1, 5, 50, 95]
+    print(f"    {'':>8} {'평균':>8} " + ' '.join(f"{'p' + str(q):>8}" for q in quantiles) + f" {'이상치':>7}")
+    for name, scores, labels in [('증분', inc_scores, inc_labels), ('전체', full_scores, full_labels)]:
+        qs = np.percentile(scores, quantiles)
+        print(f"    {name:>8} {scores.mean():>8.4f} " + ' '.join(f"{q:>8.4f}" for q in qs)
+              + f" {labels.mean() * 100:>6.2f}%")
+    print(f"    KS 통계량: {ks:.4f}, 라벨 일치: {(inc_labels == full_labels).mean() * 100:.2f}%, "
+          f"점수 상관: {np.corrcoef(inc_scores, full_scores)[0, 1]:.4f}")
+    return {'ks': ks, 'label_agreement': float((inc_labels == full_labels).mean())}
+
+
+def run_level(level, path, init=False, until=None, window_days=WINDOW_DAYS,
+              trees_per_day=TREES_PER_DAY, compare=False, input_path=None):
+    state_path = os.path.join(STATE_DIR, f'{level}.joblib')
+    if init or not os.path.exists(state_path):
+        state = new_state(level, window_days, trees_per_day)
+        start = None
+    else:
+        state = joblib.load(state_path)
+        # 마지막 반영 날짜는 다시 읽어서 그날 늦게 들어온 행까지 반영
+        start = max(state['cohorts'])
+
+    read_path = path
+    if input_path is not None:
+        read_path = input_path
+    elif start is not None and not os.path.isdir(path):
+        # CSV 원본은 날짜 조건을 걸어도 전체를 파싱함 → 매일 전체 이력을 읽지 않도록 날짜 단위 입력 요구
+        print(f"[ERROR] [{level}] 증분 실행에서 원본이 CSV({path})이면 --{level}-input에 "
+              f"날짜 단위 CSV를 지정하세요. (Parquet 데이터셋이면 새 날짜만 읽음)")
+        raise SystemExit(1)
+
+    end = None if until is None else pd.Timestamp(until) + pd.Timedelta(days=1)
+    days_data = read_days(read_path, start=start, end=end)
+    new_days = sorted(days_data)
+    if state['model'] is None:
+        new_days = new_days[-state['window_days']:]  # 처음 구성: 최근 window_days일만
+
+    rng = np.random.default_rng(FOREST_PARAMS['random_state'])
+    print(f"\n[{level}] 반영할 날짜 {len(new_days)}개 ({read_path})")
+    total = time.perf_counter()
+    for day in new_days:
+        if day in state['cohorts']:
+            # 이미 반영된 날짜를 다시 반영: 그 날짜 트리를 먼저 제거하고 새로 키움
+            keep = [i for i, d in enumerate(state['tree_days']) if d != day]
+            state['model'].estimators_ = [state['model'].estimators_[i] for i in keep]
+            state['model'].estimators_features_ = [state['model'].estimators_features_[i] for i in keep]
+            state['tree_days'] = [state['tree_days'][i] for i in keep]
+            state['model'].set_params(n_estimators=len(keep))
+            del state['cohorts'][day]
+        t0 = time.perf_counter()
+        retired = refresh_day(state, day, days_data[day], rng)
+        print(f"  {day}: {len(days_data[day]):>9,} 행, 새 트리 {trees_per_day}개, 제거 {retired}개, "
+              f"{time.perf_counter() - t0:.2f}초 (트리 {len(state['tree_days'])}개, 윈도우 {len(state['cohorts'])}일)")
+    print(f"  갱신 시간: {time.perf_counter() - total:.2f}초")
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    joblib.dump(state, state_path)
+    joblib.dump(state['model'], f'./models/anomaly_detector_{level}.pkl')
+    joblib.dump(state['scaler'], f'./models/scaler_{level}.pkl')
+    save_pipeline(level, state['model'], state['scaler'], FEATURE_COLS,
+                  metadata={'source': '14_refresh_anomaly_models.py', 'window_days': sorted(state['cohorts'])})
+
+    if compare:
+        if start is not None:
+            # 윈도우 전체 데이터가 필요 (증분 갱신에서는 새 날짜만 읽었음, CSV 원본이면 전체 파싱)
+            days_data = read_days(path, start=min(state['cohorts']), end=end)
+        report_shift(state, days_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 모델 증분 갱신 (슬라이딩 윈도우)")
+    parser.add_argument('--init', action='store_true',
+                        help="저장된 상태를 버리고 최근 window_days일로 새로 구성")
+    parser.add_argument('--until', default=None,
+                        help="이 날짜(YYYY-MM-DD)까지의 데이터만 반영")
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS)
+    parser.add_argument('--trees-per-day', type=int, default=TREES_PER_DAY)
+    parser.add_argument('--levels', nargs='+', default=['cont', 'rack'], choices=['cont', 'rack'])
+    parser.add_argument('--compare', action='store_true',
+                        help="전체 재학습 대비 점수 분포 변화 보고")
+    parser.add_argument('--cont-input', default=None,
+                        help="존 새 날짜 CSV (원본이 CSV인 증분 실행에서 필수)")
+    parser.add_argument('--rack-input', default=None,
+                        help="랙 새 날짜 CSV (원본이 CSV인 증분 실행에서 필수)")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("이상 탐지 모델 증분 갱신")
+    print("="*60)
+
+    paths = level_paths()
+    inputs = {'cont': args.cont_input, 'rack': args.rack_input}
+    for level in args.levels:
+        run_level(level, paths[level], init=args.init, until=args.until, window_days=args.window_days,
+                  trees_per_day=args.trees_per_day, compare=args.compare, input_path=inputs[level])
+
+    print("\n" + "="*60)
+    print("✅ 갱신 완료: ./models/anomaly_detector_*.pkl, scaler_*.pkl")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Step 15: 이상 탐지 모델 학습 - 층화 저장소 샘플링 (수년치 이력용)
+
+03_train_anomaly_detector.py는 전체 특성 행렬과 스케일된 복사본을 메모리에 올려서 학습한다.
+랙 데이터를 1년 이상 쌓으면 그대로는 메모리에 들어가지 않으므로, 여기서는 원본을 청크로 두 번 읽는다.
+
+1. 첫 번째 읽기: 청크마다
+   - 스케일러용 평균/분산을 누적 (청크 통계를 Chan 병렬 분산 공식으로 합침)
+   - (존, 시각(hour), 계절) 층마다 최대 per_stratum행을 균등 확률로 남기는 저장소 샘플
+     행마다 난수 키를 붙이고 층별로 키가 가장 작은 per_stratum개만 유지 (bottom-k, 청크 단위 벡터 연산)
+2. 샘플로 IsolationForest 학습. 이상치 기준 offset_은 샘플 점수의 contamination 분위수를
+   층 가중치(층 전체 행 수 / 층 샘플 수)로 계산 → 전체 이력 점수 분포 기준과 같아짐
+3. 두 번째 읽기: 전체 이력을 청크 단위로 점수 계산 (존별 이상치 통계, 선택적으로 CSV 저장)
+
+피크 메모리는 청크 크기 + 샘플 크기(층 수 × per_stratum)로 정해지고 이력 길이와 무관하다.
+산출물은 03과 같은 models/anomaly_detector_{cont,rack}.pkl, scaler_{cont,rack}.pkl, models/anomaly_pipeline/
+
+사용 방법:
+    python 15_train_anomaly_sampled.py                          # cont + rack
+    python 15_train_anomaly_sampled.py --levels rack --chunk-rows 200000 --per-stratum 500
+    python 15_train_anomaly_sampled.py --source rack=./data/rack_history.csv --no-output
+    python 15_train_anomaly_sampled.py --compare                # + 전체 메모리 학습(03 방식)과 라벨 비교
+"""
+import argparse
+import os
+import resource
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from data_loader import iter_table, read_table, rack_clean_path
+from forest_compiler import compile_forest
+from anomaly_pipeline import save_pipeline, FEATURE_COLS, FOREST_PARAMS
+
+CONT_PATH = './data/cont_processed.csv'
+RACK_PATH = './data/rack_processed.csv'
+
+CHUNK_ROWS = 500_000   # 한 번에 읽는 행 수
+PER_STRATUM = 1_000    # 층마다 남기는 최대 샘플 수 (4개 존 × 24시간 × 4계절 → 최대 384,000행)
+SEASON_NAMES = ['겨울', '봄', '여름', '가을']
+
+
+def level_paths():
+    # 랙은 clean_rack_data.py 결과가 있으면 그것을 사용 (03과 같음)
+    return {'cont': CONT_PATH, 'rack': rack_clean_path() or RACK_PATH}
+
+
+def strata_of(df):
+    """층 번호: (contID × 24 + hour) × 4 + 계절 (12~2월 겨울, 3~5 봄, 6~8 여름, 9~11 가을)"""
+    zone = df['contID'].astype(np.int64).to_numpy()
+    hour = df['colDate'].dt.hour.to_numpy().astype(np.int64)
+    season = (df['colDate'].dt.month.to_numpy().astype(np.int64) % 12) // 3
+    return (zone * 24 + hour) * 4 + season
+
+
+def describe_stratum(stratum):
+    zone, rest = divmod(int(stratum), 96)
+    hour, season = divmod(rest, 4)
+    return f"존 {zone} {hour:02d}시 {SEASON_NAMES[season]}"
+
+
+class StreamingMoments:
+    """청크별 (행 수, 평균, 제곱편차 합)을 Chan 공식으로 합쳐 StandardScaler를 만듦 (float64)"""
+
+    def __init__(self, n_features):
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def update(self, X):
+        X = X.astype(np.float64)
+        n_b = len(X)
+        if n_b == 0:
+            return
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        total = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / total
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / total
+        self.n = total
+
+    def scaler(self):
+        var = self.m2 / self.n
+        scaler = StandardScaler()
+        scaler.mean_ = self.mean
+        scaler.var_ = var
+        scaler.scale_ = np.where(var > np.finfo(np.float64).eps, np.sqrt(var), 1.0)
+        scaler.n_samples_seen_ = self.n
+        scaler.n_features_in_ = len(self.mean)
+        return scaler
+
+
+class StratifiedReservoir:
+    """
+    층별 균등 샘플 (층마다 최대 per_stratum행, 비복원)
+
+    모든 행에 균등 난수 키를 붙이고 층별로 키가 가장 작은 per_stratum개를 남기면
+    층 안에서 균등 비복원 샘플이 된다 (행 순서/청크 크기와 무관). 청크가 오면
+    (저장소 + 청크 후보)를 (층, 키)로 정렬해서 층별 앞쪽만 남긴다.
+    이미 꽉 찬 층은 현재 가장 큰 키보다 작은 행만 후보로 삼는다.
+    """
+
+    def __init__(self, per_stratum, n_features, seed=FOREST_PARAMS['random_state']):
+        self.per_stratum = per_stratum
+        self.rng = np.random.default_rng(seed)
+        self.X = np.empty((0, n_features), dtype=np.float32)
+        self.keys = np.empty(0)
+        self.strata = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)   # 원본에서의 행 번호 (학습 시 원래 순서로)
+        self.seen = {}                             # 층별 전체 행 수
+        self._cut_strata = np.empty(0, dtype=np.int64)
+        self._cut_keys = np.empty(0)
+
+    def update(self, X, strata, first_row):
+        keys = self.rng.random(len(X))
+        uniq, counts = np.unique(strata, return_counts=True)
+        for s, c in zip(uniq.tolist(), counts.tolist()):
+            self.seen[s] = self.seen.get(s, 0) + c
+
+        # 꽉 찬 층은 현재 기준 키보다 작은 행만 후보
+        if len(self._cut_strata):
+            idx = np.minimum(np.searchsorted(self._cut_strata, strata), len(self._cut_strata) - 1)
+            cut = np.where(self._cut_strata[idx] == strata, self._cut_keys[idx], np.inf)
+            candidate = np.flatnonzero(keys < cut)
+        else:
+            candidate = np.arange(len(X))
+
+        X_all = np.concatenate([self.X, X[candidate].astype(np.float32)])
+        keys_all = np.concatenate([self.keys, keys[candidate]])
+        strata_all = np.concatenate([self.strata, strata[candidate]])
+        rows_all = np.concatenate([self.rows, first_row + candidate])
+
+        order = np.lexsort((keys_all, strata_all))
+        s_sorted = strata_all[order]
+        new = np.empty(len(order), dtype=bool)
+        new[:1] = True
+        new[1:] = s_sorted[1:] != s_sorted[:-1]
+        starts = np.flatnonzero(new)
+        rank = np.arange(len(order)) - starts[np.cumsum(new) - 1]
+        keep = order[rank < self.per_stratum]   # (층, 키) 순
+
+        self.X, self.keys = X_all[keep], keys_all[keep]
+        self.strata, self.rows = strata_all[keep], rows_all[keep]
+
+        # 꽉 찬 층의 기준 키 = 층 안 가장 큰 키 (정렬돼 있으므로 층 마지막 행)
+        ends = np.append(np.flatnonzero(self.strata[1:] != self.strata[:-1]), len(self.strata) - 1)
+        sizes = np.diff(np.append(-1, ends))
+        full = sizes >= self.per_stratum
+        self._cut_strata = self.strata[ends[full]]
+        self._cut_keys = self.keys[ends[full]]
+
+    def sample(self):
+        """(X, 가중치) 원본 행 순서. 가중치 = 층 전체 행 수 / 층 샘플 수 (샘플 한 행이 대표하는 행 수)"""
+        order = np.argsort(self.rows, kind='stable')
+        strata = self.strata[order]
+        uniq, kept = np.unique(strata, return_counts=True)
+        seen = np.array([self.seen[s] for s in uniq.tolist()], dtype=np.float64)
+        weights = (seen / kept)[np.searchsorted(uniq, strata)]
+        return self.X[order], weights
+
+
+def weighted_percentile(values, weights, q):
+    """가중 분위수 (가중치가 모두 같으면 np.percentile과 같음)"""
+    if np.all(weights == weights[0]):
+        return float(np.percentile(values, q))
+    order = np.argsort(values)
+    cum = np.cumsum(weights[order])
+    return float(values[order][np.searchsorted(cum, q / 100.0 * cum[-1])])
+
+
+def fit_sampled(path, chunk_rows=CHUNK_ROWS, per_stratum=PER_STRATUM):
+    """첫 번째 읽기 + 학습. Returns: model, scaler, 샘플 정보"""
+    chunks = iter_table(path, columns=['contID', 'colDate'] + FEATURE_COLS, chunk_rows=chunk_rows, compact=True)
+    return fit_from_chunks(chunks, per_stratum)
+
+
+def fit_from_chunks(chunks, per_stratum=PER_STRATUM):
+    """
+    청크 반복자(contID, colDate, FEATURE_COLS가 있는 DataFrame)로 학습 (bench_anomaly도 같은 함수 사용)
+
+    청크마다 모멘트 누적 + (존, 시각, 계절) 층화 저장소 샘플 → 학습, 가중 분위수 offset_.
+    Returns: model, scaler, 샘플 정보
+    """
+    moments = StreamingMoments(len(FEATURE_COLS))
+    reservoir = StratifiedReservoir(per_stratum, len(FEATURE_COLS))
+    rows = chunks_seen = 0
+    for chunk in chunks:
+        X = chunk[FEATURE_COLS].to_numpy(dtype=np.float32)
+        moments.update(X)
+        reservoir.update(X, strata_of(chunk), rows)
+        rows += len(chunk)
+        chunks_seen += 1
+
+    scaler = moments.scaler()
+    X_sample, weights = reservoir.sample()
+    X_scaled = scaler.transform(X_sample)
+    model = IsolationForest(**FOREST_PARAMS)
+    model.fit(X_scaled)
+    # fit이 정한 offset_(샘플 기준)을 전체 이력 기준으로: 층 가중 분위수
+    scores = compile_forest(model).score_samples(X_scaled)
+    model.offset_ = weighted_percentile(scores, weights, 100.0 * FOREST_PARAMS['contamination'])
+
+    small = min(reservoir.seen, key=reservoir.seen.get)
+    info = {'rows': rows, 'chunks': chunks_seen, 'sample_rows': len(X_sample), 'strata': len(reservoir.seen),
+            'full_strata': int(sum(n >= per_stratum for n in reservoir.seen.values())),
+            'smallest_stratum': f"{describe_stratum(small)} ({reservoir.seen[small]:,}행)"}
+    return model, scaler, info
+
+
+def score_history(path, model, scaler, chunk_rows=CHUNK_ROWS, output=None):
+    """두 번째 읽기: 청크 단위 점수 → 존별 (행 수, 이상치 수). output이 있으면 점수 포함 CSV로 저장"""
+    forest = compile_forest(model)
+    zone_rows, zone_anomalies = {}, {}
+    first = True
+    for chunk in iter_table(path, chunk_rows=chunk_rows, compact=True):
+        scores, labels = forest.score_and_label(scaler.transform(chunk[FEATURE_COLS].to_numpy(dtype=np.float64)))
+        zones = chunk['contID'].astype(np.int64).to_numpy()
+        uniq, inverse = np.unique(zones, return_inverse=True)
+        counts = np.bincount(inverse)
+        flagged = np.bincount(inverse, weights=labels).astype(np.int64)
+        for z, c, a in zip(uniq.tolist(), counts.tolist(), flagged.tolist()):
+            zone_rows[z] = zone_rows.get(z, 0) + c
+            zone_anomalies[z] = zone_anomalies.get(z, 0) + a
+        if output is not None:
+            chunk['anomaly_score'] = scores
+            chunk['is_anomaly'] = labels.astype(int)
+            chunk.to_csv(output, mode='w' if first else 'a', header=first, index=False)
+        first = False
+    return {z: (zone_rows[z], zone_anomalies[z]) for z in sorted(zone_rows)}
+
+
+def compare_full(path, model, scaler):
+    """비교용: 03 방식(전체를 메모리에 올려 학습)과 전체 이력 라벨 일치율"""
+    df = read_table(path, columns=FEATURE_COLS, compact=True)
+    X = df[FEATURE_COLS].values
+    full_scaler = StandardScaler()
+    X_full = full_scaler.fit_transform(X)
+    full_model = IsolationForest(**FOREST_PARAMS).fit(X_full)
+    s_scores, s_labels = compile_forest(model).score_and_label(scaler.transform(X))
+    f_scores, f_labels = compile_forest(full_model).score_and_label(X_full)
+    print(f"  03 방식 대비: 라벨 일치 {(s_labels == f_labels).mean() * 100:.2f}%, "
+          f"이상치 {s_labels.mean() * 100:.2f}% vs {f_labels.mean() * 100:.2f}%, "
+          f"점수 상관 {np.corrcoef(s_scores, f_scores)[0, 1]:.4f}")
+
+
+def run_level(level, path, chunk_rows=CHUNK_ROWS, per_stratum=PER_STRATUM, write_output=True, compare=False):
+    print(f"\n[{level}] {path}")
+    t0 = time.perf_counter()
+    model, scaler, info = fit_sampled(path, chunk_rows, per_stratum)
+    fit_sec = time.perf_counter() - t0
+    print(f"  학습: 이력 {info['rows']:,}행 ({info['chunks']}개 청크) → 샘플 {info['sample_rows']:,}행, "
+          f"층 {info['strata']}개 (꽉 찬 층 {info['full_strata']}개, 가장 작은 층 {info['smallest_stratum']}), "
+          f"{fit_sec:.1f}초")
+
+    t0 = time.perf_counter()
+    output = f'./{level}_with_anomalies.csv' if write_output else None
+    zones = score_history(path, model, scaler, chunk_rows, output)
+    score_sec = time.perf_counter() - t0
+
+    total = sum(n for n, _ in zones.values())
+    flagged = sum(a for _, a in zones.values())
+    print(f"  점수: {total:,}행, 이상치 {flagged:,} ({flagged / max(total, 1) * 100:.2f}%), {score_sec:.1f}초")
+    for z, (n, a) in zones.items():
+        print(f"    존 {z}: {a:>9,} / {n:>11,} ({a / n * 100:.2f}%)")
+    # tracemalloc은 pandas 청크 처리를 몇 배 느리게 하므로 프로세스 최대 RSS로 확인 (Linux: KB)
+    print(f"  프로세스 최대 RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.1f} MB")
+    if output is not None:
+        print(f"  ✅ 저장: {output}")
+
+    joblib.dump(model, f'./models/anomaly_detector_{level}.pkl')
+    joblib.dump(scaler, f'./models/scaler_{level}.pkl')
+    save_pipeline(level, model, scaler, FEATURE_COLS,
+                  metadata={'source': '15_train_anomaly_sampled.py', 'history_rows': info['rows'],
+                            'sample_rows': info['sample_rows'], 'per_stratum': per_stratum})
+    if compare:
+        compare_full(path, model, scaler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 모델 학습 (층화 저장소 샘플링, 청크 스트리밍)")
+    parser.add_argument('--levels', nargs='+', default=['cont', 'rack'], choices=['cont', 'rack'])
+    parser.add_argument('--source', nargs='+', default=[], metavar='LEVEL=PATH',
+                        help="레벨별 입력 경로 (기본: 03과 같은 경로)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--per-stratum', type=int, default=PER_STRATUM,
+                        help="(존, 시각, 계절) 층마다 남기는 최대 샘플 수")
+    parser.add_argument('--no-output', action='store_true',
+                        help="점수 포함 CSV(*_with_anomalies.csv)를 쓰지 않음")
+    parser.add_argument('--compare', action='store_true',
+                        help="전체 메모리 학습(03 방식)과 라벨 비교 (이력이 메모리에 들어갈 때만)")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("이상 탐지 모델 학습 (층화 샘플링)")
+    print("="*60)
+
+    paths = level_paths()
+    paths.update(dict(item.split('=', 1) for item in args.source))
+    os.makedirs('./models', exist_ok=True)
+    for level in args.levels:
+        run_level(level, paths[level], args.chunk_rows, args.per_stratum,
+                  write_output=not args.no_output, compare=args.compare)
+
+    print("\n" + "="*60)
+    print("✅ 학습 완료: ./models/anomaly_detector_*.pkl, scaler_*.pkl")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
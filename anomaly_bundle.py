@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+이상 탐지 모델 번들 (버전 관리되는 단일 파일)
+
+13_train_anomaly_models.py가 학습한 모델을 하나의 파일로 저장한다.
+- 레벨(cont, rack)별 전체 모델 + 선택적으로 contID별 모델
+- 모델마다 (IsolationForest, StandardScaler, 학습 행 수, 이상치 비율, 학습 시간)
+- 메타데이터: 버전, 생성 시각, 특성 컬럼, 학습 파라미터, 입력 데이터 지문
+
+    models/anomaly_bundle/anomaly_v0003.joblib   # 번들
+    models/anomaly_bundle/latest.json            # 최신 버전 + 메타데이터 (모델 없이 가볍게 읽음)
+
+    bundle = load_bundle()                     # 최신 버전
+    model, scaler = select_model(bundle, 'cont', cont_id=4)   # 존 모델이 없으면 레벨 전체 모델
+    zone_ids(bundle, 'cont')                   # 존 모델이 있는 contID 목록
+
+anomaly_service.py --bundle이 이 선택으로 측정값마다 (레벨, contID) 모델을 골라 점수를 매긴다.
+"""
+import glob
+import json
+import os
+import re
+import time
+
+import joblib
+
+BUNDLE_DIR = './models/anomaly_bundle'
+LATEST_FILE = 'latest.json'
+LEVELS = ('cont', 'rack')
+
+
+def model_key(level, cont_id=None):
+    """번들 안 모델 키: 'cont' (레벨 전체) 또는 'cont/4' (존별)"""
+    return level if cont_id is None else f"{level}/{cont_id}"
+
+
+def bundle_path(version, bundle_dir=BUNDLE_DIR):
+    return os.path.join(bundle_dir, f"anomaly_v{version:04d}.joblib")
+
+
+def list_versions(bundle_dir=BUNDLE_DIR):
+    versions = []
+    for path in glob.glob(os.path.join(bundle_dir, 'anomaly_v*.joblib')):
+        match = re.search(r'anomaly_v(\d+)\.joblib$', path)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def save_bundle(models, metadata, bundle_dir=BUNDLE_DIR):
+    """
+    새 버전으로 저장
+
+    Args:
+        models: {model_key: {'model', 'scaler', 'rows', 'anomaly_rate', 'fit_sec'}}
+        metadata: 학습 파라미터, 특성 컬럼, 입력 지문 등
+    Returns: 저장한 버전 번호
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    versions = list_versions(bundle_dir)
+    version = versions[-1] + 1 if versions else 1
+
+    metadata = dict(metadata, version=version, created=time.strftime('%Y-%m-%d %H:%M:%S'),
+                    models={key: {k: v for k, v in entry.items() if k not in ('model', 'scaler')}
+                            for key, entry in models.items()})
+    path = bundle_path(version, bundle_dir)
+    joblib.dump({'metadata': metadata, 'models': models}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+    latest = os.path.join(bundle_dir, LATEST_FILE)
+    with open(latest + '.tmp', 'w') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    os.replace(latest + '.tmp', latest)
+    return version
+
+
+def read_manifest(bundle_dir=BUNDLE_DIR):
+    """latest.json (없으면 None)"""
+    path = os.path.join(bundle_dir, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_bundle(version=None, bundle_dir=BUNDLE_DIR):
+    """번들 로드 (version=None이면 최신)"""
+    if version is None:
+        versions = list_versions(bundle_dir)
+        if not versions:
+            raise FileNotFoundError(f"{bundle_dir}에 번들이 없습니다. 13_train_anomaly_models.py를 먼저 실행하세요.")
+        version = versions[-1]
+    return joblib.load(bundle_path(version, bundle_dir))
+
+
+def zone_ids(bundle, level):
+    """이 레벨에서 존 모델이 있는 contID 목록 (정수)"""
+    prefix = f"{level}/"
+    return sorted(int(key[len(prefix):]) for key in bundle['models'] if key.startswith(prefix))
+
+
+def select_model(bundle, level, cont_id=None):
+    """(model, scaler): 존 모델이 있으면 존 모델, 없으면 레벨 전체 모델"""
+    models = bundle['models']
+    entry = models.get(model_key(level, cont_id)) if cont_id is not None else None
+    if entry is None:
+        entry = models[model_key(level)]
+    return entry['model'], entry['scaler']
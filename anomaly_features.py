@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+이상 탐지용 시계열 특성 엔진 (존/랙별 롤링 통계 + 같은 시각 동료 대비 편차)
+
+IsolationForest는 순간값(온습도 + 차이값)만 보므로 generate_anomaly_demo.py의
+존 1 +4.5°C 고장, 존 3 스파이크 같은 빠른 변화를 놓친다. 여기서는 시리즈(존 또는 랙)마다
+시간 창(기본 1시간, (t - window, t]) 안의 평균/표준편차/기울기와 z-score,
+같은 시각 동료(다른 존, 또는 같은 존의 다른 랙) 중앙값 대비 편차를 계산한다.
+
+- 행 루프/groupby.rolling 없이 (시리즈, 시각) 정렬 한 번 + 누적합으로 모든 창을 한 번에 계산
+  창 시작은 정수 키(dedup.py와 같은 시리즈 코드 × 시간 칸) searchsorted
+- 시간은 시각 간격의 최대공약수 단위 정수 → 기울기의 시간 합/제곱합은 int64로 정확히 계산
+- 값은 평균을 빼고 CHUNK_ROWS 구간별로 누적 (누적합이 커져서 생기는 자릿수 손실 방지)
+- 동료 중앙값: 칸(시각)별 값 정렬 후 자기 자신을 뺀 순위로 중앙값 위치를 바로 찾음 (NaN 제외)
+
+배치 학습과 실시간 점수 계산이 같은 함수를 쓴다.
+    frame = add_features(df, 'cont')           # 배치 (13_train_anomaly_models.py --rolling-features)
+    state = FeatureState('rack')
+    frame = state.update(new_rows)             # 실시간: 직전 창 길이만큼 남겨 둔 행 + 새 행 (anomaly_service.py)
+
+벤치마크 (pandas groupby.rolling 대비 시간/결과 비교, 증분 == 배치 확인):
+    python anomaly_features.py --racks 52 1000 --days 14
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dedup import _encode_keys
+
+ROLL_COLS = ['tempHot', 'humiHot']
+WINDOWS = ('1h',)
+SERIES_KEYS = {'cont': ['contID'], 'rack': ['contID', 'rackID']}
+PEER_WITHIN = {'cont': [], 'rack': ['contID']}   # 동료 범위: 존은 전체 존, 랙은 같은 존의 랙
+HOUR_NS = 3600 * 10**9
+CHUNK_ROWS = 65_536   # 누적합 구간 (시리즈 경계에서 자름): 누적합 크기를 제한해 창 분산의 반올림 오차를 작게
+
+
+def feature_names(cols=ROLL_COLS, windows=WINDOWS):
+    """add_features가 추가하는 컬럼 이름 (컬럼별 창 통계 → 동료 편차)"""
+    names = []
+    for col in cols:
+        for w in windows:
+            names += [f'{col}_mean_{w}', f'{col}_std_{w}', f'{col}_slope_{w}', f'{col}_z_{w}']
+        names.append(f'{col}_peer_dev')
+    return names
+
+
+def model_features(cols=ROLL_COLS, windows=WINDOWS):
+    """모델 입력으로 쓰는 특성 (레벨과 무관한 값: 기울기, z-score, 동료 편차)"""
+    names = []
+    for col in cols:
+        names += [f'{col}_slope_{w}' for w in windows] + [f'{col}_z_{w}' for w in windows]
+        names.append(f'{col}_peer_dev')
+    return names
+
+
+def needs_features(feature_cols):
+    """특성 목록에 이 엔진이 만드는 컬럼이 있는지 (실시간 서비스에서 상태 유지 여부)"""
+    generated = set(feature_names(ROLL_COLS, WINDOWS))
+    return any(col in generated or col.endswith('_peer_dev') for col in feature_cols)
+
+
+def _series_layout(df, keys, time_col):
+    """(시리즈, 시각) 정렬 순서 + 정렬된 행의 정수 시각(단위), 시리즈 시작 기준 시각, 단위(ns)"""
+    codes, offset, _, unit, span, n_codes, _ = _encode_keys(df, keys, time_col)
+    if n_codes * span < 2 ** 62:
+        order = np.argsort(codes * span + offset, kind='stable')
+    else:
+        order = np.lexsort((offset, codes))
+    codes, offset = codes[order], offset[order]
+    new = np.empty(len(order), dtype=bool)
+    new[:1] = True
+    new[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(new)
+    series = np.cumsum(new) - 1
+    local = offset - offset[starts][series]   # 시리즈 첫 시각 기준 (제곱합이 int64 안에 머물도록)
+    return order, codes, offset, local, starts, span, unit
+
+
+def _window_starts(codes, offset, span, unit, window_ns):
+    """정렬된 행마다 창 (t - window, t]의 첫 행 위치"""
+    width = -(-window_ns // unit)   # ceil: offset_j > offset_i - window/unit
+    key = codes * (span + width) + offset   # 시리즈 사이에 창 너비만큼 간격 → 창이 시리즈를 넘지 않음
+    return np.searchsorted(key, key - width + 1, side='left')
+
+
+def _chunk_bounds(series_starts, n, chunk_rows=CHUNK_ROWS):
+    """정렬된 행을 약 chunk_rows개씩, 시리즈 시작 위치에서만 자른 경계 (창은 시리즈를 넘지 않음)"""
+    cut = series_starts[np.searchsorted(series_starts, np.arange(0, n, chunk_rows), side='right') - 1]
+    return np.append(np.unique(cut), n)
+
+
+def _window_sums(values, left):
+    """누적합으로 창 구간 합 (sum[left:i+1])"""
+    csum = np.concatenate([np.zeros(1, dtype=values.dtype), np.cumsum(values)])
+    return csum[1:] - csum[left]
+
+
+def _constant_from(x, series_start):
+    """정렬된 행마다 같은 값이 이어지기 시작한 위치 (시리즈 경계에서 끊김)"""
+    change = np.ones(len(x), dtype=bool)
+    change[1:] = x[1:] != x[:-1]
+    change[series_start] = True
+    return np.maximum.accumulate(np.where(change, np.arange(len(x)), 0))
+
+
+def rolling_stats(x, local, left, unit, series_start):
+    """
+    정렬된 한 시리즈 묶음의 창 통계 (NaN 제외)
+
+    창 안 값이 모두 같으면 표준편차를 정확히 0으로 (누적합 차이의 반올림 오차가 sqrt로 커지지 않게,
+    pandas rolling과 같은 처리).
+    Returns: mean, std (ddof=1, 2개 미만이면 NaN), slope (단위/시간, 최소제곱), z ((x - mean) / std)
+    """
+    valid = ~np.isnan(x)
+    center = np.nanmean(x) if valid.any() else 0.0
+    xc = np.where(valid, x - center, 0.0)
+    t = np.where(valid, local, 0)
+
+    n = _window_sums(valid.astype(np.int64), left)
+    sx = _window_sums(xc, left)
+    sxx = _window_sums(xc * xc, left)
+    st = _window_sums(t, left)
+    stt = _window_sums(t * t, left)
+    stx = _window_sums(t * xc, left)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        nf = n.astype(np.float64)
+        mean = np.where(n > 0, center + sx / nf, np.nan)
+        var = np.maximum(sxx - sx * sx / nf, 0.0) / (nf - 1)
+        var[_constant_from(x, series_start) <= left] = 0.0
+        std = np.where(n > 1, np.sqrt(var), np.nan)
+        # 기울기 분모는 정수 그대로 (시간 단위 정수라 정확)
+        den = n * stt - st * st
+        slope = np.where(den > 0, (nf * stx - st * sx) / den.astype(np.float64), np.nan) * (HOUR_NS / unit)
+        z = np.where(std > 0, (x - mean) / std, np.nan)
+    return mean, std, slope, z
+
+
+def _cell_layout(df, within, time_col):
+    """칸(within 키 + 시각)별로 모은 행 순서, 칸 번호, 칸 안 위치, 칸 수"""
+    codes, offset, _, _, span, _, _ = _encode_keys(df, list(within), time_col)
+    order = np.argsort(codes * span + offset, kind='stable')
+    cell = (codes * span + offset)[order]
+    new = np.empty(len(order), dtype=bool)
+    new[:1] = True
+    new[1:] = cell[1:] != cell[:-1]
+    starts = np.flatnonzero(new)
+    cell_id = np.cumsum(new) - 1
+    return order, cell_id, np.arange(len(order)) - starts[cell_id], len(starts)
+
+
+def peer_deviation(df, cols, within=(), time_col='colDate'):
+    """
+    같은 칸(within 키 + 시각)의 다른 행들 중앙값 대비 편차 {col: 배열(원래 행 순서)}
+
+    칸 × 칸 안 위치 2차원 배열(빈 자리 NaN)을 행마다 정렬해 두면, 자기 자신(순위 r)을 뺀
+    동료 m-1개의 중앙값 위치는 k < r이면 k, 아니면 k+1 → 행 루프 없이 모든 행의 중앙값을 구한다.
+    칸 너비는 동료 수(존 4개, 존 안 랙 수십 개)라 배열이 작다. 동료가 없으면 NaN.
+    """
+    order, cell_id, pos, n_cells = _cell_layout(df, within, time_col)
+    width = int(pos.max()) + 1 if len(pos) else 1
+    out = {}
+    for col in cols:
+        x = df[col].to_numpy(dtype=np.float64)[order]
+        grid = np.full((n_cells, width), np.nan)
+        grid[cell_id, pos] = x
+        idx = np.argsort(grid, axis=1)   # NaN은 맨 뒤
+        ranked = np.take_along_axis(grid, idx, axis=1)
+        rank_grid = np.empty_like(idx)
+        np.put_along_axis(rank_grid, idx, np.broadcast_to(np.arange(width), idx.shape), axis=1)
+        rank = rank_grid[cell_id, pos]
+
+        peers = (~np.isnan(ranked)).sum(axis=1)[cell_id] - 1
+        k1, k2 = (peers - 1) // 2, peers // 2   # 동료 수가 홀수면 같은 위치
+        c1 = np.clip(k1 + (k1 >= rank), 0, width - 1)
+        c2 = np.clip(k2 + (k2 >= rank), 0, width - 1)
+        median = (ranked[cell_id, c1] + ranked[cell_id, c2]) / 2
+
+        ok = ~np.isnan(x) & (peers > 0)
+        dev = np.full(len(x), np.nan)
+        dev[order[ok]] = x[ok] - median[ok]
+        out[col] = dev
+    return out
+
+
+def rolling_arrays(df, level, cols=ROLL_COLS, windows=WINDOWS, time_col='colDate'):
+    """{'{col}_{mean,std,slope,z}_{w}': 배열(원래 행 순서)} (시리즈 안 창 통계만, 동료 편차 제외)"""
+    keys = SERIES_KEYS[level]
+    order, codes, offset, local, starts, span, unit = _series_layout(df, keys, time_col)
+    bounds = _chunk_bounds(starts, len(order))
+    chunks = [(a, b, starts[(starts >= a) & (starts < b)] - a) for a, b in zip(bounds[:-1], bounds[1:])]
+    new_cols = {}
+    for w in windows:
+        left = _window_starts(codes, offset, span, unit, pd.Timedelta(w).value)
+        for col in cols:
+            x = df[col].to_numpy(dtype=np.float64)[order]
+            stats = [np.empty(len(x)) for _ in range(4)]
+            for a, b, chunk_starts in chunks:
+                for out, values in zip(stats, rolling_stats(x[a:b], local[a:b], left[a:b] - a, unit, chunk_starts)):
+                    out[a:b] = values
+            for name, values in zip(('mean', 'std', 'slope', 'z'), stats):
+                out = np.empty(len(values))
+                out[order] = values
+                new_cols[f'{col}_{name}_{w}'] = out
+    return new_cols
+
+
+def feature_arrays(df, level, cols=ROLL_COLS, windows=WINDOWS, time_col='colDate'):
+    """{특성 이름: 배열(원래 행 순서)} (feature_names(cols, windows) 순서)"""
+    new_cols = rolling_arrays(df, level, cols, windows, time_col)
+    for col, dev in peer_deviation(df, cols, PEER_WITHIN[level], time_col).items():
+        new_cols[f'{col}_peer_dev'] = dev
+    return {name: new_cols[name] for name in feature_names(cols, windows)}
+
+
+def add_features(df, level, cols=ROLL_COLS, windows=WINDOWS, time_col='colDate'):
+    """df + feature_names(cols, windows) 컬럼 (원래 행 순서 유지)"""
+    features = pd.DataFrame(feature_arrays(df, level, cols, windows, time_col), index=df.index)
+    return pd.concat([df, features], axis=1)
+
+
+def fill_features(frame, feature_cols):
+    """모델 입력용: 창에 값이 하나뿐이거나 동료가 없어 생긴 NaN은 0 (변화/편차 없음)"""
+    generated = [col for col in feature_cols if col in frame and frame[col].isna().any()]
+    return frame.fillna({col: 0.0 for col in generated}) if generated else frame
+
+
+def _joint_codes(a, b, cols):
+    """두 프레임의 키 조합 → 같은 조합이면 같은 int64 코드 (a 코드, b 코드)"""
+    codes = np.zeros(len(a) + len(b), dtype=np.int64)
+    for col in cols:
+        code, uniq = pd.factorize(np.concatenate([a[col].to_numpy(), b[col].to_numpy()]))
+        codes = codes * len(uniq) + code
+    return codes[:len(a)], codes[len(a):]
+
+
+class FeatureState:
+    """
+    실시간 점수 계산용 증분 상태
+
+    시리즈마다 최근 창 길이만큼의 원본 행을 남겨 둔다. 새 행이 오면
+    - 창 통계: 새 행이 속한 시리즈의 남긴 행 + 새 행만
+    - 동료 편차: 새 행과 같은 칸(동료 범위 + 시각)의 남긴 행 + 새 행만
+    다시 계산해 새 행의 특성을 돌려준다 (남긴 행 전체를 다시 계산하지 않음). 창 안 이전 행이 모두
+    남아 있으므로 같은 시각의 동료 행이 같은 호출(또는 이전 호출)에 들어오면 배치 결과와 같다.
+    """
+
+    def __init__(self, level, cols=ROLL_COLS, windows=WINDOWS, time_col='colDate'):
+        self.level = level
+        self.cols = list(cols)
+        self.windows = tuple(windows)
+        self.time_col = time_col
+        self.keep = max(pd.Timedelta(w) for w in self.windows)
+        self.tail = None
+
+    def update(self, df):
+        df = df.reset_index(drop=True)
+        if not pd.api.types.is_datetime64_any_dtype(df[self.time_col]):
+            df = df.assign(**{self.time_col: pd.to_datetime(df[self.time_col])})
+        keys = SERIES_KEYS[self.level]
+        rows = df[keys + [self.time_col] + self.cols]
+        tail = rows.iloc[:0] if self.tail is None else self.tail
+        n = len(rows)
+
+        tail_series, new_series = _joint_codes(tail, rows, keys)
+        touched = np.isin(tail_series, new_series)
+        tail_cells, new_cells = _joint_codes(tail, rows, PEER_WITHIN[self.level] + [self.time_col])
+        in_cells = np.isin(tail_cells, new_cells)
+
+        series_rows = pd.concat([tail[touched], rows], ignore_index=True)
+        features = rolling_arrays(series_rows, self.level, self.cols, self.windows, self.time_col)
+        cell_rows = pd.concat([tail[in_cells], rows], ignore_index=True)
+        for col, dev in peer_deviation(cell_rows, self.cols, PEER_WITHIN[self.level], self.time_col).items():
+            features[f'{col}_peer_dev'] = dev
+
+        # 바뀐 시리즈만 마지막 시각에서 창 길이 안쪽 행을 남김 (다른 시리즈의 남긴 행은 그대로)
+        series = np.concatenate([tail_series[touched], new_series])
+        t = series_rows[self.time_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        last = np.full(int(series.max()) + 1 if len(series) else 0, np.iinfo(np.int64).min)
+        np.maximum.at(last, series, t)
+        kept = series_rows[t > last[series] - self.keep.value]
+        self.tail = pd.concat([tail[~touched], kept], ignore_index=True)
+
+        new = pd.DataFrame({name: features[name][len(features[name]) - n:]
+                            for name in feature_names(self.cols, self.windows)})
+        return pd.concat([df, new], axis=1)
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크 / 검증
+# ---------------------------------------------------------------------------
+
+def pandas_reference(df, level, cols=ROLL_COLS, windows=WINDOWS, time_col='colDate'):
+    """비교용: pandas groupby().rolling() 평균/표준편차"""
+    keys = SERIES_KEYS[level]
+    ordered = df.sort_values(keys + [time_col], kind='stable')
+    out = {}
+    for w in windows:
+        for col in cols:
+            roll = ordered.groupby(keys, observed=True).rolling(w, on=time_col)[col]
+            out[f'{col}_mean_{w}'] = pd.Series(roll.mean().to_numpy(), index=ordered.index)
+            out[f'{col}_std_{w}'] = pd.Series(roll.std().to_numpy(), index=ordered.index)
+    return pd.DataFrame(out).loc[df.index]
+
+
+def benchmark(rack_counts=(52, 1000), days=14, split_days=1):
+    from synthetic import make_rack_readings
+    print("="*60)
+    print(f"롤링 특성 엔진 벤치마크 ({days}일, 창 {', '.join(WINDOWS)}, 컬럼 {', '.join(ROLL_COLS)})")
+    print("="*60)
+    print("엔진: 창 평균/표준편차/기울기/z + 동료 편차, pandas: groupby.rolling 평균/표준편차만")
+    print(f"{'랙':>6} {'행':>11} {'엔진(초)':>9} {'pandas(초)':>11} {'배속':>6} {'최대 차이':>10} {'증분==배치':>10}")
+    for n_racks in rack_counts:
+        df = make_rack_readings(n_racks=n_racks, days=days)
+        t0 = time.perf_counter()
+        frame = add_features(df, 'rack')
+        engine_sec = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ref = pandas_reference(df, 'rack')
+        pandas_sec = time.perf_counter() - t0
+        diff = max(float(np.nanmax(np.abs(frame[c].to_numpy() - ref[c].to_numpy()))) for c in ref.columns)
+
+        # 하루씩 나눠 증분 계산 → 배치와 비교
+        state = FeatureState('rack')
+        day = df['colDate'].dt.floor(f'{split_days}D')
+        parts = [state.update(df[day == d]) for d in sorted(day.unique())]
+        incremental = pd.concat(parts, ignore_index=True)
+        batch = frame.loc[np.concatenate([np.flatnonzero((day == d).to_numpy()) for d in sorted(day.unique())])]
+        names = feature_names()
+        same = np.allclose(incremental[names].to_numpy(), batch[names].to_numpy(), equal_nan=True,
+                           rtol=1e-6, atol=1e-6)
+        print(f"{n_racks:>6,} {len(df):>11,} {engine_sec:>9.2f} {pandas_sec:>11.2f} "
+              f"{pandas_sec / engine_sec:>5.1f}x {diff:>10.2e} {'OK' if same else 'FAIL':>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 롤링 특성 엔진 벤치마크")
+    parser.add_argument('--racks', type=int, nargs='+', default=[52, 1000])
+    parser.add_argument('--days', type=int, default=14)
+    args = parser.parse_args()
+    benchmark(args.racks, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+랙 → 컨테인먼트 이상 탐지 계층 집계
+
+03이 만든 cont_with_anomalies.csv(존 × 시각)와 rack_with_anomalies.csv(랙 × 시각)를
+(contID, colDate) 정수 키 색인으로 연결하고, 한 번의 그룹 집계(bincount)로 시각별 표를 만든다.
+랙 행마다 merge/루프 없이 색인 조회 → 컨테인먼트 행 번호 → 누적.
+
+시각은 랙 격자(RACK_FREQ, 10분) 구간으로 맞춘다.
+
+출력 컬럼 (존 × 시각 구간 1행, contID/colDate 순):
+- cont_score, cont_anomaly: 컨테인먼트 모델 점수/라벨 (구간 안 측정이 여럿이면 최저 점수 / 하나라도 이상)
+- n_racks, rack_anomalies, rack_anomaly_ratio: 같은 시각 랙 수, 이상 랙 수, 비율
+- worst_rackID, worst_rack_score: 점수가 가장 낮은(가장 이상한) 랙 (랙이 없으면 -1, NaN)
+- rack_score_std: 랙 점수 표준편차 (랙끼리 얼마나 다른지)
+- disagreement: 0 일치, 1 컨테인먼트만 이상 (이상 랙 없음),
+                2 랙만 이상 (이상 랙 비율 DISAGREE_RATIO 이상인데 컨테인먼트는 정상)
+
+랙 데이터는 청크로 나눠 넣어도 결과가 같다 (수천 랙 × 수개월도 청크 단위 메모리).
+
+사용:
+    python anomaly_hierarchy.py                         # → cont_rack_anomalies.parquet
+    python anomaly_hierarchy.py --benchmark --racks 52 5000 --days 14
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import read_table, iter_table
+from rack_frame import RACK_FREQ
+
+CONT_ANOMALY_PATH = './cont_with_anomalies.csv'
+RACK_ANOMALY_PATH = './rack_with_anomalies.csv'
+HIERARCHY_PATH = './cont_rack_anomalies.parquet'
+HIERARCHY_CSV = './cont_rack_anomalies.csv'   # pyarrow가 없을 때
+
+RACK_COLS = ['contID', 'rackID', 'colDate', 'anomaly_score', 'is_anomaly']
+CHUNK_ROWS = 2_000_000
+
+# 컨테인먼트는 정상인데 이 비율 이상의 랙이 이상이면 '랙만 이상'
+DISAGREE_RATIO = 0.5
+
+AGREE, CONT_ONLY, RACK_ONLY = 0, 1, 2
+
+
+class ContainmentIndex:
+    """
+    (contID, colDate) → 시각 행 번호 (고유 키 순서 = contID, colDate 순)
+
+    키 = 존 코드 × 시간 칸 수 + 시간 칸 (시간 단위는 시각 간격의 최대공약수, dedup.py와 같은 방식).
+    키 공간이 작으면 밀집 배열 조회, 크면 정렬된 고유 키에서 searchsorted.
+    freq를 주면 양쪽 시각을 freq 구간 시작으로 내림 (원본 컨테인먼트는 :06, :16처럼 랙 10분 격자와
+    어긋나므로). 같은 키가 여러 번 있으면(정제 전 데이터, 같은 구간) 한 행으로 묶인다.
+    """
+
+    def __init__(self, cont_ids, col_dates, freq=None):
+        codes, zones = pd.factorize(np.asarray(cont_ids), sort=True)
+        self.zones = pd.Index(zones)
+        self.freq_ns = pd.Timedelta(freq).value if freq is not None else 0
+        t_ns = self._floor(col_dates)
+        self.t_min = int(t_ns.min()) if len(t_ns) else 0
+        offset = t_ns - self.t_min
+        self.unit = max(int(np.gcd.reduce(offset)) if len(offset) else 1, 1)
+        offset //= self.unit
+        self.span = int(offset.max()) + 1 if len(offset) else 1
+
+        key = codes.astype(np.int64) * self.span + offset
+        # keys: 고유 키 (정렬), rows: 컨테인먼트 원본 행 → 시각 행 번호
+        self.keys, self.rows = np.unique(key, return_inverse=True)
+        self.n_rows = len(self.keys)
+
+        n_cells = len(self.zones) * self.span
+        self.slot = None
+        if n_cells <= max(4 * len(key), 1_000_000):
+            self.slot = np.full(n_cells, -1, dtype=np.int64)
+            self.slot[self.keys] = np.arange(self.n_rows)
+
+    def lookup(self, cont_ids, col_dates):
+        """각 (contID, colDate)의 시각 행 번호 (없으면 -1)"""
+        code = self.zones.get_indexer(np.asarray(cont_ids))
+        offset = self._floor(col_dates) - self.t_min
+        cell = offset // self.unit
+        ok = (code >= 0) & (offset >= 0) & (offset % self.unit == 0) & (cell < self.span)
+        key = code[ok].astype(np.int64) * self.span + cell[ok]
+
+        rows = np.full(len(code), -1, dtype=np.int64)
+        if self.slot is not None:
+            rows[ok] = self.slot[key]
+        else:
+            pos = np.minimum(np.searchsorted(self.keys, key), self.n_rows - 1)
+            rows[ok] = np.where(self.keys[pos] == key, pos, -1)
+        return rows
+
+    def _floor(self, col_dates):
+        t_ns = np.asarray(col_dates, dtype='datetime64[ns]').view(np.int64)
+        return t_ns - t_ns % self.freq_ns if self.freq_ns else t_ns
+
+    def cont_ids(self):
+        return self.zones.to_numpy()[self.keys // self.span]
+
+    def col_dates(self):
+        return (self.t_min + (self.keys % self.span) * self.unit).astype('datetime64[ns]')
+
+
+class RackAggregate:
+    """시각 행별 랙 누적값 (청크마다 add, 마지막에 table)"""
+
+    def __init__(self, cont_df, freq=RACK_FREQ):
+        self.index = ContainmentIndex(cont_df['contID'], cont_df['colDate'], freq)
+        n = self.index.n_rows
+        # 같은 키가 여러 번이면 가장 낮은 점수 / 하나라도 이상이면 이상
+        self.cont_score = np.full(n, np.inf)
+        np.minimum.at(self.cont_score, self.index.rows, cont_df['anomaly_score'].to_numpy(dtype=np.float64))
+        self.cont_anomaly = np.bincount(self.index.rows, weights=cont_df['is_anomaly'].to_numpy() == 1,
+                                        minlength=n) > 0
+
+        self.n_racks = np.zeros(n, dtype=np.int64)
+        self.rack_anomalies = np.zeros(n, dtype=np.int64)
+        self.score_sum = np.zeros(n)
+        self.score_sq = np.zeros(n)
+        self.worst_score = np.full(n, np.inf)
+        self.worst_rack = np.full(n, -1, dtype=np.int64)
+        self.unmatched = 0
+
+    def add(self, rack_df):
+        """랙 청크 누적 (키 조회 1번 + bincount, 행 루프 없음)"""
+        rows = self.index.lookup(rack_df['contID'], rack_df['colDate'])
+        score = rack_df['anomaly_score'].to_numpy(dtype=np.float64)
+        ok = (rows >= 0) & ~np.isnan(score)
+        self.unmatched += int((rows < 0).sum())
+
+        g, s = rows[ok], score[ok]
+        anomaly = rack_df['is_anomaly'].to_numpy()[ok]
+        rack_id = rack_df['rackID'].to_numpy()[ok]
+        n = self.index.n_rows
+
+        self.n_racks += np.bincount(g, minlength=n)
+        self.rack_anomalies += np.bincount(g, weights=anomaly == 1, minlength=n).astype(np.int64)
+        self.score_sum += np.bincount(g, weights=s, minlength=n)
+        self.score_sq += np.bincount(g, weights=s * s, minlength=n)
+
+        # 청크 안 최솟값 → 지금까지보다 낮아진 행만 랙 ID 갱신 (동률이면 먼저 나온 랙)
+        local = np.full(n, np.inf)
+        np.minimum.at(local, g, s)
+        better = local < self.worst_score
+        hit = np.flatnonzero(better[g] & (s == local[g]))
+        groups, first = np.unique(g[hit], return_index=True)
+        self.worst_rack[groups] = rack_id[hit[first]]
+        self.worst_score = np.where(better, local, self.worst_score)
+
+    def table(self):
+        """시각별 계층 표 (contID, colDate 순)"""
+        n_racks = self.n_racks
+        has = n_racks > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.score_sum / n_racks
+            std = np.sqrt(np.maximum(self.score_sq / n_racks - mean * mean, 0.0))
+            ratio = self.rack_anomalies / n_racks
+
+        cont_anomaly = self.cont_anomaly
+        disagreement = np.full(len(n_racks), AGREE, dtype=np.int8)
+        disagreement[has & cont_anomaly & (self.rack_anomalies == 0)] = CONT_ONLY
+        disagreement[has & ~cont_anomaly & (ratio >= DISAGREE_RATIO)] = RACK_ONLY
+
+        return pd.DataFrame({
+            'contID': self.index.cont_ids(),
+            'colDate': self.index.col_dates(),
+            'cont_score': self.cont_score.astype(np.float32),
+            'cont_anomaly': cont_anomaly.astype(np.int8),
+            'n_racks': n_racks.astype(np.int32),
+            'rack_anomalies': self.rack_anomalies.astype(np.int32),
+            'rack_anomaly_ratio': np.where(has, ratio, np.nan).astype(np.float32),
+            'worst_rackID': self.worst_rack.astype(np.int32),
+            'worst_rack_score': np.where(has, self.worst_score, np.nan).astype(np.float32),
+            'rack_score_std': np.where(has, std, np.nan).astype(np.float32),
+            'disagreement': disagreement,
+        })
+
+
+def build_hierarchy(cont_df, rack_frames, freq=RACK_FREQ):
+    """
+    컨테인먼트 프레임 + 랙 프레임(또는 랙 청크들의 iterable) → (계층 표, 매칭 안 된 랙 행 수)
+
+    freq: 시각 구간 (기본 랙 격자 10분). None이면 시각이 정확히 같은 행끼리만 연결
+    """
+    agg = RackAggregate(cont_df, freq)
+    if isinstance(rack_frames, pd.DataFrame):
+        rack_frames = [rack_frames]
+    for chunk in rack_frames:
+        agg.add(chunk)
+    return agg.table(), agg.unmatched
+
+
+def save_hierarchy(table):
+    """Parquet (pyarrow 없으면 CSV)로 저장, 저장 경로 반환"""
+    try:
+        table.to_parquet(HIERARCHY_PATH, index=False)
+        return HIERARCHY_PATH
+    except ImportError:
+        table.to_csv(HIERARCHY_CSV, index=False)
+        return HIERARCHY_CSV
+
+
+def hierarchy_path():
+    """저장된 계층 표 경로 (없으면 None)"""
+    for path in (HIERARCHY_PATH, HIERARCHY_CSV):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def pandas_reference(cont_df, rack_df, freq=RACK_FREQ):
+    """검증용: floor + merge + groupby로 같은 표 계산 (worst_rackID 제외)"""
+    keys = ['contID', 'colDate']
+    rack = rack_df[keys + ['anomaly_score', 'is_anomaly']].copy()
+    rack['contID'] = np.asarray(rack['contID'])
+    rack['colDate'] = rack['colDate'].dt.floor(freq)
+    cont = cont_df[keys].copy()
+    cont['contID'] = np.asarray(cont['contID'])
+    cont['colDate'] = cont['colDate'].dt.floor(freq)
+    cont = cont.drop_duplicates().sort_values(keys).reset_index(drop=True)
+    cont['row'] = np.arange(len(cont))
+    merged = rack.merge(cont, on=keys, how='inner')
+    stats = merged.groupby('row').agg(
+        n_racks=('anomaly_score', 'size'),
+        rack_anomalies=('is_anomaly', 'sum'),
+        worst_rack_score=('anomaly_score', 'min'),
+        rack_score_std=('anomaly_score', lambda s: s.std(ddof=0)),
+    )
+    return stats.reindex(np.arange(len(cont)))
+
+
+def benchmark(rack_counts, days, racks_per_zone=13):
+    """합성 데이터로 계층 집계 시간 (pandas merge + groupby와 비교)"""
+    from synthetic import make_rack_readings
+
+    print("\n" + "="*60)
+    print("랙 → 컨테인먼트 계층 집계 벤치마크")
+    print("="*60)
+    print(f"\n{'랙 수':>8} {'랙 행':>14} {'존×시각':>10} {'pandas(s)':>10} {'색인(s)':>10} {'일치':>6}")
+
+    rng = np.random.default_rng(0)
+    for n_racks in rack_counts:
+        rack = make_rack_readings(n_racks=n_racks, days=days, racks_per_zone=racks_per_zone)
+        rack['anomaly_score'] = rng.normal(-0.45, 0.05, len(rack))
+        rack['is_anomaly'] = (rack['anomaly_score'] < -0.55).astype(int)
+        # 원본 컨테인먼트처럼 랙 격자에서 몇 분씩 어긋난 시각
+        cont = rack[['contID', 'colDate']].drop_duplicates().reset_index(drop=True)
+        cont['colDate'] += pd.to_timedelta(rng.integers(0, 10, len(cont)), unit='min')
+        cont['anomaly_score'] = rng.normal(-0.45, 0.05, len(cont))
+        cont['is_anomaly'] = (cont['anomaly_score'] < -0.55).astype(int)
+
+        start = time.perf_counter()
+        table, _ = build_hierarchy(cont, rack)
+        fast_sec = time.perf_counter() - start
+
+        ref_sec, same = None, '-'
+        if len(rack) <= 5_000_000:
+            start = time.perf_counter()
+            ref = pandas_reference(cont, rack)
+            ref_sec = time.perf_counter() - start
+            ok = (np.array_equal(ref['n_racks'].to_numpy(), table['n_racks'].to_numpy())
+                  and np.array_equal(ref['rack_anomalies'].to_numpy(), table['rack_anomalies'].to_numpy()))
+            for col in ('worst_rack_score', 'rack_score_std'):
+                ok &= np.allclose(ref[col].to_numpy(), table[col].to_numpy(), atol=1e-6, equal_nan=True)
+            same = 'OK' if ok else 'DIFF'
+
+        ref_txt = f"{ref_sec:>10.2f}" if ref_sec is not None else f"{'-':>10}"
+        print(f"{n_racks:>8,} {len(rack):>14,} {len(cont):>10,} {ref_txt} {fast_sec:>10.2f} {same:>6}")
+
+
+def main():
+    print("\n" + "="*60)
+    print("랙 → 컨테인먼트 이상 탐지 계층 집계")
+    print("="*60)
+
+    cont_df = read_table(CONT_ANOMALY_PATH, columns=['contID', 'colDate', 'anomaly_score', 'is_anomaly'])
+    print(f"\n컨테인먼트: {len(cont_df):,} 행 ({CONT_ANOMALY_PATH})")
+
+    start = time.perf_counter()
+    table, unmatched = build_hierarchy(cont_df, iter_table(RACK_ANOMALY_PATH, columns=RACK_COLS,
+                                                           chunk_rows=CHUNK_ROWS))
+    elapsed = time.perf_counter() - start
+    print(f"랙 집계: {table['n_racks'].sum():,} 행 연결, 매칭 안 됨 {unmatched:,} 행 ({elapsed:.2f}s)")
+
+    print("\n[존별 요약]")
+    summary = table.groupby('contID').agg(
+        시각=('colDate', 'size'),
+        컨테인먼트_이상=('cont_anomaly', 'sum'),
+        이상랙_있는_시각=('rack_anomalies', lambda s: int((s > 0).sum())),
+        컨테인먼트만_이상=('disagreement', lambda s: int((s == CONT_ONLY).sum())),
+        랙만_이상=('disagreement', lambda s: int((s == RACK_ONLY).sum())),
+    )
+    print(summary)
+
+    path = save_hierarchy(table)
+    print(f"\n✅ 저장: {path} ({len(table):,} 행)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="랙 → 컨테인먼트 이상 탐지 계층 집계")
+    parser.add_argument('--benchmark', action='store_true', help="합성 데이터 벤치마크만 실행")
+    parser.add_argument('--racks', type=int, nargs='+', default=[52, 1000, 5000])
+    parser.add_argument('--days', type=int, default=14)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(rack_counts=args.racks, days=args.days)
+    else:
+        main()
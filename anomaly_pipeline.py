@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+이상 탐지 파이프라인 아티팩트 (레벨당 하나: 스케일러 + 모델 + 특성 컬럼 + 메타데이터)
+
+지금은 모델과 StandardScaler가 피클 4개로 따로 저장되어 사용하는 쪽마다 둘을 올바른 순서로
+로드/적용해야 하고, joblib.load는 트리 배열을 전부 메모리로 복사한다.
+여기서는 레벨별로 버전 폴더 하나에 다음을 저장한다.
+
+    models/anomaly_pipeline/cont/v0001/
+        meta.json           특성 컬럼, 버전, 생성 시각, 숲 크기/깊이/offset, 원본 정보
+        scaler_mean.npy     StandardScaler.mean_
+        scaler_scale.npy    StandardScaler.scale_
+        feature.npy, threshold.npy, threshold32.npy, missing_left.npy, leaf_value.npy
+                            펼친 숲 배열 (forest_compiler.py)
+
+배열은 .npy 그대로라 np.load(mmap_mode='r')로 메모리 매핑된다. 여러 워커 프로세스/Streamlit 세션이
+같은 파일을 열면 OS 페이지 캐시를 읽기 전용으로 공유하므로 프로세스마다 복사본이 생기지 않는다.
+
+    pipeline = load_pipeline('cont')                    # 최신 버전, 메모리 매핑
+    scores, labels = pipeline.score(df)                 # DataFrame 또는 (n, 6) 배열 (원본 단위)
+    save_pipeline('cont', model, scaler, FEATURE_COLS)  # 03 / 14에서
+
+벤치마크 (콜드 스타트 로드 시간, 프로세스별 RSS):
+    python anomaly_pipeline.py --bench
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from forest_compiler import CompiledForest, compile_forest
+
+PIPELINE_DIR = './models/anomaly_pipeline'
+FEATURE_COLS = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
+# IsolationForest 설정 (03_train_anomaly_detector.py와 같음, 13/14/15/bench_anomaly가 함께 사용)
+FOREST_PARAMS = {
+    'contamination': 0.05,  # 5% 이상치 가정
+    'n_estimators': 100,
+    'random_state': 42,
+}
+FOREST_ARRAYS = ('feature', 'threshold', 'threshold32', 'missing_left', 'leaf_value')
+
+
+class AnomalyPipeline:
+    """스케일 → 펼친 숲 점수 → 라벨 (sklearn 모델/스케일러와 같은 결과)"""
+
+    def __init__(self, forest, mean, scale, feature_cols, meta):
+        self.forest = forest
+        self.mean = mean
+        self.scale = scale
+        self.feature_cols = list(feature_cols)
+        self.meta = meta
+
+    def matrix(self, data):
+        """DataFrame → 특성 행렬 (차이값이 없으면 Hot - Cold로 계산), 배열은 그대로"""
+        if not isinstance(data, pd.DataFrame):
+            return np.asarray(data, dtype=np.float64)
+        if 'temp_diff' in self.feature_cols and 'temp_diff' not in data:
+            data = data.assign(temp_diff=data['tempHot'] - data['tempCold'])
+        if 'humi_diff' in self.feature_cols and 'humi_diff' not in data:
+            data = data.assign(humi_diff=data['humiHot'] - data['humiCold'])
+        return data[self.feature_cols].to_numpy(dtype=np.float64)
+
+    def transform(self, data):
+        return (self.matrix(data) - self.mean) / self.scale
+
+    def score(self, data):
+        """(anomaly_score, is_anomaly)"""
+        return self.forest.score_and_label(self.transform(data))
+
+
+def _version_dirs(level, root=PIPELINE_DIR):
+    base = os.path.join(root, level)
+    if not os.path.isdir(base):
+        return []
+    return sorted(int(m.group(1)) for m in (re.fullmatch(r'v(\d+)', name) for name in os.listdir(base)) if m)
+
+
+def save_pipeline(level, model, scaler, feature_cols=FEATURE_COLS, metadata=None, root=PIPELINE_DIR):
+    """새 버전 폴더에 저장 (model: IsolationForest 또는 CompiledForest). Returns: 버전 폴더 경로"""
+    forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+    versions = _version_dirs(level, root)
+    version = versions[-1] + 1 if versions else 1
+    out_dir = os.path.join(root, level, f'v{version:04d}')
+    tmp_dir = out_dir + '.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(getattr(forest, name)))
+    np.save(os.path.join(tmp_dir, 'scaler_mean.npy'), np.asarray(scaler.mean_, dtype=np.float64))
+    np.save(os.path.join(tmp_dir, 'scaler_scale.npy'), np.asarray(scaler.scale_, dtype=np.float64))
+
+    meta = {
+        'level': level,
+        'version': version,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'feature_cols': list(feature_cols),
+        'depth': forest.depth,
+        'n_trees': forest.n_trees,
+        'n_features': forest.n_features,
+        'denominator': forest.denominator,
+        'offset': forest.offset,
+        **(metadata or {}),
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def load_pipeline(level, version=None, mmap=True, root=PIPELINE_DIR):
+    """버전 폴더 로드 (version=None이면 최신, mmap=True면 배열을 읽기 전용 메모리 매핑)"""
+    versions = _version_dirs(level, root)
+    if not versions:
+        raise FileNotFoundError(f"{os.path.join(root, level)}에 파이프라인이 없습니다. "
+                                f"03_train_anomaly_detector.py를 먼저 실행하세요.")
+    version = versions[-1] if version is None else version
+    path = os.path.join(root, level, f'v{version:04d}')
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    mode = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in FOREST_ARRAYS}
+    forest = CompiledForest(arrays['feature'], arrays['threshold'], arrays['missing_left'],
+                            arrays['leaf_value'], meta['depth'], meta['n_features'],
+                            meta['denominator'], meta['offset'], threshold32=arrays['threshold32'])
+    mean = np.load(os.path.join(path, 'scaler_mean.npy'), mmap_mode=mode)
+    scale = np.load(os.path.join(path, 'scaler_scale.npy'), mmap_mode=mode)
+    return AnomalyPipeline(forest, mean, scale, meta['feature_cols'], meta)
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크: 새 프로세스에서 로드 (콜드 스타트) → 시간, RSS(전체/익명/파일 매핑)
+# ---------------------------------------------------------------------------
+
+_LOAD_PICKLES = """
+import joblib
+models = {lv: (joblib.load(f'{d}/anomaly_detector_{lv}.pkl'), joblib.load(f'{d}/scaler_{lv}.pkl'))
+          for lv in ('cont', 'rack')}
+"""
+
+_LOAD_PIPELINES = """
+from anomaly_pipeline import load_pipeline
+models = {lv: load_pipeline(lv, root=f'{d}/anomaly_pipeline') for lv in ('cont', 'rack')}
+"""
+
+_PROBE = """
+import json, sys, time
+d = sys.argv[1]
+def rss():
+    out = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS', 'RssAnon', 'RssFile')):
+                key, value = line.split(':')
+                out[key] = int(value.split()[0]) / 1024
+    return out
+before = rss()
+t0 = time.perf_counter()
+%s
+load_sec = time.perf_counter() - t0
+after = rss()
+print(json.dumps({'load_sec': load_sec, 'before': before, 'after': after}))
+"""
+
+
+def _probe(code, model_dir):
+    out = subprocess.run([sys.executable, '-c', _PROBE % code, model_dir], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def benchmark(model_dir='./models', repeats=3):
+    """피클 4개 joblib.load vs 파이프라인 메모리 매핑 로드 (각각 새 프로세스)"""
+    print("="*60)
+    print("이상 탐지 아티팩트 콜드 스타트 로드")
+    print("="*60)
+    print(f"{'방식':>10} {'로드(ms)':>9} {'RSS 증가(MB)':>13} {'익명(MB)':>9} {'파일 매핑(MB)':>13}")
+    for name, code in [('피클 4개', _LOAD_PICKLES), ('파이프라인', _LOAD_PIPELINES)]:
+        runs = [_probe(code, model_dir) for _ in range(repeats)]
+        best = min(runs, key=lambda r: r['load_sec'])
+        grow = {k: best['after'].get(k, 0) - best['before'].get(k, 0) for k in ('VmRSS', 'RssAnon', 'RssFile')}
+        print(f"{name:>10} {best['load_sec'] * 1000:>9.1f} {grow['VmRSS']:>13.2f} "
+              f"{grow['RssAnon']:>9.2f} {grow['RssFile']:>13.2f}")
+    print("\n익명 메모리는 프로세스마다 따로, 파일 매핑은 같은 파일을 여는 프로세스끼리 공유된다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 파이프라인 아티팩트")
+    parser.add_argument('--export', action='store_true',
+                        help="models/*.pkl 피클 4개를 파이프라인 아티팩트로 변환")
+    parser.add_argument('--bench', action='store_true',
+                        help="피클 vs 파이프라인 콜드 스타트 로드 시간/RSS")
+    parser.add_argument('--model-dir', default='./models')
+    args = parser.parse_args()
+
+    if args.export:
+        import joblib
+        for level in ('cont', 'rack'):
+            model = joblib.load(os.path.join(args.model_dir, f'anomaly_detector_{level}.pkl'))
+            scaler = joblib.load(os.path.join(args.model_dir, f'scaler_{level}.pkl'))
+            path = save_pipeline(level, model, scaler, root=os.path.join(args.model_dir, 'anomaly_pipeline'),
+                                 metadata={'source': 'pickle'})
+            print(f"✅ {level}: {path}")
+    if args.bench:
+        benchmark(args.model_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""
+실시간 이상 탐지 점수 서비스 (03_train_anomaly_detector.py가 저장한 모델 사용)
+
+모델/스케일러(컨테인먼트, 랙)를 한 번만 로드해 두고, 들어오는 측정값을 짧은 시간/개수 창으로
+모아서(micro-batch) 한 번에 점수를 매긴다. 측정값마다 anomaly_score, is_anomaly를 돌려준다.
+- is_anomaly: score_samples < offset_ (IsolationForest.predict == -1과 같음, 점수 한 번만 계산)
+- 점수는 컴파일된 숲(forest_compiler.py)으로 계산 → 단일 측정값도 sklearn 트리 루프 없이
+- --pipeline: 레벨별 파이프라인 아티팩트를 메모리 매핑으로 로드 (anomaly_pipeline.py)
+  파이프라인이 롤링 특성으로 학습됐으면(13 --rolling-features) 측정값에 contID/rackID/colDate가 필요하고,
+  시리즈별 최근 1시간 행을 남겨 두고 같은 특성을 증분으로 계산한다 (anomaly_features.FeatureState)
+- --onnx: models/onnx/anomaly_<종류>.onnx를 ONNX Runtime으로 실행 (onnx_backend.py, 같은 점수/라벨)
+- --bundle: 13이 저장한 최신 번들(models/anomaly_bundle/)에서 측정값의 contID마다 존 모델을 고름
+  (anomaly_bundle.select_model과 같음: 존 모델이 없는 존은 레벨 전체 모델). 측정값에 contID가 필요하다
+
+사용 방법:
+    # 프로세스 안에서
+    service = AnomalyService()
+    service.start()
+    result = service.score('cont', {'tempHot': 31.2, ...})          # 단일 측정값
+    results = service.score_many('rack', df)                          # 여러 개 (배치)
+
+    # 로컬 HTTP
+    python anomaly_service.py --port 8765
+    curl -X POST localhost:8765/score -d '{"kind": "cont", "readings": [{"tempHot": 31.2, ...}]}'
+    curl localhost:8765/stats
+
+    # 지연 시간/처리량 측정
+    python anomaly_service.py --bench
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from anomaly_bundle import LEVELS, load_bundle, model_key, select_model, zone_ids
+from anomaly_features import FeatureState, fill_features, needs_features
+from anomaly_pipeline import AnomalyPipeline, load_pipeline, FEATURE_COLS
+from forest_compiler import compile_forest
+from onnx_backend import load_onnx_pipeline
+
+MODEL_DIR = './models'
+MODEL_FILES = {
+    'cont': ('anomaly_detector_cont.pkl', 'scaler_cont.pkl'),
+    'rack': ('anomaly_detector_rack.pkl', 'scaler_rack.pkl'),
+}
+
+MAX_BATCH = 4096       # 한 번에 점수 매길 최대 측정값 수
+MAX_WAIT_MS = 2.0      # 첫 측정값이 들어온 뒤 배치를 더 모으는 최대 시간
+LATENCY_WINDOW = 10_000  # 지연 시간 통계에 쓰는 최근 요청 수
+
+
+def load_models(model_dir=MODEL_DIR):
+    """{'cont': (model, scaler), 'rack': (model, scaler)} (파일이 없는 종류는 제외)"""
+    models = {}
+    for kind, (model_file, scaler_file) in MODEL_FILES.items():
+        model_path = os.path.join(model_dir, model_file)
+        scaler_path = os.path.join(model_dir, scaler_file)
+        if os.path.exists(model_path) and os.path.exists(scaler_path):
+            models[kind] = (joblib.load(model_path), joblib.load(scaler_path))
+    if not models:
+        raise FileNotFoundError(f"{model_dir}에 이상 탐지 모델이 없습니다. 03_train_anomaly_detector.py를 먼저 실행하세요.")
+    return models
+
+
+def readings_to_matrix(readings):
+    """측정값(dict 목록 또는 DataFrame) → (n, 6) float64 배열. 차이값이 없으면 Hot - Cold로 계산"""
+    df = readings if isinstance(readings, pd.DataFrame) else pd.DataFrame(list(readings))
+    if 'temp_diff' not in df:
+        df = df.assign(temp_diff=df['tempHot'] - df['tempCold'])
+    if 'humi_diff' not in df:
+        df = df.assign(humi_diff=df['humiHot'] - df['humiCold'])
+    return df[FEATURE_COLS].to_numpy(dtype=np.float64)
+
+
+def bundle_pipelines(bundle):
+    """번들 → ({레벨: 전체 모델 파이프라인}, {레벨: {contID: 존 모델 파이프라인}})"""
+    feature_cols = bundle['metadata']['feature_cols']
+
+    def pipeline(level, cont_id=None):
+        model, scaler = select_model(bundle, level, cont_id)
+        return AnomalyPipeline(compile_forest(model), scaler.mean_, scaler.scale_, feature_cols, {})
+
+    levels = [level for level in LEVELS if model_key(level) in bundle['models']]
+    return ({level: pipeline(level) for level in levels},
+            {level: {cont_id: pipeline(level, cont_id) for cont_id in zone_ids(bundle, level)} for level in levels})
+
+
+class AnomalyScorer:
+    """
+    종류별 파이프라인(스케일 → 펼친 숲)으로 배열 단위 점수 계산 (스레드 없이 직접 호출할 때)
+
+    - use_pipelines=True: models/anomaly_pipeline/ 아티팩트를 메모리 매핑으로 로드 (anomaly_pipeline.py)
+    - use_onnx=True: models/onnx/ 그래프를 onnxruntime 세션으로 로드 (onnx_backend.py)
+    - use_bundle=True: models/anomaly_bundle/ 최신 번들의 레벨 전체 + 존 모델 (13_train_anomaly_models.py)
+    - 아니면 피클 4개를 로드해서 숲을 컴파일 (forest_compiler.py, sklearn과 같은 점수)
+    """
+
+    def __init__(self, models=None, model_dir=MODEL_DIR, use_pipelines=False, use_onnx=False, use_bundle=False,
+                 bundle=None):
+        self.zone_pipelines = {}
+        if bundle is not None or use_bundle:
+            bundle = bundle if bundle is not None else load_bundle(bundle_dir=os.path.join(model_dir, 'anomaly_bundle'))
+            self.pipelines, self.zone_pipelines = bundle_pipelines(bundle)
+        elif use_onnx:
+            root = os.path.join(model_dir, 'onnx')
+            self.pipelines = {kind: load_onnx_pipeline(kind, root=root) for kind in MODEL_FILES}
+        elif use_pipelines:
+            root = os.path.join(model_dir, 'anomaly_pipeline')
+            self.pipelines = {kind: load_pipeline(kind, root=root) for kind in MODEL_FILES}
+        else:
+            models = models if models is not None else load_models(model_dir)
+            self.pipelines = {
+                kind: AnomalyPipeline(compile_forest(model), scaler.mean_, scaler.scale_, FEATURE_COLS, {})
+                for kind, (model, scaler) in models.items()
+            }
+        self.kinds = list(self.pipelines)
+        self.feature_states = {kind: FeatureState(kind) for kind, pipeline in self.pipelines.items()
+                               if needs_features(pipeline.feature_cols)}
+        self._state_lock = threading.Lock()
+
+    def to_matrix(self, kind, readings):
+        """측정값 → 그 종류 파이프라인의 특성 행렬 (롤링 특성이면 상태를 갱신하면서 계산)"""
+        state = self.feature_states.get(kind)
+        if state is None:
+            return readings_to_matrix(readings)
+        df = readings if isinstance(readings, pd.DataFrame) else pd.DataFrame(list(readings))
+        with self._state_lock:   # 도착 순서대로 상태에 반영
+            frame = state.update(df)
+        pipeline = self.pipelines[kind]
+        return pipeline.matrix(fill_features(frame, pipeline.feature_cols))
+
+    def zones_of(self, kind, readings):
+        """존 모델이 있으면 측정값별 contID 배열 (없으면 None → 레벨 전체 모델)"""
+        if not self.zone_pipelines.get(kind):
+            return None
+        df = readings if isinstance(readings, pd.DataFrame) else pd.DataFrame(list(readings))
+        if 'contID' not in df:
+            raise ValueError("존별 모델 번들로 점수를 매기려면 측정값에 contID가 필요합니다.")
+        return df['contID'].astype(np.int64).to_numpy()
+
+    def score_matrix(self, kind, X, zones=None):
+        """
+        X: to_matrix 결과 (기본 (n, 6)) → (anomaly_score, is_anomaly)
+
+        zones: 행별 contID (zones_of). 존 모델이 있는 존의 행은 그 모델로, 나머지는 레벨 전체 모델로
+        """
+        by_zone = self.zone_pipelines.get(kind)
+        if zones is None or not by_zone:
+            return self.pipelines[kind].score(X)
+        scores = np.empty(len(X))
+        labels = np.empty(len(X), dtype=np.int8)
+        rest = np.ones(len(X), dtype=bool)
+        for cont_id in np.intersect1d(np.unique(zones), list(by_zone)):
+            rows = zones == cont_id
+            scores[rows], labels[rows] = by_zone[int(cont_id)].score(X[rows])
+            rest &= ~rows
+        if rest.any():
+            scores[rest], labels[rest] = self.pipelines[kind].score(X[rest])
+        return scores, labels
+
+
+class LatencyStats:
+    """최근 요청 지연 시간(p50/p99)과 처리량"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.readings = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record(self, latency_sec, n_readings=1):
+        with self.lock:
+            self.latencies.append(latency_sec)
+            self.readings += n_readings
+
+    def record_batch(self):
+        with self.lock:
+            self.batches += 1
+
+    def to_dict(self):
+        with self.lock:
+            lat = np.array(self.latencies) * 1000
+            elapsed = time.perf_counter() - self.started
+            return {
+                'requests': len(lat),
+                'readings': self.readings,
+                'batches': self.batches,
+                'p50_ms': float(np.percentile(lat, 50)) if len(lat) else None,
+                'p99_ms': float(np.percentile(lat, 99)) if len(lat) else None,
+                'readings_per_sec': self.readings / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+class AnomalyService:
+    """
+    micro-batch 점수 서비스
+
+    score()/score_many()는 요청을 큐에 넣고 결과를 기다린다. 백그라운드 스레드가
+    첫 요청 후 max_wait_ms 동안 또는 max_batch개가 찰 때까지 모아서 종류별로 한 번에 계산한다.
+    """
+
+    def __init__(self, scorer=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.scorer = scorer or AnomalyScorer()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = LatencyStats()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, kind, X, submitted=None, zones=None):
+        """
+        X: (n, 6) 배열 → Future (결과: (anomaly_score, is_anomaly))
+
+        submitted: 요청 시작 시각 (perf_counter). 지연 시간은 이때부터 (submit_many는 특성 계산 전 시각)
+        zones: 행별 contID (번들 존 모델 선택, 없으면 레벨 전체 모델)
+        """
+        if kind not in self.scorer.kinds:
+            raise ValueError(f"알 수 없는 종류: {kind} (가능: {self.scorer.kinds})")
+        future = Future()
+        self._queue.put((kind, X, future, time.perf_counter() if submitted is None else submitted, zones))
+        return future
+
+    def score(self, kind, reading):
+        """단일 측정값(dict) → {'anomaly_score', 'is_anomaly'}"""
+        return self.score_many(kind, [reading])[0]
+
+    def submit_many(self, kind, readings):
+        """측정값 목록/DataFrame → Future (입력 오류는 여기서 바로 예외, 계산 오류는 Future에)"""
+        submitted = time.perf_counter()   # 특성 계산(to_matrix)도 요청 지연에 포함
+        zones = self.scorer.zones_of(kind, readings)
+        return self.submit(kind, self.scorer.to_matrix(kind, readings), submitted, zones)
+
+    def score_many(self, kind, readings):
+        """측정값 목록/DataFrame → [{'anomaly_score', 'is_anomaly'}, ...]"""
+        return _results(*self.submit_many(kind, readings).result())
+
+    def _collect(self, first):
+        """첫 요청 이후 창 안에 들어온 요청을 모음 (종료 신호를 만나면 거기까지)"""
+        batch = [first]
+        size = len(first[1])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+
+            by_kind = {}
+            for item in batch:
+                by_kind.setdefault(item[0], []).append(item)
+            for kind, items in by_kind.items():
+                zones = None
+                if any(it[4] is not None for it in items):
+                    # 존 없이 submit한 요청의 행은 -1 → 레벨 전체 모델
+                    zones = np.concatenate([it[4] if it[4] is not None else np.full(len(it[1]), -1)
+                                            for it in items])
+                try:
+                    scores, labels = self.scorer.score_matrix(kind, np.concatenate([it[1] for it in items]), zones)
+                except Exception as e:
+                    for it in items:
+                        it[2].set_exception(e)
+                    continue
+                start = 0
+                done = time.perf_counter()
+                for _, X, future, submitted, _ in items:
+                    end = start + len(X)
+                    future.set_result((scores[start:end], labels[start:end]))
+                    self.stats.record(done - submitted, len(X))
+                    start = end
+            self.stats.record_batch()
+
+
+def _results(scores, labels):
+    return [{'anomaly_score': float(s), 'is_anomaly': int(a)} for s, a in zip(scores, labels)]
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(200, service.stats.to_dict())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not isinstance(request, dict):
+                    raise ValueError(f"요청 본문은 JSON 객체여야 합니다 ({type(request).__name__})")
+                future = service.submit_many(request.get('kind', 'cont'), request['readings'])
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            try:
+                results = _results(*future.result())
+            except Exception as e:
+                self._send(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, {'results': results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"✅ 이상 탐지 서비스: http://{host}:{port}  (POST /score, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def benchmark(service, kind='cont', single_requests=2000, batch_rows=200_000, model_dir=MODEL_DIR):
+    """단일 측정값 지연 시간(p50/p99) + 배치 처리량"""
+    from synthetic import make_cont_readings
+
+    readings = make_cont_readings(n_zones=4, days=max(1, batch_rows // (4 * 144) + 1)).head(batch_rows)
+    rolling = kind in service.scorer.feature_states
+
+    print("="*60)
+    print(f"이상 탐지 서비스 벤치마크 ({kind}, 배치 창 {service.max_batch}개 / {service.max_wait * 1000:.1f}ms)")
+    print("="*60)
+
+    # 1. 단일 측정값 (요청 하나씩, 결과를 기다린 뒤 다음 요청)
+    #    롤링 특성 모델은 측정값을 시간 순서로 보내야 하므로 특성 계산을 포함해 앞쪽 행으로 측정
+    if rolling:
+        records = readings.head(single_requests).to_dict('records')
+        readings = readings.iloc[single_requests:]
+    else:
+        service.score(kind, readings.iloc[0].to_dict())  # 워밍업
+        X = readings_to_matrix(readings)
+    latencies = []
+    for i in range(single_requests):
+        t0 = time.perf_counter()
+        if rolling:
+            service.score(kind, records[i])
+        else:
+            service.submit(kind, X[i % len(X):i % len(X) + 1]).result()
+        latencies.append(time.perf_counter() - t0)
+    lat = np.array(latencies) * 1000
+    label = " (롤링 특성 계산 포함)" if rolling else ""
+    if rolling:
+        X = service.scorer.to_matrix(kind, readings)
+    print(f"단일 측정값 {single_requests:,}건{label}: p50 {np.percentile(lat, 50):.2f}ms, "
+          f"p99 {np.percentile(lat, 99):.2f}ms")
+
+    # 2. 배치 (큰 요청 하나 + 동시에 들어온 작은 요청 여러 개)
+    t0 = time.perf_counter()
+    service.submit(kind, X).result()
+    sec = time.perf_counter() - t0
+    print(f"배치 {len(X):,}건: {sec:.2f}초 ({len(X) / sec:,.0f} 건/초)")
+
+    chunk = 100
+    t0 = time.perf_counter()
+    futures = [service.submit(kind, X[i:i + chunk]) for i in range(0, len(X), chunk)]
+    for future in futures:
+        future.result()
+    sec = time.perf_counter() - t0
+    print(f"동시 요청 {len(futures):,}개 × {chunk}건: {sec:.2f}초 ({len(X) / sec:,.0f} 건/초)")
+
+    # 3. 직접 호출과 결과 비교 (predict와 같은 라벨인지, 피클과 같은 특성일 때만)
+    if rolling:
+        return
+    model, scaler = load_models(model_dir)[kind]
+    scores, labels = service.submit(kind, X[:5000]).result()
+    expected = (model.predict(scaler.transform(X[:5000])) == -1).astype(np.int8)
+    print(f"predict와 라벨 일치: {'OK' if np.array_equal(labels, expected) else 'DIFF'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="실시간 이상 탐지 점수 서비스")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH,
+                        help="한 번에 점수 매길 최대 측정값 수")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help="배치를 모으는 최대 대기 시간 (ms)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="피클 대신 파이프라인 아티팩트(메모리 매핑)로 로드")
+    parser.add_argument('--onnx', action='store_true',
+                        help="ONNX Runtime 그래프로 점수 (python onnx_backend.py --convert 먼저)")
+    parser.add_argument('--bundle', action='store_true',
+                        help="13의 최신 번들로 점수 (측정값 contID마다 존 모델, 없으면 레벨 전체 모델)")
+    parser.add_argument('--bench', action='store_true',
+                        help="서버 대신 지연 시간/처리량 측정")
+    args = parser.parse_args()
+
+    service = AnomalyService(AnomalyScorer(model_dir=args.model_dir, use_pipelines=args.pipeline,
+                                           use_onnx=args.onnx, use_bundle=args.bundle),
+                             max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).start()
+    if args.bench:
+        benchmark(service, model_dir=args.model_dir)
+        service.stop()
+    else:
+        serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+이상 탐지 학습/점수 벤치마크 (규모별, 경로별 → JSON)
+
+synthetic.make_anomaly_workload로 고장 패턴(generate_anomaly_demo.py와 같은 종류)을 주입한
+컨테인먼트/랙 데이터를 크기별로 만들고, 경로마다 다음을 잰다.
+- fit_sec: 스케일러 + IsolationForest 학습 시간 (--repeat번 중 최솟값, 점수 시간도 같음)
+- score_sec, score_rows_per_sec: 전체 행 점수 + 라벨
+- fit_peak_mb, score_peak_mb: tracemalloc 피크 (NumPy 배열 포함, 시간 측정과 별도 실행)
+- artifact_bytes: 저장 산출물 크기 (피클 또는 파이프라인 폴더)
+- anomaly_rate, fault_recall: 이상 판정 비율, 주입한 고장 행 중 이상으로 잡힌 비율 (빨라지면서 틀려지지 않았는지)
+
+경로 (PATHS, 새 경로는 여기에 추가):
+    03_sklearn      03 학습 + sklearn score_samples/predict (컴파일 전 방식)
+    03_compiled     03 학습 + forest_compiler 한 번 탐색 (현재 03)
+    pipeline_mmap   03 학습 → save_pipeline → 메모리 매핑 로드 후 점수 (서비스 방식)
+    15_sampled      15의 층화 저장소 샘플 학습 (15의 fit_from_chunks에 청크로) + 컴파일 숲 점수
+
+결과는 JSON (메타: 커밋, 라이브러리 버전, CPU 수)으로 저장하고 --compare로 이전 결과와 비교한다.
+비교에서 시간/메모리/크기가 --threshold배 넘게 늘거나 fault_recall이 떨어지면 회귀로 표시하고 종료 코드 1.
+시간은 --repeat번 중 최솟값이고, 경우별 시간 배수는 머신 속도 변화(고정 기준 작업 calibrate()의 시간 배수,
+실행 앞뒤로 재서 짧은 값)로 나눠 판정한다. 기준 작업은 이 저장소 코드를 쓰지 않으므로 여러 경로가 함께
+느려진 회귀가 정규화에 묻히지 않는다. 느려 보이는 경우는 2 × --repeat번 더 재서 짧은 값을 쓴다.
+
+사용:
+    python bench_anomaly.py                                  # quick: 1천 ~ 10만 행
+    python bench_anomaly.py --suite full                     # 1천 ~ 1천만 행, 4 ~ 1000개 존
+    python bench_anomaly.py --rows 1000000 --zones 4 1000 --levels rack --paths 03_compiled 15_sampled
+    python bench_anomaly.py --compare ./benchmarks/anomaly_20251001_120000.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from anomaly_pipeline import save_pipeline, load_pipeline, FEATURE_COLS, FOREST_PARAMS
+from forest_compiler import compile_forest
+from synthetic import make_anomaly_workload
+
+BENCH_DIR = './benchmarks'
+
+SUITES = {
+    'quick': {'rows': [1_000, 100_000], 'zones': [4, 100]},
+    'full': {'rows': [1_000, 100_000, 1_000_000, 10_000_000], 'zones': [4, 1000]},
+}
+
+# 비교: 값이 작을수록 좋은 지표 / 시간 지표는 둘 다 이 값보다 짧으면 잡음으로 보고 무시
+LOWER_IS_BETTER = ['fit_sec', 'score_sec', 'fit_peak_mb', 'score_peak_mb', 'artifact_bytes']
+MIN_SECONDS = 0.5
+CALIBRATION_ROWS = 3_000_000   # 머신 속도 기준 작업 크기 (정렬 + 행렬곱 + 파이썬 루프, 약 0.3초)
+RECALL_DROP = 0.05
+
+
+# ---------------------------------------------------------------------------
+# 학습 / 점수 / 산출물 경로
+# ---------------------------------------------------------------------------
+
+def fit_full(df, level):
+    """03 방식: 전체 행렬 스케일 + 학습"""
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(df[FEATURE_COLS].to_numpy())
+    model = IsolationForest(**FOREST_PARAMS).fit(X_scaled)
+    return model, scaler
+
+
+def fit_sampled(df, level, chunk_rows=500_000, per_stratum=1_000):
+    """15 방식: df를 청크로 나눠 15의 fit_from_chunks에 그대로 넘김"""
+    sampled = importlib.import_module('15_train_anomaly_sampled')
+    chunks = (df.iloc[first:first + chunk_rows] for first in range(0, len(df), chunk_rows))
+    model, scaler, _ = sampled.fit_from_chunks(chunks, per_stratum)
+    return model, scaler
+
+
+def score_sklearn(fitted, X, workdir, level):
+    model, scaler = fitted
+    X_scaled = scaler.transform(X)
+    return model.score_samples(X_scaled), model.predict(X_scaled) == -1
+
+
+def score_compiled(fitted, X, workdir, level):
+    model, scaler = fitted
+    return compile_forest(model).score_and_label(scaler.transform(X))
+
+
+def score_pipeline(fitted, X, workdir, level):
+    return load_pipeline(level, mmap=True, root=os.path.join(workdir, 'anomaly_pipeline')).score(X)
+
+
+def save_pickles(fitted, workdir, level):
+    """03이 저장하는 모델 + 스케일러 피클 → 바이트 수"""
+    model, scaler = fitted
+    paths = [os.path.join(workdir, f'anomaly_detector_{level}.pkl'), os.path.join(workdir, f'scaler_{level}.pkl')]
+    joblib.dump(model, paths[0])
+    joblib.dump(scaler, paths[1])
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def save_pipeline_dir(fitted, workdir, level):
+    """파이프라인 버전 폴더 → 바이트 수"""
+    model, scaler = fitted
+    path = save_pipeline(level, model, scaler, FEATURE_COLS, root=os.path.join(workdir, 'anomaly_pipeline'))
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# 경로 이름 → (학습, 산출물 저장, 점수). 학습 함수가 같은 경로끼리는 한 번 학습한 모델을 같이 쓴다
+PATHS = {
+    '03_sklearn': (fit_full, save_pickles, score_sklearn),
+    '03_compiled': (fit_full, save_pickles, score_compiled),
+    'pipeline_mmap': (fit_full, save_pipeline_dir, score_pipeline),
+    '15_sampled': (fit_sampled, save_pickles, score_compiled),
+}
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+
+def _timed(fn, *args, repeat=1):
+    """repeat번 실행 중 가장 짧은 시간 (한 번 잰 값은 잡음이 커서 --compare가 회귀로 오판)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args)
+        sec = time.perf_counter() - start
+        best = sec if best is None else min(best, sec)
+    return out, best
+
+
+def _peak_mb(fn, *args):
+    """fn 실행 중 tracemalloc 피크 (MB)"""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(level, rows, zones, paths, memory=True, repeat=1):
+    """한 규모(레벨, 행 수, 존 수)에서 경로별 결과 목록"""
+    df = make_anomaly_workload(rows, n_zones=zones, level=level)
+    X = df[FEATURE_COLS].to_numpy(dtype=np.float64)
+    faults = df['fault'].to_numpy() > 0
+    case = f"{level}_rows{rows}_zones{zones}"
+    series = df['rackID'].nunique() if level == 'rack' else df['contID'].nunique()
+
+    results = []
+    fits = {}
+    workdir = tempfile.mkdtemp(prefix='bench_anomaly_')
+    try:
+        for name in paths:
+            fit, save, score = PATHS[name]
+            if fit not in fits:
+                fitted, fit_sec = _timed(fit, df, level, repeat=repeat)
+                fit_peak = _peak_mb(fit, df, level) if memory else None
+                fits[fit] = (fitted, fit_sec, fit_peak)
+            fitted, fit_sec, fit_peak = fits[fit]
+
+            artifact_bytes = save(fitted, workdir, level)
+            (scores, labels), score_sec = _timed(score, fitted, X, workdir, level, repeat=repeat)
+            score_peak = _peak_mb(score, fitted, X, workdir, level) if memory else None
+            labels = np.asarray(labels, dtype=bool)
+
+            results.append({
+                'case': case, 'level': level, 'rows': rows, 'zones': zones, 'series': int(series),
+                'path': name,
+                'fit_sec': round(fit_sec, 4),
+                'score_sec': round(score_sec, 4),
+                'score_rows_per_sec': round(rows / score_sec) if score_sec > 0 else None,
+                'fit_peak_mb': None if fit_peak is None else round(fit_peak, 2),
+                'score_peak_mb': None if score_peak is None else round(score_peak, 2),
+                'artifact_bytes': int(artifact_bytes),
+                'anomaly_rate': round(float(labels.mean()), 5),
+                'fault_recall': round(float(labels[faults].mean()), 5) if faults.any() else None,
+            })
+            r = results[-1]
+            mem = f"{r['fit_peak_mb']:>8.1f} {r['score_peak_mb']:>8.1f}" if memory else f"{'-':>8} {'-':>8}"
+            print(f"{level:>5} {rows:>11,} {zones:>6,} {name:>14} {fit_sec:>8.2f} {score_sec:>8.2f} "
+                  f"{r['score_rows_per_sec'] or 0:>12,} {mem} {artifact_bytes / 1024:>9,.0f} "
+                  f"{r['anomaly_rate'] * 100:>6.2f} {(r['fault_recall'] or 0) * 100:>7.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def environment(repeat=1, calibration_sec=None):
+    """결과 비교용 메타데이터 (커밋, 버전, CPU, 반복 횟수)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+        'params': FOREST_PARAMS,
+        'repeat': repeat,
+        'calibration_sec': calibration_sec,
+    }
+
+
+def calibrate(repeat=5, rows=CALIBRATION_ROWS):
+    """
+    머신 속도 기준 작업 시간 (repeat번 중 최솟값)
+
+    벤치마크 경로와 같은 종류의 비용(NumPy 정렬/행렬곱, 파이썬 루프)이지만 이 저장소 코드는 쓰지 않는다.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.random(rows)
+    matrix = rng.random((300, 300))
+
+    def work():
+        np.sort(values)
+        for _ in range(20):
+            matrix @ matrix
+        total = 0.0
+        for v in values.tolist():
+            total += v
+        return total
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _drift(baseline, calibration_sec):
+    """머신 속도 변화 = 이번 기준 작업 시간 / 이전 기준 작업 시간 (이전 결과에 없으면 1.0)"""
+    old = baseline['meta'].get('calibration_sec')
+    if not old or not calibration_sec:
+        return 1.0
+    return calibration_sec / old
+
+
+def _time_ratios(results, base):
+    """(case, path)마다 이번/이전 시간 배수 목록 (둘 다 MIN_SECONDS보다 짧으면 제외)"""
+    ratios = []
+    for r in results:
+        old = base.get((r['case'], r['path']))
+        if old is None:
+            continue
+        for metric in LOWER_IS_BETTER:
+            if metric.endswith('_sec') and r.get(metric) and old.get(metric) \
+                    and max(r[metric], old[metric]) >= MIN_SECONDS:
+                ratios.append(r[metric] / old[metric])
+    return ratios
+
+
+def _grown(r, old, threshold, metrics=LOWER_IS_BETTER, drift=1.0):
+    """threshold배 넘게 늘어난 지표 [(지표, 이전, 지금, 배수)] (짧은 시간은 잡음으로 무시, 시간은 drift로 나눔)"""
+    grown = []
+    for metric in metrics:
+        new_v, old_v = r.get(metric), old.get(metric)
+        if new_v is None or old_v is None or old_v <= 0:
+            continue
+        ratio = new_v / old_v
+        if metric.endswith('_sec'):
+            if max(new_v, old_v) < MIN_SECONDS:
+                continue
+            ratio /= drift
+        if ratio > threshold:
+            grown.append((metric, old_v, new_v, ratio))
+    return grown
+
+
+def _load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    return baseline, {(r['case'], r['path']): r for r in baseline['results']}
+
+
+def remeasure(results, baseline_path, threshold, repeat, calibration_sec=None):
+    """
+    이전보다 느려 보이는 경우만 repeat번 더 재서 더 짧은 시간을 남김
+
+    같은 코드라도 1초 안팎의 측정은 한 번마다 ±30% 넘게 흔들려서 (바로 옆에서 잰 기준 작업과도
+    상관이 없음) 최솟값을 쓰되 표본을 늘린다. Returns: 다시 잰 경우 수
+    """
+    baseline, base = _load_baseline(baseline_path)
+    time_metrics = [m for m in LOWER_IS_BETTER if m.endswith('_sec')]
+    drift = _drift(baseline, calibration_sec)
+    suspects = {}
+    for r in results:
+        old = base.get((r['case'], r['path']))
+        if old is not None and _grown(r, old, threshold, time_metrics, drift):
+            suspects.setdefault((r['level'], r['rows'], r['zones']), []).append(r['path'])
+    if not suspects:
+        return 0
+
+    print(f"\n느려 보이는 경우 {len(suspects)}개 재측정 ({repeat}회 중 최솟값과 비교해 짧은 값 사용)")
+    by_key = {(r['case'], r['path']): r for r in results}
+    for (level, rows, zones), paths in suspects.items():
+        for again in run_case(level, rows, zones, paths, memory=False, repeat=repeat):
+            r = by_key[(again['case'], again['path'])]
+            for metric in time_metrics:
+                r[metric] = min(r[metric], again[metric])
+            r['score_rows_per_sec'] = round(rows / r['score_sec']) if r['score_sec'] > 0 else None
+    return len(suspects)
+
+
+def compare(results, baseline_path, threshold, calibration_sec=None):
+    """이전 JSON과 (case, path)별 비교 → 회귀 수"""
+    baseline, base = _load_baseline(baseline_path)
+    drift = _drift(baseline, calibration_sec)
+    ratios = _time_ratios(results, base)
+
+    print("\n" + "="*60)
+    print(f"이전 결과와 비교: {baseline_path} (커밋 {baseline['meta'].get('git_commit')}, "
+          f"{baseline['meta'].get('repeat', 1)}회 중 최솟값)")
+    if baseline['meta'].get('calibration_sec'):
+        print(f"머신 속도 변화 (기준 작업): {drift:.2f}x → 경우별 시간 배수는 이 값으로 나눠 판정")
+    else:
+        print("이전 결과에 기준 작업 시간이 없어 시간 배수를 그대로 판정")
+    if ratios:
+        print(f"경로 시간 배수 중앙값: {np.median(ratios):.2f}x (머신 보정 후 {np.median(ratios) / drift:.2f}x)")
+    print("="*60)
+    regressions = 0
+    for r in results:
+        old = base.get((r['case'], r['path']))
+        if old is None:
+            continue
+        notes = [f"{metric} {old_v:g} → {new_v:g} ({ratio:.2f}x)"
+                 for metric, old_v, new_v, ratio in _grown(r, old, threshold, drift=drift)]
+        if r.get('fault_recall') is not None and old.get('fault_recall') is not None \
+                and r['fault_recall'] < old['fault_recall'] - RECALL_DROP:
+            notes.append(f"fault_recall {old['fault_recall']:.3f} → {r['fault_recall']:.3f}")
+        speed = old['score_sec'] / r['score_sec'] if r['score_sec'] > 0 else float('nan')
+        status = '⚠️ 회귀' if notes else 'OK'
+        print(f"  {r['case']:<28} {r['path']:<14} 점수 {speed:>5.2f}배 속도  {status}")
+        for note in notes:
+            print(f"      - {note}")
+        regressions += bool(notes)
+
+    missing = set(base) - {(r['case'], r['path']) for r in results}
+    if missing:
+        print(f"\n  (이번에 실행하지 않은 이전 항목 {len(missing)}개)")
+    print(f"\n회귀: {regressions}개 (기준 {threshold:.2f}배)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이상 탐지 학습/점수 벤치마크")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--rows', type=int, nargs='+', help="행 수 목록 (suite 대신)")
+    parser.add_argument('--zones', type=int, nargs='+', help="존 수 목록 (suite 대신)")
+    parser.add_argument('--levels', nargs='+', choices=['cont', 'rack'], default=['cont', 'rack'])
+    parser.add_argument('--paths', nargs='+', choices=list(PATHS), default=list(PATHS))
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc 피크 측정 생략 (실행 시간 절반)")
+    parser.add_argument('--output', help=f"결과 JSON 경로 (기본 {BENCH_DIR}/anomaly_<시각>.json)")
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON")
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help="회귀로 볼 증가 배수 (기본 1.5, 같은 코드도 공유 머신에서는 1.4배 안팎까지 흔들림)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="학습/점수 시간을 잴 반복 횟수, 최솟값 사용 (기본 5)")
+    args = parser.parse_args()
+
+    rows_list = args.rows or SUITES[args.suite]['rows']
+    zones_list = args.zones or SUITES[args.suite]['zones']
+
+    print("="*60)
+    print("이상 탐지 벤치마크")
+    print("="*60)
+    print(f"행: {rows_list}, 존: {zones_list}, 레벨: {args.levels}, 경로: {args.paths}")
+    print(f"\n{'레벨':>5} {'행':>11} {'존':>6} {'경로':>14} {'학습(s)':>8} {'점수(s)':>8} {'행/초':>12} "
+          f"{'학습MB':>8} {'점수MB':>8} {'산출물KB':>9} {'이상%':>6} {'고장재현%':>7}")
+
+    calibration_sec = calibrate(args.repeat)
+    results = []
+    for level in args.levels:
+        for zones in zones_list:
+            for rows in rows_list:
+                results.extend(run_case(level, rows, zones, args.paths, memory=not args.no_memory,
+                                        repeat=args.repeat))
+    # 실행 중 머신 속도가 바뀌는 경우가 있어 끝에서도 재고 짧은 값
+    calibration_sec = min(calibration_sec, calibrate(args.repeat))
+    print(f"\n머신 속도 기준 작업: {calibration_sec * 1000:.0f} ms")
+
+    if args.compare:
+        remeasure(results, args.compare, args.threshold, 2 * args.repeat, calibration_sec)
+
+    output = args.output or os.path.join(BENCH_DIR, f"anomaly_{pd.Timestamp.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': environment(args.repeat, calibration_sec), 'results': results}, f, indent=2,
+                  ensure_ascii=False)
+    print(f"\n✅ 저장: {output} ({len(results)}개 결과)")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold, calibration_sec) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,201 +1,242 @@
-import pandas as pd
 import numpy as np
 import os
+import argparse
+import time
+import tracemalloc
 import yaml
 
-print("="*60)
-print("강력한 중복 제거 및 재집계")
-print("="*60)
-
-# 1. 데이터 로드
-cont_df = pd.read_csv('./data/cont_processed.csv')
-cont_df['colDate'] = pd.to_datetime(cont_df['colDate'])
-
-print(f"\n원본 데이터: {len(cont_df):,} 행")
-
-# 2. 중복 확인
-before_dup = cont_df.groupby(['contID', 'colDate']).size()
-before_dup_count = (before_dup > 1).sum()
-print(f"중복된 시간-존 조합: {before_dup_count}개")
-
-# 3. 완전 재집계 (같은 contID + colDate는 평균으로 합침)
-print("\n재집계 중 (중복 완전 제거)...")
-
-agg_dict = {
-    'tempHot': 'mean',
-    'tempCold': 'mean',
-    'humiHot': 'mean',
-    'humiCold': 'mean',
-    'temp_diff': 'mean',
-    'humi_diff': 'mean',
-    'hour': 'first',
-    'day_of_week': 'first',
-    'rack_count': 'first'
-}
-
-df_agg = cont_df.groupby(['contID', 'colDate'], as_index=False).agg(agg_dict)
-print(f"✅ 재집계 후: {len(df_agg):,} 행")
-
-# 4. 정렬
-df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
-
-# 5. 15분 간격으로 리샘플링 (Azure AutoML 최소 간격)
-print("\n15분 간격으로 리샘플링 중...")
-print(f"  리샘플링 전: {len(df_agg):,} 행 (10분 간격)")
-
-# 각 존별로 15분 간격 리샘플링
-resampled_dfs = []
-for cid in sorted(df_agg['contID'].unique()):
-    zone_data = df_agg[df_agg['contID'] == cid].copy()
-    zone_data = zone_data.set_index('colDate')
-
-    # 15분 간격으로 리샘플링 (평균)
-    zone_resampled = zone_data.resample('15min').mean()
-    zone_resampled['contID'] = cid
-    zone_resampled.reset_index(inplace=True)
-
-    # hour, day_of_week 재계산 (정수형이므로 평균이 이상해짐)
-    zone_resampled['hour'] = zone_resampled['colDate'].dt.hour
-    zone_resampled['day_of_week'] = zone_resampled['colDate'].dt.dayofweek
-    # rack_count는 NaN을 제거하고 정수로 변환 (forward fill -> backward fill)
-    zone_resampled['rack_count'] = zone_resampled['rack_count'].ffill().bfill().round().astype(int)
-
-    resampled_dfs.append(zone_resampled)
-
-df_agg = pd.concat(resampled_dfs, ignore_index=True)
-df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
-print(f"✅ 리샘플링 후: {len(df_agg):,} 행 (15분 간격)")
-
-# 5.5. 빠진 시간대 채우기 (Azure AutoML 요구사항)
-print("\n빠진 시간대 채우기 중...")
-print(f"  채우기 전: {len(df_agg):,} 행")
-
-# 전체 시간 범위 확인
-min_time = df_agg['colDate'].min()
-max_time = df_agg['colDate'].max()
-
-# 각 존별로 완전한 시계열 생성
-filled_dfs = []
-for cid in sorted(df_agg['contID'].unique()):
-    zone_data = df_agg[df_agg['contID'] == cid].copy()
-
-    # 15분 간격의 완전한 시간 범위 생성
-    complete_times = pd.DataFrame({
-        'colDate': pd.date_range(start=min_time, end=max_time, freq='15min'),
-        'contID': cid
-    })
-
-    # 기존 데이터와 병합 (빠진 시간대는 NaN으로 채워짐)
-    zone_filled = complete_times.merge(zone_data, on=['contID', 'colDate'], how='left')
-
-    # 정수형 컬럼은 forward fill
-    zone_filled['hour'] = zone_filled['colDate'].dt.hour
-    zone_filled['day_of_week'] = zone_filled['colDate'].dt.dayofweek
-    zone_filled['rack_count'] = zone_filled['rack_count'].ffill().bfill().astype(int)
-
-    # 센서 값은 forward fill (최근 값 사용)
-    sensor_cols = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
-    for col in sensor_cols:
-        zone_filled[col] = zone_filled[col].ffill()
-
-    filled_dfs.append(zone_filled)
-
-df_agg = pd.concat(filled_dfs, ignore_index=True)
-df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
-print(f"✅ 채우기 후: {len(df_agg):,} 행 (연속적인 15분 간격)")
-
-# 6. 30분 후 타겟 생성
-print("\n타겟 생성 중...")
-# 15분 간격이므로 2칸 이동 = 30분 후
-df_agg['target_tempHot_30min'] = df_agg.groupby('contID')['tempHot'].shift(-2)
-df_agg = df_agg.dropna(subset=['target_tempHot_30min'])
-print(f"✅ 타겟 생성 후: {len(df_agg):,} 행")
-
-# 7. 최종 중복 확인
-final_dup = df_agg.groupby(['contID', 'colDate']).size()
-final_dup_count = (final_dup > 1).sum()
-
-if final_dup_count > 0:
-    print(f"\n⚠️ 여전히 {final_dup_count}개 중복!")
-    # 강제 중복 제거
-    df_agg = df_agg.drop_duplicates(subset=['contID', 'colDate'], keep='first')
-    print(f"강제 제거 후: {len(df_agg):,} 행")
-else:
-    print("\n✅ 중복 0개 확인!")
-
-# 8. 컬럼 순서 정리
-final_cols = [
-    'contID', 'colDate', 'tempHot', 'tempCold', 'humiHot', 'humiCold',
-    'temp_diff', 'humi_diff', 'hour', 'day_of_week', 'rack_count',
-    'target_tempHot_30min'
-]
-
-df_final = df_agg[final_cols].copy()
-
-# 9. 인덱스 리셋 (깔끔하게)
-df_final = df_final.reset_index(drop=True)
-
-print(f"\n최종 데이터: {len(df_final):,} 행 × {len(final_cols)} 컬럼")
-
-# 10. MLTable 폴더 생성
-print("\nMLTable 폴더 생성...")
-os.makedirs('cont_forecast_clean', exist_ok=True)
-
-# CSV 저장 (인덱스 제외)
-df_final.to_csv('cont_forecast_clean/data.csv', index=False)
-
-# MLTable 파일
-mltable = {
-    'type': 'mltable',
-    'paths': [{'file': 'data.csv'}],
-    'transformations': [
-        {
-            'read_delimited': {
-                'delimiter': ',',
-                'encoding': 'utf8',
-                'header': 'all_files_same_headers',
-                'empty_as_string': False
+from forecast_frame import (dedup_readings, resample_to_grid, resample_to_grid_parallel,
+                            add_target, FINAL_COLS, WATERMARK_FILE,
+                            stream_forecast_csv, append_forecast_csv, clear_watermark,
+                            estimate_chunk_rows)
+from data_loader import read_table, write_partitioned, FORECAST_PARQUET
+from data_quality import QualityReport, build_report, load_report, write_sidecar, print_report
+from dedup import print_stats
+
+SOURCE_PATH = './data/cont_processed.csv'
+OUTPUT_DIR = 'cont_forecast_clean'
+
+
+def write_mltable(output_dir=OUTPUT_DIR):
+    """MLTable 파일 (data.csv를 가리킴)"""
+    mltable = {
+        'type': 'mltable',
+        'paths': [{'file': 'data.csv'}],
+        'transformations': [
+            {
+                'read_delimited': {
+                    'delimiter': ',',
+                    'encoding': 'utf8',
+                    'header': 'all_files_same_headers',
+                    'empty_as_string': False
+                }
             }
-        }
-    ]
-}
-
-with open('cont_forecast_clean/MLTable', 'w') as f:
-    yaml.dump(mltable, f)
-
-print("✅ MLTable 폴더: cont_forecast_clean/")
-
-# 11. 철저한 검증
-print("\n" + "="*60)
-print("데이터 검증")
-print("="*60)
-
-# 중복 재확인
-verify_dup = df_final.groupby(['contID', 'colDate']).size()
-verify_dup_count = (verify_dup > 1).sum()
-print(f"\n중복 검사: {verify_dup_count}개")
-
-if verify_dup_count > 0:
-    print("❌ 중복 발견!")
-    print(df_final[df_final.duplicated(subset=['contID', 'colDate'], keep=False)].head(20))
-else:
-    print("✅ 중복 없음!")
-
-# 시간 연속성 확인
-print("\n시간 연속성 확인:")
-for cid in sorted(df_final['contID'].unique()):
-    zone_data = df_final[df_final['contID'] == cid].sort_values('colDate')
-    time_diff = zone_data['colDate'].diff().dt.total_seconds() / 60
-    
-    # 가장 많은 간격
-    mode_interval = time_diff.mode()[0] if len(time_diff.mode()) > 0 else time_diff.median()
-    
-    print(f"  존{cid}: 주 간격 {mode_interval:.0f}분, 총 {len(zone_data):,}개 시점")
-
-print("\n존별 데이터 개수:")
-print(df_final.groupby('contID').size())
-
-print("\n" + "="*60)
-print("✅ 완료!")
-print("="*60)
-print("\ncont_forecast_clean 폴더를 업로드하세요")
\ No newline at end of file
+        ]
+    }
+
+    with open(os.path.join(output_dir, 'MLTable'), 'w') as f:
+        yaml.dump(mltable, f)
+
+
+def run_batch(workers=1):
+    """전체 파일을 메모리에 올려 한 번에 처리 (기본 모드, workers > 1이면 존 단위 프로세스 풀)"""
+    print("="*60)
+    print("강력한 중복 제거 및 재집계")
+    print("="*60)
+
+    # 1. 데이터 로드
+    cont_df = read_table(SOURCE_PATH)
+
+    print(f"\n원본 데이터: {len(cont_df):,} 행")
+
+    # 2~3. 완전 재집계 (같은 contID + colDate는 평균으로 합침) + 중복 확인 (충돌 통계)
+    print("\n재집계 중 (중복 완전 제거)...")
+    df_agg, dup_stats = dedup_readings(cont_df, return_stats=True)
+    del cont_df
+    print(f"중복된 시간-존 조합: {dup_stats['extra_rows']}개")
+    print_stats(dup_stats)
+    print(f"✅ 재집계 후: {len(df_agg):,} 행")
+
+    # 4~5.5. 15분 간격 리샘플링 + 빠진 시간대 채우기 (Azure AutoML 최소 간격, 연속 시계열 요구사항)
+    # 존별 루프 없이 (contID, colDate) 격자 위에서 한 번에 처리 (forecast_frame.py)
+    print("\n15분 간격으로 리샘플링 + 빠진 시간대 채우기 중...")
+    print(f"  리샘플링 전: {len(df_agg):,} 행 (10분 간격)")
+    if workers > 1:
+        print(f"  프로세스 풀: 워커 {workers}개")
+        df_agg = resample_to_grid_parallel(df_agg, freq='15min', workers=workers)
+    else:
+        df_agg = resample_to_grid(df_agg, freq='15min')
+    print(f"✅ 채우기 후: {len(df_agg):,} 행 (연속적인 15분 간격)")
+
+    # 6. 30분 후 타겟 생성
+    print("\n타겟 생성 중...")
+    # 15분 간격이므로 2칸 이동 = 30분 후
+    df_agg = add_target(df_agg)
+    print(f"✅ 타겟 생성 후: {len(df_agg):,} 행")
+
+    # 7. 컬럼 순서 정리 + 인덱스 리셋
+    df_final = df_agg[FINAL_COLS].reset_index(drop=True)
+    del df_agg
+
+    # 8. 품질 리포트 (중복, 간격, NaN, 값 범위를 한 번에) + 최종 중복 확인
+    report = build_report(df_final)
+    if report.duplicates > 0:
+        print(f"\n⚠️ 여전히 {report.duplicates}개 중복!")
+        # 강제 중복 제거
+        df_final = df_final.drop_duplicates(subset=['contID', 'colDate'], keep='first').reset_index(drop=True)
+        report = build_report(df_final)
+        print(f"강제 제거 후: {len(df_final):,} 행")
+    else:
+        print("\n✅ 중복 0개 확인!")
+
+    print(f"\n최종 데이터: {len(df_final):,} 행 × {len(FINAL_COLS)} 컬럼")
+
+    # 10. MLTable 폴더 생성
+    print("\nMLTable 폴더 생성...")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # CSV 저장 (인덱스 제외)
+    df_final.to_csv(os.path.join(OUTPUT_DIR, 'data.csv'), index=False)
+    write_mltable(OUTPUT_DIR)
+    clear_watermark(OUTPUT_DIR)
+
+    print(f"✅ MLTable 폴더: {OUTPUT_DIR}/")
+
+    # Parquet 데이터셋 (contID/yearmonth 파티션, 로컬 스크립트/대시보드용)
+    write_partitioned(df_final, FORECAST_PARQUET)
+    print(f"✅ Parquet 데이터셋: {FORECAST_PARQUET}/")
+
+    verify(write_sidecar(report, OUTPUT_DIR))
+
+
+def run_stream(max_memory_mb, chunk_rows=None):
+    """
+    청크 단위 스트리밍 처리 (수개월 ~ 1년치 원본용)
+
+    메모리 예산(max_memory_mb)에 맞춰 청크 크기를 정하고 data.csv를 점진적으로 쓴다.
+    """
+    print("="*60)
+    print("스트리밍 모드: 청크 단위 중복 제거 및 재집계")
+    print("="*60)
+
+    if chunk_rows is None:
+        chunk_rows = estimate_chunk_rows(SOURCE_PATH, max_memory_mb)
+    print(f"\n메모리 예산: {max_memory_mb:,} MB → 청크 크기: {chunk_rows:,} 행")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    report = QualityReport()
+    tracemalloc.start()
+    start = time.perf_counter()
+    stats = stream_forecast_csv(SOURCE_PATH, os.path.join(OUTPUT_DIR, 'data.csv'),
+                                freq='15min', chunk_rows=chunk_rows,
+                                parquet_root=FORECAST_PARQUET, quality=report)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    write_mltable(OUTPUT_DIR)
+    clear_watermark(OUTPUT_DIR)
+    payload = write_sidecar(report, OUTPUT_DIR)
+
+    print(f"\n원본 데이터: {stats['input_rows']:,} 행 ({stats['chunks']}개 청크)")
+    print(f"최종 데이터: {stats['output_rows']:,} 행 × {len(FINAL_COLS)} 컬럼, 존 {stats['zones']}개")
+    print(f"소요 시간: {elapsed:.1f}초")
+    print(f"피크 메모리: {peak / 1024 / 1024:,.1f} MB (예산 {max_memory_mb:,} MB)")
+    if peak > max_memory_mb * 1024 * 1024:
+        print("⚠️ 피크 메모리가 예산을 넘었습니다. --chunk-rows를 줄여 보세요.")
+    print(f"✅ MLTable 폴더: {OUTPUT_DIR}/")
+    print(f"✅ Parquet 데이터셋: {FORECAST_PARQUET}/")
+
+    verify(payload)
+
+
+def run_incremental(source_path, max_memory_mb, chunk_rows=None):
+    """
+    증분 모드: 워터마크(cont_forecast_clean/_watermark.json) 이후의 새 행만 처리해서 추가
+
+    source_path: 새 배치 CSV 또는 원본 Parquet 데이터셋 (워터마크 이후만 pushdown으로 읽음).
+    워터마크가 있으면 꼭 지정해야 한다 - 기본 전체 이력 CSV를 다시 파싱하지 않도록.
+    워터마크가 없으면 (첫 실행) source_path 또는 전체 이력으로 처음부터 만든다.
+    """
+    print("="*60)
+    print("증분 모드: 새 데이터만 재집계 후 추가")
+    print("="*60)
+
+    has_watermark = os.path.exists(os.path.join(OUTPUT_DIR, WATERMARK_FILE))
+    if source_path is None:
+        if has_watermark:
+            print("[ERROR] 워터마크가 있으면 --input에 새 배치 CSV(또는 원본 Parquet 데이터셋)를 지정하세요.")
+            print(f"        전체 이력({SOURCE_PATH})을 다시 읽으면 갱신 비용이 이력 길이에 비례합니다.")
+            raise SystemExit(1)
+        source_path = SOURCE_PATH
+
+    if chunk_rows is None:
+        chunk_rows = estimate_chunk_rows(source_path, max_memory_mb)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # 품질 리포트도 이어서 갱신 (워터마크가 없으면 처음부터, 사이드카만 없으면 기존 data.csv로 한 번 생성)
+    report = QualityReport()
+    if has_watermark:
+        report = load_report(OUTPUT_DIR) or build_report(read_table(os.path.join(OUTPUT_DIR, 'data.csv')))
+
+    start = time.perf_counter()
+    stats = append_forecast_csv(source_path, OUTPUT_DIR, freq='15min', chunk_rows=chunk_rows,
+                                parquet_root=FORECAST_PARQUET, quality=report)
+    elapsed = time.perf_counter() - start
+
+    write_mltable(OUTPUT_DIR)
+    payload = write_sidecar(report, OUTPUT_DIR)
+
+    print(f"\n입력: {source_path}")
+    print(f"새 원본 행: {stats['input_rows']:,} 행")
+    print(f"추가된 행: {stats['output_rows']:,} 행, 존 {stats['zones']}개")
+    print(f"워터마크: 원본 {stats['last_raw_time']}, 확정 구간 {stats['watermark']}")
+    print(f"소요 시간: {elapsed:.1f}초")
+    print(f"✅ MLTable 폴더: {OUTPUT_DIR}/")
+
+    verify(payload)
+
+
+def verify(payload):
+    """철저한 검증 (중복, 시간 연속성, 존별 개수) - 데이터를 다시 훑지 않고 품질 리포트로"""
+    print("\n" + "="*60)
+    print("데이터 검증")
+    print("="*60)
+    print_report(payload)
+    print(f"\n품질 리포트: {OUTPUT_DIR}/_quality.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cont_processed.csv → cont_forecast_clean/ 정제")
+    parser.add_argument('--stream', action='store_true',
+                        help="청크 단위 스트리밍 모드 (입력은 colDate 순 정렬 필요)")
+    parser.add_argument('--max-memory-mb', type=int, default=512,
+                        help="스트리밍/증분 모드 메모리 예산 (MB, 청크 크기 추정에 사용)")
+    parser.add_argument('--chunk-rows', type=int, default=None,
+                        help="스트리밍 모드 청크 행 수 (지정 시 --max-memory-mb 추정 무시)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="일괄 모드에서 존별 리샘플링/채우기를 N개 프로세스로 병렬 처리")
+    parser.add_argument('--incremental', action='store_true',
+                        help="증분 모드: 워터마크 이후 새 행만 처리해서 data.csv에 추가")
+    parser.add_argument('--input', default=None,
+                        help="증분 모드 입력: 새 배치 CSV 또는 원본 Parquet 데이터셋 "
+                             "(워터마크가 있으면 필수, 첫 실행 기본: ./data/cont_processed.csv)")
+    args = parser.parse_args()
+
+    if args.incremental:
+        run_incremental(args.input, args.max_memory_mb, args.chunk_rows)
+    elif args.stream:
+        run_stream(args.max_memory_mb, args.chunk_rows)
+    else:
+        run_batch(workers=args.workers)
+
+    print("\n" + "="*60)
+    print("✅ 완료!")
+    print("="*60)
+    print(f"\n{OUTPUT_DIR} 폴더를 업로드하세요")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+rack_processed.csv → rack_clean/ 정제 (clean_data.py의 랙 버전)
+
+(contID, rackID, colDate) 중복 제거 → 10분 격자 → 빈 시간대 forward fill
+원본을 전부 읽지 않고 청크로 읽어 랙 블록(block_racks개)별 임시 파일로 나눈 뒤 (rack_frame.py),
+블록마다 처리해서 data.csv와 Parquet 데이터셋(contID/yearmonth 파티션)에 이어 쓴다.
+메모리는 청크 하나 + 블록 하나 크기.
+"""
+import argparse
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from rack_frame import (iter_rack_blocks_from_source, scan_racks, RACK_FREQ, RACK_KEYS, RACK_FINAL_COLS,
+                        BLOCK_RACKS, CHUNK_ROWS)
+from forecast_frame import DATE_FORMAT
+from data_loader import write_partitioned, RACK_DIR, RACK_PARQUET, RACK_ROWS_PER_GROUP
+from data_quality import QualityReport, write_sidecar
+
+SOURCE_PATH = './data/rack_processed.csv'
+
+
+def run(source_path, freq=RACK_FREQ, block_racks=BLOCK_RACKS, chunk_rows=CHUNK_ROWS):
+    print("="*60)
+    print("랙 데이터 중복 제거 및 재집계")
+    print("="*60)
+
+    # 1. 사전 스캔 (키/시각 컬럼만 청크로): 랙 목록, 기간
+    racks, time_range, n_rows = scan_racks(source_path, freq=freq, chunk_rows=chunk_rows)
+    print(f"\n원본 데이터: {n_rows:,} 행 (청크 {chunk_rows:,}행)")
+    print(f"랙 {len(racks):,}개, 존 {racks['contID'].nunique():,}개")
+    print(f"기간: {time_range[0]} ~ {time_range[1]}")
+
+    # 2. 청크 → 랙 블록별 임시 파일 → 블록 단위 재집계 + 격자 채우기 + 저장
+    print(f"\n{freq} 간격 리샘플링 + 빠진 시간대 채우기 중 (블록 {block_racks:,}랙)...")
+    os.makedirs(RACK_DIR, exist_ok=True)
+    if os.path.exists(RACK_PARQUET):
+        shutil.rmtree(RACK_PARQUET)
+
+    start = time.perf_counter()
+    out_rows = 0
+    stats = {'duplicates': 0}
+    report = QualityReport(keys=RACK_KEYS)
+    blocks = iter_rack_blocks_from_source(source_path, racks, time_range, freq=freq, block_racks=block_racks,
+                                          chunk_rows=chunk_rows, stats=stats)
+    with open(os.path.join(RACK_DIR, 'data.csv'), 'w', newline='') as f:
+        pd.DataFrame(columns=RACK_FINAL_COLS).to_csv(f, index=False, date_format=DATE_FORMAT)
+        for block, frame in enumerate(blocks):
+            frame.to_csv(f, index=False, header=False, date_format=DATE_FORMAT)
+            write_partitioned(frame, RACK_PARQUET, basename_template=f'part-{block:05d}-{{i}}.parquet',
+                              overwrite=False, rows_per_group=RACK_ROWS_PER_GROUP)
+            report.update(frame)
+            out_rows += len(frame)
+            print(f"  블록 {block + 1}: {len(frame):,} 행")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n중복된 시간-랙 조합: {stats['duplicates']:,}개")
+    print(f"✅ 채우기 후: {out_rows:,} 행 (연속적인 {freq} 간격)")
+    print(f"소요 시간: {elapsed:.1f}초 ({n_rows / max(elapsed, 1e-9):,.0f} 행/초)")
+    payload = write_sidecar(report, RACK_DIR)
+    print(f"중복: {payload['duplicates']}개, 빈 구간: {payload['gaps']}개, 랙 {payload['series']:,}개")
+    print(f"✅ CSV: {RACK_DIR}/data.csv")
+    print(f"✅ Parquet 데이터셋: {RACK_PARQUET}/")
+    print(f"✅ 품질 리포트: {RACK_DIR}/_quality.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rack_processed.csv → rack_clean/ 정제")
+    parser.add_argument('--input', default=SOURCE_PATH,
+                        help="입력 파일 (기본: ./data/rack_processed.csv)")
+    parser.add_argument('--freq', default=RACK_FREQ,
+                        help="격자 간격 (기본: 10min, 랙 원본 측정 간격)")
+    parser.add_argument('--block-racks', type=int, default=BLOCK_RACKS,
+                        help="한 번에 격자로 만드는 랙 수 (메모리 조절)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="원본을 한 번에 읽는 행 수 (메모리 조절)")
+    args = parser.parse_args()
+
+    run(args.input, freq=args.freq, block_racks=args.block_racks, chunk_rows=args.chunk_rows)
+
+    print("\n" + "="*60)
+    print("✅ 완료!")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+공용 데이터 로더
+
+모든 스크립트/대시보드가 CSV를 직접 read_csv 하지 않고 이 모듈을 통해 읽는다.
+- Parquet 데이터셋(contID=<id>/yearmonth=<YYYY-MM>/ Hive 파티션)이 있으면 그것을 사용
+  → 컬럼 프로젝션 + contID/colDate 조건 pushdown (파티션 및 row group 단위로 건너뜀)
+- 없으면 CSV로 대체 (필요한 컬럼만 읽고 조건은 로드 후 적용)
+
+예) 존 1의 2주치만 읽기
+    load_forecast_clean(cont_ids=[1], start='2025-08-01', end='2025-08-15')
+"""
+import os
+import shutil
+
+import pandas as pd
+
+import schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pyarrow 없으면 CSV만 사용
+    pa = None
+    ds = None
+
+FORECAST_DIR = './cont_forecast_clean'
+FORECAST_CSV = os.path.join(FORECAST_DIR, 'data.csv')
+FORECAST_PARQUET = os.path.join(FORECAST_DIR, 'parquet')
+
+# 한 row group = 15분 간격 1주 (2주 조회 시 2~3개 row group만 읽음)
+ROWS_PER_GROUP = 4 * 24 * 7
+
+PARTITION_COLS = ['contID', 'yearmonth']
+
+RACK_DIR = './rack_clean'
+RACK_CSV = os.path.join(RACK_DIR, 'data.csv')
+RACK_PARQUET = os.path.join(RACK_DIR, 'parquet')
+
+# 랙은 존 안에서 시간 → rackID 순으로 저장하므로 row group 하나가 존 전체 랙의 짧은 기간
+RACK_ROWS_PER_GROUP = 16 * ROWS_PER_GROUP
+
+# compact CSV 로드 청크 (파서 버퍼와 중간 배열이 이 크기만큼만 잡힘)
+CSV_CHUNK_ROWS = 200_000
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([('contID', pa.int64()), ('yearmonth', pa.string())]),
+                           flavor='hive')
+
+
+def write_partitioned(df, root, basename_template='part-{i}.parquet', overwrite=True,
+                      rows_per_group=ROWS_PER_GROUP):
+    """
+    contID / yearmonth(YYYY-MM) 로 Hive 파티션된 Parquet 데이터셋 저장
+
+    overwrite=True면 root를 비우고 새로 쓰고, False면 기존 파일 옆에 추가한다
+    (basename_template을 호출마다 다르게 지정해야 함).
+    rackID 컬럼이 있으면 (contID, colDate, rackID) 순으로 저장한다 (colDate 통계로 row group 건너뛰기).
+    """
+    if pa is None:
+        raise ImportError("Parquet 저장에는 pyarrow가 필요합니다: pip install pyarrow")
+
+    if overwrite and os.path.exists(root):
+        shutil.rmtree(root)
+
+    sort_cols = ['contID', 'colDate'] + (['rackID'] if 'rackID' in df.columns else [])
+    table_df = df.sort_values(sort_cols).copy()
+    table_df['yearmonth'] = table_df['colDate'].dt.strftime('%Y-%m')
+    table = pa.Table.from_pandas(table_df, preserve_index=False)
+
+    ds.write_dataset(
+        table, root,
+        format='parquet',
+        partitioning=_partitioning(),
+        basename_template=basename_template,
+        existing_data_behavior='overwrite_or_ignore',
+        max_rows_per_group=rows_per_group,
+        min_rows_per_group=rows_per_group,
+    )
+
+
+def _to_timestamp(value):
+    return None if value is None else pd.Timestamp(value)
+
+
+def _read_parquet(root, columns, cont_ids, start, end, nrows, compact=False):
+    dataset = ds.dataset(root, format='parquet', partitioning=_partitioning())
+
+    # 파티션(contID, yearmonth) + row group 통계(colDate)로 걸러짐
+    expr = None
+    conditions = []
+    if cont_ids is not None:
+        conditions.append(ds.field('contID').isin(list(cont_ids)))
+    if start is not None:
+        conditions.append(ds.field('yearmonth') >= start.strftime('%Y-%m'))
+        conditions.append(ds.field('colDate') >= pa.scalar(start.to_pydatetime()))
+    if end is not None:
+        conditions.append(ds.field('yearmonth') <= end.strftime('%Y-%m'))
+        conditions.append(ds.field('colDate') < pa.scalar(end.to_pydatetime()))
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+
+    if columns is None:
+        # 파티션 컬럼은 스키마 맨 뒤에 붙으므로 contID를 원래 위치(맨 앞)로
+        columns = ['contID'] + [name for name in dataset.schema.names if name not in PARTITION_COLS]
+
+    if nrows is not None:
+        table = dataset.head(nrows, columns=list(columns), filter=expr)
+    else:
+        table = dataset.to_table(columns=list(columns), filter=expr)
+    df = (schema.arrow_cast(table) if compact else table).to_pandas()
+    if compact and 'contID' in df.columns:
+        df['contID'] = schema.numeric_categories(df['contID'])  # dictionary는 파일 순서 → 정렬 전에 값 순서로
+
+    # 파일 순서가 contID=10 < contID=2 처럼 문자열 순이므로 다시 정렬 (랙은 rackID, colDate 순)
+    sort_cols = [c for c in ('contID', 'rackID', 'colDate') if c in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols).reset_index(drop=True)
+    return df
+
+
+def _filter_rows(df, cont_ids, start, end):
+    mask = pd.Series(True, index=df.index)
+    if cont_ids is not None:
+        mask &= df['contID'].isin(list(cont_ids))
+    if start is not None:
+        mask &= df['colDate'] >= start
+    if end is not None:
+        mask &= df['colDate'] < end
+    return df if mask.all() else df[mask]
+
+
+def _concat_chunks(chunks):
+    """청크별 category contID를 같은 category로 맞춰 이어 붙임 (category가 다르면 concat 결과가 object)"""
+    if 'contID' in chunks[0].columns:
+        categories = chunks[0]['contID'].cat.categories
+        for chunk in chunks[1:]:
+            categories = categories.union(chunk['contID'].cat.categories)
+        for chunk in chunks:
+            chunk['contID'] = chunk['contID'].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_csv(path, columns, cont_ids, start, end, nrows, compact=False):
+    usecols = None
+    if columns is not None:
+        # 조건 컬럼은 필터링에 필요하므로 함께 읽고 나중에 제외
+        usecols = list(dict.fromkeys(
+            list(columns)
+            + (['contID'] if cont_ids is not None else [])
+            + (['colDate'] if start is not None or end is not None else [])
+        ))
+
+    header = pd.read_csv(path, nrows=0).columns
+    parse_dates = ['colDate'] if 'colDate' in header and (usecols is None or 'colDate' in usecols) else False
+
+    if not compact:
+        df = pd.read_csv(path, usecols=usecols, parse_dates=parse_dates, nrows=nrows)
+        df = _filter_rows(df, cont_ids, start, end).reset_index(drop=True)
+    else:
+        # 읽는 시점 스키마(float32/category) + 청크마다 조건 적용 → float64 전체 프레임과 큰 파서 버퍼를 만들지 않음
+        chunks = []
+        for chunk in pd.read_csv(path, usecols=usecols, parse_dates=parse_dates, nrows=nrows,
+                                 dtype=schema.read_dtypes(), chunksize=CSV_CHUNK_ROWS):
+            if 'contID' in chunk.columns:
+                chunk['contID'] = schema.numeric_categories(chunk['contID'])  # cont_ids 조건이 숫자로 비교되도록
+            chunks.append(_filter_rows(chunk, cont_ids, start, end))
+        if not chunks:
+            chunks = [pd.read_csv(path, usecols=usecols, parse_dates=parse_dates, nrows=0,
+                                  dtype=schema.read_dtypes())]
+        df = _concat_chunks(chunks)
+
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def read_table(path, columns=None, cont_ids=None, start=None, end=None,
+               compact=False, zone_prefix=None, nrows=None):
+    """
+    CSV 파일 또는 Parquet 데이터셋(디렉토리) 로드
+
+    Args:
+        path: .csv 파일, .parquet 파일 또는 Hive 파티션 디렉토리
+        columns: 읽을 컬럼 목록 (None이면 전체)
+        cont_ids: 읽을 contID 목록 (None이면 전체)
+        start, end: colDate 범위 [start, end)
+        compact: True면 읽는 시점에 schema 적용 (float32 센서, category contID, 작은 정수)
+        zone_prefix: compact 시 숫자 contID를 '<prefix><id>' category로 (예: 'zone_')
+        nrows: 앞에서부터 읽을 최대 행 수 (샘플용)
+
+    colDate는 datetime64로 변환되어 반환된다.
+    """
+    start, end = _to_timestamp(start), _to_timestamp(end)
+
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        if ds is None:
+            raise ImportError("Parquet 로드에는 pyarrow가 필요합니다: pip install pyarrow")
+        df = _read_parquet(path, columns, cont_ids, start, end, nrows, compact)
+    else:
+        df = _read_csv(path, columns, cont_ids, start, end, nrows, compact)
+
+    if compact:
+        df = schema.compact(df, zone_prefix=zone_prefix)
+    return df
+
+
+def _batches_to_frame(batches, compact):
+    table = pa.Table.from_batches(batches)
+    if not compact:
+        return table.to_pandas()
+    return schema.compact(schema.arrow_cast(table).to_pandas())
+
+
+def iter_table(path, columns=None, chunk_rows=500_000, compact=False):
+    """
+    CSV 파일 또는 Parquet 데이터셋을 chunk_rows행 안팎씩 읽는 제너레이터 (전체를 메모리에 올리지 않음)
+
+    Parquet은 row group 단위 배치를 chunk_rows까지 모아서 내보낸다. 행 순서는 파일 순서 그대로
+    (read_table처럼 다시 정렬하지 않음). colDate는 datetime64로 변환된다.
+    """
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        if ds is None:
+            raise ImportError("Parquet 로드에는 pyarrow가 필요합니다: pip install pyarrow")
+        dataset = ds.dataset(path, format='parquet', partitioning=_partitioning())
+        if columns is None:
+            columns = ['contID'] + [name for name in dataset.schema.names if name not in PARTITION_COLS]
+        pending, n_pending = [], 0
+        for batch in dataset.to_batches(columns=list(columns)):
+            pending.append(batch)
+            n_pending += batch.num_rows
+            if n_pending >= chunk_rows:
+                yield _batches_to_frame(pending, compact)
+                pending, n_pending = [], 0
+        if n_pending:
+            yield _batches_to_frame(pending, compact)
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    parse_dates = ['colDate'] if 'colDate' in header and (columns is None or 'colDate' in columns) else False
+    dtype = schema.read_dtypes() if compact else None
+    for chunk in pd.read_csv(path, usecols=columns, parse_dates=parse_dates, chunksize=chunk_rows, dtype=dtype):
+        if columns is not None:
+            chunk = chunk[list(columns)]
+        yield schema.compact(chunk) if compact else chunk
+
+
+def iter_new_rows(path, since=None, chunk_rows=500_000, columns=None):
+    """
+    증분 입력: colDate > since 행만 colDate 순으로 chunk_rows행씩 (since가 없으면 전체)
+
+    Parquet 데이터셋이면 since를 pushdown 조건으로 넘겨 워터마크 이후 파티션/row group만 읽는다
+    (읽은 새 행을 colDate 순으로 다시 정렬하므로 새 행은 메모리에 들어가야 함).
+    CSV는 조건을 걸 수 없으므로 새 배치 파일이어야 한다 - 파일 전체를 읽고 since 이하 행(겹친 부분)만 버림.
+    """
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        df = read_table(path, columns, start=since)
+        if since is not None:
+            df = df[df['colDate'] > pd.Timestamp(since)]  # pushdown은 start 이상 (워터마크 시각 행 제외)
+        df = df.sort_values('colDate', kind='stable').reset_index(drop=True)
+        for begin in range(0, len(df), chunk_rows):
+            yield df.iloc[begin:begin + chunk_rows]
+        return
+
+    for chunk in iter_table(path, columns, chunk_rows=chunk_rows):
+        if since is not None:
+            chunk = chunk[chunk['colDate'] > pd.Timestamp(since)]
+        yield chunk
+
+
+def load_forecast_clean(columns=None, cont_ids=None, start=None, end=None, compact=False):
+    """cont_forecast_clean 로드 (Parquet 데이터셋 우선, 없으면 data.csv)"""
+    path = FORECAST_PARQUET if ds is not None and os.path.isdir(FORECAST_PARQUET) else FORECAST_CSV
+    return read_table(path, columns, cont_ids, start, end, compact=compact)
+
+
+def rack_clean_path():
+    """정제된 랙 데이터 경로 (Parquet 데이터셋 우선, 없으면 data.csv, 둘 다 없으면 None)"""
+    if ds is not None and os.path.isdir(RACK_PARQUET):
+        return RACK_PARQUET
+    if os.path.exists(RACK_CSV):
+        return RACK_CSV
+    return None
+
+
+def load_rack_clean(columns=None, cont_ids=None, start=None, end=None, compact=False):
+    """rack_clean 로드 (clean_rack_data.py 결과)"""
+    path = rack_clean_path()
+    if path is None:
+        raise FileNotFoundError("rack_clean 폴더가 없습니다. 먼저 clean_rack_data.py를 실행하세요.")
+    return read_table(path, columns, cont_ids, start, end, compact=compact)
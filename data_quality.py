@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+데이터 품질 리포트 (중복, 간격/빈 구간, 존별 주 간격, NaN, 값 범위)
+
+정제 단계가 데이터를 만들면서 한 번에 계산해 데이터셋 옆에 _quality.json으로 저장하고,
+이후 단계(02 등)는 데이터를 다시 읽지 않고 이 파일과 data.csv 지문(fingerprint.py)으로 검증한다.
+
+QualityReport는 청크 단위로 update() 할 수 있고 상태를 JSON에 그대로 보관하므로
+스트리밍/증분 모드에서도 같은 리포트를 이어서 갱신한다.
+    report = QualityReport()
+    report.update(df_final)
+    write_sidecar(report, 'cont_forecast_clean')
+    validate_sidecar('cont_forecast_clean')   # 02에서
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import fingerprint
+
+QUALITY_FILE = '_quality.json'
+
+
+def _key_str(key):
+    return '/'.join(str(k) for k in key) if isinstance(key, tuple) else str(key)
+
+
+class QualityReport:
+    """
+    (keys, colDate) 시계열 품질 통계 누적
+
+    - duplicates: 같은 키 + colDate 행 수 (첫 행 제외)
+    - 간격 히스토그램: 키별 {간격(분): 개수} → 주 간격(최빈값), 빈 구간(주 간격보다 긴 간격) 수
+    - nan_counts, ranges(min/max), rows_per_key, 전체 기간
+    """
+
+    def __init__(self, keys=('contID',)):
+        self.keys = list(keys)
+        self.rows = 0
+        self.duplicates = 0
+        self.time_min = None
+        self.time_max = None
+        self.rows_per_key = pd.Series(dtype=np.int64)
+        self.interval_counts = pd.Series(dtype=np.int64)  # index: (key..., interval_min)
+        self.nan_counts = pd.Series(dtype=np.int64)
+        self.col_min = pd.Series(dtype=np.float64)
+        self.col_max = pd.Series(dtype=np.float64)
+        self.last_time = pd.Series(dtype='datetime64[ns]')  # 키별 마지막 colDate (청크 경계 간격용)
+
+    def update(self, df):
+        """행 추가 (청크는 시간 순서대로 들어와야 청크 경계 간격이 맞음)"""
+        if len(df) == 0:
+            return self
+        keys = self.keys
+        df = df.sort_values(keys + ['colDate'], kind='stable')
+
+        # 지난 청크의 키별 마지막 시각을 앞에 붙여 경계 간격까지 한 번에 계산
+        times = df[keys + ['colDate']]
+        if len(self.last_time):
+            prev = self.last_time.rename('colDate').reset_index()
+            times = pd.concat([prev, times], ignore_index=True)
+            times = times.sort_values(keys + ['colDate'], kind='stable')
+
+        interval = times.groupby(keys, observed=True)['colDate'].diff().dt.total_seconds() / 60
+        intervals = times[keys].assign(interval_min=interval).dropna(subset=['interval_min'])
+
+        self.duplicates += int((intervals['interval_min'] == 0).sum())
+        counts = intervals[intervals['interval_min'] > 0].value_counts()
+        self.interval_counts = _merge(self.interval_counts, counts, 'sum')
+
+        self.last_time = _merge(self.last_time, df.groupby(keys, observed=True)['colDate'].max(), 'max')
+
+        self.rows += len(df)
+        self.rows_per_key = _merge(self.rows_per_key, df.groupby(keys, observed=True).size(), 'sum')
+        self.nan_counts = _merge(self.nan_counts, df.isna().sum(), 'sum')
+
+        numeric = df.drop(columns=keys).select_dtypes('number')
+        self.col_min = pd.concat([self.col_min, numeric.min()], axis=1).min(axis=1)
+        self.col_max = pd.concat([self.col_max, numeric.max()], axis=1).max(axis=1)
+
+        chunk_min, chunk_max = df['colDate'].min(), df['colDate'].max()
+        self.time_min = chunk_min if self.time_min is None else min(self.time_min, chunk_min)
+        self.time_max = chunk_max if self.time_max is None else max(self.time_max, chunk_max)
+        return self
+
+    def modal_intervals(self):
+        """키별 주 간격(분): 개수가 가장 많은 간격, 같으면 짧은 간격"""
+        if len(self.interval_counts) == 0:
+            return pd.Series(dtype=np.float64)
+        counts = self.interval_counts.rename('count').reset_index()
+        counts = counts.sort_values(self.keys + ['count', 'interval_min'],
+                                    ascending=[True] * len(self.keys) + [False, True])
+        return counts.drop_duplicates(self.keys).set_index(self.keys)['interval_min']
+
+    def gaps(self):
+        """키별 빈 구간 수 (주 간격보다 긴 간격)"""
+        if len(self.interval_counts) == 0:
+            return pd.Series(dtype=np.int64)
+        counts = self.interval_counts.rename('count').reset_index()
+        modal = self.modal_intervals().rename('modal').reset_index()
+        counts = counts.merge(modal, on=self.keys)
+        return counts[counts['interval_min'] > counts['modal']].groupby(self.keys)['count'].sum()
+
+    def to_dict(self):
+        def by_key(series, cast):
+            return {_key_str(k): cast(v) for k, v in series.items()}
+
+        gaps = self.gaps()
+        return {
+            'keys': self.keys,
+            'rows': int(self.rows),
+            'series': int(len(self.rows_per_key)),
+            'time_min': None if self.time_min is None else str(self.time_min),
+            'time_max': None if self.time_max is None else str(self.time_max),
+            'duplicates': int(self.duplicates),
+            'gaps': int(gaps.sum()),
+            'gaps_per_key': by_key(gaps, int),
+            'modal_interval_min': by_key(self.modal_intervals(), float),
+            'rows_per_key': by_key(self.rows_per_key, int),
+            'nan_counts': {c: int(n) for c, n in self.nan_counts.items()},
+            'ranges': {c: [float(self.col_min[c]), float(self.col_max[c])] for c in self.col_min.index},
+            # 이어서 update 하기 위한 상태
+            'state': {
+                'interval_counts': [list(map(_plain, k)) + [int(v)] for k, v in self.interval_counts.items()],
+                'last_time': [[_plain(k) for k in _as_tuple(k)] + [str(v)] for k, v in self.last_time.items()],
+                'rows_per_key': [[_plain(k) for k in _as_tuple(k)] + [int(v)] for k, v in self.rows_per_key.items()],
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        report = cls(keys=data['keys'])
+        keys = report.keys
+        report.rows = data['rows']
+        report.duplicates = data['duplicates']
+        report.time_min = None if data['time_min'] is None else pd.Timestamp(data['time_min'])
+        report.time_max = None if data['time_max'] is None else pd.Timestamp(data['time_max'])
+        report.nan_counts = pd.Series(data['nan_counts'], dtype=np.int64)
+        report.col_min = pd.Series({c: v[0] for c, v in data['ranges'].items()}, dtype=np.float64)
+        report.col_max = pd.Series({c: v[1] for c, v in data['ranges'].items()}, dtype=np.float64)
+
+        state = data['state']
+        if state['interval_counts']:
+            frame = pd.DataFrame(state['interval_counts'], columns=keys + ['interval_min', 'count'])
+            report.interval_counts = frame.set_index(keys + ['interval_min'])['count']
+        if state['last_time']:
+            frame = pd.DataFrame(state['last_time'], columns=keys + ['colDate'])
+            frame['colDate'] = pd.to_datetime(frame['colDate'])
+            report.last_time = frame.set_index(keys)['colDate']
+        if state['rows_per_key']:
+            frame = pd.DataFrame(state['rows_per_key'], columns=keys + ['rows'])
+            report.rows_per_key = frame.set_index(keys)['rows']
+        return report
+
+
+def _merge(total, new, how):
+    """인덱스별 누적 (sum/max). 처음이면 new 그대로"""
+    if len(total) == 0:
+        return new
+    return pd.concat([total, new]).groupby(level=list(range(new.index.nlevels))).agg(how)
+
+
+def _as_tuple(key):
+    return key if isinstance(key, tuple) else (key,)
+
+
+def _plain(value):
+    """JSON 저장용 (numpy 정수/실수 → 파이썬 값)"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def build_report(df, keys=('contID',)):
+    return QualityReport(keys).update(df)
+
+
+def write_sidecar(report, out_dir, data_file='data.csv'):
+    """out_dir/_quality.json 저장 (data_file 지문 포함)"""
+    data_path = os.path.join(out_dir, data_file)
+    st = os.stat(data_path)
+    payload = report.to_dict()
+    payload['dataset'] = {
+        'file': data_file,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'digest': fingerprint.file_digest(data_path),
+    }
+    path = os.path.join(out_dir, QUALITY_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(payload, f)
+    os.replace(path + '.tmp', path)
+    return payload
+
+
+def read_sidecar(out_dir):
+    """_quality.json 로드 (없으면 None)"""
+    path = os.path.join(out_dir, QUALITY_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_report(out_dir):
+    """이어서 update 할 QualityReport (사이드카가 없으면 None)"""
+    payload = read_sidecar(out_dir)
+    return None if payload is None else QualityReport.from_dict(payload)
+
+
+def validate_sidecar(out_dir):
+    """
+    데이터를 다시 읽지 않고 사이드카로 검증
+
+    - data.csv 크기/mtime이 같으면 그대로, 다르면 내용 해시로 지문 비교 (리포트 이후 변경 여부)
+    - 중복 0개
+
+    Returns: 사이드카 dict. 문제가 있으면 ValueError
+    """
+    payload = read_sidecar(out_dir)
+    if payload is None:
+        raise FileNotFoundError(f"{os.path.join(out_dir, QUALITY_FILE)}가 없습니다. 정제 단계를 다시 실행하세요.")
+
+    dataset = payload['dataset']
+    data_path = os.path.join(out_dir, dataset['file'])
+    st = os.stat(data_path)
+    if (st.st_size, st.st_mtime_ns) != (dataset['size'], dataset['mtime_ns']):
+        if fingerprint.file_digest(data_path) != dataset['digest']:
+            raise ValueError(f"{data_path}가 품질 리포트 이후 변경되었습니다. 정제 단계를 다시 실행하세요.")
+
+    if payload['duplicates'] > 0:
+        raise ValueError(f"⚠️ {payload['duplicates']}개의 중복이 있습니다. 정제 단계를 다시 실행하세요.")
+    return payload
+
+
+def print_report(payload):
+    """철저한 검증 출력 (중복, 시간 연속성, 키별 개수)"""
+    print(f"\n중복 검사: {payload['duplicates']}개")
+    print("✅ 중복 없음!" if payload['duplicates'] == 0 else "❌ 중복 발견!")
+
+    print(f"\n시간 연속성 확인 (빈 구간 {payload['gaps']:,}개):")
+    modal = payload['modal_interval_min']
+    gaps = payload['gaps_per_key']
+    for key, n_points in payload['rows_per_key'].items():
+        interval = modal.get(key, float('nan'))
+        print(f"  {key}: 주 간격 {interval:.0f}분, 총 {n_points:,}개 시점, 빈 구간 {gaps.get(key, 0)}개")
+
+    nan_cols = {c: n for c, n in payload['nan_counts'].items() if n > 0}
+    print(f"\nNaN: {nan_cols if nan_cols else '없음'}")
+    print("값 범위:")
+    for col, (lo, hi) in payload['ranges'].items():
+        print(f"  {col}: {lo:.2f} ~ {hi:.2f}")
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+정수 키 기반 중복 제거/재집계 엔진
+
+groupby(['contID', 'colDate']).agg({...}) 대신
+(존 코드, 시각) 을 하나의 정수 키(존 코드 × 시간 칸 수 + 시간 칸)로 만들어 NumPy로 집계한다.
+- 시간 칸 단위는 시각 간격의 최대공약수 (10분 간격 원본이면 10분, 최소 epoch 분 단위가 아니어도 됨)
+- 키 공간이 작으면 정렬 없이 셀 배열에 bincount/scatter, 크면 키 정렬
+- 그룹마다 대표 행 하나 → 컬럼마다 gather 한 번 (중복이 없는 키가 대부분), 중복 키 행만 모아서 집계
+- 평균 컬럼은 (컬럼 수, 그룹 수) 블록 하나에 바로 써서 DataFrame 생성 시 다시 쌓지 않음
+- 남은 시간 대부분은 시간 순 원본을 키 순으로 옮기는 컬럼별 gather (메모리 지연)
+
+- 'mean': NaN 제외 평균. pandas groupby mean과 같은 Kahan 보정 합을 같은 순서로 계산하므로 결과가 비트 단위로 같다
+- 'first': 그룹 안 원래 순서의 첫 non-null 값
+- 충돌 통계: 중복된 키 수, 추가 행 수, 최대 중복 수, 컬럼별 값 차이(최대-최소)
+
+벤치마크 (목표: groupby-agg 대비 5x, 미달이면 표시):
+    python dedup.py --rows 5000000 50000000 --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _encode_keys(df, keys, time_col):
+    """(키 컬럼들, 시간) → 정수 키 재료: 키 조합 코드, 시간 오프셋(단위), 고유값 목록"""
+    codes = None
+    uniques = []
+    for col in keys:
+        code, uniq = pd.factorize(df[col], sort=True)
+        code = code.astype(np.int64, copy=False)
+        codes = code if codes is None else codes * len(uniq) + code
+        uniques.append(uniq)
+    if codes is None:
+        codes = np.zeros(len(df), dtype=np.int64)
+
+    t_ns = df[time_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    t_min = int(t_ns.min()) if len(t_ns) else 0
+    offset = t_ns - t_min
+    # 시간 단위: 모든 시각 간격의 최대공약수 (10분 간격 원본이면 10분 → 키 범위가 작아짐)
+    unit = int(np.gcd.reduce(offset)) if len(offset) else 1
+    unit = max(unit, 1)
+    offset //= unit
+    span = int(offset.max()) + 1 if len(offset) else 1
+    n_codes = 1
+    for uniq in uniques:
+        n_codes *= max(len(uniq), 1)
+    return codes, offset, t_min, unit, span, n_codes, uniques
+
+
+def _group_rows(df, keys, time_col):
+    """
+    그룹(키, 시간 순) 배치 정보를 한 번에 계산
+
+    키 공간(존 수 × 시간 칸)이 행 수에 비해 작으면 정렬 없이 셀(키 × 시간 칸) 배열에 bincount/scatter,
+    크면 int64 키 정렬, 그것도 넘치면 lexsort.
+    Returns: sizes, 그룹별 코드, 그룹별 시각(ns), uniques, layout
+      layout = (그룹별 대표 행, 중복 그룹 번호, 중복 그룹 행(그룹, 원래 순서), 구간 시작, 구간 크기)
+      단일 행 그룹은 대표 행이 곧 그 행 → 컬럼마다 gather 한 번으로 끝나고 중복 그룹만 따로 집계
+    """
+    codes, offset, t_min, unit, span, n_codes, uniques = _encode_keys(df, keys, time_col)
+    n_cells = n_codes * span
+    n_rows = len(df)
+
+    if n_cells <= max(4 * n_rows, 1_000_000):
+        key = codes * span + offset
+        del codes, offset
+        counts = np.bincount(key, minlength=n_cells)
+        occupied = np.flatnonzero(counts)
+        sizes = counts[occupied]
+        # 셀 → 행 scatter (중복 셀은 마지막 행이 남지만 아래에서 다시 집계)
+        row_of_cell = np.empty(n_cells, dtype=np.int64)
+        row_of_cell[key] = np.arange(n_rows)
+        rows = row_of_cell[occupied]
+        del row_of_cell
+
+        dup_groups = np.flatnonzero(sizes > 1)
+        if len(dup_groups):
+            dup_rows = np.flatnonzero((counts > 1)[key])
+            dup_rows = dup_rows[np.argsort(key[dup_rows], kind='stable')]
+        else:
+            dup_rows = np.empty(0, dtype=np.int64)
+        g_codes, g_times = occupied // span, t_min + (occupied % span) * unit
+    else:
+        if n_cells < 2 ** 62:
+            order = np.argsort(codes * span + offset, kind='stable')
+        else:
+            order = np.lexsort((offset, codes))
+        c_sorted, o_sorted = codes[order], offset[order]
+        new = np.empty(n_rows, dtype=bool)
+        new[:1] = True
+        new[1:] = (c_sorted[1:] != c_sorted[:-1]) | (o_sorted[1:] != o_sorted[:-1])
+        starts = np.flatnonzero(new)
+        sizes = np.diff(np.append(starts, n_rows))
+        rows = order[starts]
+        dup_groups = np.flatnonzero(sizes > 1)
+        dup_rows = order[np.repeat(sizes > 1, sizes)]
+        g_codes, g_times = c_sorted[starts], t_min + o_sorted[starts] * unit
+
+    dup_sizes = sizes[dup_groups]
+    dup_starts = np.cumsum(dup_sizes) - dup_sizes
+    layout = (rows, dup_groups, dup_rows, dup_starts, dup_sizes)
+    return sizes, g_codes, g_times, uniques, layout
+
+
+def _group_mean(values, layout, out=None):
+    """
+    그룹별 NaN 제외 평균
+
+    단일 행 그룹은 값 그대로, 중복 그룹만 pandas group_mean과 같은 Kahan 합을 원래 행 순서로 계산.
+    out: 결과를 쓸 float64 배열 (평균 컬럼 2D 블록의 한 행)
+    Returns: (평균, 중복 그룹별 값 차이(최대-최소))
+    """
+    rows, dup_groups, dup_rows, starts, dup_sizes = layout
+    out = np.take(values, rows, out=out)
+    if len(dup_groups) == 0:
+        return out, np.empty(0)
+
+    n = len(dup_groups)
+    sums = np.zeros(n)
+    comp = np.zeros(n)
+    counts = np.zeros(n, dtype=np.int64)
+    hi = np.full(n, np.nan)
+    lo = np.full(n, np.nan)
+    dup_vals = values[dup_rows]
+    last = len(dup_vals) - 1
+    # k번째 행끼리 한 번에 더함 (반복 횟수 = 최대 중복 수). 그룹 인덱싱 없이 원소별로 갱신
+    for k in range(int(dup_sizes.max())):
+        val = dup_vals[np.minimum(starts + k, last)]
+        if k >= 2:
+            val = np.where(dup_sizes > k, val, np.nan)
+        valid = ~np.isnan(val)
+        y = val - comp
+        t = sums + y
+        c = t - sums - y
+        comp = np.where(valid, np.where(np.isnan(c), 0.0, c), comp)
+        sums = np.where(valid, t, sums)
+        counts += valid
+        hi = np.fmax(hi, val)
+        lo = np.fmin(lo, val)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[dup_groups] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return out, hi - lo
+
+
+def _group_first(values, layout):
+    """그룹별 원래 순서 첫 non-null 값"""
+    rows, dup_groups, dup_rows, starts, dup_sizes = layout
+    out = values[rows]
+    if len(dup_groups) == 0:
+        return out
+
+    dup_vals = values[dup_rows]
+    first = dup_vals[starts]
+    if values.dtype.kind in 'iub':
+        # 정수/불리언은 결측이 없으므로 첫 행이 곧 답
+        out[dup_groups] = first
+        return out
+    missing = pd.isna(first)
+    for k in range(1, int(dup_sizes.max())):
+        idx = np.flatnonzero(missing & (dup_sizes > k))
+        if len(idx) == 0:
+            break
+        val = dup_vals[starts[idx] + k]
+        found = ~pd.isna(val)
+        first[idx[found]] = val[found]
+        missing[idx[found]] = False
+    out[dup_groups] = first
+    return out
+
+
+def dedup_keys(df, keys, agg, time_col='colDate'):
+    """
+    같은 (keys, time_col) 행을 하나로 재집계
+
+    Args:
+        keys: 키 컬럼 목록 (예: ['contID'] 또는 ['contID', 'rackID'])
+        agg: {컬럼: 'mean' | 'first'}
+    Returns:
+        (df_agg, stats). df_agg는 groupby(keys + [time_col], as_index=False).agg(agg)와 같음 (키 순 정렬)
+        키나 시각이 비어 있는 행은 groupby(dropna=True)처럼 버린다 (stats['dropped_rows'])
+    """
+    n_input = len(df)
+    missing_key = df[keys + [time_col]].isna().any(axis=1).to_numpy()
+    if missing_key.any():
+        df = df[~missing_key]
+    sizes, codes, t_ns, uniques, layout = _group_rows(df, keys, time_col)
+
+    out = {}
+    if len(keys) == 1:
+        out[keys[0]] = uniques[0].values.take(codes)
+    else:
+        for i in reversed(range(len(keys))):
+            n = max(len(uniques[i]), 1)
+            out[keys[i]] = uniques[i].values.take(codes % n)
+            codes = codes // n
+        out = {col: out[col] for col in keys}
+    t_ns = np.ascontiguousarray(t_ns, dtype=np.int64).view('datetime64[ns]')
+    out[time_col] = t_ns.astype(df[time_col].dtype, copy=False)
+
+    stats = {
+        'rows': n_input,
+        'dropped_rows': int(missing_key.sum()),
+        'keys': len(sizes),
+        'collided_keys': int(len(layout[1])),
+        'extra_rows': int(len(df) - len(sizes)),
+        'max_group_size': int(sizes.max()) if len(sizes) else 0,
+        'divergence': {},
+    }
+
+    bad = {col: how for col, how in agg.items() if how not in ('mean', 'first')}
+    if bad:
+        raise ValueError(f"지원하지 않는 집계: {bad} (mean, first만 가능)")
+
+    # 평균 컬럼은 처음부터 (컬럼 수, 그룹 수) 블록 하나에 씀 → DataFrame이 컬럼을 다시 쌓지 않음
+    mean_cols = [col for col, how in agg.items() if how == 'mean']
+    block = np.empty((len(mean_cols), len(sizes)))
+    firsts = {}
+    for col, how in agg.items():
+        values = df[col].to_numpy()
+        if how == 'mean':
+            _, spread = _group_mean(values.astype(np.float64, copy=False), layout,
+                                    out=block[mean_cols.index(col)])
+            # 중복 키 안에서 값이 얼마나 달랐는지 (최대 - 최소)
+            spread = spread[~np.isnan(spread)]
+            if len(spread):
+                stats['divergence'][col] = {'max': float(spread.max()), 'mean': float(spread.mean()),
+                                            'nonzero': int((spread > 0).sum())}
+        else:
+            firsts[col] = _group_first(values, layout)
+
+    result = pd.concat([pd.DataFrame(out), pd.DataFrame(block.T, columns=mean_cols, copy=False),
+                        pd.DataFrame(firsts)], axis=1)
+    order = list(out) + list(agg)
+    if list(result.columns) != order:
+        result = result[order]
+    return result, stats
+
+
+def print_stats(stats):
+    if stats.get('dropped_rows'):
+        print(f"  키/시각 결측으로 제외: {stats['dropped_rows']:,}행")
+    print(f"  키 충돌: {stats['collided_keys']:,}개 키, 추가 행 {stats['extra_rows']:,}개 "
+          f"(최대 {stats['max_group_size']}중복)")
+    for col, d in stats['divergence'].items():
+        if d['nonzero']:
+            print(f"    {col}: 값 차이 최대 {d['max']:.3f}, 평균 {d['mean']:.3f} ({d['nonzero']:,}개 키)")
+
+
+def benchmark(row_counts=(5_000_000,), n_zones=500, repeat=3, target=5.0):
+    """groupby-agg vs 정수 키 재집계 (결과 동일성 포함). 시간은 repeat번 중 최솟값"""
+    from synthetic import make_cont_readings
+    from forecast_frame import AGG_DICT
+
+    def best_of(fn):
+        best = result = None
+        for _ in range(repeat):
+            result = None   # 이전 결과를 먼저 놓아 메모리 압박이 시간에 섞이지 않게
+            t0 = time.perf_counter()
+            result = fn()
+            sec = time.perf_counter() - t0
+            best = sec if best is None else min(best, sec)
+        return result, best
+
+    print("="*60)
+    print(f"재집계 엔진 벤치마크 (존 {n_zones}개, 10분 간격, 중복 3%, {repeat}회 중 최솟값)")
+    print("="*60)
+    print(f"{'원본 행':>12} {'groupby(s)':>11} {'정수키(s)':>10} {'배속':>7} {'동일':>6}")
+
+    for rows in row_counts:
+        days = max(1, int(round(rows / (n_zones * 144 * 0.98))))
+        raw = make_cont_readings(n_zones=n_zones, days=days)
+
+        expected, gb_sec = best_of(lambda: raw.groupby(['contID', 'colDate'], as_index=False).agg(AGG_DICT))
+        (result, stats), vec_sec = best_of(lambda: dedup_keys(raw, ['contID'], AGG_DICT))
+
+        same = expected.equals(result)
+        speedup = gb_sec / vec_sec
+        print(f"{len(raw):>12,} {gb_sec:>11.2f} {vec_sec:>10.2f} {speedup:>6.1f}x {'OK' if same else 'DIFF':>6}")
+        if speedup < target:
+            print(f"  [주의] 목표 {target:.0f}x 미달 ({speedup:.1f}x)")
+        del raw, expected, result
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="재집계 엔진 벤치마크")
+    parser.add_argument('--rows', type=int, nargs='+', default=[5_000_000])
+    parser.add_argument('--zones', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3, help='반복 횟수 (최솟값 사용)')
+    args = parser.parse_args()
+
+    benchmark(row_counts=args.rows, n_zones=args.zones, repeat=args.repeat)
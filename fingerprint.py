@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+파일/폴더 내용 해시 (파이프라인 캐시 키, 데이터셋 지문)
+
+- file_digest: 파일 내용 blake2b 해시. (크기, mtime) 가 같으면 memo에 저장된 값을 재사용
+- tree_digest: 파일 또는 폴더 전체 (상대 경로 + 파일 해시)
+- params_digest: 파라미터 dict (JSON 정렬 직렬화)
+
+memo는 {절대경로: {'size', 'mtime_ns', 'digest'}} dict이며 load_memo/save_memo로 JSON 파일에 보관한다.
+수 GB 파일도 내용이 바뀌지 않았으면 stat 한 번으로 끝난다.
+"""
+import hashlib
+import json
+import os
+
+CHUNK_BYTES = 1024 * 1024
+DIGEST_SIZE = 16
+
+SKIP_DIRS = {'__pycache__', '.ipynb_checkpoints'}
+
+
+def file_digest(path, memo=None):
+    """파일 내용 해시 (memo가 있으면 크기/mtime이 같을 때 재계산하지 않음)"""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    if memo is not None:
+        hit = memo.get(key)
+        if hit and hit['size'] == st.st_size and hit['mtime_ns'] == st.st_mtime_ns:
+            return hit['digest']
+
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b''):
+            h.update(block)
+    digest = h.hexdigest()
+
+    if memo is not None:
+        memo[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'digest': digest}
+    return digest
+
+
+def tree_digest(path, memo=None):
+    """파일이면 file_digest, 폴더면 하위 파일 전체 (경로 정렬) 해시. 없으면 None"""
+    if os.path.isfile(path):
+        return file_digest(path, memo)
+    if not os.path.isdir(path):
+        return None
+
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, path).replace(os.sep, '/')
+            h.update(rel.encode('utf-8'))
+            h.update(file_digest(full, memo).encode('ascii'))
+    return h.hexdigest()
+
+
+def params_digest(params):
+    """파라미터 dict 해시 (키 순서 무관)"""
+    payload = json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def load_memo(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # 깨진 memo는 버리고 다시 계산
+        return {}
+
+
+def save_memo(memo, path):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(memo, f)
+    os.replace(path + '.tmp', path)
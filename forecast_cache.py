@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+예측 결과 캐시 ((존, 컨텍스트 끝 시각, horizon, 모델 지문) → 예측값)
+
+대시보드를 다시 열거나 11을 다시 돌리면 이미 예측한 기간도 model.forecast를 다시 부른다.
+예측값 하나는 존, 그 시각까지의 컨텍스트, horizon, 모델 파일로 정해지므로 이 키로 저장해 둔다.
+- 메모리 LRU (OrderedDict, capacity개) → 디스크 sqlite (./forecast_cache.sqlite) → 둘 다 없으면 계산
+- 모델 지문: forecast_server info()['fingerprint'] (model.pkl 내용 해시, fingerprint.py). 모델을 바꾸면 새 키
+- get_or_compute: 못 찾은 키를 존마다 [첫 miss - lookback, 마지막 miss] 구간으로 모아 모든 존을 forecast 한 번
+  (예측값은 입력 행 순서 - run_forecast와 같은 가정).
+  lookback은 모델 속성 값 그대로 쓰지 않고 forecast_context.verified_spec으로 모델 지문마다 한 번 전체 이력과
+  예측이 같은지 확인한 값만 쓴다 (짧은 lookback으로 틀린 값이 지문 키로 영구 저장되지 않도록)
+  계산 구간에서 컨텍스트가 다 찬 행(첫 miss 이후)은 요청하지 않았어도 같이 저장
+- stats(): 메모리/디스크 적중, miss, 모델 호출 수, 적중률, get_or_compute 지연 p50/p99
+
+과거 측정값이 고쳐져도 키는 같으므로 그때는 clear() (python forecast_cache.py --clear).
+검증(07)은 창별 체크포인트(rolling_validation.py)를 따로 쓴다.
+
+사용 방법:
+    cache = ForecastCache(get_forecaster())
+    predictions = cache.get_or_compute(history, targets)   # targets: 예측할 (contID, colDate) 행, 없으면 history 전체
+    print(cache.stats())
+
+    python forecast_cache.py --stats
+    python forecast_cache.py --clear
+    python forecast_cache.py --bench       # 처음 / 다시 열기 / 새 프로세스(디스크) / 하루 늘린 기간
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from anomaly_service import LatencyStats
+from forecast_context import lookback_delta, verified_path, verified_spec
+
+CACHE_PATH = './forecast_cache.sqlite'
+CAPACITY = 200_000  # 메모리 LRU 항목 수 (존 4개 × 15분 → 약 1년치)
+
+TARGET_COL = 'target_tempHot_30min'
+GRAIN_COL = 'contID'
+TIME_COL = 'colDate'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    model TEXT NOT NULL,
+    cont_id TEXT NOT NULL,
+    context_end INTEGER NOT NULL,
+    horizon INTEGER NOT NULL,
+    value REAL NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (model, cont_id, context_end, horizon)
+) WITHOUT ROWID
+"""
+
+
+def _keys(frame):
+    """(contID 문자열 배열, colDate ns 정수 배열)"""
+    zones = frame[GRAIN_COL].astype(str).to_numpy()
+    times = pd.to_datetime(frame[TIME_COL]).to_numpy('datetime64[ns]').view('int64')
+    return zones, times
+
+
+class ForecastCache:
+    """
+    forecaster(ForecastClient/LocalForecaster)의 예측 결과 캐시
+
+    메모리 키는 (contID, 컨텍스트 끝 ns) - 모델 지문과 horizon은 인스턴스마다 하나라 디스크 키에만 넣는다.
+    """
+
+    def __init__(self, forecaster, path=CACHE_PATH, capacity=CAPACITY):
+        info = forecaster.info()
+        self.forecaster = forecaster
+        self.model_key = info.get('fingerprint') or info['model_path']
+        self.fingerprint = info.get('fingerprint')
+        self.verified_path = verified_path(info['model_path'])
+        self.spec = info.get('lookback') or {'periods': None}
+        self.checked_spec = None   # 첫 계산 때 verified_spec으로 확인 (그 전에는 자르지 않음)
+        self.horizon = int(self.spec.get('horizon') or info.get('max_horizon') or 1)
+        self.capacity = capacity
+        self.path = path
+        self.latency = LatencyStats()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'model_calls': 0,
+                         'computed_rows': 0, 'forecast_ms': 0.0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def clear(self, all_models=False):
+        """이 모델(또는 전체) 캐시 삭제"""
+        with self._lock:
+            self._memory.clear()
+            if all_models:
+                self._db.execute('DELETE FROM forecasts')
+            else:
+                self._db.execute('DELETE FROM forecasts WHERE model = ?', (self.model_key,))
+            self._db.commit()
+
+    # -- 조회 / 저장 --------------------------------------------------------
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, zones, times, values, found):
+        for i, key in enumerate(zip(zones.tolist(), times.tolist())):
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                values[i] = value
+                found[i] = True
+
+    def _lookup_disk(self, zones, times, values, found):
+        """못 찾은 키를 존마다 시각 범위 쿼리 한 번으로"""
+        missing = np.flatnonzero(~found)
+        for zone in pd.unique(zones[missing]):
+            idx = missing[zones[missing] == zone]
+            rows = self._db.execute(
+                'SELECT context_end, value FROM forecasts '
+                'WHERE model = ? AND cont_id = ? AND horizon = ? AND context_end BETWEEN ? AND ?',
+                (self.model_key, str(zone), self.horizon, int(times[idx].min()), int(times[idx].max()))).fetchall()
+            stored = dict(rows)
+            for i in idx:
+                value = stored.get(int(times[i]))
+                if value is not None:
+                    values[i] = value
+                    found[i] = True
+                    self._remember((zone, int(times[i])), value)
+
+    def _store(self, zones, times, preds):
+        ok = np.isfinite(preds)
+        now = time.time()
+        rows = [(self.model_key, z, int(t), self.horizon, float(v), now)
+                for z, t, v in zip(zones[ok].tolist(), times[ok].tolist(), preds[ok].tolist())]
+        self._db.executemany('INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._db.commit()
+        for _, z, t, _, v, _ in rows:
+            self._remember((z, t), v)
+
+    # -- 계산 -------------------------------------------------------------
+
+    def _checked(self, history):
+        """확인된 lookback spec (이 모델 지문으로 처음이면 history 전체와 비교, 모델 호출 수에는 넣지 않음)"""
+        if self.checked_spec is None:
+            self.checked_spec = verified_spec(self.forecaster, history.drop(columns=[TARGET_COL], errors='ignore'),
+                                              self.spec, self.fingerprint, self.verified_path)
+        return self.checked_spec
+
+    def _compute(self, history, zones, times):
+        """miss 키의 존마다 [첫 miss - lookback, 마지막 miss] 이력을 모아 forecast 한 번 → (존, 시각, 예측) 배열"""
+        hist_zones, hist_times = _keys(history)
+        lookback = lookback_delta(self._checked(history), history)
+        lookback_ns = None if lookback is None else lookback.value
+        first = {}
+        mask = np.zeros(len(history), dtype=bool)
+        for zone in pd.unique(zones):
+            zone_times = times[zones == zone]
+            first[zone] = zone_times.min()
+            in_zone = (hist_zones == zone) & (hist_times <= zone_times.max())
+            if lookback_ns is not None:
+                in_zone &= hist_times >= first[zone] - lookback_ns
+            mask |= in_zone
+        if not mask.any():
+            return zones[:0], times[:0], np.empty(0)
+
+        X = history[mask].drop(columns=[TARGET_COL], errors='ignore')
+        predictions, timing = self.forecaster.forecast(X)
+        self.counters['model_calls'] += 1
+        self.counters['forecast_ms'] += timing.get('forecast_ms', timing.get('total_ms', 0.0))
+
+        out_zones, out_times = hist_zones[mask], hist_times[mask]
+        starts = pd.Series(first).reindex(out_zones).to_numpy(dtype=np.int64)
+        keep = out_times >= starts   # 컨텍스트가 다 찬 행만 (그 앞은 lookback용 입력)
+        preds = predictions[TARGET_COL].to_numpy(dtype=np.float64)
+        return out_zones[keep], out_times[keep], preds[keep]
+
+    def get_or_compute(self, history, targets=None):
+        """
+        targets 행(contID, colDate)의 예측 → DataFrame (contID, colDate, horizon, target_tempHot_30min, 행 순서 = targets)
+
+        history: 모델 입력 이력 (to_model_frame, target 컬럼은 있어도 빼고 넘김). miss 계산의 컨텍스트
+        """
+        started = time.perf_counter()
+        targets = history if targets is None else targets
+        zones, times = _keys(targets)
+        values = np.full(len(targets), np.nan)
+        found = np.zeros(len(targets), dtype=bool)
+
+        with self._lock:
+            self._lookup_memory(zones, times, values, found)
+            memory_hits = int(found.sum())
+            if not found.all():
+                self._lookup_disk(zones, times, values, found)
+        disk_hits = int(found.sum()) - memory_hits
+
+        miss = np.flatnonzero(~found)
+        if len(miss):
+            out_zones, out_times, preds = self._compute(history, zones[miss], times[miss])
+            self.counters['computed_rows'] += len(preds)
+            with self._lock:
+                self._store(out_zones, out_times, preds)
+            computed = dict(zip(zip(out_zones.tolist(), out_times.tolist()), preds.tolist()))
+            for i in miss:
+                values[i] = computed.get((zones[i], int(times[i])), np.nan)
+            self.counters['misses'] += len(miss)
+
+        self.counters['memory_hits'] += memory_hits
+        self.counters['disk_hits'] += disk_hits
+        self.latency.record(time.perf_counter() - started, len(targets))
+
+        return pd.DataFrame({
+            GRAIN_COL: targets[GRAIN_COL].to_numpy(),
+            TIME_COL: targets[TIME_COL].to_numpy(),
+            'horizon': self.horizon,
+            TARGET_COL: values,
+        })
+
+    def stats(self):
+        """적중률 / 모델 호출 / 지연 카운터"""
+        c = self.counters
+        lookups = c['memory_hits'] + c['disk_hits'] + c['misses']
+        with self._lock:
+            stored = self._db.execute('SELECT COUNT(*) FROM forecasts WHERE model = ?', (self.model_key,)).fetchone()[0]
+        latency = self.latency.to_dict()
+        return {
+            **c,
+            'lookups': lookups,
+            'hit_rate': (c['memory_hits'] + c['disk_hits']) / lookups if lookups else None,
+            'memory_entries': len(self._memory),
+            'disk_entries': stored,
+            'requests': latency['requests'],
+            'p50_ms': latency['p50_ms'],
+            'p99_ms': latency['p99_ms'],
+        }
+
+
+def format_stats(stats):
+    hit_rate = '-' if stats['hit_rate'] is None else f"{stats['hit_rate'] * 100:.1f}%"
+    p50 = '-' if stats['p50_ms'] is None else f"{stats['p50_ms']:.1f}ms"
+    return (f"적중률 {hit_rate} (메모리 {stats['memory_hits']:,} / 디스크 {stats['disk_hits']:,} / "
+            f"miss {stats['misses']:,}), 모델 호출 {stats['model_calls']}회 ({stats['computed_rows']:,}행), "
+            f"p50 {p50}, 저장 {stats['disk_entries']:,}개")
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크
+# ---------------------------------------------------------------------------
+
+def benchmark(days=30, zones=4):
+    """참조 lag 모델로: 처음 열기 / 같은 기간 다시 / 새 인스턴스(디스크만) / 하루 늘린 기간"""
+    import joblib
+    from forecast_context import ReferenceLagForecaster, make_history
+    from forecast_server import LocalForecaster
+
+    model = ReferenceLagForecaster()
+    train = make_history(1, zones, model.data_frequency)
+    model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+    history = make_history(max(1, -(-days // 30)) + 1, zones, model.data_frequency).drop(columns=[TARGET_COL])
+    end = history[TIME_COL].max()
+    period = history[history[TIME_COL] > end - pd.Timedelta(days=days + 1)]
+    period = period[period[TIME_COL] <= end - pd.Timedelta(days=1)]
+    extended = history[history[TIME_COL] > end - pd.Timedelta(days=days + 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        joblib.dump(model, model_path)
+        forecaster = LocalForecaster(model_path)
+        db_path = os.path.join(tmp, 'cache.sqlite')
+
+        print("="*60)
+        print(f"예측 결과 캐시 (참조 lag 모델, 존 {zones}개, 이력 {len(history):,}행, 대시보드 기간 {days}일)")
+        print("="*60)
+
+        uncached = time.perf_counter()
+        expected = forecaster.forecast(history)[0]
+        uncached = time.perf_counter() - uncached
+        print(f"캐시 없이 forecast (전체 이력): {uncached * 1000:8.1f} ms")
+
+        cache = ForecastCache(forecaster, path=db_path)
+        steps = [('처음 열기', cache, period), ('같은 기간 다시', cache, period)]
+        for label, c, targets in steps:
+            _run_step(label, c, history, targets)
+        cache.close()
+
+        reopened = ForecastCache(forecaster, path=db_path)   # 새 프로세스처럼 메모리는 비어 있음
+        _run_step('새 인스턴스 (디스크)', reopened, history, period)
+        result = _run_step('하루 늘린 기간', reopened, history, extended)
+
+        merged = result.merge(expected, on=[GRAIN_COL, TIME_COL], suffixes=('', '_full'))
+        diff = np.nanmax(np.abs(merged[TARGET_COL] - merged[f'{TARGET_COL}_full']))
+        print(f"\n전체 이력 forecast와 최대 차이: {diff:.2e}")
+        print(format_stats(reopened.stats()))
+        reopened.close()
+
+
+def _run_step(label, cache, history, targets):
+    calls = cache.counters['model_calls']
+    start = time.perf_counter()
+    result = cache.get_or_compute(history, targets)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {len(targets):>7,}행 {elapsed * 1000:8.1f} ms, 모델 호출 {cache.counters['model_calls'] - calls}회")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="예측 결과 캐시")
+    parser.add_argument('--path', default=CACHE_PATH)
+    parser.add_argument('--stats', action='store_true', help="모델별 저장 항목 수")
+    parser.add_argument('--clear', action='store_true', help="캐시 전체 삭제")
+    parser.add_argument('--bench', action='store_true', help="참조 모델로 처음/다시/디스크/기간 확장 비교")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--zones', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(days=args.days, zones=args.zones)
+        return
+    if not os.path.exists(args.path):
+        print(f"{args.path}가 없습니다.")
+        return
+
+    db = sqlite3.connect(args.path)
+    if args.clear:
+        deleted = db.execute('DELETE FROM forecasts').rowcount
+        db.commit()
+        print(f"[OK] {deleted:,}개 삭제: {args.path}")
+    else:
+        rows = db.execute('SELECT model, COUNT(*), MIN(context_end), MAX(context_end) FROM forecasts '
+                          'GROUP BY model').fetchall()
+        for model_key, count, first, last in rows:
+            print(f"{model_key[:16]}  {count:>9,}개  {pd.Timestamp(first)} ~ {pd.Timestamp(last)}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+AutoML forecast 입력 컨텍스트 최소화
+
+04/10은 존 전체 이력을, 07은 전체 존의 train+test를 그대로 model.forecast / rolling_forecast에 넘긴다.
+모델이 실제로 보는 과거는 최대 lag + rolling window 길이뿐이므로, 학습된 파이프라인 속성
+(08_inspect_model.py가 출력하는 max_horizon, lag, window 크기, freq)에서 필요한 길이를 구하고
+존(grain)마다 예측 구간 앞 그 길이만 남겨서 호출한다.
+
+    spec = lookback_spec(model)                    # {'horizon', 'lags', 'window', 'freq', 'periods', 'found'}
+    X = trim_context(X, spec)                      # 존마다 마지막 horizon행 예측 + 필요한 과거만
+    X = trim_context(X, spec, predict_from=test_start)   # 07: test 시작 이후 예측 + 그 앞 과거만
+
+- periods = 최대 lag + rolling window + horizon (여유) × freq. freq를 모르면 데이터 간격(중앙값)으로 계산
+- 속성에서 lag/window를 찾지 못하면 자르지 않는다 (결과가 바뀔 수 있는 추정은 하지 않음)
+- verify_trim()으로 자른 입력과 전체 입력의 예측이 같은지 확인하고, 다르면 길이를 두 배씩 늘려 맞는 길이를 찾는다
+  (모델이 자른 입력에서 예외를 내면 자르지 않음)
+- 04/10/07은 verified_spec()으로 모델 지문마다 한 번 전체 이력에서 확인한 spec만 쓴다
+  (결과는 모델 옆 lookback_verified.json에 보관, 모델 파일이 바뀌면 다시 확인)
+
+벤치마크 (1, 3, 12개월 이력에서 전체 vs 자른 입력: 시간, 메모리, 예측 차이):
+    python forecast_context.py --bench                    # models/model.pkl 있으면 그 모델, 없으면 참조 lag 모델
+    python forecast_context.py --inspect                  # 모델에서 읽은 lookback
+"""
+import argparse
+import json
+import math
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import load_memo
+
+GRAIN_COL = 'contID'
+TIME_COL = 'colDate'
+TARGET_COL = 'target_tempHot_30min'
+MODEL_PATH = './models/model.pkl'
+VERIFIED_FILE = 'lookback_verified.json'  # 모델 폴더 안, {모델 지문: 확인 결과}
+
+# 파이프라인 속성 이름 (AutoML 래퍼 → 내부 시계열 변환기 → parameters dict 순으로 찾음)
+HORIZON_ATTRS = ('max_horizon', 'forecast_horizon')
+LAG_ATTRS = ('target_lags', 'lags')
+WINDOW_ATTRS = ('target_rolling_window_size', 'window_size')
+FREQ_ATTRS = ('data_frequency', 'freq', 'frequency')
+
+BENCH_MONTHS = (1, 3, 12)
+
+
+def _sources(model):
+    """속성을 찾을 객체들: 모델, 내부 시계열 변환기, 그 parameters dict"""
+    sources = [model]
+    for name in ('_ts_transformer', 'ts_transformer', 'timeseries_transformer'):
+        inner = getattr(model, name, None)
+        if inner is not None:
+            sources.append(inner)
+            if isinstance(getattr(inner, 'parameters', None), dict):
+                sources.append(inner.parameters)
+    return sources
+
+
+def _find(sources, names):
+    for source in sources:
+        for name in names:
+            value = source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+            if value is not None:
+                return name, value
+    return None, None
+
+
+def _lag_list(value):
+    """target_lags 값 (int, 리스트, {컬럼: 리스트}) → 정수 목록. 'auto' 등 해석 불가면 None"""
+    if isinstance(value, dict):
+        values = [v for lags in value.values() for v in (lags if isinstance(lags, (list, tuple)) else [lags])]
+    elif isinstance(value, (list, tuple)):
+        values = list(value)
+    else:
+        values = [value]
+    try:
+        return sorted({int(v) for v in values})
+    except (TypeError, ValueError):
+        return None
+
+
+def _freq_str(value):
+    if value is None:
+        return None
+    try:
+        return pd.tseries.frequencies.to_offset(value).freqstr
+    except (TypeError, ValueError):
+        return None
+
+
+def lookback_spec(model):
+    """
+    학습된 파이프라인 → 필요한 과거 길이
+
+    Returns: {'horizon', 'lags', 'window', 'freq', 'periods', 'found'}
+             periods(freq 단위 과거 행 수)가 None이면 속성을 못 찾은 것 → 자르지 않음
+    """
+    sources = _sources(model)
+    found = {}
+    name, horizon = _find(sources, HORIZON_ATTRS)
+    if name:
+        found[name] = repr(horizon)
+    horizon = int(horizon) if horizon is not None else 1
+
+    lag_name, lags_value = _find(sources, LAG_ATTRS)
+    window_name, window = _find(sources, WINDOW_ATTRS)
+    freq_name, freq = _find(sources, FREQ_ATTRS)
+    for key, value in ((lag_name, lags_value), (window_name, window), (freq_name, freq)):
+        if key:
+            found[key] = repr(value)
+
+    lags = _lag_list(lags_value) if lag_name else []
+    try:
+        window = int(window) if window is not None else 0
+    except (TypeError, ValueError):
+        window = None
+
+    periods = None
+    if (lag_name or window_name) and lags is not None and window is not None:
+        periods = max(lags, default=0) + window + horizon
+    return {'horizon': horizon, 'lags': lags, 'window': window, 'freq': _freq_str(freq),
+            'periods': periods, 'found': found}
+
+
+def data_step(spec, X=None):
+    """시각 간격 Timedelta: spec의 freq, 없으면 X의 존별 시각 간격 중앙값 (둘 다 없으면 None)"""
+    if spec.get('freq'):
+        return pd.Timedelta(pd.tseries.frequencies.to_offset(spec['freq']))
+    if X is not None and len(X) > 1:
+        ordered = X.sort_values([GRAIN_COL, TIME_COL])
+        diffs = ordered.groupby(GRAIN_COL, observed=True)[TIME_COL].diff().dropna()
+        if not diffs.empty:
+            return diffs.median()
+    return None
+
+
+def lookback_delta(spec, X=None):
+    """spec의 과거 길이 → Timedelta (freq가 없으면 X의 존별 시각 간격 중앙값으로)"""
+    if spec.get('periods') is None:
+        return None
+    step = data_step(spec, X)
+    return None if step is None else spec['periods'] * step
+
+
+def trim_context(X, spec, predict_from=None, predict_rows=None):
+    """
+    존마다 예측할 행 + 그 앞 lookback 기간만 남김 (행 순서 유지)
+
+    predict_from: 이 시각 이후 행을 예측 (07 test 구간). 모든 존에 같은 기준
+    predict_rows: predict_from이 없을 때 존마다 마지막 몇 행을 예측할지 (기본 horizon)
+    spec에 lookback이 없으면 X 그대로.
+    """
+    lookback = lookback_delta(spec, X)
+    if lookback is None or len(X) == 0:
+        return X
+    times = X[TIME_COL]
+    if predict_from is not None:
+        return X[times >= pd.Timestamp(predict_from) - lookback]
+
+    n_predict = predict_rows or spec.get('horizon') or 1
+    grains = X[GRAIN_COL]
+    from_end = X.groupby(grains, observed=True, sort=False).cumcount(ascending=False)
+    first_predicted = times.where(from_end < n_predict).groupby(grains, observed=True, sort=False).transform('min')
+    return X[times >= first_predicted - lookback]
+
+
+def _predicted_rows(X, spec, predict_from, predict_rows):
+    """비교할 예측 행 (contID, colDate): predict_from 이후 또는 존마다 마지막 predict_rows행"""
+    if predict_from is not None:
+        return X[X[TIME_COL] >= pd.Timestamp(predict_from)][[GRAIN_COL, TIME_COL]]
+    n_predict = predict_rows or spec.get('horizon') or 1
+    from_end = X.groupby(X[GRAIN_COL], observed=True, sort=False).cumcount(ascending=False)
+    return X[from_end < n_predict][[GRAIN_COL, TIME_COL]]
+
+
+def _forecast_rows(model, X, rows):
+    """
+    model.forecast(X) 결과에서 rows (contID, colDate) 예측값만
+
+    AutoML 모델은 입력 행 순서와 같다고 가정 (04/07/11과 같음), forecast_server의 LocalForecaster/ForecastClient는
+    (contID, colDate, target) 표를 돌려주므로 그 키로 맞춘다.
+    """
+    y_pred, _ = model.forecast(X)
+    if isinstance(y_pred, pd.DataFrame) and TARGET_COL in y_pred:
+        out = y_pred[[GRAIN_COL, TIME_COL, TARGET_COL]].rename(columns={TARGET_COL: 'pred'})
+        out[TIME_COL] = pd.to_datetime(out[TIME_COL]).astype(rows[TIME_COL].dtype)
+    else:
+        out = X[[GRAIN_COL, TIME_COL]].assign(pred=np.asarray(y_pred, dtype=np.float64).ravel()[:len(X)])
+    return rows.merge(out, on=[GRAIN_COL, TIME_COL], how='left')['pred'].to_numpy(dtype=np.float64)
+
+
+def verify_trim(model, X, spec, predict_from=None, predict_rows=None, atol=1e-9, max_doublings=6):
+    """
+    자른 입력과 전체 입력의 예측 비교. 다르면 periods를 두 배씩 늘려 다시 비교
+
+    Returns: (확인된 spec, 최대 차이). 끝까지 다르거나 모델이 자른 입력을 거부하면 periods=None (자르지 않음),
+             거부 사유는 spec['error']
+    """
+    rows = _predicted_rows(X, spec, predict_from, predict_rows)
+    expected = _forecast_rows(model, X, rows)
+    spec = dict(spec)
+    diff = 0.0
+    for _ in range(max_doublings + 1):
+        if spec.get('periods') is None:
+            return spec, diff
+        try:
+            got = _forecast_rows(model, trim_context(X, spec, predict_from, predict_rows), rows)
+        except Exception as e:
+            # AutoML이 자른 입력을 거부 (간격/연속성 검사 등) → 전체 이력으로 예측
+            spec['periods'] = None
+            spec['error'] = f'{type(e).__name__}: {e}'
+            return spec, math.inf
+        valid = ~np.isnan(expected)
+        if np.array_equal(np.isnan(got), ~valid):
+            diff = float(np.max(np.abs(got[valid] - expected[valid]), initial=0.0))
+        else:
+            diff = math.inf   # 한쪽만 NaN인 행 (자른 입력에서 lag/window가 모자람)
+        if diff <= atol:
+            return spec, diff
+        spec['periods'] *= 2
+    spec['periods'] = None
+    return spec, diff
+
+
+def verified_path(model_path):
+    """모델 파일 옆 확인 결과 파일"""
+    return os.path.join(os.path.dirname(model_path) or '.', VERIFIED_FILE)
+
+
+def load_verified(path, fingerprint, spec):
+    """이 모델 지문 + 같은 spec으로 이미 확인한 spec (없으면 None)"""
+    if fingerprint is None:
+        return None
+    hit = load_memo(path).get(fingerprint)
+    if hit and hit.get('periods') == spec.get('periods'):
+        return hit['spec']
+    return None
+
+
+def save_verified(path, fingerprint, spec, checked, diff):
+    """확인 결과 저장 (임시 파일 후 교체, 다른 모델 지문 항목은 유지)"""
+    if fingerprint is None:
+        return
+    memo = load_memo(path)
+    memo[fingerprint] = {'periods': spec.get('periods'), 'spec': checked, 'max_diff': diff,
+                         'checked_at': pd.Timestamp.now().isoformat(timespec='seconds')}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(memo, f, indent=2, default=str)
+    os.replace(path + '.tmp', path)
+
+
+def report_verified(spec, checked, diff):
+    """verify_trim 결과 출력"""
+    if checked.get('error'):
+        print(f"  [WARNING] 모델이 lookback {spec.get('periods')}행으로 자른 입력을 거부해 자르지 않습니다 "
+              f"({checked['error']})")
+    elif checked.get('periods') is None:
+        print(f"  [WARNING] lookback {spec.get('periods')}행을 늘려도 전체 이력과 예측이 달라 자르지 않습니다 "
+              f"(최대 차이 {diff:.1e})")
+    elif checked['periods'] != spec.get('periods'):
+        print(f"  [WARNING] lookback {spec['periods']}행으로는 예측이 달라 {checked['periods']}행으로 늘림 "
+              f"(최대 차이 {diff:.1e})")
+    else:
+        print(f"  lookback {checked['periods']}행 확인: 전체 이력과 최대 차이 {diff:.1e}")
+
+
+def verified_spec(model, X, spec, fingerprint, path, predict_from=None, predict_rows=None):
+    """
+    모델 지문마다 한 번 전체 이력 X로 verify_trim → 확인된 spec (이후 호출은 저장된 결과)
+
+    fingerprint가 None이면 (모델 파일 없음) 저장하지 않고 매번 확인한다.
+    """
+    checked = load_verified(path, fingerprint, spec)
+    if checked is not None:
+        print(f"  lookback {checked['periods']}행 (이 모델로 확인된 값, {path})")
+        return checked
+    if spec.get('periods') is None:
+        return spec
+    checked, diff = verify_trim(model, X, spec, predict_from, predict_rows)
+    report_verified(spec, checked, diff)
+    save_verified(path, fingerprint, spec, checked, diff)
+    return checked
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크
+# ---------------------------------------------------------------------------
+
+class ReferenceLagForecaster:
+    """
+    models/model.pkl이 없을 때 벤치마크에 쓰는 참조 모델 (AutoML과 같은 forecast/rolling_forecast 인터페이스/속성)
+
+    존별 tempHot lag + rolling 평균 + 시각 특성 → 선형 회귀로 horizon 뒤 온도.
+    AutoML 래퍼처럼 forecast 때마다 입력 전체에서 특성을 다시 만들므로 비용이 이력 길이에 비례한다.
+    lag/window를 X의 tempHot에서 속성 그대로 만들므로 lookback_spec 길이면 정의상 예측이 같다.
+    이 모델에서 verify_trim이 통과해도 AutoML 모델에서 같다는 뜻은 아니다 (실제 모델은 verified_spec으로 확인).
+    """
+
+    forecast_origin_column_name = '_automl_forecast_origin'
+    forecast_column_name = '_automl_forecast_y'
+    actual_column_name = '_automl_actual_y'
+
+    def __init__(self, max_horizon=2, target_lags=(1, 2, 4), target_rolling_window_size=8,
+                 data_frequency='15min'):
+        self.max_horizon = max_horizon
+        self.target_lags = list(target_lags)
+        self.target_rolling_window_size = target_rolling_window_size
+        self.data_frequency = data_frequency
+        self.coef_ = None
+
+    def _features(self, X):
+        ordered = X.sort_values([GRAIN_COL, TIME_COL], kind='stable')
+        temp = ordered.groupby(GRAIN_COL, observed=True)['tempHot']
+        cols = {f'lag{lag}': temp.shift(lag) for lag in self.target_lags}
+        cols['roll'] = temp.transform(lambda s: s.rolling(self.target_rolling_window_size).mean())
+        cols['hour'] = ordered[TIME_COL].dt.hour
+        feats = pd.DataFrame(cols, index=ordered.index).reindex(X.index)
+        return np.column_stack([np.ones(len(X)), X['tempHot'].to_numpy(dtype=np.float64),
+                                feats.to_numpy(dtype=np.float64)])
+
+    def fit(self, X, y):
+        F = self._features(X)
+        ok = ~np.isnan(F).any(axis=1) & ~np.isnan(y)
+        self.coef_ = np.linalg.lstsq(F[ok], y[ok], rcond=None)[0]
+        return self
+
+    def forecast(self, X_pred=None, y_pred=None, forecast_destination=None):
+        return self._features(X_pred) @ self.coef_, X_pred
+
+    def rolling_forecast(self, X_pred, y_pred, step=1, ignore_data_errors=False):
+        """AutoML rolling_forecast와 같은 형식: 시각 origin마다 그 앞 전체 X로 forecast → horizon개 행"""
+        X = X_pred.assign(**{self.actual_column_name: np.asarray(y_pred, dtype=np.float64)})
+        times = np.sort(X[TIME_COL].unique())
+        ahead = self.max_horizon * pd.Timedelta(pd.tseries.frequencies.to_offset(self.data_frequency))
+        frames = []
+        for origin in times[::step]:
+            context = X[X[TIME_COL] < origin + ahead]
+            pred, _ = self.forecast(context.drop(columns=[self.actual_column_name]))
+            mask = (context[TIME_COL] >= origin).to_numpy()
+            frames.append(context.loc[mask, [GRAIN_COL, TIME_COL, self.actual_column_name]].assign(
+                **{self.forecast_origin_column_name: origin, self.forecast_column_name: pred[mask]}))
+        return pd.concat(frames, ignore_index=True)
+
+
+def make_history(months, zones, freq):
+    """months개월 × zones개 존 이력 (cont_forecast_clean과 같은 컬럼, 중복/결측 없음)"""
+    from synthetic import make_cont_readings
+    step = int(pd.Timedelta(freq).total_seconds() // 60)
+    df = make_cont_readings(n_zones=zones, days=30 * months, interval_min=step, missing_frac=0, dup_frac=0,
+                            max_start_delay_min=0)
+    df = df.sort_values([GRAIN_COL, TIME_COL], kind='stable').reset_index(drop=True)
+    df[TARGET_COL] = df.groupby(GRAIN_COL)['tempHot'].shift(-2)
+    return df
+
+
+def _timed(fn, repeats=3):
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(model=None, months=BENCH_MONTHS, zones=4):
+    """이력 길이별 전체 vs 자른 입력: forecast 시간, 메모리 피크, 예측 차이 (존마다 마지막 horizon행)"""
+    reference = model is None
+    if reference:
+        model = ReferenceLagForecaster()
+        train = make_history(1, zones, model.data_frequency)
+        model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+
+    spec = lookback_spec(model)
+    print("="*60)
+    print(f"forecast 컨텍스트 최소화 ({'참조 lag 모델' if reference else type(model).__name__}, 존 {zones}개)")
+    print("="*60)
+    print(f"lookback: {spec}")
+    if reference:
+        print("(참조 모델은 lag/window를 입력 tempHot에서 만들어 차이 0이 정의상 나옴 → AutoML 모델 확인이 아님)")
+    if spec['periods'] is None:
+        print("[WARNING] 모델 속성에서 lag/window를 찾지 못해 자르지 않습니다.")
+        return
+
+    freq = spec['freq'] or '15min'
+    print(f"\n{'이력':>6} {'전체 행':>10} {'자른 행':>8} {'전체(ms)':>10} {'자름(ms)':>10} {'배속':>7} "
+          f"{'전체MB':>8} {'자름MB':>8} {'최대 차이':>10}")
+    for m in months:
+        X = make_history(m, zones, freq).drop(columns=[TARGET_COL])
+        checked, diff = verify_trim(model, X, spec)
+        trimmed = trim_context(X, checked)
+        full_sec = _timed(lambda: model.forecast(X))
+        trim_sec = _timed(lambda: model.forecast(trimmed))
+        full_mb = _peak_mb(lambda: model.forecast(X))
+        trim_mb = _peak_mb(lambda: model.forecast(trimmed))
+        grown = '' if checked['periods'] == spec['periods'] else f" (periods {checked['periods']})"
+        print(f"{m:>4}개월 {len(X):>10,} {len(trimmed):>8,} {full_sec * 1000:>10.1f} {trim_sec * 1000:>10.1f} "
+              f"{full_sec / trim_sec:>6.1f}x {full_mb:>8.1f} {trim_mb:>8.1f} {diff:>10.1e}{grown}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoML forecast 입력 컨텍스트 최소화")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--inspect', action='store_true', help="모델에서 읽은 lookback만 출력")
+    parser.add_argument('--bench', action='store_true', help="1/3/12개월 이력에서 전체 vs 자른 입력 비교")
+    parser.add_argument('--months', type=int, nargs='+', default=list(BENCH_MONTHS))
+    parser.add_argument('--zones', type=int, default=4)
+    args = parser.parse_args()
+
+    model = None
+    if os.path.exists(args.model):
+        import joblib
+        model = joblib.load(args.model)
+    elif args.inspect:
+        print(f"{args.model}가 없습니다.")
+        return
+
+    if args.inspect:
+        print(lookback_spec(model))
+    else:
+        benchmark(model, months=args.months, zones=args.zones)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,612 @@
+# -*- coding: utf-8 -*-
+"""
+cont_forecast_clean 생성 엔진 (중복 제거 → 15분 리샘플링 → 빈 시간대 채우기 → 30분 후 타겟)
+
+존별 for 루프 대신 (contID, colDate) MultiIndex 위에서 한 번에 처리한다.
+결과는 기존 clean_data.py 루프 방식과 바이트 단위로 동일하다.
+
+벤치마크:
+    python forecast_frame.py --zones 4 100 1000 --days 14
+    python forecast_frame.py --zones 5000 --workers 1 2 4 8 16 32   (프로세스 풀 확장성)
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from dedup import dedup_keys
+
+SENSOR_COLS = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
+
+# 같은 contID + colDate는 센서값 평균, 정수형은 첫 값
+AGG_DICT = {
+    'tempHot': 'mean',
+    'tempCold': 'mean',
+    'humiHot': 'mean',
+    'humiCold': 'mean',
+    'temp_diff': 'mean',
+    'humi_diff': 'mean',
+    'hour': 'first',
+    'day_of_week': 'first',
+    'rack_count': 'first'
+}
+
+TARGET_COL = 'target_tempHot_30min'
+TARGET_STEPS = 2  # 15분 간격이므로 2칸 이동 = 30분 후
+
+FINAL_COLS = [
+    'contID', 'colDate', 'tempHot', 'tempCold', 'humiHot', 'humiCold',
+    'temp_diff', 'humi_diff', 'hour', 'day_of_week', 'rack_count',
+    TARGET_COL
+]
+
+WATERMARK_FILE = '_watermark.json'
+
+# 청크마다 따로 to_csv하면 pandas가 청크별로 형식을 고른다 (모두 자정이면 날짜만) → 고정
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def dedup_readings(df, return_stats=False):
+    """
+    같은 (contID, colDate) 행을 하나로 재집계 (결과는 contID, colDate 순 정렬)
+
+    groupby(['contID', 'colDate']).agg(AGG_DICT)와 같은 결과를 정수 키 엔진(dedup.py)으로 계산.
+    return_stats=True면 (df_agg, 충돌 통계)
+    """
+    df_agg, stats = dedup_keys(df, ['contID'], AGG_DICT)
+    return (df_agg, stats) if return_stats else df_agg
+
+
+def resample_to_grid(df_agg, freq='15min', time_range=None):
+    """
+    존별 freq 간격 평균을 구하고 전체 시간 범위의 완전한 격자로 채운다
+
+    - 모든 존이 전체 기간(min ~ max)의 같은 시점을 가짐
+    - 센서 값은 forward fill, rack_count는 forward → backward fill 후 정수
+    - hour, day_of_week는 격자 시각으로 재계산
+    - time_range=(start, end)를 주면 그 범위로 격자 생성 (존 일부만 처리할 때)
+    """
+    bucket = df_agg['colDate'].dt.floor(freq)
+    value_cols = SENSOR_COLS + ['rack_count']
+    means = df_agg[value_cols].groupby([df_agg['contID'], bucket]).mean()
+
+    if time_range is None:
+        time_range = (bucket.min(), bucket.max())
+    zones = means.index.get_level_values(0).unique().sort_values()
+    times = pd.date_range(start=time_range[0], end=time_range[1], freq=freq)
+    grid = pd.MultiIndex.from_product([zones, times], names=['contID', 'colDate'])
+
+    filled = means.reindex(grid)
+    by_zone = filled.groupby(level='contID')
+    filled[SENSOR_COLS] = by_zone[SENSOR_COLS].ffill()
+    rack = by_zone['rack_count'].ffill()
+    rack = rack.groupby(level='contID').bfill()
+    filled['rack_count'] = rack.round().astype(int)
+
+    filled = filled.reset_index()
+    filled['hour'] = filled['colDate'].dt.hour
+    filled['day_of_week'] = filled['colDate'].dt.dayofweek
+    return filled
+
+
+def add_target(df_grid):
+    """30분 후 tempHot 타겟을 붙이고 타겟이 없는 행(존별 마지막 2칸 등)은 제거"""
+    df_grid[TARGET_COL] = df_grid.groupby('contID')['tempHot'].shift(-TARGET_STEPS)
+    df_grid = df_grid.dropna(subset=[TARGET_COL])
+    return df_grid[FINAL_COLS].reset_index(drop=True)
+
+
+def build_forecast_frame(df, freq='15min', workers=1):
+    """원본 데이터(cont_processed 형식) → cont_forecast_clean/data.csv 형식"""
+    df_agg = dedup_readings(df)
+    if workers > 1:
+        df_grid = resample_to_grid_parallel(df_agg, freq=freq, workers=workers)
+    else:
+        df_grid = resample_to_grid(df_agg, freq=freq)
+    return add_target(df_grid)
+
+
+def _grid_worker(task):
+    """
+    프로세스 풀 작업: 공유 메모리에서 존 구간을 읽어 격자를 만들고 결과 공유 메모리에 씀
+
+    DataFrame을 pickle로 주고받지 않고 공유 메모리 이름과 행/존 범위만 전달받는다.
+    """
+    (in_f_name, in_i_name, out_name, n_rows, n_out, row_range, zone_range,
+     n_times, time_range, freq) = task
+    value_cols = SENSOR_COLS + ['rack_count']
+
+    in_f = shared_memory.SharedMemory(name=in_f_name)
+    in_i = shared_memory.SharedMemory(name=in_i_name)
+    out = shared_memory.SharedMemory(name=out_name)
+    try:
+        values = np.ndarray((n_rows, len(value_cols)), dtype=np.float64, buffer=in_f.buf)
+        keys = np.ndarray((n_rows, 2), dtype=np.int64, buffer=in_i.buf)
+        result = np.ndarray((n_out, len(value_cols)), dtype=np.float64, buffer=out.buf)
+
+        r0, r1 = row_range
+        sub = pd.DataFrame(values[r0:r1], columns=value_cols)
+        sub['contID'] = keys[r0:r1, 0]
+        sub['colDate'] = pd.to_datetime(keys[r0:r1, 1])
+
+        grid = resample_to_grid(sub, freq=freq, time_range=time_range)
+        z0, z1 = zone_range
+        result[z0 * n_times:z1 * n_times] = grid[value_cols].to_numpy(dtype=np.float64)
+        del values, keys, result, sub, grid
+    finally:
+        in_f.close()
+        in_i.close()
+        out.close()
+    return zone_range
+
+
+def _split_zones(zone_starts, n_rows, n_tasks):
+    """행 수가 비슷하도록 연속된 존 구간으로 나눔 → [(z0, z1), ...]"""
+    n_zones = len(zone_starts)
+    bounds = np.append(zone_starts, n_rows)
+    targets = np.linspace(0, n_rows, n_tasks + 1)[1:-1]
+    cuts = np.unique(np.concatenate([[0], np.searchsorted(bounds[:-1], targets), [n_zones]]))
+    return [(int(a), int(b)) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+
+def resample_to_grid_parallel(df_agg, freq='15min', workers=4, tasks_per_worker=4):
+    """
+    resample_to_grid의 프로세스 풀 버전 (결과 동일)
+
+    재집계된 프레임을 contID 순 연속 구간으로 나눠 공유 메모리로 워커에 넘기고,
+    워커는 결과 격자를 미리 할당된 출력 공유 메모리의 자기 존 구간에 직접 쓴다.
+    모든 존의 격자 길이가 같으므로 (contID, colDate) 순서가 그대로 유지된다.
+    """
+    value_cols = SENSOR_COLS + ['rack_count']
+    df_agg = df_agg.sort_values(['contID', 'colDate'], kind='stable')
+
+    bucket = df_agg['colDate'].dt.floor(freq)
+    time_range = (bucket.min(), bucket.max())
+    times = pd.date_range(start=time_range[0], end=time_range[1], freq=freq)
+    n_times = len(times)
+
+    cont_ids = df_agg['contID'].to_numpy(dtype=np.int64)
+    zones, zone_starts = np.unique(cont_ids, return_index=True)
+    n_rows, n_zones = len(df_agg), len(zones)
+    n_out = n_zones * n_times
+
+    in_f = shared_memory.SharedMemory(create=True, size=max(n_rows * len(value_cols) * 8, 1))
+    in_i = shared_memory.SharedMemory(create=True, size=max(n_rows * 2 * 8, 1))
+    out = shared_memory.SharedMemory(create=True, size=max(n_out * len(value_cols) * 8, 1))
+    try:
+        values = np.ndarray((n_rows, len(value_cols)), dtype=np.float64, buffer=in_f.buf)
+        keys = np.ndarray((n_rows, 2), dtype=np.int64, buffer=in_i.buf)
+        values[:] = df_agg[value_cols].to_numpy(dtype=np.float64)
+        keys[:, 0] = cont_ids
+        keys[:, 1] = df_agg['colDate'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        bounds = np.append(zone_starts, n_rows)
+        tasks = [
+            (in_f.name, in_i.name, out.name, n_rows, n_out,
+             (int(bounds[z0]), int(bounds[z1])), (z0, z1), n_times, time_range, freq)
+            for z0, z1 in _split_zones(zone_starts, n_rows, workers * tasks_per_worker)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_grid_worker, tasks))
+
+        result = np.ndarray((n_out, len(value_cols)), dtype=np.float64, buffer=out.buf)
+        filled = pd.DataFrame(result.copy(), columns=value_cols)
+        del values, keys, result
+    finally:
+        for shm in (in_f, in_i, out):
+            shm.close()
+            shm.unlink()
+
+    filled.insert(0, 'contID', np.repeat(zones, n_times))
+    filled.insert(1, 'colDate', np.tile(times.values, n_zones))
+    filled['rack_count'] = filled['rack_count'].astype(int)
+    filled['hour'] = filled['colDate'].dt.hour
+    filled['day_of_week'] = filled['colDate'].dt.dayofweek
+    return filled
+
+
+class ForecastFrameStream:
+    """
+    청크 단위 스트리밍 처리 (build_forecast_frame과 같은 결과를 작은 메모리로)
+
+    청크 사이에 유지하는 존별 상태:
+    - open_rows: 아직 닫히지 않은 마지막 15분 구간의 원본 행 (중복/평균 계산용)
+    - carry: 존별 마지막 2개 격자 행 (30분 후 타겟 계산 + forward fill 시작값)
+             + rack_count backward fill을 기다리는 앞쪽 행
+
+    입력은 colDate 순으로 정렬되어 있어야 한다 (이미 처리한 구간의 행이 오면 ValueError).
+    """
+
+    def __init__(self, zones, time_min, freq='15min'):
+        self.freq = freq
+        self.step = pd.Timedelta(freq)
+        self.zones = pd.Index(sorted(zones), name='contID')
+        self.next_time = pd.Timestamp(time_min).floor(freq)
+        self.open_rows = None
+        self.carry = None
+
+    def feed(self, chunk):
+        """원본 청크를 받아 확정된 격자 행을 반환"""
+        rows = chunk if self.open_rows is None else pd.concat([self.open_rows, chunk], ignore_index=True)
+        if len(rows) == 0:
+            return self._empty()
+
+        bucket = rows['colDate'].dt.floor(self.freq)
+        if bucket.min() < self.next_time:
+            raise ValueError(
+                f"이미 처리한 구간({self.next_time} 이전)의 행이 들어왔습니다. "
+                "스트리밍 모드는 colDate 순으로 정렬된 입력이 필요합니다."
+            )
+
+        last_bucket = bucket.max()
+        self.open_rows = rows[bucket == last_bucket]
+        return self._finalize(rows[bucket < last_bucket], upto=last_bucket - self.step)
+
+    def flush(self):
+        """남은 구간을 확정 (마지막 호출)"""
+        if self.open_rows is None or len(self.open_rows) == 0:
+            return self._empty()
+        rows, self.open_rows = self.open_rows, None
+        upto = rows['colDate'].dt.floor(self.freq).max()
+        return self._finalize(rows, upto=upto)
+
+    def add_zones(self, zones):
+        """처음 보는 존 추가 (격자는 현재 위치부터 시작)"""
+        self.zones = self.zones.union(pd.Index(zones)).rename('contID')
+
+    def state_dict(self):
+        """다음 실행에서 이어가기 위한 상태 (JSON 저장용)"""
+        raw_cols = ['contID', 'colDate'] + list(AGG_DICT)
+        return {
+            'freq': self.freq,
+            'zones': [int(z) for z in self.zones],
+            'next_time': str(self.next_time),
+            'open_rows': frame_to_records(None if self.open_rows is None else self.open_rows[raw_cols]),
+            'carry': frame_to_records(self.carry),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stream = cls(state['zones'], state['next_time'], freq=state['freq'])
+        stream.open_rows = frame_from_records(state['open_rows'])
+        stream.carry = frame_from_records(state['carry'])
+        return stream
+
+    def _empty(self):
+        return pd.DataFrame(columns=FINAL_COLS)
+
+    def _finalize(self, raw, upto):
+        if upto < self.next_time:
+            return self._empty()
+
+        df_agg = dedup_readings(raw)
+        bucket = df_agg['colDate'].dt.floor(self.freq)
+        value_cols = SENSOR_COLS + ['rack_count']
+        means = df_agg[value_cols].groupby([df_agg['contID'], bucket]).mean()
+
+        times = pd.date_range(start=self.next_time, end=upto, freq=self.freq)
+        grid = pd.MultiIndex.from_product([self.zones, times], names=['contID', 'colDate'])
+        frame = means.reindex(grid).reset_index()
+
+        if self.carry is not None:
+            frame = pd.concat([self.carry, frame], ignore_index=True)
+            frame = frame.sort_values(['contID', 'colDate'], kind='stable').reset_index(drop=True)
+
+        by_zone = frame.groupby('contID')
+        frame[SENSOR_COLS] = by_zone[SENSOR_COLS].ffill()
+        frame['rack_count'] = by_zone['rack_count'].ffill()
+        frame['rack_count'] = frame.groupby('contID')['rack_count'].bfill()
+        frame[TARGET_COL] = frame.groupby('contID')['tempHot'].shift(-TARGET_STEPS)
+
+        # 존별 마지막 2행은 다음 청크의 값이 있어야 타겟이 정해짐
+        is_tail = frame.groupby('contID').cumcount(ascending=False) < TARGET_STEPS
+        has_target = frame[TARGET_COL].notna()
+        has_rack = frame['rack_count'].notna()
+
+        self.carry = frame.loc[is_tail | (has_target & ~has_rack), ['contID', 'colDate'] + value_cols]
+        self.next_time = upto + self.step
+
+        done = frame[~is_tail & has_target & has_rack].copy()
+        done['rack_count'] = done['rack_count'].round().astype(int)
+        done['hour'] = done['colDate'].dt.hour
+        done['day_of_week'] = done['colDate'].dt.dayofweek
+        return done[FINAL_COLS].reset_index(drop=True)
+
+
+def scan_zones_and_start(path, chunk_rows):
+    """스트리밍 전 사전 스캔: 존 목록과 시작 시각 (contID, colDate 컬럼만 읽음)"""
+    from data_loader import iter_table
+
+    zones = set()
+    time_min = None
+    for chunk in iter_table(path, columns=['contID', 'colDate'], chunk_rows=chunk_rows):
+        zones.update(chunk['contID'].unique().tolist())
+        chunk_min = chunk['colDate'].min()
+        time_min = chunk_min if time_min is None else min(time_min, chunk_min)
+    return sorted(zones), time_min
+
+
+def frame_to_records(df):
+    if df is None:
+        return None
+    out = df.copy()
+    out['colDate'] = out['colDate'].astype(str)
+    return out.to_dict(orient='list')
+
+
+def frame_from_records(records):
+    if records is None:
+        return None
+    df = pd.DataFrame(records)
+    df['colDate'] = pd.to_datetime(df['colDate'])
+    return df
+
+
+def _feed_chunks(stream, src_path, chunk_rows, emit, since=None):
+    """
+    원본 청크(since 이후 행만, data_loader.iter_new_rows)를 stream에 넣고 확정된 행을 emit(done, part)으로 넘김
+
+    src_path가 Parquet 데이터셋이면 since가 pushdown 조건이라 워터마크 이후만 읽는다.
+    CSV면 파일 전체를 읽으므로 증분 실행에는 새 배치 파일을 넘긴다.
+    """
+    from data_loader import iter_new_rows
+
+    stats = {'input_rows': 0, 'output_rows': 0, 'chunks': 0, 'last_raw_time': since}
+    for chunk in iter_new_rows(src_path, since, chunk_rows):
+        new_zones = set(chunk['contID'].unique().tolist()) - set(stream.zones)
+        if new_zones:
+            stream.add_zones(sorted(new_zones))
+
+        done = stream.feed(chunk)
+        emit(done, stats['chunks'])
+        stats['input_rows'] += len(chunk)
+        stats['output_rows'] += len(done)
+        stats['chunks'] += 1
+        if len(chunk) > 0:
+            chunk_max = chunk['colDate'].max()
+            if stats['last_raw_time'] is None or chunk_max > stats['last_raw_time']:
+                stats['last_raw_time'] = chunk_max
+    return stats
+
+
+def _parquet_writer(parquet_root, prefix):
+    from data_loader import write_partitioned
+
+    def write_parquet(done, part):
+        if parquet_root is not None and len(done) > 0:
+            write_partitioned(done, parquet_root, basename_template=f'{prefix}-{part:05d}-{{i}}.parquet',
+                              overwrite=False)
+    return write_parquet
+
+
+def stream_forecast_csv(src_path, dst_path, freq='15min', chunk_rows=200_000, parquet_root=None,
+                        quality=None):
+    """
+    원본 CSV를 청크로 읽어 data.csv를 점진적으로 쓴다
+
+    행 순서는 청크(시간) 단위 → 청크 안에서 (contID, colDate) 순.
+    내용은 build_forecast_frame 결과와 같다. 반환값: 처리 통계 dict
+    parquet_root를 주면 같은 행을 청크마다 Parquet 파티션 파일로도 쓴다.
+    quality(data_quality.QualityReport)를 주면 쓰는 행으로 품질 리포트를 함께 갱신한다.
+    """
+    if parquet_root is not None and os.path.exists(parquet_root):
+        shutil.rmtree(parquet_root)
+    write_parquet = _parquet_writer(parquet_root, 'part')
+
+    zones, time_min = scan_zones_and_start(src_path, chunk_rows)
+    stream = ForecastFrameStream(zones, time_min, freq=freq)
+
+    with open(dst_path, 'w', newline='') as f:
+        pd.DataFrame(columns=FINAL_COLS).to_csv(f, index=False, date_format=DATE_FORMAT)
+
+        def emit(done, part):
+            done.to_csv(f, index=False, header=False, date_format=DATE_FORMAT)
+            write_parquet(done, part)
+            if quality is not None:
+                quality.update(done)
+
+        stats = _feed_chunks(stream, src_path, chunk_rows, emit)
+        done = stream.flush()
+        emit(done, stats['chunks'])
+        stats['output_rows'] += len(done)
+
+    stats['zones'] = len(stream.zones)
+    return stats
+
+
+def append_forecast_csv(src_path, out_dir, freq='15min', chunk_rows=200_000, parquet_root=None,
+                        quality=None):
+    """
+    증분 모드: 워터마크 이후의 새 행만 처리해서 data.csv(와 Parquet)에 추가
+
+    src_path: 새 배치 CSV 또는 원본 Parquet 데이터셋 (워터마크 이후만 읽음, _feed_chunks).
+    전체 이력 CSV를 넘기면 매번 전체를 파싱하므로 비용이 이력 길이에 비례한다.
+
+    out_dir/_watermark.json 에 존별 상태를 저장한다.
+    - last_raw_time: 지금까지 반영한 원본 행의 마지막 colDate (이 시각 이하 행은 건너뜀)
+    - next_time: 확정된 마지막 15분 구간 + 15분 (그 구간은 아직 열려 있음)
+    - open_rows: 열려 있는 구간의 원본 행
+    - carry: 존별 마지막 forward fill 값/rack_count, 타겟이 아직 없는 마지막 2행
+
+    워터마크가 없으면 처음부터 처리하며 data.csv를 새로 만든다.
+    마지막 구간은 확정하지 않으므로 일괄 처리보다 존별 마지막 1행이 늦게 나온다.
+    quality를 주면 추가되는 행으로 품질 리포트를 이어서 갱신한다.
+    """
+    state_path = os.path.join(out_dir, WATERMARK_FILE)
+    dst_path = os.path.join(out_dir, 'data.csv')
+
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        stream = ForecastFrameStream.from_state(state['stream'])
+        since = pd.Timestamp(state['last_raw_time'])
+        mode = 'a'
+    else:
+        if parquet_root is not None and os.path.exists(parquet_root):
+            shutil.rmtree(parquet_root)
+        zones, time_min = scan_zones_and_start(src_path, chunk_rows)
+        stream = ForecastFrameStream(zones, time_min, freq=freq)
+        since = None
+        mode = 'w'
+
+    run_id = pd.Timestamp.now().strftime('%Y%m%d%H%M%S')
+    write_parquet = _parquet_writer(parquet_root, f'append-{run_id}')
+
+    with open(dst_path, mode, newline='') as f:
+        if mode == 'w':
+            pd.DataFrame(columns=FINAL_COLS).to_csv(f, index=False, date_format=DATE_FORMAT)
+
+        def emit(done, part):
+            done.to_csv(f, index=False, header=False, date_format=DATE_FORMAT)
+            write_parquet(done, part)
+            if quality is not None:
+                quality.update(done)
+
+        stats = _feed_chunks(stream, src_path, chunk_rows, emit, since=since)
+
+    if stats['last_raw_time'] is not None:
+        state = {'last_raw_time': str(stats['last_raw_time']), 'stream': stream.state_dict()}
+        tmp_path = state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    stats['zones'] = len(stream.zones)
+    stats['watermark'] = stream.next_time - stream.step
+    return stats
+
+
+def clear_watermark(out_dir):
+    """전체 재생성 시 증분 상태 삭제 (다음 증분 실행이 처음부터 하도록)"""
+    state_path = os.path.join(out_dir, WATERMARK_FILE)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+
+def estimate_chunk_rows(path, max_memory_mb, sample_rows=5_000, overhead=10):
+    """
+    메모리 예산(MB) → 청크 행 수
+
+    샘플 행의 실제 메모리 사용량에 중간 복사본(재집계, 격자, carry 등) 배수를 곱해 추정
+    """
+    from data_loader import read_table
+
+    sample = read_table(path, nrows=sample_rows)
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    return max(1_000, int(max_memory_mb * 1024 * 1024 / (bytes_per_row * overhead)))
+
+
+def _build_forecast_frame_loop(df, freq='15min'):
+    """기존 clean_data.py의 존별 루프 방식 (동일성 확인 및 비교용)"""
+    df_agg = df.groupby(['contID', 'colDate'], as_index=False).agg(AGG_DICT)
+    df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
+
+    resampled_dfs = []
+    for cid in sorted(df_agg['contID'].unique()):
+        zone_data = df_agg[df_agg['contID'] == cid].copy()
+        zone_data = zone_data.set_index('colDate')
+        zone_resampled = zone_data.resample(freq).mean()
+        zone_resampled['contID'] = cid
+        zone_resampled.reset_index(inplace=True)
+        zone_resampled['hour'] = zone_resampled['colDate'].dt.hour
+        zone_resampled['day_of_week'] = zone_resampled['colDate'].dt.dayofweek
+        zone_resampled['rack_count'] = zone_resampled['rack_count'].ffill().bfill().round().astype(int)
+        resampled_dfs.append(zone_resampled)
+
+    df_agg = pd.concat(resampled_dfs, ignore_index=True)
+    df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
+
+    min_time = df_agg['colDate'].min()
+    max_time = df_agg['colDate'].max()
+
+    filled_dfs = []
+    for cid in sorted(df_agg['contID'].unique()):
+        zone_data = df_agg[df_agg['contID'] == cid].copy()
+        complete_times = pd.DataFrame({
+            'colDate': pd.date_range(start=min_time, end=max_time, freq=freq),
+            'contID': cid
+        })
+        zone_filled = complete_times.merge(zone_data, on=['contID', 'colDate'], how='left')
+        zone_filled['hour'] = zone_filled['colDate'].dt.hour
+        zone_filled['day_of_week'] = zone_filled['colDate'].dt.dayofweek
+        zone_filled['rack_count'] = zone_filled['rack_count'].ffill().bfill().astype(int)
+        for col in SENSOR_COLS:
+            zone_filled[col] = zone_filled[col].ffill()
+        filled_dfs.append(zone_filled)
+
+    df_agg = pd.concat(filled_dfs, ignore_index=True)
+    df_agg = df_agg.sort_values(['contID', 'colDate']).reset_index(drop=True)
+    df_agg[TARGET_COL] = df_agg.groupby('contID')['tempHot'].shift(-TARGET_STEPS)
+    df_agg = df_agg.dropna(subset=[TARGET_COL])
+    return df_agg[FINAL_COLS].reset_index(drop=True)
+
+
+def benchmark(zone_counts=(4, 100, 1000), days=14):
+    """루프 방식 vs 벡터화 방식 소요 시간 비교"""
+    from synthetic import make_cont_readings
+
+    print("="*60)
+    print(f"리샘플링 엔진 벤치마크 ({days}일, 10분 간격 원본)")
+    print("="*60)
+    print(f"{'존 수':>8} {'원본 행':>12} {'루프(s)':>10} {'벡터화(s)':>10} {'배속':>8} {'동일':>6}")
+
+    for n_zones in zone_counts:
+        raw = make_cont_readings(n_zones=n_zones, days=days)
+
+        t0 = time.perf_counter()
+        expected = _build_forecast_frame_loop(raw)
+        loop_sec = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        result = build_forecast_frame(raw)
+        vec_sec = time.perf_counter() - t0
+
+        same = expected.to_csv(index=False) == result.to_csv(index=False)
+        print(f"{n_zones:>8} {len(raw):>12,} {loop_sec:>10.2f} {vec_sec:>10.2f} "
+              f"{loop_sec / vec_sec:>7.1f}x {'OK' if same else 'DIFF':>6}")
+
+
+def benchmark_workers(worker_counts=(1, 2, 4, 8), n_zones=2000, days=14):
+    """프로세스 풀 워커 수별 리샘플링 시간 (재집계 이후 단계)"""
+    import os
+    from synthetic import make_cont_readings
+
+    raw = make_cont_readings(n_zones=n_zones, days=days)
+    df_agg = dedup_readings(raw)
+
+    print("="*60)
+    print(f"워커 수별 리샘플링 벤치마크 (존 {n_zones:,}개, 재집계 {len(df_agg):,} 행, CPU {os.cpu_count()}개)")
+    print("="*60)
+    print(f"{'워커':>6} {'시간(s)':>10} {'배속':>8} {'동일':>6}")
+
+    t0 = time.perf_counter()
+    expected = resample_to_grid(df_agg)
+    base_sec = time.perf_counter() - t0
+    print(f"{'직렬':>6} {base_sec:>10.2f} {1.0:>7.1f}x {'-':>6}")
+
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        result = resample_to_grid_parallel(df_agg, workers=workers)
+        sec = time.perf_counter() - t0
+        same = expected.to_csv(index=False) == result.to_csv(index=False)
+        print(f"{workers:>6} {sec:>10.2f} {base_sec / sec:>7.1f}x {'OK' if same else 'DIFF':>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="리샘플링 엔진 벤치마크")
+    parser.add_argument('--zones', type=int, nargs='+', default=[4, 100, 1000])
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="지정 시 워커 수별 확장성 벤치마크 (--zones 첫 값 사용)")
+    args = parser.parse_args()
+
+    if args.workers:
+        benchmark_workers(worker_counts=args.workers, n_zones=args.zones[0], days=args.days)
+    else:
+        benchmark(zone_counts=args.zones, days=args.days)
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+로컬 예측 추론 서버 (Azure AutoML models/model.pkl을 한 번만 로드해서 상주)
+
+04/10/11/12 스크립트는 실행할 때마다 joblib.load(MODEL_PATH)로 AutoML 파이프라인과 azureml 런타임을
+몇 초씩 올린 뒤 forecast 한 번만 호출한다. 이 서버는 모델을 메모리에 두고 요청을 받는다.
+- 요청: 존별 컨텍스트 창 (contID, colDate, 센서/달력 컬럼 행들. target_tempHot_30min은 빼고 보냄)
+- 동시에 들어온 요청을 짧은 창(max_wait_ms)으로 모아 여러 존(grain)을 한 번의 model.forecast로 계산
+  같은 존이 두 요청에 있으면 (grain, 시각) 중복이 되므로 다음 forecast 호출로 나눈다
+- forecast_destination 요청(12 방식, 입력 없이 학습 끝 이후 예측)은 따로 한 번 호출
+- 응답: 행별 target_tempHot_30min 예측 + 요청별 시간 (대기 / forecast / 전체 ms, 같이 묶인 요청 수)
+
+스크립트/대시보드는 get_forecaster()로 얻은 객체의 forecast(X)만 호출한다.
+서버가 떠 있으면 HTTP 클라이언트, 없으면 그 프로세스에서 모델을 로드하는 LocalForecaster (결과 형식 같음).
+
+사용 방법:
+    python forecast_server.py --port 8766                 # 서버 (모델 로드 1번)
+    python forecast_server.py --model models/onnx/model.onnx   # onnx_backend.py로 변환한 sklearn 회귀기 (AutoML 아님)
+    curl localhost:8766/info
+    curl -X POST localhost:8766/forecast -d '{"windows": {"1": [{"colDate": "2025-08-01 00:00:00", ...}]}}'
+
+    forecaster = get_forecaster()                         # 서버 있으면 클라이언트, 없으면 로컬 로드
+    predictions, timing = forecaster.forecast(X_test)     # contID, colDate, target_tempHot_30min
+
+    python forecast_server.py --bench --zones 4 --window 96   # 요청별 forecast vs 묶음 forecast
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from anomaly_service import LatencyStats
+from fingerprint import file_digest
+from forecast_context import lookback_spec
+from onnx_backend import OnnxForecaster
+
+MODEL_PATH = './models/model.pkl'
+TARGET_COL = 'target_tempHot_30min'
+GRAIN_COL = 'contID'
+TIME_COL = 'colDate'
+
+HOST = '127.0.0.1'
+PORT = 8766
+DEFAULT_URL = f'http://{HOST}:{PORT}'
+
+MAX_BATCH_ROWS = 200_000  # 한 번에 모을 최대 행 수
+MAX_WAIT_MS = 5.0         # 첫 요청 이후 다른 요청을 기다리는 최대 시간
+
+_DIGEST_MEMO = {}          # 모델 파일 지문 (크기/mtime이 같으면 info()마다 다시 해시하지 않음)
+
+
+def load_forecaster(path=MODEL_PATH):
+    """
+    AutoML 모델 로드 → (model, 로드 시간 초)
+
+    .onnx면 ONNX Runtime 세션 (onnx_backend.OnnxForecaster): sklearn 회귀기를 변환한 그래프만 지원하며
+    행마다 입력 컬럼 → 예측 (AutoML처럼 lag 특성을 만들지 않고 forecast_destination 요청은 받지 않음)
+    """
+    if not os.path.exists(path):
+        if path.endswith('.onnx'):
+            raise FileNotFoundError(f"{path}가 없습니다. python onnx_backend.py --convert --forecaster <sklearn 회귀기 pkl>로 "
+                                    f"만드세요 (AutoML model.pkl은 변환되지 않음).")
+        raise FileNotFoundError(f"{path}가 없습니다. Azure ML Studio에서 모델을 다운로드해 models/에 두세요.")
+    start = time.perf_counter()
+    model = OnnxForecaster(path) if path.endswith('.onnx') else joblib.load(path)
+    return model, time.perf_counter() - start
+
+
+def to_frame(rows):
+    """JSON 행 목록 → 모델 입력 DataFrame (colDate datetime, target 컬럼 제외)"""
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if TIME_COL in df and not pd.api.types.is_datetime64_any_dtype(df[TIME_COL]):
+        df[TIME_COL] = pd.to_datetime(df[TIME_COL])
+    return df.drop(columns=[TARGET_COL], errors='ignore')
+
+
+def windows_to_frame(windows):
+    """{contID: [행, ...]} 존별 컨텍스트 창 → 하나의 DataFrame (contID 컬럼 추가)"""
+    frames = []
+    for cont_id, rows in windows.items():
+        frame = to_frame(rows)
+        key = int(cont_id) if isinstance(cont_id, str) and cont_id.isdigit() else cont_id
+        frames.append(frame.assign(**{GRAIN_COL: key}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def run_forecast(model, X=None, forecast_destination=None):
+    """
+    model.forecast 한 번 → 행별 예측 DataFrame (contID, colDate, target_tempHot_30min)
+
+    X가 있으면 예측값은 입력 행 순서와 같다고 보고(04/07/11과 같은 가정) 입력의 contID/colDate를 붙이고,
+    forecast_destination만 주면 X_trans 인덱스(grain, time_index)에서 꺼낸다.
+    """
+    if X is not None:
+        y_pred, _ = model.forecast(X)
+        y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+        out = X[[GRAIN_COL, TIME_COL]].reset_index(drop=True).copy()
+        out[TARGET_COL] = y_pred[:len(out)]
+        return out
+
+    y_pred, X_trans = model.forecast(X_pred=None, y_pred=None, forecast_destination=forecast_destination)
+    index = X_trans.reset_index()
+    out = pd.DataFrame({
+        GRAIN_COL: index[GRAIN_COL].to_numpy() if GRAIN_COL in index else None,
+        TIME_COL: index['time_index' if 'time_index' in index else TIME_COL].to_numpy(),
+    })
+    out[TARGET_COL] = np.asarray(y_pred, dtype=np.float64).ravel()[:len(out)]
+    return out
+
+
+class ForecastService:
+    """
+    상주 모델 + 요청 묶기
+
+    submit()은 요청을 큐에 넣고 Future를 돌려준다. 백그라운드 스레드가 첫 요청 이후 max_wait_ms 동안
+    (또는 max_rows행이 찰 때까지) 모은 요청을 grain이 겹치지 않는 묶음으로 나눠 묶음마다 forecast 한 번.
+    """
+
+    def __init__(self, model, model_path=MODEL_PATH, load_sec=None, max_rows=MAX_BATCH_ROWS,
+                 max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.model_path = model_path
+        self.load_sec = load_sec
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.stats = LatencyStats()
+        self.forecast_calls = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, X=None, forecast_destination=None):
+        """X: 컨텍스트 창 DataFrame → Future (결과: (예측 DataFrame, 시간 dict))"""
+        if X is None and forecast_destination is None:
+            raise ValueError("rows/windows 또는 forecast_destination이 필요합니다.")
+        if X is not None:
+            X = to_frame(X)
+            missing = [c for c in (GRAIN_COL, TIME_COL) if c not in X]
+            if missing:
+                raise ValueError(f"필수 컬럼 없음: {missing}")
+            grains = frozenset(pd.unique(X[GRAIN_COL]).tolist())
+        else:
+            forecast_destination = pd.Timestamp(forecast_destination)
+            grains = None
+        future = Future()
+        self._queue.put((X, grains, forecast_destination, future, time.perf_counter()))
+        return future
+
+    def forecast(self, X=None, forecast_destination=None):
+        return self.submit(X, forecast_destination).result()
+
+    def info(self):
+        model = self.model
+        return {
+            'model_path': self.model_path,
+            'model_type': f"{type(model).__module__}.{type(model).__name__}",
+            'load_sec': self.load_sec,
+            'fingerprint': file_digest(self.model_path, _DIGEST_MEMO) if os.path.exists(self.model_path) else None,
+            'max_horizon': getattr(model, 'max_horizon', None),
+            'lookback': lookback_spec(model),
+            'methods': sorted(m for m in dir(model) if not m.startswith('_') and callable(getattr(model, m, None))),
+        }
+
+    def _collect(self, first):
+        """첫 요청 이후 창 안에 들어온 요청을 모음 (종료 신호를 만나면 거기까지)"""
+        batch = [first]
+        size = len(first[0]) if first[0] is not None else 0
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0]) if item[0] is not None else 0
+        return batch
+
+    @staticmethod
+    def _rounds(batch):
+        """grain이 겹치지 않는 묶음으로 나눔 (도착 순서 유지, destination 요청은 단독)"""
+        rounds = []
+        for item in batch:
+            grains = item[1]
+            if grains is not None:
+                for items, used in rounds:
+                    if used is not None and used.isdisjoint(grains):
+                        items.append(item)
+                        used |= grains
+                        break
+                else:
+                    rounds.append(([item], set(grains)))
+            else:
+                rounds.append(([item], None))
+        return [items for items, _ in rounds]
+
+    def _forecast_round(self, items):
+        started = time.perf_counter()
+        try:
+            if items[0][0] is None:
+                results = [run_forecast(self.model, forecast_destination=items[0][2])]
+            else:
+                frames = [item[0] for item in items]
+                X = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+                out = run_forecast(self.model, X)
+                bounds = np.cumsum([0] + [len(f) for f in frames])
+                results = [out.iloc[bounds[i]:bounds[i + 1]].reset_index(drop=True) for i in range(len(frames))]
+        except Exception as e:
+            for item in items:
+                item[3].set_exception(e)
+            return
+        done = time.perf_counter()
+        self.forecast_calls += 1
+        rows = sum(len(item[0]) for item in items if item[0] is not None)
+        for (X, _, _, future, submitted), result in zip(items, results):
+            timing = {
+                'queue_ms': (started - submitted) * 1000,
+                'forecast_ms': (done - started) * 1000,
+                'total_ms': (done - submitted) * 1000,
+                'coalesced': len(items),
+                'batch_rows': rows,
+            }
+            future.set_result((result, timing))
+            self.stats.record(done - submitted, len(result))
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            for items in self._rounds(self._collect(first)):
+                self._forecast_round(items)
+            self.stats.record_batch()
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+def _records(df):
+    """DataFrame → JSON 행 (colDate ISO 문자열, NaN → null)"""
+    return json.loads(df.to_json(orient='records', date_format='iso', date_unit='s'))
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(200, {**service.stats.to_dict(), 'forecast_calls': service.forecast_calls})
+            elif self.path == '/info':
+                self._send(200, service.info())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/forecast':
+                self._send(404, {'error': 'not found'})
+                return
+            received = time.perf_counter()
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not isinstance(request, dict):
+                    raise ValueError(f"요청 본문은 JSON 객체여야 합니다 ({type(request).__name__})")
+                if 'windows' in request:
+                    X = windows_to_frame(request['windows'])
+                elif 'rows' in request:
+                    X = to_frame(request['rows'])
+                else:
+                    X = None
+                future = service.submit(X, request.get('forecast_destination'))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            try:
+                predictions, timing = future.result()
+            except Exception as e:
+                self._send(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            timing['server_ms'] = (time.perf_counter() - received) * 1000
+            self._send(200, {'predictions': _records(predictions), 'timing': timing})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(service, host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"✅ 예측 서버: http://{host}:{port}  (POST /forecast, GET /info, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+# ---------------------------------------------------------------------------
+# 클라이언트
+# ---------------------------------------------------------------------------
+
+class ForecastClient:
+    """서버 클라이언트: forecast(X) → (예측 DataFrame, 시간 dict)"""
+
+    def __init__(self, url=DEFAULT_URL, timeout=60):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"예측 서버 오류 ({e.code}): {json.loads(e.read()).get('error')}") from None
+
+    def available(self):
+        try:
+            self._request('/info')
+            return True
+        except (OSError, RuntimeError):
+            return False
+
+    def info(self):
+        return self._request('/info')
+
+    def forecast(self, X=None, forecast_destination=None):
+        started = time.perf_counter()
+        payload = {}
+        if X is not None:
+            payload['rows'] = _records(X.drop(columns=[TARGET_COL], errors='ignore'))
+        if forecast_destination is not None:
+            payload['forecast_destination'] = str(pd.Timestamp(forecast_destination))
+        response = self._request('/forecast', payload)
+        predictions = pd.DataFrame(response['predictions'], columns=[GRAIN_COL, TIME_COL, TARGET_COL])
+        predictions[TIME_COL] = pd.to_datetime(predictions[TIME_COL])
+        timing = {**response['timing'], 'client_ms': (time.perf_counter() - started) * 1000}
+        return predictions, timing
+
+
+class LocalForecaster:
+    """서버가 없을 때: 이 프로세스에서 모델을 로드해 같은 형식으로 예측"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model, self.load_sec = load_forecaster(model_path)
+        self.model_path = model_path
+
+    def info(self):
+        return ForecastService(self.model, self.model_path, self.load_sec).info()
+
+    def forecast(self, X=None, forecast_destination=None):
+        started = time.perf_counter()
+        predictions = run_forecast(self.model, None if X is None else to_frame(X.copy()), forecast_destination)
+        elapsed = (time.perf_counter() - started) * 1000
+        return predictions, {'forecast_ms': elapsed, 'total_ms': elapsed, 'coalesced': 1}
+
+
+def get_forecaster(url=DEFAULT_URL, model_path=MODEL_PATH):
+    """예측 서버가 떠 있으면 ForecastClient, 아니면 LocalForecaster (모델 로드)"""
+    client = ForecastClient(url)
+    if client.available():
+        print(f"예측 서버 사용: {url}")
+        return client
+    print(f"예측 서버 없음 ({url}) → 모델 직접 로드: {model_path}")
+    return LocalForecaster(model_path)
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크
+# ---------------------------------------------------------------------------
+
+def benchmark(service, zones=4, window=96, rounds=5):
+    """존별 요청을 동시에 보냈을 때: 요청마다 forecast vs 서버에서 묶어서 forecast"""
+    from data_loader import load_forecast_clean
+    from schema import to_model_frame
+
+    df = to_model_frame(load_forecast_clean(compact=True)).drop(columns=[TARGET_COL], errors='ignore')
+    zone_ids = sorted(df[GRAIN_COL].unique())[:zones]
+    windows = [df[df[GRAIN_COL] == z].tail(window).reset_index(drop=True) for z in zone_ids]
+
+    print("="*60)
+    print(f"예측 서버 벤치마크 (존 {len(windows)}개 × 컨텍스트 {window}행, 모델 로드 {service.load_sec:.2f}초)")
+    print("="*60)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for w in windows:
+            run_forecast(service.model, w)
+    direct = (time.perf_counter() - start) / rounds
+    print(f"요청마다 forecast (순차):   {direct * 1000:8.1f} ms / 라운드")
+
+    calls_before = service.forecast_calls
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(windows)) as pool:
+        for _ in range(rounds):
+            for _, timing in pool.map(lambda w: service.forecast(w), windows):
+                latencies.append(timing['total_ms'])
+    served = (time.perf_counter() - start) / rounds
+    calls = (service.forecast_calls - calls_before) / rounds
+    print(f"서버 묶음 forecast (동시):  {served * 1000:8.1f} ms / 라운드 "
+          f"(forecast {calls:.1f}회/라운드, 요청 p50 {np.percentile(latencies, 50):.1f}ms)")
+
+    merged = pd.concat(windows, ignore_index=True)
+    expected = run_forecast(service.model, merged)
+    got = pd.concat([service.forecast(w)[0] for w in windows], ignore_index=True)
+    diff = np.nanmax(np.abs(expected[TARGET_COL].to_numpy() - got[TARGET_COL].to_numpy()))
+    print(f"한 번에 forecast한 결과와 차이: {diff:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 예측 추론 서버")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--max-rows', type=int, default=MAX_BATCH_ROWS, help="한 번에 모을 최대 행 수")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS, help="요청을 모으는 최대 대기 시간 (ms)")
+    parser.add_argument('--bench', action='store_true', help="서버 대신 묶음 효과 측정")
+    parser.add_argument('--zones', type=int, default=4)
+    parser.add_argument('--window', type=int, default=96, help="존별 컨텍스트 행 수 (15분 × 96 = 하루)")
+    args = parser.parse_args()
+
+    print(f"모델 로드 중: {args.model}")
+    model, load_sec = load_forecaster(args.model)
+    print(f"✅ 모델 로드 {load_sec:.2f}초: {type(model).__name__}")
+    if isinstance(model, OnnxForecaster):
+        print(f"  ONNX 회귀기: 입력 {model.input_names} → 행마다 예측 "
+              f"(lag 특성 없음, 요청 행에 특성 컬럼 {model.feature_cols}가 있어야 함, forecast_destination 불가)")
+    service = ForecastService(model, args.model, load_sec, max_rows=args.max_rows,
+                              max_wait_ms=args.max_wait_ms).start()
+    if args.bench:
+        benchmark(service, zones=args.zones, window=args.window)
+        service.stop()
+    else:
+        serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
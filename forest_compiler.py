@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+IsolationForest → NumPy 배열 컴파일러
+
+sklearn의 score_samples/predict는 estimators_를 파이썬 루프로 하나씩 돌고,
+03에서는 같은 행렬에 두 번 호출해서 숲을 두 번 탐색한다.
+여기서는 학습된 숲을 연속 배열로 펼쳐 두고 모든 트리를 한 번에 탐색해서
+점수와 라벨을 같이 계산한다.
+
+- 트리마다 최대 깊이 D의 완전 이진 트리로 펼침 (빈 자리는 항상 왼쪽으로 가는 가짜 노드)
+  → 자식 번호는 2*node + 1 + (x > threshold), left/right 배열 조회가 필요 없음
+- 잎 값 = 잎까지 깊이 + 잎 샘플 수 보정 c(n) - 1 (sklearn _decision_path_lengths + _average_path_length_per_tree)
+- 입력은 sklearn 트리처럼 float32로 바꿔 비교 (threshold는 같은 결과가 나오는 float32로 내림),
+  NaN은 missing_go_to_left를 따름
+- 잎 값 합은 sklearn과 같은 트리 순서로 더함 → 점수 차이 1e-9 이내, 라벨 동일
+
+사용 방법:
+    forest = compile_forest(iso_forest)           # 또는 load_forest('models/...npz')
+    scores, labels = forest.score_and_label(X_scaled)
+    export_forest(iso_forest, 'models/anomaly_forest_cont.npz')
+
+벤치마크:
+    python forest_compiler.py --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+CHUNK_ROWS = 256  # (트리 수 × CHUNK_ROWS) 노드 배열이 캐시에 들어가는 크기
+
+
+def _average_path_length(n):
+    """sklearn.ensemble._iforest._average_path_length와 같은 식 (n개 샘플 트리의 평균 경로 길이)"""
+    n = np.asarray(n, dtype=np.float64)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return out
+
+
+class CompiledForest:
+    """
+    펼친 숲 (트리 t의 완전 트리 위치 p → 배열 인덱스 t * n_inner + p)
+
+    feature, threshold, missing_left: (n_trees * n_inner,)  내부 노드
+    leaf_value: (n_trees * n_leaves,)  마지막 층 위치별 경로 길이
+    """
+
+    def __init__(self, feature, threshold, missing_left, leaf_value, depth, n_features,
+                 denominator, offset, threshold32=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.leaf_value = leaf_value
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.denominator = float(denominator)
+        self.offset = float(offset)
+        self.n_inner = 2 ** self.depth - 1
+        self.n_leaves = 2 ** self.depth
+        self.n_trees = len(leaf_value) // self.n_leaves
+        # float32 입력 x에 대해 x > threshold ⇔ x > (threshold 이하 최대 float32) → 비교를 float32로
+        if threshold32 is None:
+            threshold32 = threshold.astype(np.float32)
+            over = threshold32.astype(np.float64) > threshold
+            threshold32[over] = np.nextafter(threshold32[over], np.float32(-np.inf))
+        self.threshold32 = threshold32
+
+    def path_lengths(self, X):
+        """X: (n, n_features) 스케일된 입력 → 트리 전체 경로 길이 합 (n,)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"입력 컬럼 수가 다릅니다: {X.shape}, 필요: (n, {self.n_features})")
+        has_nan = bool(np.isnan(X).any())
+        rows = min(CHUNK_ROWS, max(len(X), 1))
+
+        # node: 트리 t의 위치 p를 전역 인덱스 g = t * n_inner + p로 들고 다님
+        # 자식: 2p + 1 + go → g' = 2g + (1 - t * n_inner) + go
+        base = (np.arange(self.n_trees, dtype=np.int32) * self.n_inner)[:, None]
+        child_shift = 1 - base
+        leaf_shift = (np.arange(self.n_trees, dtype=np.int32) * self.n_leaves)[:, None] - base - self.n_inner
+        feature_off = self.feature * np.int32(rows)
+        cols = np.arange(rows, dtype=np.int32)[None, :]
+
+        node = np.empty((self.n_trees, rows), dtype=np.int32)
+        xi = np.empty_like(node)
+        x = np.empty(node.shape, dtype=np.float32)
+        th = np.empty_like(x)
+        go = np.empty(node.shape, dtype=bool)
+        block_t = np.zeros((self.n_features, rows), dtype=np.float32)  # 청크 전치 (특성 × 행)
+        flat = block_t.ravel()
+
+        depths = np.empty(len(X))
+        for start in range(0, len(X), rows):
+            block = X[start:start + rows]
+            n = len(block)
+            block_t[:, :n] = block.T
+            node[:] = base
+            for _ in range(self.depth):
+                feature_off.take(node, out=xi)
+                xi += cols
+                flat.take(xi, out=x)
+                self.threshold32.take(node, out=th)
+                np.greater(x, th, out=go)
+                if has_nan:
+                    missing = np.isnan(x)
+                    go[missing] = ~self.missing_left.take(node[missing])
+                node *= 2
+                node += child_shift
+                node += go
+            node += leaf_shift
+            # axis=0 합은 트리 순서대로 차례로 더함 (sklearn과 같은 순서 → 같은 값)
+            depths[start:start + n] = self.leaf_value.take(node).sum(axis=0)[:n]
+        return depths
+
+    def score_samples(self, X):
+        """IsolationForest.score_samples와 같은 점수 (낮을수록 이상)"""
+        if not self.denominator:
+            return -np.ones(len(X))
+        return -(2 ** (-self.path_lengths(X) / self.denominator))
+
+    def score_and_label(self, X):
+        """(anomaly_score, is_anomaly): is_anomaly = score < offset_ (predict == -1과 같음)"""
+        scores = self.score_samples(X)
+        return scores, (scores < self.offset).astype(np.int8)
+
+    def to_arrays(self):
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'missing_left': self.missing_left,
+            'leaf_value': self.leaf_value, 'depth': self.depth, 'n_features': self.n_features,
+            'denominator': self.denominator, 'offset': self.offset,
+        }
+
+
+def _flatten_tree(tree, features, depth, path_length):
+    """트리 하나 → 완전 트리 배열 (feature, threshold, missing_left, leaf_value)"""
+    n_inner, n_leaves = 2 ** depth - 1, 2 ** depth
+    feature = np.zeros(n_inner, dtype=np.int32)
+    threshold = np.full(n_inner, np.inf)
+    missing_left = np.ones(n_inner, dtype=bool)
+    leaf_value = np.zeros(n_leaves)
+
+    t = tree.tree_
+    mgl = getattr(t, 'missing_go_to_left', np.ones(t.node_count, dtype=bool))
+    stack = [(0, 0, 0)]  # (원래 노드, 완전 트리 위치, 깊이)
+    while stack:
+        node, pos, level = stack.pop()
+        if t.children_left[node] == -1:
+            # 잎: 아래 남은 층은 모두 왼쪽 → 마지막 층의 가장 왼쪽 자리에 값
+            while level < depth:
+                pos, level = 2 * pos + 1, level + 1
+            leaf_value[pos - n_inner] = path_length[node]
+            continue
+        feature[pos] = features[t.feature[node]]
+        threshold[pos] = t.threshold[node]
+        missing_left[pos] = bool(mgl[node])
+        stack.append((t.children_left[node], 2 * pos + 1, level + 1))
+        stack.append((t.children_right[node], 2 * pos + 2, level + 1))
+    return feature, threshold, missing_left, leaf_value
+
+
+def compile_forest(model):
+    """학습된 IsolationForest → CompiledForest"""
+    depth = max(max(est.tree_.max_depth for est in model.estimators_), 1)
+    parts = []
+    for est, features in zip(model.estimators_, model.estimators_features_):
+        t = est.tree_
+        node_depth = np.zeros(t.node_count)
+        for node in range(t.node_count):
+            for child in (t.children_left[node], t.children_right[node]):
+                if child != -1:
+                    node_depth[child] = node_depth[node] + 1
+        # sklearn: 잎 값 = _decision_path_lengths(깊이 + 1) + c(잎 샘플 수) - 1
+        path_length = (node_depth + 1.0) + _average_path_length(t.n_node_samples) - 1.0
+        parts.append(_flatten_tree(est, np.asarray(features), depth, path_length))
+
+    feature, threshold, missing_left, leaf_value = (np.concatenate(a) for a in zip(*parts))
+    denominator = len(model.estimators_) * _average_path_length([model._max_samples])[0]
+    return CompiledForest(feature, threshold, missing_left, leaf_value, depth,
+                          model.n_features_in_, denominator, model.offset_)
+
+
+def export_forest(model, path):
+    """펼친 배열을 .npz로 저장 (CompiledForest 또는 IsolationForest)"""
+    forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+    np.savez(path, **forest.to_arrays())
+    return forest
+
+
+def load_forest(path):
+    with np.load(path) as data:
+        arrays = {k: data[k] for k in data.files}
+    for key in ('depth', 'n_features', 'denominator', 'offset'):
+        arrays[key] = arrays[key].item()
+    return CompiledForest(**arrays)
+
+
+def benchmark(rows=1_000_000, model_dir='./models'):
+    """sklearn score_samples + predict vs 컴파일 숲 한 번 탐색 (컨테인먼트/랙 모델)"""
+    import joblib
+    from synthetic import make_cont_readings, make_rack_readings, SENSOR_COLS
+
+    print("="*60)
+    print(f"IsolationForest 컴파일 벤치마크 ({rows:,}행)")
+    print("="*60)
+    print(f"{'모델':>6} {'sklearn(s)':>11} {'컴파일(s)':>10} {'배속':>7} {'최대 점수 차':>12} {'라벨':>6}")
+
+    makers = {
+        'cont': lambda: make_cont_readings(n_zones=50, days=rows // (50 * 144) + 1),
+        'rack': lambda: make_rack_readings(n_racks=100, days=rows // (100 * 144) + 1),
+    }
+    for kind, make in makers.items():
+        model = joblib.load(f'{model_dir}/anomaly_detector_{kind}.pkl')
+        scaler = joblib.load(f'{model_dir}/scaler_{kind}.pkl')
+        X = scaler.transform(make()[SENSOR_COLS].to_numpy()[:rows])
+
+        t0 = time.perf_counter()
+        expected_scores = model.score_samples(X)
+        expected_labels = (model.predict(X) == -1).astype(np.int8)
+        sk_sec = time.perf_counter() - t0
+
+        forest = compile_forest(model)
+        t0 = time.perf_counter()
+        scores, labels = forest.score_and_label(X)
+        fast_sec = time.perf_counter() - t0
+
+        diff = float(np.max(np.abs(scores - expected_scores)))
+        same = np.array_equal(labels, expected_labels) and diff <= 1e-9
+        print(f"{kind:>6} {sk_sec:>11.2f} {fast_sec:>10.2f} {sk_sec / fast_sec:>6.1f}x {diff:>12.1e} {'OK' if same else 'DIFF':>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IsolationForest 컴파일 벤치마크")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--model-dir', default='./models')
+    args = parser.parse_args()
+
+    benchmark(rows=args.rows, model_dir=args.model_dir)
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+ONNX Runtime 추론 백엔드 (예측 모델 + 스케일러/IsolationForest, CPU)
+
+ONNX_CONVERSION_GUIDE.md의 엣지 배포를 로컬 코드로 옮긴 것. 추론 경로가 피클(AutoML 래퍼/sklearn 객체)을
+통째로 로드하지 않고, 변환한 .onnx 그래프를 onnxruntime으로 실행한다. 입력은 특성 계산이 끝난
+float32 배치 (n, 특성 수) 또는 특성 컬럼이 있는 DataFrame.
+
+    models/onnx/anomaly_cont.onnx     StandardScaler + IsolationForest (03 피클 → 변환)
+    models/onnx/anomaly_rack.onnx
+    models/onnx/model.onnx            예측 모델 (--forecaster로 넘긴 sklearn 회귀기/Pipeline → 변환)
+    models/onnx/reference_forecaster.onnx   --forecaster 없이 확인/벤치마크할 때 쓰는 참조 회귀기
+
+인터페이스는 피클 경로와 같다:
+    pipeline = load_onnx_pipeline('cont')         # AnomalyPipeline과 같음
+    scores, labels = pipeline.score(df)           # (score_samples, is_anomaly)
+    model = OnnxForecaster('models/onnx/model.onnx')
+    y_pred, X = model.forecast(X)                 # AutoML model.forecast와 같음 (forecast_server.run_forecast에 그대로)
+
+그래프 메타데이터(metadata_props)에 특성 컬럼, IsolationForest offset, max_horizon/lag 등이 들어간다.
+그래프는 float32로 계산하므로 sklearn(float64)과 점수가 1e-6 안쪽에서 다를 수 있다 (--check로 확인).
+
+예측 모델은 행마다 입력 컬럼 → 예측값인 sklearn 회귀기만 지원한다 (확인한 것은 여기서 변환한 그래프뿐).
+AutoML 래퍼처럼 lag/rolling 특성을 만들지 않으므로 입력 행에 특성이 이미 있어야 하고, forecast_destination만으로는
+예측할 수 없다. Azure AutoML 예측 모델을 ONNX로 내보낸 그래프는 입력/출력 구성이 달라 이 경로로 확인하지 않았다.
+
+    python onnx_backend.py --convert            # models/*.pkl → models/onnx/*.onnx
+    python onnx_backend.py --check              # 피클 vs ONNX 점수/라벨/예측 일치
+    python onnx_backend.py --bench              # 로드 시간, 배치별 지연, RSS (joblib vs onnxruntime, 각각 새 프로세스)
+
+필요 패키지: onnxruntime (추론), skl2onnx + onnx (변환, 학습 환경에서만)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_pipeline import AnomalyPipeline, FEATURE_COLS
+from forest_compiler import compile_forest
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+MODEL_DIR = './models'
+ONNX_DIR = './models/onnx'
+LEVELS = ('cont', 'rack')
+FORECAST_FEATURES = ['tempHot', 'tempCold', 'humiHot', 'humiCold']
+FORECAST_ATTRS = ('max_horizon', 'target_lags', 'target_rolling_window_size', 'data_frequency')
+TARGET_OPSET = {'': 17, 'ai.onnx.ml': 3}
+IR_VERSION = 8                      # opset 17에 맞는 IR (onnx 최신 기본값은 onnxruntime이 못 읽을 수 있음)
+SCORE_ATOL = 1e-5
+
+BENCH_BATCHES = (1, 96, 10_000)
+
+
+def anomaly_path(level, root=ONNX_DIR):
+    return os.path.join(root, f'anomaly_{level}.onnx')
+
+
+def forecast_path(root=ONNX_DIR, reference=False):
+    return os.path.join(root, 'reference_forecaster.onnx' if reference else 'model.onnx')
+
+
+# ---------------------------------------------------------------------------
+# 변환 (onnx / skl2onnx, 학습 환경)
+# ---------------------------------------------------------------------------
+
+def _save_onnx(onx, metadata, path):
+    """ModelProto + metadata_props(JSON 값) → path (임시 파일 후 교체)"""
+    for key, value in metadata.items():
+        prop = onx.metadata_props.add()
+        prop.key, prop.value = key, json.dumps(value)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(onx.SerializeToString())
+    os.replace(tmp, path)
+    return path
+
+
+def anomaly_graph(pipeline):
+    """
+    AnomalyPipeline (스케일 + 펼친 숲) → TreeEnsembleRegressor 하나 + 점수 식
+
+    skl2onnx는 트리마다 노드를 따로 만들어(100트리 → 2,700여 노드) 세션 생성과 실행이 느리다.
+    여기서는 forest_compiler의 완전 트리 배열을 그대로 옮긴다.
+    - 스케일러는 threshold에 접어 넣음: (x - mean) / scale <= t  ⇔  x <= t * scale + mean
+      (float32 입력에서 같은 결과가 나오는 float32로 내림 → 원본 단위 float32 입력을 그대로 비교)
+    - 잎 가중치 = 경로 길이, 트리 합 S → score = -2^(-S / denominator), label = score < offset
+    """
+    from onnx import TensorProto, helper
+
+    forest = pipeline.forest
+    n_trees, n_inner, n_leaves = forest.n_trees, forest.n_inner, forest.n_leaves
+    feature = np.asarray(forest.feature).reshape(n_trees, n_inner)
+    mean, scale = np.asarray(pipeline.mean), np.asarray(pipeline.scale)
+    raw = np.asarray(forest.threshold).reshape(n_trees, n_inner) * scale[feature] + mean[feature]
+    raw32 = raw.astype(np.float32)
+    over = raw32.astype(np.float64) > raw
+    raw32[over] = np.nextafter(raw32[over], np.float32(-np.inf))
+
+    pos = np.arange(n_inner)
+    n_nodes = n_inner + n_leaves
+    tree_ids = np.repeat(np.arange(n_trees), n_nodes)
+    inner_tail = np.zeros(n_leaves, dtype=np.int64)
+    ensemble = helper.make_node(
+        'TreeEnsembleRegressor', ['X'], ['path_sum'], domain='ai.onnx.ml',
+        n_targets=1, aggregate_function='SUM', post_transform='NONE',
+        nodes_treeids=tree_ids.tolist(),
+        nodes_nodeids=np.tile(np.arange(n_nodes), n_trees).tolist(),
+        nodes_featureids=np.hstack([feature, np.tile(inner_tail, (n_trees, 1))]).ravel().tolist(),
+        nodes_values=np.hstack([raw32, np.zeros((n_trees, n_leaves), np.float32)]).ravel().tolist(),
+        nodes_modes=(['BRANCH_LEQ'] * n_inner + ['LEAF'] * n_leaves) * n_trees,
+        nodes_truenodeids=np.tile(np.concatenate([2 * pos + 1, inner_tail]), n_trees).tolist(),
+        nodes_falsenodeids=np.tile(np.concatenate([2 * pos + 2, inner_tail]), n_trees).tolist(),
+        nodes_missing_value_tracks_true=np.hstack([
+            np.asarray(forest.missing_left).reshape(n_trees, n_inner),
+            np.zeros((n_trees, n_leaves), dtype=bool)]).astype(np.int64).ravel().tolist(),
+        target_treeids=np.repeat(np.arange(n_trees), n_leaves).tolist(),
+        target_nodeids=np.tile(np.arange(n_inner, n_nodes), n_trees).tolist(),
+        target_ids=[0] * (n_trees * n_leaves),
+        target_weights=np.asarray(forest.leaf_value, dtype=np.float32).tolist(),
+    )
+    const = lambda name, value: helper.make_tensor(name, TensorProto.FLOAT, [], [value])
+    nodes = [
+        ensemble,
+        helper.make_node('Div', ['path_sum', 'neg_denominator'], ['exponent']),
+        helper.make_node('Pow', ['two', 'exponent'], ['power']),
+        helper.make_node('Neg', ['power'], ['score_2d']),
+        helper.make_node('Flatten', ['score_2d'], ['scores'], axis=0),
+        helper.make_node('Less', ['scores', 'offset'], ['label']),
+    ]
+    graph = helper.make_graph(
+        nodes, 'isolation_forest',
+        [helper.make_tensor_value_info('X', TensorProto.FLOAT, [None, forest.n_features])],
+        [helper.make_tensor_value_info('scores', TensorProto.FLOAT, [1, None]),
+         helper.make_tensor_value_info('label', TensorProto.BOOL, [1, None])],
+        initializer=[const('neg_denominator', -forest.denominator), const('two', 2.0),
+                     const('offset', forest.offset)],
+    )
+    opsets = [helper.make_opsetid(domain, version) for domain, version in TARGET_OPSET.items()]
+    return helper.make_model(graph, opset_imports=opsets, producer_name='onnx_backend', ir_version=IR_VERSION)
+
+
+def convert_anomaly(level, pipeline, root=ONNX_DIR):
+    """AnomalyPipeline → models/onnx/anomaly_<level>.onnx (출력: scores = score_samples, label = 이상 여부)"""
+    metadata = {'kind': 'anomaly', 'level': level, 'feature_cols': list(pipeline.feature_cols),
+                'offset': pipeline.forest.offset, 'n_trees': pipeline.forest.n_trees,
+                'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+    return _save_onnx(anomaly_graph(pipeline), metadata, anomaly_path(level, root))
+
+
+def _column_inputs(model):
+    """첫 단계가 ColumnTransformer인 Pipeline이면 컬럼 이름으로 고르므로 그래프 입력도 컬럼마다 하나"""
+    from sklearn.compose import ColumnTransformer
+
+    steps = getattr(model, 'steps', None)
+    return isinstance(model, ColumnTransformer) or bool(steps) and isinstance(steps[0][1], ColumnTransformer)
+
+
+def convert_forecaster(model, feature_cols=FORECAST_FEATURES, path=None):
+    """
+    특성 행렬 → 예측값 sklearn 회귀기(또는 Pipeline) 변환
+
+    그래프 입력은 (n, 특성 수) float32 하나, ColumnTransformer로 시작하는 Pipeline이면 특성 컬럼마다 (n, 1).
+    AutoML 래퍼(ForecastingPipelineWrapper)는 특성 생성까지 포함해 skl2onnx로 변환되지 않는다.
+    """
+    if not hasattr(model, 'predict') or hasattr(model, 'forecast'):
+        raise ValueError(f"{type(model).__name__}는 sklearn 회귀기가 아니라 변환할 수 없습니다 "
+                         f"(ONNX 예측 경로는 sklearn 회귀기만 지원).")
+    metadata = {'kind': 'forecast', 'feature_cols': list(feature_cols),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+    for attr in FORECAST_ATTRS:
+        value = getattr(model, attr, None)
+        if value is not None:
+            metadata[attr] = value
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    if _column_inputs(model):
+        initial_types = [(col, FloatTensorType([None, 1])) for col in feature_cols]
+    else:
+        initial_types = [('X', FloatTensorType([None, len(feature_cols)]))]
+    onx = convert_sklearn(model, initial_types=initial_types, target_opset=TARGET_OPSET)
+    return _save_onnx(onx, metadata, path or forecast_path())
+
+
+# ---------------------------------------------------------------------------
+# 추론 (onnxruntime)
+# ---------------------------------------------------------------------------
+
+def open_session(path, threads=None):
+    """CPU InferenceSession + 메타데이터 dict"""
+    if ort is None:
+        raise ImportError("onnxruntime이 없습니다: pip install onnxruntime")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path}가 없습니다. python onnx_backend.py --convert를 먼저 실행하세요.")
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+    session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+    meta = {}
+    for key, value in session.get_modelmeta().custom_metadata_map.items():
+        try:
+            meta[key] = json.loads(value)
+        except ValueError:
+            meta[key] = value
+    return session, meta
+
+
+class OnnxAnomalyPipeline(AnomalyPipeline):
+    """AnomalyPipeline과 같은 matrix/score, 스케일과 숲은 ONNX 그래프 안에서 (anomaly_graph)"""
+
+    def __init__(self, path, threads=None):
+        self.session, meta = open_session(path, threads)
+        self.input_name = self.session.get_inputs()[0].name
+        self.path = path
+        super().__init__(None, None, None, meta.get('feature_cols', FEATURE_COLS), meta)
+
+    def transform(self, data):
+        """그래프 입력 (스케일 전 float32 배치)"""
+        return np.ascontiguousarray(self.matrix(data), dtype=np.float32)
+
+    def score(self, data):
+        """(anomaly_score, is_anomaly): score_samples와 같은 척도"""
+        scores, labels = self.session.run(None, {self.input_name: self.transform(data)})
+        return scores.ravel().astype(np.float64), labels.ravel().astype(np.int8)
+
+
+def load_onnx_pipeline(level, root=ONNX_DIR, threads=None):
+    return OnnxAnomalyPipeline(anomaly_path(level, root), threads)
+
+
+# 세션 입력 형식 → NumPy dtype (OnnxForecaster.feed)
+INPUT_DTYPES = {'tensor(float)': np.float32, 'tensor(double)': np.float64, 'tensor(int64)': np.int64,
+                'tensor(int32)': np.int32, 'tensor(bool)': np.bool_, 'tensor(string)': object}
+
+
+class OnnxForecaster:
+    """
+    AutoML model.forecast와 같은 인터페이스 (forecast_server.load_forecaster가 .onnx면 이것을 로드)
+
+    sklearn 회귀기를 변환한 그래프만 지원 (convert_forecaster). 행마다 예측하며 lag 특성은 만들지 않는다.
+    X_pred: 특성 컬럼이 있는 DataFrame 또는 이미 특성 계산된 (n, 특성 수) 배열. 예측값은 입력 행 순서.
+    세션 입력은 그래프에 선언된 이름대로 채운다 (feed). 첫 번째 출력을 예측값으로 쓴다.
+    메타데이터의 max_horizon/target_lags/... 는 속성으로 노출 (forecast_context.lookback_spec이 읽음).
+    """
+
+    def __init__(self, path=None, threads=None):
+        self.path = path or forecast_path()
+        self.session, self.meta = open_session(self.path, threads)
+        self.inputs = self.session.get_inputs()
+        self.input_names = [inp.name for inp in self.inputs]
+        self.output_name = self.session.get_outputs()[0].name
+        self.feature_cols = list(self.meta.get('feature_cols', FORECAST_FEATURES))
+        for attr in FORECAST_ATTRS:
+            if attr in self.meta:
+                setattr(self, attr, self.meta[attr])
+
+    def matrix(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_cols].to_numpy(dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def feed(self, X):
+        """
+        세션 입력 {이름: 배열}
+
+        입력이 하나이고 그 이름이 X의 컬럼이 아니면 (n, 특성 수) float32 행렬 (convert_forecaster 기본 형식).
+        그 밖에는 입력 이름마다 X의 같은 이름 컬럼을 선언된 형식/차원으로 넘긴다.
+        """
+        columns = X.columns if isinstance(X, pd.DataFrame) else ()
+        if len(self.inputs) == 1 and self.input_names[0] not in columns:
+            return {self.input_names[0]: self.matrix(X)}
+        missing = [name for name in self.input_names if name not in columns]
+        if missing:
+            raise ValueError(f"ONNX 모델 입력 {self.input_names} 중 {missing} 컬럼이 입력에 없습니다 "
+                             f"(컬럼 이름이 있는 DataFrame으로 넘기세요).")
+        feed = {}
+        for inp in self.inputs:
+            dtype = INPUT_DTYPES.get(inp.type)
+            if dtype is None:
+                raise ValueError(f"지원하지 않는 ONNX 입력 형식: {inp.name} {inp.type}")
+            column = X[inp.name]
+            values = column.astype(str).to_numpy(dtype=object) if dtype is object else column.to_numpy(dtype=dtype)
+            feed[inp.name] = values.reshape(-1, 1) if len(inp.shape) == 2 else values
+        return feed
+
+    def predict(self, X):
+        return self.session.run([self.output_name], self.feed(X))[0].ravel()
+
+    def forecast(self, X_pred=None, y_pred=None, forecast_destination=None):
+        if X_pred is None:
+            raise ValueError("ONNX 예측 모델은 forecast_destination만으로 예측할 수 없습니다 (X_pred 필요).")
+        return self.predict(X_pred), X_pred
+
+
+# ---------------------------------------------------------------------------
+# 일치 확인 / 벤치마크
+# ---------------------------------------------------------------------------
+
+def _sample_features(scaler, n, seed=0):
+    """스케일러 분포 주변 (꼬리 포함) 특성 행렬"""
+    rng = np.random.default_rng(seed)
+    return np.asarray(scaler.mean_) + rng.standard_t(4, size=(n, len(scaler.mean_))) * np.asarray(scaler.scale_)
+
+
+def _forecast_features(n, seed=7):
+    """합성 컨테인먼트 측정값 (센서 4개, float32) n행"""
+    from synthetic import make_cont_readings
+
+    days = -(-n // (4 * 96))
+    df = make_cont_readings(days=days, interval_min=15, missing_frac=0, dup_frac=0, max_start_delay_min=0, seed=seed)
+    return df[FORECAST_FEATURES].to_numpy(dtype=np.float32)[:n]
+
+
+def reference_forecaster(days=30, seed=42):
+    """
+    models/model.pkl(AutoML)은 변환되지 않으므로 확인/벤치마크용 sklearn 회귀기 (센서 4개 → 30분 뒤 tempHot)
+
+    트리 모델은 float32로 분기하므로 스케일러 없이 그대로 두면 ONNX와 분기가 같다.
+    """
+    from sklearn.ensemble import GradientBoostingRegressor
+    from synthetic import make_cont_readings
+
+    df = make_cont_readings(days=days, interval_min=15, missing_frac=0, dup_frac=0, seed=seed)
+    df = df.sort_values(['contID', 'colDate'])
+    y = df.groupby('contID')['tempHot'].shift(-2)
+    ok = y.notna()
+    model = GradientBoostingRegressor(n_estimators=200, max_depth=4, random_state=seed)
+    model.fit(df.loc[ok, FORECAST_FEATURES].to_numpy(dtype=np.float32), y[ok].to_numpy())
+    model.max_horizon = 2
+    return model
+
+
+def check_parity(model_dir=MODEL_DIR, root=ONNX_DIR, rows=50_000, forecaster=None, forecaster_onnx=None):
+    """피클(joblib) vs ONNX: 이상 점수 최대 차이 + 라벨 일치율, 예측값 최대 차이. Returns: 모두 허용 범위면 True"""
+    import joblib
+
+    print("="*60)
+    print("피클 vs ONNX 일치 확인")
+    print("="*60)
+    ok = True
+    for level in LEVELS:
+        model = joblib.load(os.path.join(model_dir, f'anomaly_detector_{level}.pkl'))
+        scaler = joblib.load(os.path.join(model_dir, f'scaler_{level}.pkl'))
+        X = _sample_features(scaler, rows).astype(np.float32).astype(np.float64)   # float32 입력과 같은 값
+        expected = model.score_samples(scaler.transform(X))
+        scores, labels = load_onnx_pipeline(level, root).score(X)
+        diff = float(np.abs(scores - expected).max())
+        agree = float((labels == (model.predict(scaler.transform(X)) == -1)).mean())
+        passed = diff <= SCORE_ATOL and agree >= 0.999
+        ok &= passed
+        print(f"  [{level}] 점수 최대 차이 {diff:.2e} (허용 {SCORE_ATOL:.0e}), 라벨 일치 {agree:.4%} "
+              f"{'OK' if passed else '⚠️ 불일치'}")
+
+    if forecaster is not None and forecaster_onnx and os.path.exists(forecaster_onnx):
+        X = _forecast_features(rows)
+        diff = float(np.abs(OnnxForecaster(forecaster_onnx).predict(X) - forecaster.predict(X)).max())
+        passed = diff <= SCORE_ATOL
+        ok &= passed
+        print(f"  [forecast] 예측 최대 차이 {diff:.2e} (허용 {SCORE_ATOL:.0e}) {'OK' if passed else '⚠️ 불일치'}")
+    return ok
+
+
+_PROBE = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+import numpy as np
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1]) / 1024
+X_all = np.load(sys.argv[1])
+sizes = json.loads(sys.argv[2])
+before = rss()
+t0 = time.perf_counter()
+%s
+load_sec = time.perf_counter() - t0
+loaded = rss()
+latency = {}
+for n in sizes:
+    X = X_all[:n]
+    run(X)
+    times = []
+    for _ in range(max(3, min(200, 20000 // n))):
+        t = time.perf_counter()
+        run(X)
+        times.append(time.perf_counter() - t)
+    latency[n] = float(np.median(times))
+print(json.dumps({'load_sec': load_sec, 'load_mb': loaded - before, 'peak_mb': rss() - before, 'latency': latency}))
+"""
+
+_JOBLIB_ANOMALY = """
+import joblib
+model = joblib.load('{model}')
+scaler = joblib.load('{scaler}')
+def run(X):
+    scores = model.score_samples(scaler.transform(X))
+    return scores, scores < model.offset_
+"""
+
+_ONNX_ANOMALY = """
+from onnx_backend import OnnxAnomalyPipeline
+pipeline = OnnxAnomalyPipeline('{onnx}')
+run = pipeline.score
+"""
+
+_JOBLIB_FORECAST = """
+import joblib
+model = joblib.load('{model}')
+run = model.predict
+"""
+
+_ONNX_FORECAST = """
+from onnx_backend import OnnxForecaster
+model = OnnxForecaster('{onnx}')
+run = model.predict
+"""
+
+
+def _probe(code, X, sizes):
+    with tempfile.NamedTemporaryFile(suffix='.npy', delete=False) as f:
+        np.save(f, X)
+    try:
+        out = subprocess.run([sys.executable, '-c', _PROBE % code, f.name, json.dumps(list(sizes))],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    finally:
+        os.remove(f.name)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['latency'] = {int(k): v for k, v in result['latency'].items()}
+    return result
+
+
+def benchmark(model_dir=MODEL_DIR, root=ONNX_DIR, forecaster_pkl=None, forecaster_onnx=None,
+              sizes=BENCH_BATCHES, repeats=3):
+    """joblib 피클 vs onnxruntime: import+로드 시간, 로드 후 RSS 증가, 배치 크기별 지연 (새 프로세스)"""
+    import joblib
+
+    cases = []
+    for level in LEVELS:
+        model_pkl = os.path.abspath(os.path.join(model_dir, f'anomaly_detector_{level}.pkl'))
+        scaler_pkl = os.path.abspath(os.path.join(model_dir, f'scaler_{level}.pkl'))
+        X = _sample_features(joblib.load(scaler_pkl), max(sizes))
+        cases.append((f'anomaly_{level}', X,
+                      _JOBLIB_ANOMALY.format(model=model_pkl, scaler=scaler_pkl),
+                      _ONNX_ANOMALY.format(onnx=os.path.abspath(anomaly_path(level, root)))))
+    if forecaster_pkl and forecaster_onnx and os.path.exists(forecaster_onnx):
+        cases.append(('forecast', _forecast_features(max(sizes)),
+                      _JOBLIB_FORECAST.format(model=os.path.abspath(forecaster_pkl)),
+                      _ONNX_FORECAST.format(onnx=os.path.abspath(forecaster_onnx))))
+
+    print("\n" + "="*60)
+    print("joblib vs onnxruntime (각각 새 프로세스, import 포함 로드, 배치 지연은 중앙값)")
+    print("="*60)
+    header = ''.join(f" {f'{n}행(ms)':>10}" for n in sizes)
+    print(f"{'모델':>14} {'백엔드':>8} {'로드(ms)':>9} {'로드 RSS(MB)':>12} {'최대 RSS(MB)':>12}{header}")
+    results = {}
+    for name, X, joblib_code, onnx_code in cases:
+        for backend, code in [('joblib', joblib_code), ('onnx', onnx_code)]:
+            runs = [_probe(code, X, sizes) for _ in range(repeats)]
+            best = min(runs, key=lambda r: r['load_sec'])
+            latency = {n: min(r['latency'][n] for r in runs) for n in sizes}
+            results[(name, backend)] = {**best, 'latency': latency}
+            cells = ''.join(f" {latency[n] * 1000:>10.3f}" for n in sizes)
+            print(f"{name:>14} {backend:>8} {best['load_sec'] * 1000:>9.1f} {best['load_mb']:>12.1f} "
+                  f"{best['peak_mb']:>12.1f}{cells}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime 추론 백엔드")
+    parser.add_argument('--convert', action='store_true', help="models/*.pkl → models/onnx/*.onnx")
+    parser.add_argument('--check', action='store_true', help="피클 vs ONNX 점수/라벨/예측 일치 확인")
+    parser.add_argument('--bench', action='store_true', help="로드 시간, 배치별 지연, RSS 비교")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--onnx-dir', default=ONNX_DIR)
+    parser.add_argument('--forecaster', default=None,
+                        help="변환할 sklearn 예측 모델 pkl (없으면 참조 회귀기를 학습해서 사용)")
+    args = parser.parse_args()
+
+    import joblib
+
+    forecaster, forecaster_pkl = None, args.forecaster
+    if args.convert or args.check or args.bench:
+        if forecaster_pkl:
+            forecaster = joblib.load(forecaster_pkl)
+        else:
+            # 변환 가능한 예측 모델이 없으면 참조 회귀기 (임시 pkl로 저장해서 joblib 로드와 비교)
+            forecaster = reference_forecaster()
+            forecaster_pkl = os.path.join(tempfile.mkdtemp(), 'reference_forecaster.pkl')
+            joblib.dump(forecaster, forecaster_pkl)
+
+    if args.convert or not os.path.exists(anomaly_path(LEVELS[0], args.onnx_dir)):
+        print("="*60)
+        print("ONNX 변환")
+        print("="*60)
+        for level in LEVELS:
+            model = joblib.load(os.path.join(args.model_dir, f'anomaly_detector_{level}.pkl'))
+            scaler = joblib.load(os.path.join(args.model_dir, f'scaler_{level}.pkl'))
+            pipeline = AnomalyPipeline(compile_forest(model), scaler.mean_, scaler.scale_, FEATURE_COLS, {})
+            path = convert_anomaly(level, pipeline, root=args.onnx_dir)
+            print(f"✅ {level}: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    forecaster_onnx = forecast_path(args.onnx_dir, reference=not args.forecaster)
+    if forecaster is not None and (args.convert or not os.path.exists(forecaster_onnx)):
+        path = convert_forecaster(forecaster, path=forecaster_onnx)
+        print(f"✅ forecast: {path} ({os.path.getsize(path) / 1024:.0f} KB, {type(forecaster).__name__})")
+
+    if args.check:
+        if not check_parity(args.model_dir, args.onnx_dir, forecaster=forecaster, forecaster_onnx=forecaster_onnx):
+            sys.exit(1)
+    if args.bench:
+        benchmark(args.model_dir, args.onnx_dir, forecaster_pkl, forecaster_onnx)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
 
+from data_loader import read_table
+from schema import to_model_frame
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="온도 예측 대시보드",
@@ -36,15 +38,39 @@ WARNING_DELTA = 0.5    # 경고 온도 델타 (°C)
 # --- Data Loading ---
 @st.cache_data
 def load_data(filepath):
-    """CSV 파일에서 데이터를 로드하고, colDate를 datetime으로 변환"""
+    """CSV 파일에서 데이터를 로드 (colDate는 datetime, float32 센서, category contID - schema.py)"""
     try:
-        df = pd.read_csv(filepath)
-        df['colDate'] = pd.to_datetime(df['colDate'])
-        return df
+        return read_table(filepath, compact=True)
     except FileNotFoundError:
         st.error(f"오류: '{filepath}' 파일을 찾을 수 없습니다.")
         return None
 
+@st.cache_resource
+def load_forecast_cache():
+    """예측 결과 캐시 (forecast_cache.py, 서버가 있으면 서버, 없으면 models/model.pkl 로드). 모델이 없으면 None"""
+    from forecast_cache import ForecastCache
+    from forecast_server import get_forecaster
+    try:
+        return ForecastCache(get_forecaster())
+    except FileNotFoundError:
+        return None
+
+def apply_model_forecast(history, data):
+    """data 기간의 target_tempHot_30min을 모델 예측으로 교체 (캐시에 있으면 모델 호출 없음)"""
+    if data.empty:
+        return data
+    cache = load_forecast_cache()
+    if cache is None:
+        st.sidebar.warning("models/model.pkl이 없어 저장된 예측을 표시합니다.")
+        return data
+    predictions = cache.get_or_compute(to_model_frame(history), targets=data)
+    stats = cache.stats()
+    st.sidebar.caption(
+        f"예측 캐시: 적중률 {stats['hit_rate'] * 100:.1f}% · 모델 호출 {stats['model_calls']}회 · "
+        f"p50 {stats['p50_ms']:.0f}ms"
+    )
+    return data.assign(target_tempHot_30min=predictions['target_tempHot_30min'].to_numpy())
+
 def calculate_metrics(df, zone_id):
     """KPI 지표 계산"""
     zone_data = df[df['contID'] == zone_id].copy()
@@ -490,6 +516,12 @@ def main():
         help="경고 알림 기준 온도입니다"
     )
 
+    use_model = st.sidebar.checkbox(
+        "모델로 예측 (캐시)",
+        value=False,
+        help="저장된 예측 대신 models/model.pkl로 예측합니다. 이미 예측한 기간은 캐시에서 읽습니다"
+    )
+
     st.sidebar.markdown("---")
     st.sidebar.info(
         """
@@ -547,10 +579,13 @@ def main():
             st.rerun()
 
     # 날짜 필터링
+    history = data
     data = data[
         (data['colDate'].dt.date >= start_date) &
         (data['colDate'].dt.date <= end_date)
     ]
+    if use_model:
+        data = apply_model_forecast(history, data)
 
     st.caption(f"📊 {start_date} ~ {end_date} ({(end_date - start_date).days + 1}일)")
     st.markdown("---")
@@ -1,9 +1,11 @@
 
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from data_loader import read_table
+from anomaly_hierarchy import hierarchy_path, CONT_ONLY, RACK_ONLY
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="이상 탐지 대시보드",
@@ -16,18 +18,23 @@ st.set_page_config(
 def load_data(filepath):
     """
     CSV 파일에서 이상 탐지 데이터를 로드하고, colDate를 datetime으로 변환합니다.
+    (float32 센서, category contID - schema.py)
     """
     try:
-        df = pd.read_csv(filepath)
-        df['colDate'] = pd.to_datetime(df['colDate'])
-        # contID가 숫자로 되어 있을 경우 'zone_' 접두사 추가
-        if pd.api.types.is_numeric_dtype(df['contID']):
-            df['contID'] = 'zone_' + df['contID'].astype(str)
-        return df
+        # contID가 숫자로 되어 있을 경우 'zone_' 접두사 추가 (category)
+        return read_table(filepath, compact=True, zone_prefix='zone_')
     except FileNotFoundError:
         st.error(f"오류: '{filepath}' 파일을 찾을 수 없습니다. '03_train_anomaly_detector.py'를 먼저 실행했는지 확인하세요.")
         return None
 
+@st.cache_data
+def load_hierarchy():
+    """랙 → 컨테인먼트 계층 표 (anomaly_hierarchy.py 결과, 없으면 None)"""
+    path = hierarchy_path()
+    if path is None:
+        return None
+    return read_table(path, compact=True, zone_prefix='zone_')
+
 # --- Main Application ---
 def main():
     """
@@ -138,5 +145,57 @@ def main():
         else:
             st.warning("선택된 존에 대한 데이터가 없습니다.")
 
+        # --- Rack → Containment Hierarchy ---
+        hierarchy = load_hierarchy()
+        st.markdown("---")
+        st.subheader("랙 이상 집계 (컨테인먼트별)")
+        if hierarchy is None:
+            st.info("'anomaly_hierarchy.py'를 실행하면 같은 시각의 랙 이상 집계가 표시됩니다.")
+        else:
+            zone_hier = hierarchy[hierarchy['contID'] == selected_zone]
+            col1, col2, col3 = st.columns(3)
+            col1.metric("이상 랙이 있는 시각", f"{int((zone_hier['rack_anomalies'] > 0).sum()):,}")
+            col2.metric("컨테인먼트만 이상", f"{int((zone_hier['disagreement'] == CONT_ONLY).sum()):,}")
+            col3.metric("랙만 이상", f"{int((zone_hier['disagreement'] == RACK_ONLY).sum()):,}")
+
+            fig = make_subplots(specs=[[{"secondary_y": True}]])
+            fig.add_trace(
+                go.Scatter(
+                    x=zone_hier['colDate'],
+                    y=zone_hier['rack_anomalies'],
+                    name='이상 랙 수',
+                    mode='lines',
+                    line=dict(color='crimson')
+                ),
+                secondary_y=False,
+            )
+            fig.add_trace(
+                go.Scatter(
+                    x=zone_hier['colDate'],
+                    y=zone_hier['worst_rack_score'],
+                    name='최저 랙 점수',
+                    mode='lines',
+                    line=dict(color='orange', dash='dot')
+                ),
+                secondary_y=True,
+            )
+            fig.update_layout(
+                title=f"'{selected_zone}' 랙 이상 수 및 최저 랙 점수",
+                legend_title_text='범례',
+                hovermode="x unified"
+            )
+            fig.update_yaxes(title_text="이상 랙 수", secondary_y=False)
+            fig.update_yaxes(title_text="이상 점수", secondary_y=True)
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.markdown("**컨테인먼트와 랙 판정이 다른 시각**")
+            st.dataframe(
+                zone_hier[zone_hier['disagreement'] > 0][
+                    ['colDate', 'cont_score', 'n_racks', 'rack_anomalies',
+                     'worst_rackID', 'worst_rack_score', 'disagreement']
+                ],
+                use_container_width=True
+            )
+
 if __name__ == "__main__":
     main()
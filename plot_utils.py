@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+대용량 시각화 공용 함수 (03 이상 탐지 그림, 07 예측 검증 그림)
+
+- 점 줄이기: x를 max_bins개 구간으로 나눠 구간마다 첫/마지막/최소/최대 점만 남김 (M4 방식)
+  → 선/점 모양(급등, 급락, 범위)은 그대로이고 점 수는 최대 4 × max_bins개.
+  keep으로 지정한 점(이상치)은 구간과 상관없이 모두 남긴다
+- 산점도 레이어는 rasterized=True (PNG에서는 차이 없고, 벡터 출력에서도 점 수만큼 느려지지 않음)
+- 존 수에 맞춰 subplot 격자 크기 자동 계산 (존 ID가 1부터가 아니어도 됨)
+- 그림마다 Figure 객체를 직접 만들고(pyplot 전역 상태 없음, Agg 렌더링) 워커 프로세스에서 병렬 저장
+
+    idx = decimate_indices(x, y, keep=is_anomaly)
+    rows, cols = grid_shape(n_zones)
+    render_figures([(draw_fn, kwargs), ...], workers=2, rc={'font.family': 'Malgun Gothic'})
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MAX_BINS = 1_000   # 시리즈 하나에 남기는 구간 수 (점은 최대 4배)
+MAX_COLS = 4       # subplot 격자의 최대 열 수
+
+
+def decimate_indices(x, y, max_bins=MAX_BINS, keep=None):
+    """
+    x 순서로 정렬된 시리즈에서 남길 행 위치 (오름차순)
+
+    x 범위를 max_bins개 구간으로 나누고 구간마다 첫 행, 마지막 행, y 최소 행, y 최대 행을 남긴다.
+    keep(bool 배열)이 True인 행은 모두 남긴다. 점 수가 이미 4 × max_bins 이하면 전부.
+    """
+    n = len(y)
+    extra = np.flatnonzero(keep) if keep is not None else np.empty(0, dtype=np.int64)
+    if n <= 4 * max_bins:
+        return np.arange(n)
+
+    xv = np.asarray(x)
+    if np.issubdtype(xv.dtype, np.datetime64):
+        xv = xv.astype('datetime64[ns]').view(np.int64)
+    xv = xv.astype(np.float64)
+    span = xv[-1] - xv[0]
+    bins = np.zeros(n, dtype=np.int64) if span <= 0 else \
+        np.minimum(((xv - xv[0]) / span * max_bins).astype(np.int64), max_bins - 1)
+
+    new = np.empty(n, dtype=bool)
+    new[:1] = True
+    new[1:] = bins[1:] != bins[:-1]
+    starts = np.flatnonzero(new)
+    ends = np.append(starts[1:], n) - 1
+    bin_id = np.cumsum(new) - 1
+
+    yv = np.asarray(y, dtype=np.float64)
+    lo = np.where(np.isnan(yv), np.inf, yv)
+    hi = np.where(np.isnan(yv), -np.inf, yv)
+    bin_min = np.minimum.reduceat(lo, starts)
+    bin_max = np.maximum.reduceat(hi, starts)
+    # 구간 최소/최대와 같은 첫 행 (동률이면 앞쪽)
+    is_min = np.flatnonzero(lo == bin_min[bin_id])
+    is_max = np.flatnonzero(hi == bin_max[bin_id])
+    first_min = is_min[np.unique(bin_id[is_min], return_index=True)[1]]
+    first_max = is_max[np.unique(bin_id[is_max], return_index=True)[1]]
+    return np.unique(np.concatenate([starts, ends, first_min, first_max, extra]))
+
+
+def grid_shape(n, max_cols=MAX_COLS):
+    """subplot 개수 n → (행, 열)"""
+    cols = max(1, min(n, max_cols))
+    return max(1, math.ceil(n / cols)), cols
+
+
+def new_figure(figsize):
+    """pyplot 없이 Figure 생성 (Agg 캔버스, 전역 상태/백엔드와 무관)"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _render(job):
+    draw, kwargs, rc = job
+    import matplotlib
+    with matplotlib.rc_context(rc or {}):
+        return draw(**kwargs)
+
+
+def render_figures(jobs, workers=None, rc=None):
+    """
+    그림 그리기 함수들을 워커 프로세스에서 병렬 실행 (Agg)
+
+    jobs: [(draw, kwargs), ...] - draw(**kwargs)는 그림을 저장하고 저장 경로를 돌려주는 모듈 수준 함수
+          (kwargs의 데이터는 피클로 전달되므로 미리 점을 줄여서 넘긴다)
+    rc: 워커에 적용할 matplotlib rcParams (한글 폰트 등)
+    Returns: 각 job의 반환값 (jobs 순서)
+    """
+    tasks = [(draw, kwargs, rc) for draw, kwargs in jobs]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) <= 1:
+        return [_render(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, tasks))
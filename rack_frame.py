@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+랙 데이터 정제 엔진 (중복 제거 → freq 격자 → 빈 시간대 forward fill)
+
+forecast_frame.py의 랙 버전. 키는 (contID, rackID, colDate).
+랙이 수천 개이고 원본이 컨테인먼트의 약 13배이므로 pandas MultiIndex reindex 대신
+랙 번호 × 시간 칸 2차원 NumPy 배열 위에서 처리한다 (랙/시간 루프 없음).
+
+- 같은 (contID, rackID, colDate)는 센서값 평균 (NaN 제외)
+- freq 구간 평균 → 전체 기간 격자 → 랙별 forward fill
+- 첫 측정 이전 구간(설치 전)은 제외
+- hour, day_of_week, month, day는 격자 시각으로 재계산
+
+격자 배열은 랙 수 × 시간 칸 크기이므로 block_racks개 랙씩 나눠 만든다.
+
+벤치마크:
+    python rack_frame.py --racks 52 1000 --days 14
+    python rack_frame.py --racks 10000 --days 30      (블록 단위 생성/처리)
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from forecast_frame import SENSOR_COLS
+
+RACK_KEYS = ['contID', 'rackID']
+RACK_FREQ = '10min'  # 랙 원본 측정 간격 (이상 탐지용이므로 AutoML 15분 제약 없음)
+
+RACK_CALENDAR_COLS = ['hour', 'day_of_week', 'month', 'day']
+RACK_FINAL_COLS = RACK_KEYS + ['colDate'] + SENSOR_COLS + RACK_CALENDAR_COLS
+
+# 한 블록: 1,000랙 × 1개월(10분) ≈ 피크 1GB (원본 블록 + 격자 + 출력 프레임)
+BLOCK_RACKS = 1_000
+CHUNK_ROWS = 500_000  # 원본 파일을 블록으로 나눌 때 한 번에 읽는 행 수
+
+
+def _segment_means(values, starts):
+    """정렬된 행의 구간별 평균 (NaN 제외, 전부 NaN이면 NaN)"""
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _ffill_rows(grid):
+    """(랙, 시간) 2차원 배열을 시간 축으로 forward fill (앞쪽 NaN은 그대로)"""
+    n_times = grid.shape[1]
+    idx = np.where(np.isnan(grid), 0, np.arange(n_times))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return np.take_along_axis(grid, idx, axis=1)
+
+
+def rack_time_range(df, freq=RACK_FREQ):
+    """전체 격자 범위 (첫 구간, 마지막 구간)"""
+    return df['colDate'].min().floor(freq), df['colDate'].max().floor(freq)
+
+
+def build_rack_frame(df, freq=RACK_FREQ, time_range=None):
+    """
+    원본 랙 데이터(rack_processed 형식) → 정제된 랙 프레임 (contID, rackID, colDate 순)
+
+    time_range=(start, end)를 주면 그 범위로 격자 생성 (랙 블록별로 나눠 처리할 때 공통 범위)
+    """
+    if time_range is None:
+        time_range = rack_time_range(df, freq)
+    step = pd.Timedelta(freq).value
+    t0 = pd.Timestamp(time_range[0]).value
+    n_times = (pd.Timestamp(time_range[1]).value - t0) // step + 1
+
+    # 1. 랙 번호 (contID, rackID 순)
+    rack_id = df.groupby(RACK_KEYS, sort=True).ngroup().to_numpy()
+    racks = df[RACK_KEYS].drop_duplicates().sort_values(RACK_KEYS).to_numpy()
+    n_racks = len(racks)
+
+    # 2. 같은 (랙, colDate) 중복 제거: 정렬 후 연속 구간 평균
+    t_ns = df['colDate'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    order = np.lexsort((t_ns, rack_id))
+    rack_sorted, t_sorted = rack_id[order], t_ns[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (rack_sorted[1:] != rack_sorted[:-1]) | (t_sorted[1:] != t_sorted[:-1])
+    starts = np.flatnonzero(first)
+    has_dup = len(starts) < len(order)
+    rack_id, t_ns = rack_sorted[starts], t_sorted[starts]
+
+    # 3. freq 구간 평균 → (랙, 시간 칸) 격자 → 랙별 forward fill (컬럼별 1차원 배열)
+    bucket = t_ns // step - t0 // step
+    in_range = (bucket >= 0) & (bucket < n_times)
+    cell = rack_id[in_range] * n_times + bucket[in_range]
+
+    n_cells = n_racks * n_times
+    filled = {}
+    for col in SENSOR_COLS:
+        values = df[col].to_numpy(dtype=np.float64)[order]
+        values = _segment_means(values, starts) if has_dup else values
+        values = values[in_range]
+        valid = ~np.isnan(values)
+        sums = np.bincount(cell[valid], weights=values[valid], minlength=n_cells)
+        counts = np.bincount(cell[valid], minlength=n_cells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        filled[col] = _ffill_rows(means.reshape(n_racks, n_times)).ravel()
+
+    # 4. 설치 전(모든 센서 NaN) 칸 제외 후 프레임 구성
+    keep = ~np.logical_and.reduce([np.isnan(filled[col]) for col in SENSOR_COLS])
+    rack_idx = np.repeat(np.arange(n_racks), n_times)[keep]
+    grid_times = pd.date_range(start=time_range[0], end=time_range[1], freq=freq)
+    time_idx = np.tile(np.arange(n_times), n_racks)[keep]
+
+    frame = pd.DataFrame({
+        'contID': racks[rack_idx, 0],
+        'rackID': racks[rack_idx, 1],
+        'colDate': grid_times.values.astype(df['colDate'].dtype)[time_idx],
+    })
+    for col in SENSOR_COLS:
+        frame[col] = filled[col][keep]
+    # 달력 컬럼은 격자 시각(n_times개)에서 한 번만 계산
+    frame['hour'] = grid_times.hour.values[time_idx]
+    frame['day_of_week'] = grid_times.dayofweek.values[time_idx]
+    frame['month'] = grid_times.month.values[time_idx]
+    frame['day'] = grid_times.day.values[time_idx]
+    return frame[RACK_FINAL_COLS]
+
+
+def iter_rack_blocks(df, freq=RACK_FREQ, block_racks=BLOCK_RACKS):
+    """block_racks개 랙씩 build_rack_frame 결과를 순서대로 반환 (모든 블록이 같은 격자 범위)"""
+    time_range = rack_time_range(df, freq)
+    block = df.groupby(RACK_KEYS, sort=True).ngroup().to_numpy() // block_racks
+    order = np.argsort(block, kind='stable')
+    bounds = np.searchsorted(block[order], np.arange(block.max() + 2))
+    for b0, b1 in zip(bounds[:-1], bounds[1:]):
+        if b1 > b0:
+            yield build_rack_frame(df.iloc[order[b0:b1]], freq=freq, time_range=time_range)
+
+
+def scan_racks(path, freq=RACK_FREQ, chunk_rows=CHUNK_ROWS):
+    """사전 스캔 (키/시각 컬럼만 청크로): 랙 목록 (contID, rackID 순), 격자 범위, 원본 행 수"""
+    from data_loader import iter_table
+
+    keys, t_min, t_max, n_rows = [], None, None, 0
+    for chunk in iter_table(path, columns=RACK_KEYS + ['colDate'], chunk_rows=chunk_rows):
+        keys.append(chunk[RACK_KEYS].drop_duplicates())
+        lo, hi = chunk['colDate'].min(), chunk['colDate'].max()
+        t_min = lo if t_min is None else min(t_min, lo)
+        t_max = hi if t_max is None else max(t_max, hi)
+        n_rows += len(chunk)
+    racks = pd.concat(keys).drop_duplicates().sort_values(RACK_KEYS).reset_index(drop=True)
+    return racks, (t_min.floor(freq), t_max.floor(freq)), n_rows
+
+
+def iter_rack_blocks_from_source(path, racks, time_range, freq=RACK_FREQ, block_racks=BLOCK_RACKS,
+                                 chunk_rows=CHUNK_ROWS, stats=None):
+    """
+    원본 파일을 전부 메모리에 올리지 않고 iter_rack_blocks와 같은 블록 결과를 순서대로 반환
+    (racks, time_range는 같은 freq로 scan_racks한 결과)
+
+    1) 원본을 chunk_rows행씩 읽어 행마다 랙 블록 번호(scan_racks 순서 // block_racks)를 붙이고
+       블록별 임시 파일로 나눠 쓴다 (행 순서 유지)
+    2) 블록마다 임시 파일만 읽어 build_rack_frame
+    메모리는 청크 하나 + 블록 하나. 디스크에 원본 크기만큼 임시 파일이 잠깐 생긴다.
+    stats dict를 주면 중복된 (랙, colDate) 수를 더한다 (중복은 같은 랙 안이므로 블록별로 세도 같음).
+    """
+    from data_loader import iter_table
+
+    rack_index = pd.MultiIndex.from_frame(racks[RACK_KEYS])
+    with tempfile.TemporaryDirectory(prefix='rack_blocks_') as spill:
+        for part, chunk in enumerate(iter_table(path, chunk_rows=chunk_rows)):
+            block = rack_index.get_indexer(pd.MultiIndex.from_frame(chunk[RACK_KEYS])) // block_racks
+            for b in np.unique(block):
+                chunk[block == b].to_pickle(os.path.join(spill, f'block{b:06d}-{part:06d}.pkl'))
+            del chunk, block
+
+        files = sorted(os.listdir(spill))
+        for b in sorted({name.split('-')[0] for name in files}):
+            df = pd.concat([pd.read_pickle(os.path.join(spill, name)) for name in files if name.startswith(b + '-')],
+                           ignore_index=True)
+            if stats is not None:
+                stats['duplicates'] = stats.get('duplicates', 0) + int(df.duplicated(RACK_KEYS + ['colDate']).sum())
+            yield build_rack_frame(df, freq=freq, time_range=time_range)
+            del df
+
+
+def _build_rack_frame_loop(df, freq=RACK_FREQ):
+    """랙별 for 루프 방식 (결과 비교용, clean_data.py 기존 방식과 같은 구조)"""
+    df_agg = df.groupby(RACK_KEYS + ['colDate'], as_index=False)[SENSOR_COLS].mean()
+    min_time, max_time = rack_time_range(df_agg, freq)
+    complete = pd.date_range(start=min_time, end=max_time, freq=freq)
+
+    frames = []
+    for (cid, rid), rack in df_agg.groupby(RACK_KEYS):
+        rack = rack.set_index('colDate')[SENSOR_COLS].resample(freq).mean()
+        rack = rack.reindex(complete).ffill().dropna(how='all')
+        rack = rack.rename_axis('colDate').reset_index()
+        rack.insert(0, 'rackID', rid)
+        rack.insert(0, 'contID', cid)
+        frames.append(rack)
+
+    out = pd.concat(frames, ignore_index=True)
+    out['hour'] = out['colDate'].dt.hour
+    out['day_of_week'] = out['colDate'].dt.dayofweek
+    out['month'] = out['colDate'].dt.month
+    out['day'] = out['colDate'].dt.day
+    return out[RACK_FINAL_COLS]
+
+
+def benchmark(rack_counts=(52, 1000), days=14, block_racks=BLOCK_RACKS, loop_max_racks=1000):
+    """
+    루프 방식 vs 격자 배열 방식 (랙 수별)
+
+    원본 전체를 한 번에 만들면 메모리를 넘으므로 block_racks개 랙씩 생성해서 처리하고
+    처리 시간(생성 제외)과 피크 메모리를 합산한다.
+    """
+    from synthetic import make_rack_readings
+
+    print("="*60)
+    print(f"랙 정제 엔진 벤치마크 ({days}일, 10분 간격 원본, 블록 {block_racks:,}랙)")
+    print("="*60)
+    print(f"{'랙 수':>8} {'원본 행':>14} {'출력 행':>14} {'루프(s)':>10} {'격자(s)':>10} "
+          f"{'행/초':>12} {'피크MB':>8} {'동일':>6}")
+
+    for n_racks in rack_counts:
+        in_rows = out_rows = 0
+        vec_sec = 0.0
+        peak = 0
+        time_range = None
+        loop_sec = None
+        same = '-'
+        for first in range(0, n_racks, block_racks):
+            raw = make_rack_readings(n_racks=min(block_racks, n_racks - first), days=days,
+                                     first_rack=first, seed=first)
+            if time_range is None:
+                time_range = rack_time_range(raw)
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            result = build_rack_frame(raw, time_range=time_range)
+            vec_sec += time.perf_counter() - t0
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            if n_racks <= loop_max_racks:
+                t0 = time.perf_counter()
+                expected = _build_rack_frame_loop(raw)
+                loop_sec = (loop_sec or 0.0) + time.perf_counter() - t0
+                ok = (len(expected) == len(result)
+                      and np.allclose(expected[SENSOR_COLS].to_numpy(), result[SENSOR_COLS].to_numpy(),
+                                      rtol=0, atol=1e-9, equal_nan=True)
+                      and expected[RACK_KEYS + ['colDate']].equals(result[RACK_KEYS + ['colDate']]))
+                same = 'OK' if ok and same != 'DIFF' else 'DIFF'
+
+            in_rows += len(raw)
+            out_rows += len(result)
+            del raw, result
+
+        loop_txt = f"{loop_sec:>10.2f}" if loop_sec is not None else f"{'-':>10}"
+        print(f"{n_racks:>8,} {in_rows:>14,} {out_rows:>14,} {loop_txt} {vec_sec:>10.2f} "
+              f"{in_rows / vec_sec:>12,.0f} {peak / 1024 / 1024:>8,.0f} {same:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="랙 정제 엔진 벤치마크")
+    parser.add_argument('--racks', type=int, nargs='+', default=[52, 1000])
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--block-racks', type=int, default=BLOCK_RACKS)
+    args = parser.parse_args()
+
+    benchmark(rack_counts=args.racks, days=args.days, block_racks=args.block_racks)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+rolling-origin 검증 엔진 (07_validate_forecast.py)
+
+07은 train+test 전체(모든 존)를 rolling_forecast(step=1) 한 번에 넘기고 zone 1만 남겼다.
+rolling_forecast는 origin마다 그 앞 전체를 다시 보므로 비용이 구간 길이의 제곱으로 늘고, 단일 프로세스다.
+여기서는 검증 기간을 존 × 창(기본 7일)으로 나눈다.
+
+- 창마다 그 존의 [창 시작 - lookback, 창 끝 + horizon) 행만 넘김 (forecast_context.py, 모델이 보는 과거만)
+  lookback은 모델 지문마다 한 번 검증 시작 직후 horizon 스텝을 전체 이력 vs 자른 입력으로 forecast해 확인
+- 창은 서로 독립 → ProcessPoolExecutor, 워커마다 모델 한 번 로드 (initializer)
+- 끝난 창은 바로 체크포인트 파일로 저장 → 중단 후 다시 실행하면 남은 창만 계산
+  체크포인트 폴더는 모델 파일 해시 + 데이터 해시 + 창 길이로 정해지므로 모델/데이터가 바뀌면 새로 계산
+- 결과를 합쳐 존 × horizon 오차 표 (n, MAE, RMSE, MAPE, bias)
+
+    results, errors = run_validation('models/model.pkl', df, '2025-06-01', '2025-09-01', workers=4)
+
+벤치마크 (한 번에 rolling_forecast vs 창 나눔, models/model.pkl 없으면 참조 lag 모델):
+    python rolling_validation.py --bench --days 14
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import file_digest, params_digest
+from forecast_context import data_step, lookback_spec, trim_context, verified_path, verified_spec
+from forecast_server import GRAIN_COL, TARGET_COL, TIME_COL, load_forecaster
+
+CHECKPOINT_ROOT = './validation_checkpoints'
+WINDOW = '7D'
+
+# AutoML rolling_forecast 결과 컬럼 (모델 속성이 없을 때 기본값)
+ORIGIN_COL = '_automl_forecast_origin'
+FORECAST_COL = '_automl_forecast_y'
+ACTUAL_COL = '_automl_actual_y'
+
+_MODEL = None  # 워커 프로세스마다 한 번 로드
+
+
+def _init_worker(model_path):
+    global _MODEL
+    _MODEL, _ = load_forecaster(model_path)
+
+
+def _worker_spec():
+    """워커에 로드된 모델의 lookback"""
+    return lookback_spec(_MODEL)
+
+
+def _worker_forecast(X):
+    y_pred, _ = _MODEL.forecast(X)
+    return np.asarray(y_pred, dtype=np.float64), None
+
+
+class _PoolModel:
+    """워커에 로드된 모델의 forecast (lookback 확인용, 이 프로세스에는 모델을 로드하지 않음)"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def forecast(self, X):
+        return self.pool.submit(_worker_forecast, X).result()
+
+
+def checked_spec(model, model_path, df, spec, start):
+    """
+    lookback을 전체 이력으로 확인 (forecast_context.verified_spec, 모델 지문마다 한 번)
+
+    검증 시작 직후 horizon 스텝을 그 앞 전체 이력으로 forecast한 값과 자른 입력으로 forecast한 값을 비교
+    """
+    step = data_step(spec, df)
+    ahead = spec.get('horizon', 1) * step if step is not None else pd.Timedelta(0)
+    X = df[df[TIME_COL] < pd.Timestamp(start) + ahead].drop(columns=[TARGET_COL])
+    return verified_spec(model, X, spec, file_digest(model_path), verified_path(model_path), predict_from=start)
+
+
+def _result_columns(model, results):
+    origin = getattr(model, 'forecast_origin_column_name', ORIGIN_COL)
+    actual = getattr(model, 'actual_column_name', ACTUAL_COL)
+    if 'predicted' in results:
+        forecast = 'predicted'
+    else:
+        forecast = getattr(model, 'forecast_column_name', FORECAST_COL)
+    return origin, forecast, actual
+
+
+def _run_window(task):
+    """창 하나: rolling_forecast → (contID, origin, colDate, horizon, actual, predicted) 중 origin이 창 안인 행"""
+    start = time.perf_counter()
+    context = task['context']
+    X = context.drop(columns=[TARGET_COL])
+    y = context[TARGET_COL].to_numpy(dtype=np.float64)
+    raw = _MODEL.rolling_forecast(X_pred=X, y_pred=y, step=1, ignore_data_errors=True)
+    origin_col, forecast_col, actual_col = _result_columns(_MODEL, raw)
+
+    out = pd.DataFrame({
+        GRAIN_COL: np.asarray(raw[GRAIN_COL]) if GRAIN_COL in raw else task['zones'][0],
+        'origin': pd.to_datetime(raw[origin_col]) if origin_col in raw else pd.to_datetime(raw[TIME_COL]),
+        TIME_COL: pd.to_datetime(raw[TIME_COL]),
+        'actual': np.asarray(raw[actual_col], dtype=np.float64),
+        'predicted': np.asarray(raw[forecast_col], dtype=np.float64),
+    })
+    out = out[(out['origin'] >= task['start']) & (out['origin'] < task['end'])]
+    out = out.sort_values([GRAIN_COL, 'origin', TIME_COL], kind='stable')
+    # horizon: origin(첫 예측 시각)부터 몇 번째 스텝인지 (간격을 모르면 origin 안의 순서)
+    if task['step'] is not None:
+        horizon = ((out[TIME_COL] - out['origin']) // task['step']).astype(np.int64) + 1
+    else:
+        horizon = out.groupby([GRAIN_COL, 'origin'], sort=False).cumcount() + 1
+    out.insert(3, 'horizon', horizon)
+    return task['key'], out.reset_index(drop=True), time.perf_counter() - start
+
+
+def plan_windows(df, spec, start, end, window=WINDOW, zones=None, zones_per_task=None):
+    """
+    창 × 존 묶음 작업 목록. 작업마다 그 존들의 필요한 행만 (origin 앞 lookback + 창 끝 뒤 horizon - 1 스텝)
+
+    zones_per_task: 한 작업에 넣을 존 수 (기본: 전체). rolling_forecast는 origin마다 모든 존을 한 번에
+                    예측하므로 호출 고정 비용이 큰 모델은 묶는 편이 빠르고, 1이면 존마다 따로 (창이 적을 때 병렬)
+    Returns: [{'key', 'zones', 'start', 'end', 'step', 'context'}]
+    """
+    step = data_step(spec, df)
+    ahead = (spec.get('horizon', 1) - 1) * step if step is not None else pd.Timedelta(0)
+    starts = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=window, inclusive='left')
+    zones = sorted(df[GRAIN_COL].unique()) if zones is None else list(zones)
+    size = zones_per_task or len(zones)
+    groups = [zones[i:i + size] for i in range(0, len(zones), size)]
+
+    tasks = []
+    for w_start in starts:
+        w_end = min(w_start + pd.Timedelta(window), pd.Timestamp(end))
+        period = df[df[TIME_COL] < w_end + ahead]
+        for g, group in enumerate(groups):
+            context = trim_context(period[period[GRAIN_COL].isin(group)], spec, predict_from=w_start)
+            if not (context[TIME_COL] >= w_start).any():
+                continue
+            key = f"{w_start:%Y%m%d%H%M}_g{g:03d}"
+            tasks.append({'key': key, 'zones': group, 'start': w_start, 'end': w_end, 'step': step,
+                          'context': context.reset_index(drop=True)})
+    return tasks
+
+
+def checkpoint_dir(model_path, df, window=WINDOW, zones=None, zones_per_task=None, root=CHECKPOINT_ROOT):
+    """모델 파일 + 데이터 내용 + 창 길이 + 존 묶음 → 체크포인트 폴더 (하나라도 바뀌면 다른 폴더)"""
+    data = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(),
+                           digest_size=16).hexdigest()
+    key = params_digest({'model': file_digest(model_path), 'data': data, 'window': str(window),
+                         'zones': None if zones is None else [str(zone) for zone in zones],
+                         'zones_per_task': zones_per_task})
+    return os.path.join(root, key[:16])
+
+
+def _checkpoint_path(run_dir, key):
+    for ext in ('.parquet', '.csv'):
+        path = os.path.join(run_dir, key + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _save_checkpoint(run_dir, key, frame):
+    """창 결과 저장 (임시 파일 후 교체 → 중간에 끊겨도 반쪽 파일이 남지 않음)"""
+    try:
+        path = os.path.join(run_dir, key + '.parquet')
+        frame.to_parquet(path + '.tmp', index=False)
+    except ImportError:
+        path = os.path.join(run_dir, key + '.csv')
+        frame.to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _load_checkpoint(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, parse_dates=['origin', TIME_COL])
+
+
+def error_table(results):
+    """존 × horizon 오차 (n, MAE, RMSE, MAPE %, bias = 평균(실제 - 예측))"""
+    valid = results.dropna(subset=['actual', 'predicted'])
+    error = valid['actual'] - valid['predicted']
+    frame = valid[[GRAIN_COL, 'horizon']].assign(
+        error=error, abs_error=error.abs(), squared=error ** 2, ape=error.abs() / valid['actual'].abs())
+    table = frame.groupby([GRAIN_COL, 'horizon']).agg(
+        n=('error', 'size'), mae=('abs_error', 'mean'), rmse=('squared', 'mean'),
+        mape=('ape', 'mean'), bias=('error', 'mean'))
+    table['rmse'] = np.sqrt(table['rmse'])
+    table['mape'] *= 100
+    return table.reset_index()
+
+
+def run_validation(model_path, df, start, end, window=WINDOW, zones=None, zones_per_task=None, workers=None,
+                   checkpoint_root=CHECKPOINT_ROOT, resume=True):
+    """
+    존 × 창 rolling-origin 검증
+
+    df: 검증 기간 앞 컨텍스트를 포함한 전체 데이터 (contID, colDate, 센서, target_tempHot_30min)
+    zones_per_task: plan_windows 참고 (기본: 창 하나에 모든 존)
+    workers: 프로세스 수 (기본: CPU 수, 1이면 이 프로세스에서)
+    resume=False면 체크포인트 폴더를 지우고 처음부터
+
+    Returns: (창 결과를 합친 행별 표, error_table)
+    """
+    run_dir = checkpoint_dir(model_path, df, window, zones, zones_per_task, checkpoint_root)
+    if not resume and os.path.isdir(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir, exist_ok=True)
+
+    cpus = os.cpu_count() or 1
+    pool = None
+    wall = time.perf_counter()
+    try:
+        if workers is None or workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers or cpus, initializer=_init_worker,
+                                       initargs=(model_path,))
+            spec = checked_spec(_PoolModel(pool), model_path, df, pool.submit(_worker_spec).result(), start)
+        else:
+            _init_worker(model_path)
+            spec = checked_spec(_MODEL, model_path, df, _worker_spec(), start)
+
+        tasks = plan_windows(df, spec, start, end, window, zones, zones_per_task)
+        todo = [task for task in tasks if _checkpoint_path(run_dir, task['key']) is None]
+        with open(os.path.join(run_dir, 'run.json'), 'w') as f:
+            json.dump({'model': model_path, 'window': str(window), 'lookback': spec,
+                       'tasks': {task['key']: [str(zone) for zone in task['zones']] for task in tasks}},
+                      f, indent=2, default=str)
+        print(f"작업 {len(tasks)}개 (창 {len({t['start'] for t in tasks})}개 × 존 묶음, 창 {window}), "
+              f"체크포인트 {len(tasks) - len(todo)}개 완료 → {len(todo)}개 계산 ({run_dir})")
+        print(f"lookback: {spec['periods']} × {spec['freq']}, "
+              f"작업당 컨텍스트 평균 {np.mean([len(t['context']) for t in tasks]) if tasks else 0:,.0f}행")
+
+        window_sec = 0.0
+        if pool is not None:
+            futures = [pool.submit(_run_window, task) for task in todo]
+            done = (future.result() for future in as_completed(futures))
+        else:
+            done = (_run_window(task) for task in todo)
+        for i, (key, frame, sec) in enumerate(done, 1):
+            _save_checkpoint(run_dir, key, frame)
+            window_sec += sec
+            print(f"  [{i}/{len(todo)}] {key}: origin {frame['origin'].nunique():,}개, {sec:.1f}초")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    wall = time.perf_counter() - wall
+
+    frames = [_load_checkpoint(_checkpoint_path(run_dir, task['key'])) for task in tasks]
+    results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=[GRAIN_COL, 'origin', TIME_COL, 'horizon', 'actual', 'predicted'])
+    if todo:
+        print(f"\n전체 {wall:.1f}초 (창별 시간 합 {window_sec:.1f}초)")
+    return results, error_table(results)
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크
+# ---------------------------------------------------------------------------
+
+def single_call(model, df, start, end, zone=None):
+    """기존 07 방식: 전체 존 [start - lookback, end)를 rolling_forecast 한 번 (zone만 남김)"""
+    data = df[df[TIME_COL] < pd.Timestamp(end)]
+    data = trim_context(data, lookback_spec(model), predict_from=start).reset_index(drop=True)
+    raw = model.rolling_forecast(X_pred=data.drop(columns=[TARGET_COL]),
+                                 y_pred=data[TARGET_COL].to_numpy(dtype=np.float64), step=1,
+                                 ignore_data_errors=True)
+    origin_col, forecast_col, _ = _result_columns(model, raw)
+    raw = raw[pd.to_datetime(raw[origin_col]) >= pd.Timestamp(start)]
+    return raw if zone is None else raw[raw[GRAIN_COL] == zone]
+
+
+def benchmark(model_path=None, days=14, zones=4, window=WINDOW, workers=(1, 2)):
+    """한 번에 rolling_forecast (모든 존) vs 존 × 창 엔진 (워커 수별, 체크포인트 없이 새로)"""
+    import joblib
+    from forecast_context import ReferenceLagForecaster, make_history
+
+    tmp = tempfile.mkdtemp()
+    try:
+        df = make_history(1 + -(-days // 30), zones, '15min')
+        start = df[TIME_COL].min() + pd.Timedelta(days=7)
+        end = start + pd.Timedelta(days=days)
+        if model_path is None:
+            model = ReferenceLagForecaster()
+            train = df[df[TIME_COL] < start].dropna(subset=[TARGET_COL])
+            model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+            model_path = os.path.join(tmp, 'reference.pkl')
+            joblib.dump(model, model_path)
+        model, _ = load_forecaster(model_path)
+
+        print("="*60)
+        print(f"rolling-origin 검증: 존 {zones}개 × {days}일 (창 {window}, CPU {os.cpu_count()}개)")
+        print("="*60)
+        started = time.perf_counter()
+        single = single_call(model, df, start, end)
+        single_sec = time.perf_counter() - started
+        print(f"한 번에 rolling_forecast: {single_sec:.1f}초, 결과 {len(single):,}행")
+        origin_col, forecast_col, _ = _result_columns(model, single)
+        reference = single.rename(columns={origin_col: 'origin', forecast_col: 'single'})
+        reference = reference.assign(origin=pd.to_datetime(reference['origin']))[[GRAIN_COL, 'origin', TIME_COL, 'single']]
+
+        configs = [(n, None) for n in workers] + [(max(workers), 1)]
+        for n, per_task in configs:
+            started = time.perf_counter()
+            results, errors = run_validation(model_path, df, start, end, window, zones_per_task=per_task,
+                                             workers=n, checkpoint_root=os.path.join(tmp, 'ckpt'), resume=False)
+            sec = time.perf_counter() - started
+            merged = results.merge(reference, on=[GRAIN_COL, 'origin', TIME_COL])
+            diff = float(np.nanmax(np.abs(merged['predicted'] - merged['single']))) if len(merged) else float('nan')
+            label = '존별' if per_task == 1 else '존 묶음'
+            print(f"→ 워커 {n}개, {label}: {sec:.1f}초 ({single_sec / sec:.1f}배), 결과 {len(results):,}행, "
+                  f"한 번에 예측과 최대 차이 {diff:.1e}\n")
+        print(errors.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+
+        started = time.perf_counter()
+        run_validation(model_path, df, start, end, window, zones_per_task=1, workers=1,
+                       checkpoint_root=os.path.join(tmp, 'ckpt'))
+        print(f"\n체크포인트에서 다시 실행: {time.perf_counter() - started:.2f}초")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rolling-origin 검증 엔진 벤치마크")
+    parser.add_argument('--bench', action='store_true')
+    parser.add_argument('--model', default=None, help="모델 pkl (기본: 참조 lag 모델)")
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--zones', type=int, default=4)
+    parser.add_argument('--window', default=WINDOW)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    args = parser.parse_args()
+    benchmark(args.model, args.days, args.zones, args.window, tuple(args.workers))
+
+
+if __name__ == "__main__":
+    main()
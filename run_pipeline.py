@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+파이프라인 실행기 (내용 해시 기반 단계 캐시)
+
+clean_data.py → 09 → 02 → clean_rack_data.py → 03 → hier → 13 → 07 순서로 실행하되, 각 단계의
+입력 파일 / 스크립트 코드(로컬 import 포함) / 인자를 해시한 캐시 키가
+지난 실행과 같고 출력물이 그대로 남아 있으면 건너뛴다.
+대시보드는 이 단계들이 만든 산출물(cont_forecast_clean/, models/*.pkl,
+cont_with_anomalies.csv 등)을 읽기만 하므로 대시보드만 고친 뒤 다시 돌리면 전부 캐시로 끝난다.
+
+사용:
+    python run_pipeline.py                  # 바뀐 단계만 실행
+    python run_pipeline.py --dry-run        # 무엇이 실행될지 확인만
+    python run_pipeline.py --force 03       # 특정 단계 강제 실행
+    python run_pipeline.py --stages clean 09
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+
+import fingerprint
+
+STATE_PATH = './.pipeline_state.json'
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 단계 정의: 입력/출력은 파일 또는 폴더. optional=True면 입력이 없을 때 건너뜀 (Azure에서 받은 모델 등)
+# shared_outputs: 다른 스크립트(14 증분 갱신, 15)도 새로 쓰는 출력 → 있는지만 확인 (내용이 바뀌었다고 다시 실행하면
+#   그 스크립트의 결과를 덮어씀). 13/14/15가 버전을 추가하는 models/anomaly_pipeline/은 출력에 넣지 않는다.
+STAGES = [
+    {
+        'name': 'clean',
+        'script': 'clean_data.py',
+        'args': [],
+        'inputs': ['./data/cont_processed.csv'],
+        'outputs': ['./cont_forecast_clean'],
+    },
+    {
+        'name': '09',
+        'script': '09_prepare_validation_data.py',
+        'args': [],
+        'inputs': ['./data/cont_processed.csv', './cont_forecast_clean'],
+        'outputs': ['./data/cont_validation.csv'],
+    },
+    {
+        'name': '02',
+        'script': '02_train_forecast_model.py',
+        'args': [],
+        'inputs': ['./cont_forecast_clean'],
+        'outputs': ['./cont_forecast_data.csv'],
+    },
+    {
+        'name': 'rack',
+        'script': 'clean_rack_data.py',
+        'args': [],
+        'inputs': ['./data/rack_processed.csv'],
+        'outputs': ['./rack_clean'],
+    },
+    {
+        'name': '03',
+        'script': '03_train_anomaly_detector.py',
+        'args': [],
+        'inputs': ['./data/cont_processed.csv', './rack_clean'],
+        'outputs': ['./cont_with_anomalies.csv', './rack_with_anomalies.csv',
+                    './visualizations/containment_anomalies_timeseries.png',
+                    './visualizations/anomaly_score_analysis.png'],
+        'shared_outputs': ['./models/anomaly_detector_cont.pkl', './models/scaler_cont.pkl',
+                           './models/anomaly_detector_rack.pkl', './models/scaler_rack.pkl'],
+    },
+    {
+        'name': 'hier',
+        'script': 'anomaly_hierarchy.py',
+        'args': [],
+        'inputs': ['./cont_with_anomalies.csv', './rack_with_anomalies.csv'],
+        'outputs': ['./cont_rack_anomalies.parquet'],
+    },
+    {
+        'name': '13',
+        'script': '13_train_anomaly_models.py',
+        'args': ['--per-zone'],
+        'inputs': ['./data/cont_processed.csv', './rack_clean'],
+        'outputs': ['./models/anomaly_bundle'],
+    },
+    {
+        'name': '07',
+        'script': '07_validate_forecast.py',
+        'args': [],
+        'inputs': ['./models/model.pkl', './data/cont_validation.csv'],
+        'outputs': ['./forecast_validation_results.csv', './forecast_validation_errors.csv',
+                    './forecast_validation_cont1.png'],
+        'optional': True,
+    },
+]
+
+
+def local_modules(script, seen=None):
+    """스크립트가 (재귀적으로) import하는 저장소 내 .py 파일 목록"""
+    if seen is None:
+        seen = set()
+    path = os.path.join(ROOT, script)
+    if path in seen or not os.path.exists(path):
+        return seen
+    seen.add(path)
+
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_modules(name.split('.')[0] + '.py', seen)
+    return seen
+
+
+def stage_key(stage, memo):
+    """입력 + 코드 + 인자 해시 (입력이 없으면 None)"""
+    inputs = {}
+    for path in stage['inputs']:
+        digest = fingerprint.tree_digest(path, memo)
+        if digest is None:
+            return None
+        inputs[path] = digest
+    code = {os.path.relpath(p, ROOT): fingerprint.file_digest(p, memo)
+            for p in sorted(local_modules(stage['script']))}
+    return fingerprint.params_digest({'args': stage['args'], 'inputs': inputs, 'code': code})
+
+
+def outputs_digest(stage, memo):
+    """출력 내용 해시 (shared_outputs는 있는지만, 하나라도 없으면 None)"""
+    digests = {path: fingerprint.tree_digest(path, memo) for path in stage['outputs']}
+    if any(d is None for d in digests.values()):
+        return None
+    shared = stage.get('shared_outputs', [])
+    if not all(os.path.exists(path) for path in shared):
+        return None
+    return fingerprint.params_digest({**digests, **{path: 'exists' for path in shared}})
+
+
+def run_stage(stage):
+    # 07은 plt.show()를 호출하므로 창 없이 저장만 하도록
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    result = subprocess.run([sys.executable, stage['script']] + stage['args'], env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"{stage['script']} 실패 (exit {result.returncode})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="변경된 단계만 다시 실행하는 파이프라인")
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help="실행할 단계 (기본: 전체). 예: clean 09 02 rack 03 07")
+    parser.add_argument('--force', nargs='+', default=[],
+                        help="캐시를 무시하고 실행할 단계")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="실행하지 않고 캐시 적중 여부만 출력")
+    args = parser.parse_args()
+
+    names = [s['name'] for s in STAGES]
+    for name in (args.stages or []) + args.force:
+        if name not in names:
+            parser.error(f"알 수 없는 단계: {name} (가능: {', '.join(names)})")
+    selected = [s for s in STAGES if args.stages is None or s['name'] in args.stages]
+
+    saved = fingerprint.load_memo(STATE_PATH)
+    memo = saved.get('digests', {})
+    state = saved.get('stages', {})
+
+    print("="*60)
+    print("파이프라인 실행")
+    print("="*60)
+
+    report = []
+    failed = None
+    total_start = time.perf_counter()
+    try:
+        for stage in selected:
+            start = time.perf_counter()
+            key = stage_key(stage, memo)
+
+            if key is None:
+                missing = [p for p in stage['inputs'] if not os.path.exists(p)]
+                if not stage.get('optional'):
+                    raise FileNotFoundError(f"[{stage['name']}] 입력 없음: {missing}")
+                status = '건너뜀 (입력 없음)'
+            elif (stage['name'] not in args.force
+                  and state.get(stage['name'], {}).get('key') == key
+                  and state[stage['name']].get('outputs') == outputs_digest(stage, memo)):
+                status = '캐시'
+            elif args.dry_run:
+                status = '실행 예정'
+            else:
+                print(f"\n▶ [{stage['name']}] {stage['script']} {' '.join(stage['args'])}")
+                try:
+                    run_stage(stage)
+                except RuntimeError as e:
+                    # 실패한 단계에서 멈추고 (다음 단계는 입력이 어긋나므로) 지금까지 결과만 보고
+                    failed = e
+                    state.pop(stage['name'], None)
+                    report.append((stage['name'], stage['script'], '실패', time.perf_counter() - start))
+                    break
+                state[stage['name']] = {'key': key, 'outputs': outputs_digest(stage, memo)}
+                status = '실행'
+
+            elapsed = time.perf_counter() - start
+            report.append((stage['name'], stage['script'], status, elapsed))
+    finally:
+        if not args.dry_run:
+            memo = {k: v for k, v in memo.items() if os.path.exists(k)}
+            fingerprint.save_memo({'stages': state, 'digests': memo}, STATE_PATH)
+
+    print("\n" + "="*60)
+    print("단계별 결과")
+    print("="*60)
+    for name, script, status, elapsed in report:
+        print(f"  {name:<6} {script:<32} {status:<16} {elapsed:8.2f}초")
+    hits = sum(1 for r in report if r[2] == '캐시')
+    print(f"\n캐시 적중: {hits}/{len(report)}  총 소요: {time.perf_counter() - total_start:.2f}초")
+
+    if failed is not None:
+        print(f"\n❌ {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+공용 메모리 스키마 (로드 시 적용)
+
+- 센서/타겟/점수 컬럼: float64 → float32
+- contID: int64 또는 'zone_N' 문자열 → category
+- hour, day_of_week, month, day, is_anomaly: int8 / rack_count: int16 / rackID: int32
+- colDate: datetime64
+
+data_loader는 이 스키마를 읽는 시점에 적용한다 (read_dtypes → read_csv dtype=, arrow_cast → to_pandas 전).
+float64/int64 프레임을 먼저 만들고 줄이는 것이 아니라서 로드 중 피크 메모리도 줄어든다.
+
+모델(AutoML, StandardScaler 등)에 넣기 직전에는 to_model_frame()으로 원래 dtype으로 되돌리고,
+check_output_tolerance()로 float32 입력이 결과를 허용 오차 이상 바꾸지 않는지 확인한다.
+"""
+import numpy as np
+import pandas as pd
+
+SENSOR_COLS = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
+
+FLOAT32_COLS = SENSOR_COLS + ['target_tempHot_30min', 'anomaly_score']
+
+SMALL_INT_COLS = {
+    'hour': np.int8,
+    'day_of_week': np.int8,
+    'month': np.int8,
+    'day': np.int8,
+    'is_anomaly': np.int8,
+    'rack_count': np.int16,
+    'rackID': np.int32,
+}
+
+
+def read_dtypes():
+    """
+    pd.read_csv(dtype=)용: 파싱하면서 바로 float32 / category contID
+
+    작은 정수 컬럼은 NaN이 있어도 읽히도록 float32로 읽고 compact()에서 정수로 바꾼다
+    (2^24 미만 정수는 float32로 정확). 파일에 없는 컬럼은 read_csv가 무시한다.
+    """
+    dtypes = {col: np.float32 for col in FLOAT32_COLS}
+    dtypes.update({col: np.float32 for col in SMALL_INT_COLS})
+    dtypes['contID'] = 'category'
+    return dtypes
+
+
+def arrow_cast(table):
+    """Arrow 테이블을 to_pandas() 전에 작은 타입으로 (float32, 작은 정수, contID dictionary → category)"""
+    import pyarrow as pa
+
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if field.name in FLOAT32_COLS and pa.types.is_floating(field.type):
+            column = column.cast(pa.float32())
+        elif field.name in SMALL_INT_COLS and pa.types.is_integer(field.type):
+            column = column.cast(pa.from_numpy_dtype(SMALL_INT_COLS[field.name]))
+        elif field.name == 'contID' and not pa.types.is_dictionary(field.type):
+            column = column.dictionary_encode()
+        else:
+            continue
+        table = table.set_column(i, field.name, column)
+    return table
+
+
+def numeric_categories(zones):
+    """read_csv category는 문자열 category ('10' < '2') → 숫자면 숫자 category, 값 순서로"""
+    categories = zones.cat.categories
+    if not pd.api.types.is_numeric_dtype(categories):
+        try:
+            zones = zones.cat.rename_categories(pd.to_numeric(categories))
+        except (ValueError, TypeError):
+            pass
+    if not zones.cat.categories.is_monotonic_increasing:
+        zones = zones.cat.reorder_categories(zones.cat.categories.sort_values())
+    return zones
+
+
+def compact(df, zone_prefix=None):
+    """
+    로드된 프레임을 작은 dtype으로 변환 (제자리 변환 후 반환)
+
+    read_dtypes/arrow_cast로 읽은 프레임이면 남은 정수 변환과 category 정리만 한다.
+    zone_prefix='zone_'이면 숫자 contID를 'zone_1' 형태의 category로 만든다 (Anomaly Dashboard 표시용).
+    """
+    for col in FLOAT32_COLS:
+        if col in df.columns and df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+
+    for col, dtype in SMALL_INT_COLS.items():
+        # NaN이 있으면 정수형으로 바꿀 수 없으므로 그대로 둠
+        if col in df.columns and df[col].dtype != dtype and df[col].notna().all():
+            df[col] = df[col].astype(dtype)
+
+    if 'contID' in df.columns:
+        # 읽는 시점 category는 파일 전체 존을 가짐 → 조건으로 걸러진 존은 빼기 (groupby에 빈 그룹이 생기지 않게)
+        zones = numeric_categories(df['contID'].astype('category')).cat.remove_unused_categories()
+        if zone_prefix is not None and pd.api.types.is_numeric_dtype(zones.cat.categories):
+            zones = zones.cat.rename_categories(lambda z: f'{zone_prefix}{z}')
+        df['contID'] = zones
+
+    if 'colDate' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['colDate']):
+        df['colDate'] = pd.to_datetime(df['colDate'])
+
+    return df
+
+
+def to_model_frame(df):
+    """모델 입력용으로 원래 dtype 복원 (float64, int64 contID)"""
+    out = df.copy()
+    for col in FLOAT32_COLS:
+        if col in out.columns:
+            out[col] = out[col].astype(np.float64)
+    for col in SMALL_INT_COLS:
+        if col in out.columns and pd.api.types.is_integer_dtype(out[col]):
+            out[col] = out[col].astype(np.int64)
+    if 'contID' in out.columns and isinstance(out['contID'].dtype, pd.CategoricalDtype):
+        out['contID'] = out['contID'].astype(out['contID'].cat.categories.dtype)
+    return out
+
+
+def memory_mb(df):
+    """프레임의 실제 메모리 사용량 (MB, object 문자열 포함)"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def check_output_tolerance(predict_fn, reference_df, compact_df, atol, name='model'):
+    """
+    같은 데이터를 float64(원본)와 float32(compact)로 넣었을 때 모델 출력 차이 확인
+
+    Returns:
+        max_abs_diff (float). atol을 넘으면 경고를 출력한다.
+    """
+    expected = np.asarray(predict_fn(reference_df), dtype=np.float64)
+    actual = np.asarray(predict_fn(to_model_frame(compact_df)), dtype=np.float64)
+    max_diff = float(np.nanmax(np.abs(expected - actual))) if len(expected) else 0.0
+
+    status = "OK" if max_diff <= atol else "⚠️ 허용 오차 초과"
+    print(f"  [{name}] float32 스키마 출력 차이: 최대 {max_diff:.2e} (허용 {atol:.0e}) {status}")
+    return max_diff
+
+
+def _peak_mb(load):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        df = load()
+        return df, tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    # 메모리 비교: python schema.py [CSV 경로 ...]
+    import sys
+    from data_loader import read_table
+
+    paths = sys.argv[1:] or ['./cont_forecast_clean/data.csv', './data/rack_processed.csv']
+    print("="*60)
+    print("로드 스키마별 메모리 사용량 (로드 후 / 로드 중 피크)")
+    print("="*60)
+    for path in paths:
+        full, full_peak = _peak_mb(lambda: read_table(path))
+        small, small_peak = _peak_mb(lambda: read_table(path, compact=True))
+        print(f"  {path}: {memory_mb(full):,.1f} MB → {memory_mb(small):,.1f} MB "
+              f"(피크 {full_peak:,.1f} MB → {small_peak:,.1f} MB)")
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+벤치마크용 합성 센서 데이터 생성
+data/cont_processed.csv 와 같은 컬럼 구조(10분 간격, 중복/결측 포함)를 만든다
+"""
+import numpy as np
+import pandas as pd
+
+SENSOR_COLS = ['tempHot', 'tempCold', 'humiHot', 'humiCold', 'temp_diff', 'humi_diff']
+
+
+def make_cont_readings(n_zones=4, days=14, interval_min=10, start='2025-07-01',
+                       missing_frac=0.05, dup_frac=0.03, max_start_delay_min=120, seed=42):
+    """
+    컨테인먼트 원본 데이터 생성
+
+    - 존마다 시작 시각이 조금씩 다르고 (첫 존은 start, 나머지는 0 ~ max_start_delay_min분 늦게) 일부 시점이 빠져 있음
+    - dup_frac 비율만큼 같은 (contID, colDate) 행이 값만 달리해서 중복됨
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start=start, periods=days * 24 * 60 // interval_min,
+                          freq=f'{interval_min}min')
+    n_times = len(times)
+
+    cont_ids = np.repeat(np.arange(1, n_zones + 1), n_times)
+    col_date = np.tile(times.values, n_zones)
+
+    # 존별 베이스 + 일주기 패턴 + 노이즈
+    hours = np.tile(times.hour.values, n_zones)
+    daily = 1.5 * np.sin((hours - 6) * np.pi / 12)
+    temp_hot = 30.5 + cont_ids * 0.01 + daily + rng.normal(0, 0.3, len(cont_ids))
+    temp_cold = 22.0 + rng.normal(0, 0.3, len(cont_ids))
+    humi_hot = 45.0 + rng.normal(0, 2.0, len(cont_ids))
+    humi_cold = 50.0 + rng.normal(0, 2.0, len(cont_ids))
+
+    df = pd.DataFrame({
+        'contID': cont_ids,
+        'colDate': col_date,
+        'tempHot': temp_hot.round(2),
+        'tempCold': temp_cold.round(2),
+        'humiHot': humi_hot.round(2),
+        'humiCold': humi_cold.round(2),
+    })
+    df['temp_diff'] = (df['tempHot'] - df['tempCold']).round(2)
+    df['humi_diff'] = (df['humiHot'] - df['humiCold']).round(2)
+    df['hour'] = df['colDate'].dt.hour
+    df['day_of_week'] = df['colDate'].dt.dayofweek
+    df['rack_count'] = 13
+
+    # 늦게 시작한 존 (그 앞 시점 없음)
+    delays = rng.integers(0, max_start_delay_min // interval_min + 1, n_zones) * interval_min
+    delays[0] = 0
+    late = df['colDate'].to_numpy() < np.datetime64(pd.Timestamp(start)) + pd.to_timedelta(
+        np.repeat(delays, n_times), unit='min').to_numpy()
+
+    # 결측 시점
+    df = df[(rng.random(len(df)) >= missing_frac) & ~late]
+
+    # 중복 행 (같은 키, 조금 다른 값)
+    dup = df.sample(frac=dup_frac, random_state=seed).copy()
+    dup['tempHot'] = dup['tempHot'] + 0.3
+    df = pd.concat([df, dup], ignore_index=True)
+
+    return df.sort_values('colDate', kind='stable').reset_index(drop=True)
+
+
+def make_rack_readings(n_racks=52, days=14, racks_per_zone=13, first_rack=0, interval_min=10,
+                       start='2025-07-01', missing_frac=0.05, dup_frac=0.03, seed=42):
+    """
+    랙 원본 데이터 생성 (data/rack_processed.csv 와 같은 컬럼)
+
+    - 랙 번호 first_rack ~ first_rack + n_racks - 1 (블록 단위로 나눠 생성할 때 사용)
+    - contID = 랙 번호 // racks_per_zone + 1, rackID = contID * 100 + 존 안 순번 + 1
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start=start, periods=days * 24 * 60 // interval_min,
+                          freq=f'{interval_min}min')
+    n_times = len(times)
+
+    rack_no = np.arange(first_rack, first_rack + n_racks)
+    cont_ids = rack_no // racks_per_zone + 1
+    rack_ids = cont_ids * 100 + rack_no % racks_per_zone + 1
+    n = n_racks * n_times
+
+    hours = np.tile(times.hour.values, n_racks)
+    daily = 1.5 * np.sin((hours - 6) * np.pi / 12)
+    temp_hot = (30.5 + np.repeat(rack_no % racks_per_zone, n_times) * 0.05 + daily
+                + rng.normal(0, 0.4, n)).round(2)
+    temp_cold = (22.0 + rng.normal(0, 0.3, n)).round(2)
+    humi_hot = (45.0 + rng.normal(0, 2.0, n)).round(2)
+    humi_cold = (50.0 + rng.normal(0, 2.0, n)).round(2)
+
+    col_date = np.tile(times.values, n_racks)
+    df = pd.DataFrame({
+        'contID': np.repeat(cont_ids, n_times),
+        'rackID': np.repeat(rack_ids, n_times),
+        'colDate': col_date,
+        'tempHot': temp_hot,
+        'tempCold': temp_cold,
+        'humiHot': humi_hot,
+        'humiCold': humi_cold,
+        'temp_diff': (temp_hot - temp_cold).round(2),
+        'humi_diff': (humi_hot - humi_cold).round(2),
+    })
+    df['hour'] = hours
+    df['day_of_week'] = np.tile(times.dayofweek.values, n_racks)
+    df['month'] = np.tile(times.month.values, n_racks)
+    df['day'] = np.tile(times.day.values, n_racks)
+
+    # 결측 시점
+    df = df[rng.random(len(df)) >= missing_frac]
+
+    # 중복 행 (같은 키, 조금 다른 값)
+    dup = df.sample(frac=dup_frac, random_state=seed).copy()
+    dup['tempHot'] = dup['tempHot'] + 0.3
+    df = pd.concat([df, dup], ignore_index=True)
+
+    return df.sort_values('colDate', kind='stable').reset_index(drop=True)
+
+
+FAULT_KINDS = ['normal', 'overheat', 'humidity_drop', 'spike', 'erratic', 'outlier']
+
+
+def make_anomaly_workload(n_rows, n_zones=4, level='cont', racks_per_zone=13, interval_min=10,
+                          start='2025-07-01', outlier_frac=0.02, seed=42):
+    """
+    이상 탐지 벤치마크용 합성 데이터 (정확히 n_rows행, 시각 순, 센서 float32)
+
+    시리즈(존 또는 랙)마다 generate_anomaly_demo.py의 고장 패턴 하나를 임의 시각에 주입 (시리즈 번호 % 4):
+    - overheat: 3시간 동안 +4.5°C (장비 고장)
+    - humidity_drop: 3시간 동안 습도 -15 (냉각 시스템 문제)
+    - spike: 연속 3회 +5°C (순간적 이상)
+    - erratic: 3시간 동안 30% 확률로 -2 ~ +3°C 변동
+    나머지 행 중 outlier_frac만큼 ±3°C 임의 이상치.
+    fault 컬럼 = FAULT_KINDS 번호 (0 정상). level='rack'이면 존마다 racks_per_zone개 랙.
+    """
+    rng = np.random.default_rng(seed)
+    n_series = n_zones * (racks_per_zone if level == 'rack' else 1)
+    n_times = max(-(-n_rows // n_series), 1)
+    window = max(180 // interval_min, 1)
+
+    # 시각 우선 배치 (행 i → 시각 i // n_series, 시리즈 i % n_series): 행 수를 잘라도 시리즈 길이가 고름
+    idx = np.arange(n_rows, dtype=np.int64)
+    t = idx // n_series
+    series = idx % n_series
+    zone = series // (racks_per_zone if level == 'rack' else 1) + 1
+
+    step = np.int64(interval_min * 60 * 10**9)
+    col_date = np.datetime64(pd.Timestamp(start), 'ns') + t * step
+    hour = (t * interval_min // 60) % 24
+    daily = 1.5 * np.sin((hour - 6) * np.pi / 12)
+
+    temp_hot = 30.5 + (zone % 10) * 0.2 + daily + rng.normal(0, 0.3, n_rows)
+    temp_cold = 22.0 + rng.normal(0, 0.3, n_rows)
+    humi_hot = 45.0 + (zone % 10) * 0.5 + rng.normal(0, 2.0, n_rows)
+    humi_cold = 50.0 + rng.normal(0, 2.0, n_rows)
+
+    # 시리즈별 고장 종류/시작 시각/길이
+    kind = series % 4 + 1
+    length = np.where(kind == 3, 3, window)
+    start_t = rng.integers(0, max(n_times - window, 1), n_series)[series]
+    in_window = (t >= start_t) & (t < start_t + length)
+
+    fault = np.zeros(n_rows, dtype=np.int8)
+    hit = in_window & (kind == 1)
+    temp_hot[hit] += 4.5
+    fault[hit] = 1
+    hit = in_window & (kind == 2)
+    humi_hot[hit] -= 15.0
+    fault[hit] = 2
+    hit = in_window & (kind == 3)
+    temp_hot[hit] += 5.0
+    fault[hit] = 3
+    hit = np.flatnonzero(in_window & (kind == 4) & (rng.random(n_rows) < 0.3))
+    temp_hot[hit] += rng.uniform(-2, 3, len(hit))
+    fault[hit] = 4
+    hit = np.flatnonzero((fault == 0) & (rng.random(n_rows) < outlier_frac))
+    temp_hot[hit] += rng.choice([-3.0, 3.0], len(hit))
+    fault[hit] = 5
+
+    df = pd.DataFrame({'contID': zone, 'colDate': col_date})
+    if level == 'rack':
+        df['rackID'] = zone * 100 + series % racks_per_zone + 1
+    df['tempHot'] = temp_hot.astype(np.float32)
+    df['tempCold'] = temp_cold.astype(np.float32)
+    df['humiHot'] = humi_hot.astype(np.float32)
+    df['humiCold'] = humi_cold.astype(np.float32)
+    df['temp_diff'] = df['tempHot'] - df['tempCold']
+    df['humi_diff'] = df['humiHot'] - df['humiCold']
+    df['hour'] = hour.astype(np.int8)
+    df['fault'] = fault
+    return df
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""저장소 루트의 스크립트/모듈을 import할 수 있게 경로 추가 (저장소 루트에서 python -m pytest -q, pytest.ini testpaths = tests)"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
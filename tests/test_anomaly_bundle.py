@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""13 번들: 병렬 학습한 레벨/존 모델 저장 → 서비스가 측정값 contID마다 select_model과 같은 모델로 점수"""
+import importlib
+
+import numpy as np
+import pytest
+
+from anomaly_bundle import load_bundle, model_key, save_bundle, select_model, zone_ids
+from anomaly_pipeline import FEATURE_COLS
+from anomaly_service import AnomalyScorer, AnomalyService
+from synthetic import make_cont_readings
+
+train = importlib.import_module('13_train_anomaly_models')
+
+PARAMS = {'contamination': 0.05, 'n_estimators': 20, 'random_state': 0}
+
+
+@pytest.fixture(scope='module')
+def readings():
+    """존 3개, 존 3은 행이 적어 존 모델 없음"""
+    df = make_cont_readings(n_zones=3, days=3)
+    return df[(df['contID'] != 3) | (df.index % 10 == 0)].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def bundle(readings, tmp_path_factory):
+    cont_ids = readings['contID'].to_numpy(dtype=np.int64)
+    X = np.ascontiguousarray(readings[FEATURE_COLS].to_numpy(dtype=np.float32))
+    order = np.argsort(cont_ids, kind='stable')
+    zones, starts = np.unique(cont_ids[order], return_index=True)
+    ends = np.append(starts[1:], len(cont_ids))
+    levels = {'cont': (X, order, {int(z): (int(s), int(e)) for z, s, e in zip(zones, starts, ends)})}
+
+    models, _ = train.train_models(levels, per_zone=True, workers=1, n_jobs=1, params=PARAMS, min_zone_rows=200)
+    bundle_dir = str(tmp_path_factory.mktemp('bundle'))
+    version = save_bundle(models, {'feature_cols': FEATURE_COLS, 'params': PARAMS}, bundle_dir=bundle_dir)
+    assert version == 1
+    return load_bundle(bundle_dir=bundle_dir)
+
+
+def test_bundle_has_level_and_zone_models(bundle):
+    assert model_key('cont') in bundle['models']
+    assert zone_ids(bundle, 'cont') == [1, 2]
+
+
+def test_service_scores_with_selected_zone_model(bundle, readings):
+    service = AnomalyService(AnomalyScorer(bundle=bundle), max_wait_ms=5).start()
+    try:
+        scores, labels = service.submit_many('cont', readings).result()
+    finally:
+        service.stop()
+
+    X = readings[FEATURE_COLS].to_numpy(dtype=np.float64)
+    for cont_id in (1, 2, 3):
+        rows = (readings['contID'] == cont_id).to_numpy()
+        model, scaler = select_model(bundle, 'cont', cont_id)
+        X_scaled = scaler.transform(X[rows])
+        np.testing.assert_allclose(scores[rows], model.score_samples(X_scaled), rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(labels[rows] == 1, model.predict(X_scaled) == -1)
+
+
+def test_zone_models_need_cont_id(bundle, readings):
+    scorer = AnomalyScorer(bundle=bundle)
+    with pytest.raises(ValueError):
+        scorer.zones_of('cont', readings.drop(columns=['contID']))
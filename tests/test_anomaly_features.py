@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""anomaly_features: 창 통계 = pandas groupby.rolling, 동료 편차 = 자기 제외 중앙값, 증분 == 배치"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_features import FeatureState, add_features, feature_names, pandas_reference
+from synthetic import make_rack_readings
+
+
+@pytest.fixture(scope='module')
+def readings():
+    return make_rack_readings(n_racks=12, days=2, racks_per_zone=6, dup_frac=0)
+
+
+@pytest.fixture(scope='module')
+def batch(readings):
+    return add_features(readings, 'rack')
+
+
+def _naive_peer_dev(df, col):
+    """같은 (contID, 시각)의 다른 랙 중앙값 대비 편차 (행 루프)"""
+    dev = pd.Series(np.nan, index=df.index)
+    for _, cell in df.groupby(['contID', 'colDate']):
+        for idx in cell.index:
+            peers = cell.loc[cell.index != idx, col].dropna()
+            if len(peers) and not np.isnan(cell.at[idx, col]):
+                dev[idx] = cell.at[idx, col] - peers.median()
+    return dev.to_numpy()
+
+
+def test_window_stats_match_pandas(readings, batch):
+    ref = pandas_reference(readings, 'rack')
+    for col in ref.columns:
+        np.testing.assert_allclose(batch[col].to_numpy(), ref[col].to_numpy(), rtol=1e-9, atol=1e-9)
+    assert batch.index.equals(readings.index)                 # 원래 행 순서
+
+
+def test_peer_deviation_matches_naive_median(readings, batch):
+    for col in ('tempHot', 'humiHot'):
+        np.testing.assert_allclose(batch[f'{col}_peer_dev'].to_numpy(), _naive_peer_dev(readings, col),
+                                   rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('split', ['hour', 'hour_zone'])
+def test_incremental_matches_batch(readings, batch, split):
+    """시간별 (또는 시간 × 존별: 호출마다 일부 시리즈만 바뀜) 증분 계산 == 배치"""
+    parts = [readings['colDate'].dt.floor('h')]
+    if split == 'hour_zone':
+        parts.append(readings['contID'])
+    state = FeatureState('rack')
+    names = feature_names()
+    for _, chunk in readings.groupby(parts, sort=True):
+        out = state.update(chunk)
+        np.testing.assert_allclose(out[names].to_numpy(), batch.loc[chunk.index, names].to_numpy(),
+                                   rtol=1e-6, atol=1e-6)
+    # 남긴 행은 시리즈마다 창 길이(1시간) 안쪽만
+    span = state.tail.groupby(['contID', 'rackID'])['colDate'].agg(lambda t: t.max() - t.min())
+    assert (span < pd.Timedelta('1h')).all()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""anomaly_hierarchy: 색인 + bincount 집계 = pandas floor + merge + groupby"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_hierarchy import build_hierarchy, pandas_reference
+from synthetic import make_rack_readings
+
+
+@pytest.fixture(scope='module')
+def frames():
+    """랙 26개(존 2개) × 2일 + 랙 격자에서 몇 분씩 어긋난 컨테인먼트 시각 (anomaly_hierarchy.benchmark와 같은 방식)"""
+    rng = np.random.default_rng(0)
+    rack = make_rack_readings(n_racks=26, days=2, racks_per_zone=13)
+    rack['anomaly_score'] = rng.normal(-0.45, 0.05, len(rack)).round(3)   # 동률 점수가 생기게 반올림
+    rack['is_anomaly'] = (rack['anomaly_score'] < -0.52).astype(int)
+    cont = rack[['contID', 'colDate']].drop_duplicates().reset_index(drop=True)
+    cont['colDate'] += pd.to_timedelta(rng.integers(0, 10, len(cont)), unit='min')
+    cont['anomaly_score'] = rng.normal(-0.45, 0.05, len(cont))
+    cont['is_anomaly'] = (cont['anomaly_score'] < -0.52).astype(int)
+    # 컨테인먼트에 없는 시각의 랙 행 (매칭 안 됨)
+    stray = rack.iloc[:5].copy()
+    stray['colDate'] -= pd.Timedelta(days=1)
+    return cont, pd.concat([rack, stray], ignore_index=True)
+
+
+def test_hierarchy_matches_pandas(frames):
+    cont, rack = frames
+    table, unmatched = build_hierarchy(cont, rack)
+    ref = pandas_reference(cont, rack)
+
+    assert unmatched == 5
+    np.testing.assert_array_equal(table['n_racks'], ref['n_racks'].fillna(0).astype(int))
+    np.testing.assert_array_equal(table['rack_anomalies'], ref['rack_anomalies'].fillna(0).astype(int))
+    for col in ('worst_rack_score', 'rack_score_std'):
+        np.testing.assert_allclose(table[col], ref[col], atol=1e-6, equal_nan=True)
+
+
+def test_hierarchy_worst_rack_is_first_minimum(frames):
+    """worst_rackID = 가장 낮은 점수의 랙 (동률이면 입력에서 먼저 나온 랙), pandas idxmin과 같음"""
+    cont, rack = frames
+    table, _ = build_hierarchy(cont, rack)
+
+    keyed = rack.assign(colDate=rack['colDate'].dt.floor('10min'))
+    first_min = keyed.loc[keyed.groupby(['contID', 'colDate'])['anomaly_score'].idxmin(),
+                          ['contID', 'colDate', 'rackID']]
+    merged = table.merge(first_min, on=['contID', 'colDate'], how='inner')
+    assert len(merged) == int((table['n_racks'] > 0).sum())
+    np.testing.assert_array_equal(merged['worst_rackID'], merged['rackID'])
+
+
+def test_hierarchy_chunked_equals_whole(frames):
+    cont, rack = frames
+    whole, _ = build_hierarchy(cont, rack)
+    chunked, unmatched = build_hierarchy(cont, (rack.iloc[i:i + 333] for i in range(0, len(rack), 333)))
+
+    assert unmatched == 5
+    pd.testing.assert_frame_equal(chunked.drop(columns=['rack_score_std']),
+                                  whole.drop(columns=['rack_score_std']))
+    np.testing.assert_allclose(chunked['rack_score_std'], whole['rack_score_std'], atol=1e-6, equal_nan=True)
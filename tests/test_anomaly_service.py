@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""anomaly_service: micro-batch 점수 = sklearn IsolationForest, 지연 시간은 특성 계산부터"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from anomaly_pipeline import FEATURE_COLS
+from anomaly_service import AnomalyScorer, AnomalyService, make_handler
+from synthetic import make_cont_readings
+
+
+@pytest.fixture(scope='module')
+def readings():
+    return make_cont_readings(n_zones=2, days=2)
+
+
+@pytest.fixture(scope='module')
+def models(readings):
+    X = readings[FEATURE_COLS].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=50, contamination=0.05, random_state=0).fit(scaler.transform(X))
+    return {'cont': (model, scaler)}
+
+
+@pytest.fixture
+def service(models):
+    service = AnomalyService(AnomalyScorer(models=models), max_wait_ms=5).start()
+    yield service
+    service.stop()
+
+
+def test_scores_match_sklearn(models, readings, service):
+    model, scaler = models['cont']
+    X = scaler.transform(readings[FEATURE_COLS].to_numpy(dtype=np.float64))
+    futures = [service.submit_many('cont', readings.iloc[i:i + 100]) for i in range(0, len(readings), 100)]
+    scores = np.concatenate([f.result()[0] for f in futures])
+    labels = np.concatenate([f.result()[1] for f in futures])
+
+    np.testing.assert_allclose(scores, model.score_samples(X), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(labels == 1, model.predict(X) == -1)
+    assert service.score('cont', readings.iloc[0].to_dict())['is_anomaly'] == int(labels[0])
+
+
+def test_latency_includes_feature_construction(readings, service):
+    """to_matrix가 느리면 보고되는 p50에도 그 시간이 들어가야 함"""
+    to_matrix = service.scorer.to_matrix
+
+    def slow_to_matrix(kind, rows):
+        time.sleep(0.05)
+        return to_matrix(kind, rows)
+
+    service.scorer.to_matrix = slow_to_matrix
+    for i in range(5):
+        service.score_many('cont', readings.iloc[i:i + 10])
+    assert service.stats.to_dict()['p50_ms'] >= 50
+
+
+def test_unknown_kind_is_rejected(readings, service):
+    with pytest.raises(ValueError):
+        service.submit_many('rack', readings.iloc[:5])
+
+
+def test_http_non_object_body_returns_400(service):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        req = urllib.request.Request(f'http://127.0.0.1:{httpd.server_address[1]}/score', data=b'[1, 2]')
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(req, timeout=10)
+        assert e.value.code == 400 and 'error' in json.loads(e.value.read())
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""bench_anomaly.compare: 머신 속도 변화는 기준 작업으로 보정, 여러 경로가 함께 느려진 회귀는 잡음"""
+import json
+
+import pytest
+
+import bench_anomaly
+
+PATHS = ['03_sklearn', '03_compiled', 'pipeline_mmap', '15_sampled']
+
+
+def _results(score_sec):
+    return [{'case': 'cont_rows100000_zones4', 'level': 'cont', 'rows': 100_000, 'zones': 4, 'path': path,
+             'fit_sec': 1.0, 'score_sec': sec, 'fit_peak_mb': 10.0, 'score_peak_mb': 5.0,
+             'artifact_bytes': 1000, 'anomaly_rate': 0.05, 'fault_recall': 0.9}
+            for path, sec in zip(PATHS, score_sec)]
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    path = tmp_path / 'baseline.json'
+    path.write_text(json.dumps({'meta': {'git_commit': 'abc', 'repeat': 5, 'calibration_sec': 0.3},
+                                'results': _results([1.0, 1.0, 1.0, 1.0])}))
+    return str(path)
+
+
+def test_regression_on_most_paths_is_reported(baseline):
+    """3/4 경로가 1.6배: 경로 중앙값으로 나누면 1.0이 되지만 기준 작업은 그대로라 회귀 3개"""
+    assert bench_anomaly.compare(_results([1.6, 1.6, 1.6, 1.0]), baseline, 1.5, calibration_sec=0.3) == 3
+
+
+def test_slower_machine_is_not_a_regression(baseline):
+    """기준 작업도 같이 2배 → 머신 속도 변화로 보정해 회귀 없음"""
+    assert bench_anomaly.compare(_results([2.0, 2.0, 2.0, 2.0]), baseline, 1.5, calibration_sec=0.6) == 0
+
+
+def test_single_path_regression_is_reported(baseline):
+    assert bench_anomaly.compare(_results([1.0, 1.0, 1.0, 2.0]), baseline, 1.5, calibration_sec=0.3) == 1
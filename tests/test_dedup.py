@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""dedup: 정수 키 재집계 = groupby(keys + [colDate]).agg (결측 키 행은 groupby처럼 제외)"""
+import numpy as np
+import pandas as pd
+
+from dedup import dedup_keys
+from forecast_frame import AGG_DICT
+from synthetic import make_cont_readings, make_rack_readings
+
+
+def _groupby(df, keys, agg):
+    return df.groupby(keys + ['colDate'], as_index=False).agg(agg)
+
+
+def test_dedup_matches_groupby():
+    raw = make_cont_readings(n_zones=5, days=2)
+    result, stats = dedup_keys(raw, ['contID'], AGG_DICT)
+
+    pd.testing.assert_frame_equal(result, _groupby(raw, ['contID'], AGG_DICT))
+    assert stats['collided_keys'] > 0
+    assert stats['extra_rows'] == len(raw) - len(result)
+
+
+def test_dedup_two_keys_matches_groupby():
+    rack = make_rack_readings(n_racks=26, days=1, racks_per_zone=13)
+    rack = pd.concat([rack, rack.sample(frac=0.05, random_state=0).assign(tempHot=lambda d: d['tempHot'] + 1)],
+                     ignore_index=True)
+    agg = {'tempHot': 'mean', 'humiHot': 'mean'}
+    result, stats = dedup_keys(rack, ['contID', 'rackID'], agg)
+
+    pd.testing.assert_frame_equal(result, _groupby(rack, ['contID', 'rackID'], agg))
+    assert stats['divergence']['tempHot']['max'] >= 1.0
+
+
+def test_dedup_drops_missing_keys_like_groupby():
+    raw = make_cont_readings(n_zones=3, days=1).astype({'contID': 'float64'})
+    raw.loc[3, 'contID'] = np.nan
+    raw.loc[10, 'colDate'] = pd.NaT
+    result, stats = dedup_keys(raw, ['contID'], AGG_DICT)
+
+    pd.testing.assert_frame_equal(result, _groupby(raw, ['contID'], AGG_DICT))
+    assert stats['dropped_rows'] == 2 and stats['rows'] == len(raw)
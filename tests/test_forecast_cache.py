@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""forecast_cache: 캐시를 거친 예측 = 전체 이력 forecast (처음 / 메모리 / 디스크 / 기간 늘림)"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_cache import GRAIN_COL, TARGET_COL, TIME_COL, ForecastCache
+from forecast_context import VERIFIED_FILE, ReferenceLagForecaster, make_history
+from forecast_server import LocalForecaster
+
+
+@pytest.fixture(scope='module')
+def setup(tmp_path_factory):
+    """참조 lag 모델(pkl) + 2개 존 × 1개월 이력 + 전체 이력 forecast"""
+    tmp = tmp_path_factory.mktemp('cache')
+    model = ReferenceLagForecaster()
+    train = make_history(1, 2, model.data_frequency)
+    model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+    model_path = str(tmp / 'model.pkl')
+    joblib.dump(model, model_path)
+
+    forecaster = LocalForecaster(model_path)
+    history = make_history(1, 2, model.data_frequency).drop(columns=[TARGET_COL])
+    history = history[history[TIME_COL] < history[TIME_COL].min() + pd.Timedelta(days=5)].reset_index(drop=True)
+    expected = forecaster.forecast(history)[0]
+    return forecaster, history, expected, str(tmp / 'cache.sqlite')
+
+
+class ShortLookbackForecaster(LocalForecaster):
+    """모델 속성에서 읽은 lookback이 실제보다 짧다고 알리는 forecaster (AutoML 속성이 틀린 경우)"""
+
+    def info(self):
+        info = super().info()
+        info['lookback'] = dict(info['lookback'], periods=2)
+        return info
+
+
+def _check(result, targets, expected):
+    assert result[[GRAIN_COL, TIME_COL]].astype(str).equals(targets[[GRAIN_COL, TIME_COL]].astype(str).reset_index(drop=True))
+    merged = result.merge(expected, on=[GRAIN_COL, TIME_COL], suffixes=('', '_full'))
+    assert len(merged) == len(targets)
+    np.testing.assert_allclose(merged[TARGET_COL], merged[f'{TARGET_COL}_full'], rtol=0, atol=1e-9, equal_nan=True)
+
+
+def test_cache_matches_full_forecast(setup):
+    forecaster, history, expected, db_path = setup
+    end = history[TIME_COL].max()
+    period = history[history[TIME_COL] > end - pd.Timedelta(days=2)]
+    period = period[period[TIME_COL] <= end - pd.Timedelta(days=1)]
+    extended = history[history[TIME_COL] > end - pd.Timedelta(days=2)]
+
+    cache = ForecastCache(forecaster, path=db_path)
+    _check(cache.get_or_compute(history, period), period, expected)
+    assert cache.counters['model_calls'] == 1
+
+    # 같은 기간 다시: 메모리만
+    _check(cache.get_or_compute(history, period), period, expected)
+    assert cache.counters['model_calls'] == 1
+    assert cache.counters['memory_hits'] == len(period)
+    cache.close()
+
+    # 새 인스턴스: 디스크에서, 늘린 하루만 계산
+    reopened = ForecastCache(forecaster, path=db_path)
+    _check(reopened.get_or_compute(history, period), period, expected)
+    assert reopened.counters['disk_hits'] == len(period) and reopened.counters['model_calls'] == 0
+    _check(reopened.get_or_compute(history, extended), extended, expected)
+    assert reopened.counters['model_calls'] == 1
+    assert reopened.counters['misses'] == len(extended) - len(period)
+    reopened.close()
+
+
+def test_cache_verifies_short_lookback(setup, tmp_path):
+    """알린 lookback으로 자르면 예측이 달라지는 모델: 확인된 lookback으로 계산해 전체 이력과 같은 값만 저장"""
+    forecaster, history, expected, _ = setup
+    short = ShortLookbackForecaster(forecaster.model_path)
+    targets = history[history[TIME_COL] > history[TIME_COL].max() - pd.Timedelta(days=1)]
+
+    cache = ForecastCache(short, path=str(tmp_path / 'cache.sqlite'))
+    _check(cache.get_or_compute(history, targets), targets, expected)
+    assert cache.checked_spec['periods'] > 2
+    assert os.path.basename(cache.verified_path) == VERIFIED_FILE and os.path.exists(cache.verified_path)
+    cache.close()
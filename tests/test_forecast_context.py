@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""forecast_context: lookback 속성 → 자른 입력 예측 = 전체 이력 예측, 확인 결과는 모델 지문마다 한 번"""
+import numpy as np
+import pytest
+
+from forecast_context import (TARGET_COL, ReferenceLagForecaster, lookback_spec, make_history, trim_context,
+                              verified_spec, verify_trim)
+
+
+@pytest.fixture(scope='module')
+def model():
+    model = ReferenceLagForecaster()
+    train = make_history(1, 2, model.data_frequency)
+    return model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+
+
+@pytest.fixture(scope='module')
+def X(model):
+    return make_history(1, 3, model.data_frequency).drop(columns=[TARGET_COL])
+
+
+class RejectsShortInput:
+    """AutoML처럼 짧은(자른) 입력에서 예외를 내는 모델"""
+
+    def __init__(self, model, min_rows):
+        self.model, self.min_rows = model, min_rows
+        self.calls = 0
+
+    def forecast(self, X_pred=None):
+        self.calls += 1
+        if len(X_pred) < self.min_rows:
+            raise ValueError('input is not contiguous enough')
+        return self.model.forecast(X_pred)
+
+
+def test_lookback_spec_from_attributes(model):
+    spec = lookback_spec(model)
+    assert spec['periods'] == max(model.target_lags) + model.target_rolling_window_size + model.max_horizon
+    assert spec['freq'] == '15min'
+
+
+def test_trimmed_forecast_matches_full(model, X):
+    spec = lookback_spec(model)
+    trimmed = trim_context(X, spec)
+    checked, diff = verify_trim(model, X, spec)
+
+    assert len(trimmed) == X['contID'].nunique() * (spec['periods'] + spec['horizon'])
+    assert checked['periods'] == spec['periods'] and diff <= 1e-9
+
+
+def test_short_lookback_is_grown(model, X):
+    short = dict(lookback_spec(model), periods=2)
+    checked, diff = verify_trim(model, X, short)
+
+    assert checked['periods'] > 2 and diff <= 1e-9
+
+
+def test_rejected_trim_falls_back_to_full_history(model, X):
+    rejecting = RejectsShortInput(model, min_rows=len(X))
+    checked, _ = verify_trim(rejecting, X, lookback_spec(model))
+
+    assert checked['periods'] is None and 'ValueError' in checked['error']
+    assert len(trim_context(X, checked)) == len(X)
+
+
+def test_verified_spec_checks_once_per_fingerprint(model, X, tmp_path):
+    path = str(tmp_path / 'lookback_verified.json')
+    counting = RejectsShortInput(model, min_rows=0)
+    spec = lookback_spec(model)
+
+    first = verified_spec(counting, X, spec, 'abc', path)
+    calls = counting.calls
+    again = verified_spec(counting, X, spec, 'abc', path)
+    other = verified_spec(counting, X, spec, 'def', path)
+
+    assert first == again == other
+    assert calls == 2 and counting.calls == 4
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""forecast_frame: 벡터화 리샘플 vs 기존 존별 루프, 스트리밍/증분 vs 일괄"""
+import io
+
+import pandas as pd
+import pytest
+
+from forecast_frame import (DATE_FORMAT, _build_forecast_frame_loop, append_forecast_csv, build_forecast_frame,
+                            stream_forecast_csv)
+from synthetic import make_cont_readings
+
+# 스트리밍은 청크마다 중복 평균을 따로 내므로 마지막 자리(1 ULP)까지 같지는 않다
+RTOL = 1e-12
+
+
+@pytest.fixture(scope='module')
+def raw():
+    """4개 존 × 3일, 10분 간격 (결측 5%, 중복 3%, 존 2~4는 늦게 시작), colDate 순"""
+    return make_cont_readings(n_zones=4, days=3, interval_min=10)
+
+
+@pytest.fixture(scope='module')
+def batch(raw):
+    return build_forecast_frame(raw)
+
+
+def _read(path_or_text):
+    """data.csv → (contID, colDate) 순 DataFrame"""
+    df = pd.read_csv(path_or_text, parse_dates=['colDate'])
+    return df.sort_values(['contID', 'colDate'], kind='stable').reset_index(drop=True)
+
+
+def _batch_csv(batch):
+    return _read(io.StringIO(batch.to_csv(index=False)))
+
+
+def test_resample_matches_zone_loop_bytes(raw, batch):
+    assert batch.to_csv(index=False) == _build_forecast_frame_loop(raw).to_csv(index=False)
+
+
+def test_resample_parallel_matches_single(raw, batch):
+    assert build_forecast_frame(raw, workers=2).equals(batch)
+
+
+def test_late_start_zone_backfills_rack_count(raw, batch):
+    """늦게 시작한 존의 앞쪽 격자: 센서는 비어 있고 rack_count는 첫 측정값으로 backward fill"""
+    starts = raw.groupby('contID')['colDate'].min().dt.floor('15min')
+    late = starts[starts > starts.min()]
+    assert len(late) > 0
+
+    for zone, first in late.items():
+        lead = batch[(batch['contID'] == zone) & (batch['colDate'] < first)]
+        assert len(lead) > 0
+        assert lead['tempHot'].isna().all()
+        first_rack = raw.loc[raw['contID'] == zone, 'rack_count'].iloc[0]
+        assert (lead['rack_count'] == first_rack).all()
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 1_000])
+def test_stream_matches_batch(tmp_path, raw, batch, chunk_rows):
+    src, dst = tmp_path / 'src.csv', tmp_path / 'data.csv'
+    raw.to_csv(src, index=False)
+    stats = stream_forecast_csv(str(src), str(dst), chunk_rows=chunk_rows)
+
+    assert stats['output_rows'] == len(batch)
+    pd.testing.assert_frame_equal(_read(dst), _batch_csv(batch), check_exact=False, rtol=RTOL)
+
+
+def test_stream_writes_one_date_format(tmp_path, raw):
+    """chunk_rows=7이면 자정 행만 있는 청크가 생긴다 → 날짜만 쓰면 형식이 섞여 pandas 2에서 읽기 실패"""
+    src, dst = tmp_path / 'src.csv', tmp_path / 'data.csv'
+    raw.to_csv(src, index=False)
+    stream_forecast_csv(str(src), str(dst), chunk_rows=7)
+
+    dates = pd.read_csv(dst, dtype={'colDate': str})['colDate']
+    assert (dates.str.len() == len('2025-07-01 00:00:00')).all()
+    pd.to_datetime(dates, format=DATE_FORMAT)
+
+
+def test_append_matches_batch(tmp_path, raw, batch):
+    """두 번 나눠 증분 실행 = 일괄 결과 (마지막 열린 구간은 아직 확정하지 않으므로 제외)"""
+    cut = raw['colDate'].iloc[len(raw) // 2]
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    raw[raw['colDate'] < cut].to_csv(first, index=False)
+    raw[raw['colDate'] >= cut].to_csv(second, index=False)
+    out = tmp_path / 'out'
+    out.mkdir()
+
+    append_forecast_csv(str(first), str(out), chunk_rows=50)
+    stats = append_forecast_csv(str(second), str(out), chunk_rows=50)
+
+    appended = _read(out / 'data.csv')
+    expected = _batch_csv(batch)
+    expected = expected[expected['colDate'] <= appended['colDate'].max()].reset_index(drop=True)
+    pd.testing.assert_frame_equal(appended, expected, check_exact=False, rtol=RTOL)
+    # 존마다 빠진 행은 워터마크 뒤 구간뿐
+    assert (batch['colDate'] > appended['colDate'].max()).sum() == raw['contID'].nunique()
+    assert stats['watermark'] > appended['colDate'].max()
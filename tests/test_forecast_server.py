@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""forecast_server: 묶어서 forecast 한 번 = 요청마다 forecast, HTTP 잘못된 본문은 400"""
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_context import ReferenceLagForecaster, make_history
+from forecast_server import GRAIN_COL, TARGET_COL, ForecastClient, ForecastService, make_handler, run_forecast
+
+
+@pytest.fixture(scope='module')
+def model():
+    model = ReferenceLagForecaster()
+    train = make_history(1, 2, model.data_frequency)
+    return model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+
+
+@pytest.fixture(scope='module')
+def windows(model):
+    """존 4개 × 마지막 48행 컨텍스트 창"""
+    X = make_history(1, 4, model.data_frequency).drop(columns=[TARGET_COL])
+    return [g.tail(48).reset_index(drop=True) for _, g in X.groupby(GRAIN_COL)]
+
+
+@pytest.fixture(scope='module')
+def server(model):
+    service = ForecastService(model, model_path='missing_model.pkl', max_wait_ms=50).start()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield service, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    service.stop()
+
+
+def test_coalesced_requests_match_single_forecasts(model, windows, server):
+    service, _ = server
+    futures = [service.submit(w) for w in windows]
+    results = [f.result() for f in futures]
+
+    for window, (predictions, timing) in zip(windows, results):
+        pd.testing.assert_frame_equal(predictions, run_forecast(model, window))
+    assert max(timing['coalesced'] for _, timing in results) > 1
+
+
+def test_client_matches_local_forecast(model, windows, server):
+    _, url = server
+    predictions, timing = ForecastClient(url).forecast(windows[0])
+
+    # JSON 본문은 to_json 기본 소수 10자리
+    np.testing.assert_allclose(predictions[TARGET_COL], run_forecast(model, windows[0])[TARGET_COL], atol=1e-8)
+    assert 'server_ms' in timing
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'rows', {'windows': [1, 2]}, {'rows': [{'contID': 1}]}])
+def test_bad_request_body_returns_400(server, body):
+    _, url = server
+    req = urllib.request.Request(url + '/forecast', data=json.dumps(body).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(req, timeout=10)
+    assert e.value.code == 400
+    assert 'error' in json.loads(e.value.read())
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""forest_compiler: 펼친 숲의 점수/라벨 = sklearn IsolationForest"""
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from forest_compiler import compile_forest, export_forest, load_forest
+
+
+def _data(n=2_000, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, n_features))
+    X[:20] *= 6   # 꼬리 (이상 행)
+    return X
+
+
+def _with_thresholds(model, X):
+    """분기 threshold와 정확히 같은 값을 가진 행 추가 (float32 경계 비교 확인)"""
+    est, features = model.estimators_[0], model.estimators_features_[0]
+    t = est.tree_
+    inner = np.flatnonzero(t.children_left != -1)
+    extra = np.repeat(X[:1], len(inner), axis=0)
+    extra[np.arange(len(inner)), np.asarray(features)[t.feature[inner]]] = t.threshold[inner]
+    return np.vstack([X, extra])
+
+
+@pytest.mark.parametrize('params', [
+    {'n_estimators': 100, 'contamination': 0.05},
+    {'n_estimators': 30, 'max_samples': 64, 'max_features': 0.5, 'contamination': 'auto'},
+])
+def test_compiled_forest_matches_sklearn(params):
+    X = _data()
+    model = IsolationForest(random_state=42, **params).fit(X)
+    X_test = _with_thresholds(model, _data(seed=1))
+
+    scores, labels = compile_forest(model).score_and_label(X_test)
+
+    np.testing.assert_allclose(scores, model.score_samples(X_test), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(labels == 1, model.predict(X_test) == -1)
+
+
+def test_exported_forest_roundtrip(tmp_path):
+    X = _data()
+    model = IsolationForest(n_estimators=50, random_state=0).fit(X)
+    path = str(tmp_path / 'forest.npz')
+    forest = export_forest(model, path)
+
+    loaded = load_forest(path)
+    np.testing.assert_array_equal(loaded.score_samples(X), forest.score_samples(X))
+    assert loaded.offset == forest.offset
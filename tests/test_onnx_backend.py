@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""onnx_backend: 변환한 그래프의 점수/라벨/예측 = sklearn (float32 입력 기준)"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingRegressor, IsolationForest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('skl2onnx')
+
+from anomaly_pipeline import AnomalyPipeline, FEATURE_COLS
+from forest_compiler import compile_forest
+from onnx_backend import (FORECAST_FEATURES, SCORE_ATOL, OnnxForecaster, convert_anomaly,
+                          convert_forecaster, load_onnx_pipeline)
+from synthetic import make_cont_readings
+
+
+@pytest.fixture(scope='module')
+def readings():
+    return make_cont_readings(n_zones=2, days=3, missing_frac=0, dup_frac=0, max_start_delay_min=0)
+
+
+def _float32(df, cols):
+    """그래프 입력과 같은 값 (float32로 내린 뒤 float64)"""
+    return df[cols].to_numpy(dtype=np.float32).astype(np.float64)
+
+
+def _target(df):
+    """30분 뒤 tempHot (존 끝 2행은 현재 값)"""
+    return df.groupby('contID')['tempHot'].shift(-2).fillna(df['tempHot']).to_numpy()
+
+
+def test_anomaly_graph_matches_sklearn(readings, tmp_path):
+    X = _float32(readings, FEATURE_COLS)
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=50, contamination=0.05, random_state=0).fit(scaler.transform(X))
+    convert_anomaly('cont', AnomalyPipeline(compile_forest(model), scaler.mean_, scaler.scale_, FEATURE_COLS, {}),
+                    root=str(tmp_path))
+
+    pipeline = load_onnx_pipeline('cont', root=str(tmp_path))
+    scores, labels = pipeline.score(readings)
+    np.testing.assert_allclose(scores, model.score_samples(scaler.transform(X)), rtol=0, atol=SCORE_ATOL)
+    agree = (labels == (model.predict(scaler.transform(X)) == -1)).mean()
+    assert agree >= 0.999
+    assert pipeline.meta['level'] == 'cont'
+
+
+def test_forecaster_graph_matches_sklearn(readings, tmp_path):
+    X = _float32(readings, FORECAST_FEATURES)
+    model = GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0).fit(X, _target(readings))
+    model.max_horizon = 2
+    path = convert_forecaster(model, path=str(tmp_path / 'model.onnx'))
+
+    onnx_model = OnnxForecaster(path)
+    y_pred, X_out = onnx_model.forecast(readings)
+    np.testing.assert_allclose(y_pred, model.predict(X), rtol=0, atol=SCORE_ATOL)
+    assert X_out is readings
+    assert onnx_model.max_horizon == 2                      # forecast_context.lookback_spec이 읽는 속성
+    with pytest.raises(ValueError):
+        onnx_model.forecast(forecast_destination=pd.Timestamp('2024-01-01'))
+
+
+def test_column_transformer_inputs_fed_by_name(readings, tmp_path):
+    X = _float32(readings, FORECAST_FEATURES)
+    model = Pipeline([
+        ('columns', ColumnTransformer([('scale', StandardScaler(), FORECAST_FEATURES)])),
+        ('model', GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0)),
+    ]).fit(pd.DataFrame(X, columns=FORECAST_FEATURES), _target(readings))
+    onnx_model = OnnxForecaster(convert_forecaster(model, path=str(tmp_path / 'model.onnx')))
+    assert onnx_model.input_names == FORECAST_FEATURES
+
+    shuffled = readings[FORECAST_FEATURES[::-1] + ['contID']]   # 컬럼 순서와 무관하게 이름으로
+    expected = model.predict(pd.DataFrame(X, columns=FORECAST_FEATURES))
+    np.testing.assert_allclose(onnx_model.predict(shuffled), expected, rtol=0, atol=SCORE_ATOL)
+    with pytest.raises(ValueError):
+        onnx_model.predict(X)                                # 이름 없는 배열은 컬럼별 입력에 못 넣음
+
+
+def test_automl_wrapper_is_rejected(tmp_path):
+    class ForecastWrapper:
+        def predict(self, X):
+            return X
+
+        def forecast(self, X_pred=None):
+            return X_pred
+
+    with pytest.raises(ValueError):
+        convert_forecaster(ForecastWrapper(), path=str(tmp_path / 'model.onnx'))
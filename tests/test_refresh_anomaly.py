@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""14_refresh_anomaly_models: 슬라이딩 윈도우 트리 교체 (윈도우 크기, 스케일러, 날짜별 시드)"""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from anomaly_pipeline import FEATURE_COLS
+
+refresh = importlib.import_module('14_refresh_anomaly_models')
+
+WINDOW_DAYS = 3
+TREES_PER_DAY = 4
+
+
+@pytest.fixture(scope='module')
+def days_data():
+    """6일 × 하루 500행 (날짜마다 평균이 조금씩 이동)"""
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2025-07-01', periods=6).strftime('%Y-%m-%d')
+    return {d: (rng.standard_normal((500, len(FEATURE_COLS))) + i * 0.1).astype(np.float32)
+            for i, d in enumerate(days)}
+
+
+@pytest.fixture(scope='module')
+def refreshed(days_data):
+    """하루씩 반영하면서 날짜별 새 트리의 random_state 기록"""
+    state = refresh.new_state('cont', WINDOW_DAYS, TREES_PER_DAY)
+    rng = np.random.default_rng(0)
+    seeds = {}
+    for day in sorted(days_data):
+        refresh.refresh_day(state, day, days_data[day], rng)
+        seeds[day] = [est.random_state for est in state['model'].estimators_[-TREES_PER_DAY:]]
+    return state, seeds
+
+
+def test_window_keeps_latest_days(days_data, refreshed):
+    state, _ = refreshed
+    latest = sorted(days_data)[-WINDOW_DAYS:]
+
+    assert sorted(state['cohorts']) == latest
+    assert len(state['model'].estimators_) == WINDOW_DAYS * TREES_PER_DAY
+    assert sorted(set(state['tree_days'])) == latest
+
+
+def test_window_scaler_matches_fit_on_window(days_data, refreshed):
+    state, _ = refreshed
+    X = np.concatenate([days_data[d] for d in sorted(state['cohorts'])]).astype(np.float64)
+    expected = StandardScaler().fit(X)
+
+    np.testing.assert_allclose(state['scaler'].mean_, expected.mean_, rtol=1e-10)
+    np.testing.assert_allclose(state['scaler'].scale_, expected.scale_, rtol=1e-10)
+
+
+def test_new_trees_get_new_seeds_each_day(refreshed):
+    """윈도우가 찬 뒤에도 날짜마다 새 트리 시드가 달라야 함 (고정 random_state면 매일 같은 시드)"""
+    _, seeds = refreshed
+    all_seeds = [s for day_seeds in seeds.values() for s in day_seeds]
+    assert len(set(all_seeds)) == len(all_seeds)
+    assert refresh.day_seed('2025-07-05') == refresh.day_seed('2025-07-05')
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""15_train_anomaly_sampled: 층화 저장소 샘플 (층별 키가 가장 작은 per_stratum행, 청크 크기와 무관)"""
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_pipeline import FEATURE_COLS
+from synthetic import make_anomaly_workload
+
+sampled = importlib.import_module('15_train_anomaly_sampled')
+
+PER_STRATUM = 5
+SEED = 7
+
+
+@pytest.fixture(scope='module')
+def workload():
+    return make_anomaly_workload(3_000, n_zones=2, level='cont')
+
+
+def _run(df, chunk_rows, per_stratum=PER_STRATUM):
+    reservoir = sampled.StratifiedReservoir(per_stratum, len(FEATURE_COLS), seed=SEED)
+    for first in range(0, len(df), chunk_rows):
+        chunk = df.iloc[first:first + chunk_rows]
+        reservoir.update(chunk[FEATURE_COLS].to_numpy(dtype=np.float32), sampled.strata_of(chunk), first)
+    return reservoir
+
+
+def test_reservoir_keeps_smallest_keys_per_stratum(workload):
+    """한 번에 뽑은 난수 키로 층별 작은 키 per_stratum개를 고른 결과와 같은 행"""
+    reservoir = _run(workload, chunk_rows=len(workload))
+    keys = np.random.default_rng(SEED).random(len(workload))
+    strata = sampled.strata_of(workload)
+    expected = (pd.DataFrame({'stratum': strata, 'key': keys, 'row': np.arange(len(workload))})
+                .sort_values(['stratum', 'key']).groupby('stratum').head(PER_STRATUM)['row'])
+
+    assert sorted(reservoir.rows.tolist()) == sorted(expected.tolist())
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 97, 1_000])
+def test_reservoir_independent_of_chunking(workload, chunk_rows):
+    whole = _run(workload, chunk_rows=len(workload))
+    chunked = _run(workload, chunk_rows=chunk_rows)
+
+    assert sorted(chunked.rows.tolist()) == sorted(whole.rows.tolist())
+    assert chunked.seen == whole.seen
+
+
+def test_reservoir_sample_weights(workload):
+    """층별 샘플 수 = min(층 행 수, per_stratum), 가중치 합 = 전체 행 수, 샘플 값은 원본 행"""
+    reservoir = _run(workload, chunk_rows=256)
+    X, weights = reservoir.sample()
+    strata = sampled.strata_of(workload)
+    counts = pd.Series(strata).value_counts()
+
+    kept = pd.Series(reservoir.strata).value_counts()
+    pd.testing.assert_series_equal(kept.sort_index(), counts.clip(upper=PER_STRATUM).sort_index(),
+                                   check_names=False)
+    assert weights.sum() == pytest.approx(len(workload))
+    rows = np.sort(reservoir.rows)
+    np.testing.assert_array_equal(X, workload[FEATURE_COLS].to_numpy(dtype=np.float32)[rows])
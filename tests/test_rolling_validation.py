@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""rolling_validation: 존 × 창 결과 = 한 번에 rolling_forecast, 워커 수와 무관, 체크포인트에서 남은 창만"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import rolling_validation
+from forecast_context import TARGET_COL, TIME_COL, ReferenceLagForecaster, make_history
+from forecast_server import GRAIN_COL
+
+WINDOW = '1D'
+KEYS = [GRAIN_COL, 'origin', TIME_COL]
+
+
+@pytest.fixture(scope='module')
+def history():
+    df = make_history(1, 2, '15min')
+    start = df[TIME_COL].min() + pd.Timedelta(days=7)
+    return df, start, start + pd.Timedelta(days=2)
+
+
+@pytest.fixture(scope='module')
+def model_path(history, tmp_path_factory):
+    df, start, _ = history
+    model = ReferenceLagForecaster()
+    train = df[df[TIME_COL] < start].dropna(subset=[TARGET_COL])
+    model.fit(train.drop(columns=[TARGET_COL]), train[TARGET_COL].to_numpy(dtype=np.float64))
+    path = str(tmp_path_factory.mktemp('model') / 'reference.pkl')
+    joblib.dump(model, path)
+    return path
+
+
+def _validate(model_path, history, root, **kwargs):
+    df, start, end = history
+    results, errors = rolling_validation.run_validation(model_path, df, start, end, WINDOW,
+                                                        checkpoint_root=str(root), **kwargs)
+    return results.sort_values(KEYS, kind='stable').reset_index(drop=True), errors
+
+
+@pytest.fixture(scope='module')
+def single(model_path, history, tmp_path_factory):
+    return _validate(model_path, history, tmp_path_factory.mktemp('ckpt'), workers=1, zones_per_task=1)
+
+
+def test_windows_match_single_call(model_path, history, single):
+    df, start, end = history
+    model = joblib.load(model_path)
+    raw = rolling_validation.single_call(model, df, start, end)
+    reference = raw.rename(columns={model.forecast_origin_column_name: 'origin',
+                                    model.forecast_column_name: 'single'})
+    results, errors = single
+    merged = results.merge(reference.assign(origin=pd.to_datetime(reference['origin']))[KEYS + ['single']],
+                           on=KEYS, how='outer', indicator=True)
+    # 한 번에 예측은 end에서 데이터를 자르므로 마지막 origin의 end 뒤 horizon만 엔진에 더 있음
+    assert (merged['_merge'] != 'right_only').all()
+    assert (merged.loc[merged['_merge'] == 'left_only', TIME_COL] >= end).all()
+    both = merged[merged['_merge'] == 'both']
+    assert len(both) == len(reference)
+    np.testing.assert_allclose(both['predicted'], both['single'], rtol=1e-9, atol=1e-9)
+    assert set(results['horizon']) == {1, 2}
+    assert errors['n'].sum() == results[['actual', 'predicted']].notna().all(axis=1).sum()
+
+
+def test_parallel_matches_single(model_path, history, single, tmp_path):
+    results, errors = _validate(model_path, history, tmp_path, workers=2)
+    pd.testing.assert_frame_equal(results, single[0], check_dtype=False)
+    pd.testing.assert_frame_equal(errors, single[1], check_dtype=False)
+
+
+def test_resume_runs_only_missing_windows(model_path, history, single, tmp_path, monkeypatch):
+    df = history[0]
+    _validate(model_path, history, tmp_path, workers=1, zones_per_task=1)
+    run_dir = rolling_validation.checkpoint_dir(model_path, df, WINDOW, zones_per_task=1, root=str(tmp_path))
+    tasks = sorted(p for p in os.listdir(run_dir) if p.endswith(('.parquet', '.csv')))
+    assert len(tasks) == 4                                       # 창 2개 × 존 2개
+    os.remove(os.path.join(run_dir, tasks[0]))
+
+    ran = []
+    run_window = rolling_validation._run_window
+    monkeypatch.setattr(rolling_validation, '_run_window', lambda task: ran.append(task['key']) or run_window(task))
+    results, _ = _validate(model_path, history, tmp_path, workers=1, zones_per_task=1)
+    assert ran == [tasks[0].rsplit('.', 1)[0]]
+    pd.testing.assert_frame_equal(results, single[0], check_dtype=False)
+
+    ran.clear()
+    _validate(model_path, history, tmp_path, workers=1, zones_per_task=1, resume=False)
+    assert len(ran) == 4
+
+
+def test_checkpoint_dir_changes_with_inputs(model_path, history, tmp_path):
+    df = history[0]
+    base = rolling_validation.checkpoint_dir(model_path, df, WINDOW, root=str(tmp_path))
+    assert base == rolling_validation.checkpoint_dir(model_path, df.copy(), WINDOW, root=str(tmp_path))
+    assert base != rolling_validation.checkpoint_dir(model_path, df, '2D', root=str(tmp_path))
+    changed = df.assign(tempHot=df['tempHot'].where(df.index != 0, df['tempHot'] + 1))
+    assert base != rolling_validation.checkpoint_dir(model_path, changed, WINDOW, root=str(tmp_path))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""run_pipeline: 출력 해시 (공유 출력은 있는지만), 단계 키 = 입력 + 코드 + 인자"""
+import os
+
+from run_pipeline import STAGES, outputs_digest, stage_key
+
+
+def _stage(tmp_path):
+    own, shared = tmp_path / 'own.csv', tmp_path / 'model.pkl'
+    own.write_text('a')
+    shared.write_text('v1')
+    return {'name': 't', 'script': 'run_pipeline.py', 'args': [], 'inputs': [str(own)],
+            'outputs': [str(own)], 'shared_outputs': [str(shared)]}, own, shared
+
+
+def test_shared_output_change_keeps_digest(tmp_path):
+    """14가 모델 pkl을 갱신해도 03 출력 해시는 그대로 (다시 실행해서 덮어쓰지 않음)"""
+    stage, own, shared = _stage(tmp_path)
+    before = outputs_digest(stage, {})
+    shared.write_text('refreshed by 14')
+
+    assert outputs_digest(stage, {}) == before
+    os.remove(shared)
+    assert outputs_digest(stage, {}) is None
+
+
+def test_own_output_change_changes_digest(tmp_path):
+    stage, own, _ = _stage(tmp_path)
+    before = outputs_digest(stage, {})
+    own.write_text('b')
+
+    assert outputs_digest(stage, {}) != before
+
+
+def test_stage_key_follows_inputs_and_args(tmp_path):
+    stage, own, _ = _stage(tmp_path)
+    key = stage_key(stage, {})
+
+    assert stage_key(dict(stage, args=['--x']), {}) != key
+    own.write_text('changed')
+    assert stage_key(stage, {}) != key
+
+
+def test_no_stage_hashes_the_shared_pipeline_dir():
+    """models/anomaly_pipeline/은 03/13/14/15가 버전을 추가하는 공유 폴더"""
+    for stage in STAGES:
+        assert './models/anomaly_pipeline' not in stage['outputs']